@@ -0,0 +1,178 @@
+"""
+Archivos estáticos con huella y respuestas comprimidas.
+
+RAZÓN: styles.css, script.js y logo.jpg se servían sin versión ni
+compresión, y las páginas que se recargan cada pocos segundos (cocina,
+dashboard, ver_mesa, nuevo_pedido) traían cientos de líneas de <style> y
+<script> en línea, que se volvían a descargar en cada recarga. Ahora esos
+bloques son archivos de static/ y las plantillas los piden con
+activo('css/cocina.css'):
+
+- La URL lleva el hash del contenido (/activos/css/cocina.3f2a1b9c4d.css) y
+  se sirve con Cache-Control immutable por un año: la tableta la descarga
+  una vez por versión. Al cambiar el archivo cambia el hash (se revisa la
+  fecha de modificación en cada llamada) y la URL es otra.
+- Los de texto (css, js, svg…) se comprimen una vez por worker y versión, en
+  brotli si el paquete `brotli` está instalado y el navegador lo acepta, o
+  en gzip.
+- Las respuestas HTML y JSON de las vistas se comprimen al vuelo (nivel
+  bajo, rápido) si el navegador lo acepta.
+
+Una URL con un hash viejo (una página guardada antes de desplegar) recibe el
+contenido actual sin caché, para no guardar para siempre un archivo con el
+nombre equivocado.
+"""
+
+import gzip
+import hashlib
+import mimetypes
+import os
+
+from flask import abort, make_response, request, url_for
+
+try:
+    import brotli
+except ImportError:  # opcional: sin él todo va en gzip
+    brotli = None
+
+# Caracteres del hash en el nombre del archivo
+LARGO_HUELLA = 10
+
+# Tipos que vale la pena comprimir (las imágenes y el audio ya vienen comprimidos)
+TIPOS_COMPRIMIBLES = {
+    'text/html', 'text/css', 'text/plain', 'text/javascript', 'application/javascript',
+    'application/json', 'image/svg+xml',
+}
+
+# Las respuestas más pequeñas no ganan nada comprimidas
+MINIMO_BYTES = 500
+
+CACHE_INMUTABLE = 'public, max-age=31536000, immutable'
+
+# ruta -> (mtime, huella)
+_huellas = {}
+# (ruta, huella, codificacion) -> bytes
+_comprimidos = {}
+
+
+# =========================
+# HUELLAS
+# =========================
+
+def _archivo(carpeta, ruta):
+    completa = os.path.realpath(os.path.join(carpeta, ruta))
+    if not completa.startswith(os.path.realpath(carpeta) + os.sep) or not os.path.isfile(completa):
+        return None
+    return completa
+
+
+def huella(carpeta, ruta):
+    """Hash corto del contenido de static/<ruta>; None si no existe"""
+    completa = _archivo(carpeta, ruta)
+    if completa is None:
+        return None
+    mtime = os.path.getmtime(completa)
+    guardada = _huellas.get(ruta)
+    if guardada and guardada[0] == mtime:
+        return guardada[1]
+    with open(completa, 'rb') as archivo:
+        valor = hashlib.sha256(archivo.read()).hexdigest()[:LARGO_HUELLA]
+    _huellas[ruta] = (mtime, valor)
+    return valor
+
+
+def nombre_con_huella(ruta, valor):
+    """'css/cocina.css' -> 'css/cocina.3f2a1b9c4d.css'"""
+    base, extension = os.path.splitext(ruta)
+    return f"{base}.{valor}{extension}"
+
+
+def separar_huella(nombre):
+    """'css/cocina.3f2a1b9c4d.css' -> ('css/cocina.css', '3f2a1b9c4d'); sin huella: (nombre, None)"""
+    base, extension = os.path.splitext(nombre)
+    base, _, valor = base.rpartition('.')
+    if not base or len(valor) != LARGO_HUELLA:
+        return nombre, None
+    return base + extension, valor
+
+
+# =========================
+# COMPRESIÓN
+# =========================
+
+def _codificacion():
+    """La mejor codificación que acepta el navegador: 'br', 'gzip' o None"""
+    opciones = ['br', 'gzip'] if brotli else ['gzip']
+    return request.accept_encodings.best_match(opciones)
+
+
+def comprimir(datos, codificacion, nivel_alto=False):
+    if codificacion == 'br':
+        return brotli.compress(datos, quality=11 if nivel_alto else 4)
+    return gzip.compress(datos, compresslevel=9 if nivel_alto else 5, mtime=0)
+
+
+def comprimible(mimetype):
+    return mimetype in TIPOS_COMPRIMIBLES
+
+
+# =========================
+# INSTALACIÓN
+# =========================
+
+def instalar(app):
+    carpeta = app.static_folder
+
+    def activo(ruta):
+        """URL de static/<ruta> con la huella de su contenido"""
+        valor = huella(carpeta, ruta)
+        if valor is None:
+            return url_for('static', filename=ruta)
+        return url_for('servir_activo', nombre=nombre_con_huella(ruta, valor))
+
+    @app.route('/activos/<path:nombre>')
+    def servir_activo(nombre):
+        ruta, pedida = separar_huella(nombre)
+        completa = _archivo(carpeta, ruta)
+        if completa is None:
+            abort(404)
+        valor = huella(carpeta, ruta)
+        with open(completa, 'rb') as archivo:
+            datos = archivo.read()
+
+        mimetype = mimetypes.guess_type(ruta)[0] or 'application/octet-stream'
+        codificacion = _codificacion() if comprimible(mimetype) else None
+        if codificacion:
+            clave = (ruta, valor, codificacion)
+            if clave not in _comprimidos:
+                _comprimidos[clave] = comprimir(datos, codificacion, nivel_alto=True)
+            datos = _comprimidos[clave]
+
+        respuesta = make_response(datos)
+        respuesta.mimetype = mimetype
+        if codificacion:
+            respuesta.headers['Content-Encoding'] = codificacion
+        if comprimible(mimetype):
+            respuesta.vary.add('Accept-Encoding')
+        respuesta.headers['Cache-Control'] = CACHE_INMUTABLE if pedida == valor else 'no-cache'
+        respuesta.set_etag(f"{valor}-{codificacion or 'identity'}")
+        return respuesta.make_conditional(request)
+
+    @app.after_request
+    def comprimir_respuesta(respuesta):
+        if (respuesta.direct_passthrough or respuesta.is_streamed
+                or 'Content-Encoding' in respuesta.headers
+                or not comprimible(respuesta.mimetype)
+                or not 200 <= respuesta.status_code < 300):
+            return respuesta
+        datos = respuesta.get_data()
+        if len(datos) < MINIMO_BYTES:
+            return respuesta
+        respuesta.vary.add('Accept-Encoding')
+        codificacion = _codificacion()
+        if codificacion:
+            respuesta.set_data(comprimir(datos, codificacion))
+            respuesta.headers['Content-Encoding'] = codificacion
+        return respuesta
+
+    app.add_template_global(activo, 'activo')
@@ -0,0 +1,86 @@
+"""
+Mide el costo de arranque de un worker: tiempo de `import app` y memoria (RSS máxima).
+Cada medición corre en un proceso nuevo (arranque en frío, sin caché de módulos).
+
+Ejecutar:
+    python benchmark_arranque.py                      # todos los módulos vs configuración mínima
+    python benchmark_arranque.py --repeticiones 15
+    python benchmark_arranque.py --deshabilitar presupuestos,domicilios,gastos
+
+La diferencia entre configuraciones es el costo de los módulos de rutas y de los
+servicios y eventos de la sesión que cada uno importa.
+Flask, SQLAlchemy y los modelos se cargan siempre, así que son el piso del arranque.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+import rutas
+
+MEDIR = r'''
+import json, resource, sys, time
+inicio = time.perf_counter()
+import app
+duracion = time.perf_counter() - inicio
+rss_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+print(json.dumps({
+    "segundos": duracion,
+    "rss_mb": rss_kb / 1024,
+    "rutas": len(list(app.app.url_map.iter_rules())),
+    "modulos": len(sys.modules),
+}))
+'''
+
+
+def medir(deshabilitados, repeticiones):
+    entorno = dict(os.environ, MODULOS_DESHABILITADOS=','.join(sorted(deshabilitados)))
+    resultados = []
+    for _ in range(repeticiones):
+        salida = subprocess.run(
+            [sys.executable, '-c', MEDIR],
+            env=entorno, capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        )
+        resultados.append(json.loads(salida.stdout.strip().splitlines()[-1]))
+    return {
+        'segundos': statistics.median(r['segundos'] for r in resultados),
+        'rss_mb': statistics.median(r['rss_mb'] for r in resultados),
+        'rutas': resultados[0]['rutas'],
+        'modulos': resultados[0]['modulos'],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeticiones', type=int, default=7)
+    parser.add_argument('--deshabilitar', default=None,
+                        help="módulos a deshabilitar en la configuración reducida (por defecto todos los opcionales)")
+    args = parser.parse_args()
+
+    if args.deshabilitar is None:
+        reducida = set(rutas.MODULOS) - rutas.OBLIGATORIOS
+    else:
+        reducida = rutas.parsear_deshabilitados(args.deshabilitar)
+
+    configuraciones = [
+        ('todos los módulos', set()),
+        (f"sin {', '.join(sorted(reducida))}", reducida),
+    ]
+
+    print(f"Mediana de {args.repeticiones} arranques en frío\n")
+    print(f"{'configuración':<60} {'import (ms)':>12} {'RSS (MB)':>10} {'rutas':>6} {'módulos':>8}")
+    base = None
+    for nombre, deshabilitados in configuraciones:
+        r = medir(deshabilitados, args.repeticiones)
+        base = base or r
+        print(f"{nombre[:60]:<60} {r['segundos'] * 1000:>12.1f} {r['rss_mb']:>10.1f} {r['rutas']:>6} {r['modulos']:>8}")
+
+    print(f"\nAhorro: {(base['segundos'] - r['segundos']) * 1000:.1f} ms, {base['rss_mb'] - r['rss_mb']:.1f} MB por worker")
+
+
+if __name__ == '__main__':
+    main()
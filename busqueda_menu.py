@@ -0,0 +1,226 @@
+"""
+Búsqueda de platillos para la toma de pedidos.
+
+RAZÓN: nuevo_pedido y nuevo_domicilio enviaban todo el menú disponible al
+navegador y lo filtraban allí; con cientos de platillos las tabletas de los
+meseros se vuelven lentas. Ahora la página trae solo los más pedidos y el
+resto se busca en /api/menu/buscar.
+
+El índice vive en la memoria de cada worker: prefijos de cada palabra y
+trigramas (para errores de escritura) sobre el nombre, la descripción y la
+categoría, sin tildes ni mayúsculas. Un menú de cientos de platillos ocupa
+poco, y una búsqueda es un par de lecturas de diccionario, sin consultar la
+base de datos. Cada sucursal tiene su menú y su índice. Se reconstruye
+cuando el menú cambia en este worker y, para los cambios hechos en otro
+worker, cuando vence el TTL. Los platillos que el inventario agota o vuelve a
+mostrar suben Sucursal.version_menu, que se revisa cada VERSION_TTL segundos:
+esos cambios llegan a todos los workers casi de inmediato (ver inventario.py).
+
+Orden de los resultados: qué tan bien coincide, luego los más pedidos en los
+últimos días, luego el orden de la categoría y del platillo en el menú.
+"""
+
+import os
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+
+from cache_local import CacheLRU
+from extensiones import db
+from modelos import ItemMenu, CategoriaMenu, Sucursal
+from ocupacion import dia_operativo
+from ventas import normalizar_nombre, unidades_por_item
+from sucursales import sucursal_actual_id
+
+TTL_INDICE = int(os.environ.get('MENU_BUSQUEDA_TTL', 60))
+# Cada cuánto se revisa Sucursal.version_menu
+VERSION_TTL = 2
+
+# Días de ventas que cuentan para "los más pedidos"
+DIAS_POPULARIDAD = 30
+
+# Fracción de los trigramas de una palabra que debe aparecer en el platillo
+SIMILITUD_TRIGRAMAS = 0.5
+
+# Puntaje por tipo de coincidencia de cada palabra buscada
+PUNTOS_PALABRA_EXACTA = 4
+PUNTOS_PREFIJO_NOMBRE = 3
+PUNTOS_TRIGRAMAS = 2
+PUNTOS_DESCRIPCION = 1
+
+
+def trigramas(palabra):
+    relleno = f"  {palabra} "
+    return {relleno[i:i + 3] for i in range(len(relleno) - 2)}
+
+
+class IndiceMenu:
+    """Índice de prefijos y trigramas sobre los platillos disponibles"""
+
+    def __init__(self, platillos, popularidad=None):
+        """
+        platillos: dicts con id, nombre, descripcion, precio, categoria,
+        orden_categoria y orden. popularidad: {item_id: unidades}.
+        """
+        popularidad = popularidad or {}
+        self.platillos = []
+        self._palabras = []         # por platillo: palabras del nombre
+        self._prefijos_nombre = {}  # prefijo -> {posición}
+        self._prefijos_otros = {}   # prefijo de descripción/categoría -> {posición}
+        self._trigramas = {}        # trigrama del nombre -> {posición}
+
+        for posicion, platillo in enumerate(platillos):
+            platillo = dict(platillo, popularidad=popularidad.get(platillo['id'], 0))
+            self.platillos.append(platillo)
+
+            palabras = normalizar_nombre(platillo['nombre']).split()
+            self._palabras.append(set(palabras))
+            for palabra in palabras:
+                for i in range(1, len(palabra) + 1):
+                    self._prefijos_nombre.setdefault(palabra[:i], set()).add(posicion)
+                for trigrama in trigramas(palabra):
+                    self._trigramas.setdefault(trigrama, set()).add(posicion)
+
+            otros = normalizar_nombre(f"{platillo['descripcion'] or ''} {platillo['categoria']}").split()
+            for palabra in otros:
+                for i in range(1, len(palabra) + 1):
+                    self._prefijos_otros.setdefault(palabra[:i], set()).add(posicion)
+
+        self._orden_base = sorted(range(len(self.platillos)), key=self._clave_orden)
+
+    def _clave_orden(self, posicion, puntaje=0):
+        platillo = self.platillos[posicion]
+        return (-puntaje, -platillo['popularidad'], platillo['orden_categoria'],
+                platillo['orden'], platillo['nombre'])
+
+    def _coincidencias(self, palabra):
+        """{posición: puntaje} de los platillos que coinciden con una palabra buscada"""
+        puntajes = {}
+        for posicion in self._prefijos_otros.get(palabra, ()):
+            puntajes[posicion] = PUNTOS_DESCRIPCION
+        for posicion in self._prefijos_nombre.get(palabra, ()):
+            exacta = palabra in self._palabras[posicion]
+            puntajes[posicion] = PUNTOS_PALABRA_EXACTA if exacta else PUNTOS_PREFIJO_NOMBRE
+
+        # Errores de escritura: "amburguesa", "limonda"
+        if len(palabra) >= 3:
+            buscados = trigramas(palabra)
+            comunes = Counter()
+            for trigrama in buscados:
+                comunes.update(self._trigramas.get(trigrama, ()))
+            minimo = SIMILITUD_TRIGRAMAS * len(buscados)
+            for posicion, cantidad in comunes.items():
+                if cantidad >= minimo:
+                    puntaje = PUNTOS_TRIGRAMAS * cantidad / len(buscados)
+                    puntajes[posicion] = max(puntajes.get(posicion, 0), puntaje)
+        return puntajes
+
+    def buscar(self, texto, limite=20):
+        """Platillos que coinciden con todas las palabras de `texto`, mejores primero"""
+        palabras = normalizar_nombre(texto).split()
+        if not palabras:
+            return [self.platillos[p] for p in self._orden_base[:limite]]
+
+        total = None
+        for palabra in palabras:
+            puntajes = self._coincidencias(palabra)
+            if total is None:
+                total = puntajes
+            else:
+                total = {p: total[p] + puntos for p, puntos in puntajes.items() if p in total}
+            if not total:
+                return []
+
+        mejores = sorted(total, key=lambda p: self._clave_orden(p, total[p]))
+        return [self.platillos[p] for p in mejores[:limite]]
+
+
+# =========================
+# ÍNDICE DEL WORKER
+# =========================
+
+_indices = {}  # sucursal_id -> (IndiceMenu, momento en que se construyó, version_menu)
+_lock = threading.Lock()
+
+cache_versiones = CacheLRU(max_elementos=64, ttl=VERSION_TTL)
+
+
+def _popularidad():
+    """
+    Unidades vendidas por platillo en los últimos DIAS_POPULARIDAD días cerrados.
+    Solo lee: una búsqueda (un GET) no calcula ni guarda agregados de ventas.
+    """
+    hoy = dia_operativo(datetime.now())
+    return unidades_por_item(hoy - timedelta(days=DIAS_POPULARIDAD), hoy - timedelta(days=1))
+
+
+def construir_indice():
+    """Platillos disponibles con su categoría y ventas recientes, en un número fijo de consultas"""
+    filas = db.session.execute(
+        db.select(ItemMenu.id, ItemMenu.nombre, ItemMenu.descripcion, ItemMenu.precio,
+                  ItemMenu.orden, CategoriaMenu.nombre, CategoriaMenu.orden)
+        .join(CategoriaMenu, ItemMenu.categoria_id == CategoriaMenu.id)
+        .where(ItemMenu.disponible == True)
+    ).all()
+    platillos = [
+        {
+            'id': item_id,
+            'nombre': nombre,
+            'descripcion': descripcion or '',
+            'precio': precio,
+            'categoria': categoria,
+            'orden_categoria': orden_categoria or 0,
+            'orden': orden or 0,
+        }
+        for item_id, nombre, descripcion, precio, orden, categoria, orden_categoria in filas
+    ]
+    return IndiceMenu(platillos, _popularidad())
+
+
+def _version_menu(sucursal_id):
+    """Sucursal.version_menu (se relee cada VERSION_TTL segundos)"""
+    if sucursal_id is None:
+        return 0
+    version = cache_versiones.obtener(sucursal_id)
+    if version is None:
+        version = db.session.execute(
+            db.select(Sucursal.version_menu).where(Sucursal.id == sucursal_id)
+        ).scalar() or 0
+        cache_versiones.guardar(sucursal_id, version)
+    return version
+
+
+def _vigente(entrada, version):
+    return (
+        entrada is not None
+        and time.monotonic() - entrada[1] <= TTL_INDICE
+        and entrada[2] == version
+    )
+
+
+def obtener_indice():
+    """
+    Índice de la sucursal actual en este worker; se reconstruye si venció el
+    TTL, si se invalidó o si el inventario cambió el menú en otro worker
+    """
+    sucursal_id = sucursal_actual_id()
+    version = _version_menu(sucursal_id)
+    entrada = _indices.get(sucursal_id)
+    if not _vigente(entrada, version):
+        with _lock:
+            entrada = _indices.get(sucursal_id)
+            if not _vigente(entrada, version):
+                entrada = (construir_indice(), time.monotonic(), version)
+                _indices[sucursal_id] = entrada
+    return entrada[0]
+
+
+def invalidar_indice():
+    """Llamar después de modificar el menú"""
+    _indices.clear()
+    cache_versiones.limpiar()
+
+
+def buscar_platillos(texto, limite=20):
+    return obtener_indice().buscar(texto, limite)
@@ -0,0 +1,62 @@
+"""
+Cache en memoria del proceso (LRU con expiración).
+
+RAZÓN: Algunos datos se consultan en cada petición (por ejemplo el usuario
+autenticado en los polls de cocina cada 5 segundos) pero casi nunca cambian.
+Guardarlos en memoria evita repetir la misma consulta miles de veces por hora.
+Cada worker de gunicorn tiene su propia copia; el TTL limita cuánto tiempo
+puede quedar un dato desactualizado en otro worker.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+_SIN_VALOR = object()
+
+
+class CacheLRU:
+    """LRU con TTL, segura para hilos (gunicorn gthread)"""
+
+    def __init__(self, max_elementos=512, ttl=60):
+        self.max_elementos = max_elementos
+        self.ttl = ttl
+        self._datos = OrderedDict()  # clave -> (expira, valor)
+        self._lock = threading.Lock()
+
+    def obtener(self, clave, defecto=None):
+        with self._lock:
+            entrada = self._datos.get(clave, _SIN_VALOR)
+            if entrada is _SIN_VALOR:
+                return defecto
+            expira, valor = entrada
+            if expira < time.monotonic():
+                del self._datos[clave]
+                return defecto
+            self._datos.move_to_end(clave)
+            return valor
+
+    def guardar(self, clave, valor, ttl=None):
+        expira = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._datos[clave] = (expira, valor)
+            self._datos.move_to_end(clave)
+            while len(self._datos) > self.max_elementos:
+                self._datos.popitem(last=False)
+
+    def eliminar(self, clave):
+        with self._lock:
+            self._datos.pop(clave, None)
+
+    def eliminar_si(self, condicion):
+        """Elimina todas las claves para las que condicion(clave) es verdadera"""
+        with self._lock:
+            for clave in [c for c in self._datos if condicion(c)]:
+                del self._datos[clave]
+
+    def limpiar(self):
+        with self._lock:
+            self._datos.clear()
+
+    def __len__(self):
+        return len(self._datos)
@@ -0,0 +1,215 @@
+"""
+Directorio de clientes de domicilio.
+
+RAZÓN: Cada domicilio volvía a escribir nombre, teléfono, dirección, barrio y
+referencias a mano, y para ver el historial de un cliente había que recorrer
+todos los domicilios. Ahora hay un Cliente por teléfono normalizado (índice
+único) con sus contadores de siempre: pedidos, gasto y último pedido. Se
+mantienen al crear, editar y cancelar domicilios (con expresiones SQL, dos
+pedidos simultáneos no se pisan); nunca se recalculan sobre todo el historial.
+
+- Pedidos y gasto cuentan solo los domicilios no cancelados.
+- Los datos del cliente (nombre, dirección...) son los del pedido más reciente.
+- La búsqueda por prefijo de teléfono es un rango sobre el índice único
+  (telefono >= '300' AND telefono < '300:'), que sirve igual en SQLite y en
+  PostgreSQL sin importar la intercalación.
+"""
+
+import re
+
+from sqlalchemy.exc import IntegrityError
+
+from extensiones import db
+from modelos import Cliente, Domicilio, EstadoDomicilio, Factura
+
+# Indicativo de Colombia: "+57 300 123 4567" es el mismo cliente que "3001234567"
+INDICATIVO_PAIS = '57'
+DIGITOS_NACIONALES = 10
+
+# Menos dígitos que esto devuelve demasiados clientes para autocompletar
+MINIMO_DIGITOS_BUSQUEDA = 4
+LIMITE_BUSQUEDA = 8
+
+
+def normalizar_telefono(telefono):
+    """Solo los dígitos, sin indicativo del país. '' si no hay ninguno"""
+    digitos = re.sub(r'\D', '', telefono or '')
+    if len(digitos) > DIGITOS_NACIONALES and digitos.startswith(INDICATIVO_PAIS):
+        digitos = digitos[len(INDICATIVO_PAIS):]
+    return digitos[:20]
+
+
+# =========================
+# MANTENIMIENTO INCREMENTAL
+# =========================
+
+def _acumular(domicilio, cambios, documento=None):
+    """Suma el aporte de un domicilio a cambios[telefono]"""
+    telefono = normalizar_telefono(domicilio.cliente_telefono)
+    if not telefono:
+        return
+    cambio = cambios.setdefault(telefono, {
+        'pedidos': 0, 'gasto': 0, 'ultimo': None, 'datos': None, 'documento': None, 'domicilios': []
+    })
+    if domicilio.estado != EstadoDomicilio.CANCELADO:
+        cambio['pedidos'] += 1
+        cambio['gasto'] += domicilio.total or 0
+    if cambio['ultimo'] is None or domicilio.fecha_pedido >= cambio['ultimo']:
+        cambio['ultimo'] = domicilio.fecha_pedido
+        cambio['datos'] = {
+            'nombre': domicilio.cliente_nombre,
+            'direccion': domicilio.cliente_direccion,
+            'barrio': domicilio.cliente_barrio,
+            'referencias': domicilio.cliente_referencias,
+        }
+    if documento:
+        cambio['documento'] = documento
+    cambio['domicilios'].append(domicilio)
+
+
+def _crear(telefono):
+    """Crea el cliente; si otro pedido lo creó al mismo tiempo, retorna ese"""
+    cliente = Cliente(telefono=telefono, pedidos=0, gasto_total=0)
+    try:
+        with db.session.begin_nested():
+            db.session.add(cliente)
+    except IntegrityError:
+        cliente = Cliente.query.filter_by(telefono=telefono).one()
+    return cliente
+
+
+def _aplicar(cambios, signo=1):
+    """Aplica los cambios acumulados con una sola consulta de los clientes existentes"""
+    if not cambios:
+        return
+    existentes = {
+        cliente.telefono: cliente
+        for cliente in Cliente.query.filter(Cliente.telefono.in_(list(cambios)))
+    }
+
+    for telefono, cambio in cambios.items():
+        cliente = existentes.get(telefono)
+        if cliente is None:
+            if signo < 0:
+                continue
+            cliente = _crear(telefono)
+
+        if signo > 0:
+            if cliente.ultimo_pedido is None or cambio['ultimo'] >= cliente.ultimo_pedido:
+                for campo, valor in cambio['datos'].items():
+                    setattr(cliente, campo, valor)
+                cliente.ultimo_pedido = cambio['ultimo']
+            if cambio['documento']:
+                cliente.documento = cambio['documento']
+            for domicilio in cambio['domicilios']:
+                domicilio.cliente = cliente
+
+        if cambio['pedidos'] or cambio['gasto']:
+            # Expresiones SQL: dos pedidos simultáneos del mismo cliente no se pisan
+            cliente.pedidos = Cliente.pedidos + signo * cambio['pedidos']
+            cliente.gasto_total = Cliente.gasto_total + signo * cambio['gasto']
+
+
+def registrar_domicilio(domicilio, signo=1):
+    """
+    Asocia el domicilio a su cliente (creándolo si es nuevo) y suma sus
+    contadores; signo=-1 los resta. Llamar dentro de la transacción del
+    domicilio; no hace commit.
+    """
+    cambios = {}
+    _acumular(domicilio, cambios)
+    _aplicar(cambios, signo)
+
+
+def cambio_estado(domicilio, estado_anterior):
+    """Cancelar resta el domicilio de los contadores; reactivarlo lo vuelve a sumar"""
+    cancelado_antes = estado_anterior == EstadoDomicilio.CANCELADO
+    cancelado_ahora = domicilio.estado == EstadoDomicilio.CANCELADO
+    if cancelado_antes == cancelado_ahora or domicilio.cliente_id is None:
+        return
+    signo = -1 if cancelado_ahora else 1
+    total = domicilio.total or 0
+    db.session.execute(
+        db.update(Cliente).where(Cliente.id == domicilio.cliente_id)
+        .values(pedidos=Cliente.pedidos + signo, gasto_total=Cliente.gasto_total + signo * total)
+    )
+
+
+def domicilio_editado(domicilio, telefono_anterior, total_anterior):
+    """
+    Después de editar un domicilio: si cambió el teléfono, pasa el pedido al
+    otro cliente; si no, ajusta el gasto y actualiza los datos del cliente.
+    """
+    activo = domicilio.estado != EstadoDomicilio.CANCELADO
+    if normalizar_telefono(telefono_anterior) != normalizar_telefono(domicilio.cliente_telefono):
+        if domicilio.cliente_id is not None and activo:
+            db.session.execute(
+                db.update(Cliente).where(Cliente.id == domicilio.cliente_id)
+                .values(pedidos=Cliente.pedidos - 1, gasto_total=Cliente.gasto_total - (total_anterior or 0))
+            )
+        domicilio.cliente = None
+        registrar_domicilio(domicilio)
+        return
+
+    if domicilio.cliente is None:
+        registrar_domicilio(domicilio)
+        return
+    cliente = domicilio.cliente
+    if cliente.ultimo_pedido is None or domicilio.fecha_pedido >= cliente.ultimo_pedido:
+        cliente.nombre = domicilio.cliente_nombre
+        cliente.direccion = domicilio.cliente_direccion
+        cliente.barrio = domicilio.cliente_barrio
+        cliente.referencias = domicilio.cliente_referencias
+    diferencia = (domicilio.total or 0) - (total_anterior or 0)
+    if activo and diferencia:
+        cliente.gasto_total = Cliente.gasto_total + diferencia
+
+
+def vincular_domicilios(desde_id, hasta_id):
+    """
+    Backfill: agrupa por teléfono los domicilios con id en (desde_id, hasta_id]
+    que no tienen cliente. El documento sale de su factura, si tiene.
+    Retorna cuántos procesó.
+    """
+    filas = db.session.query(Domicilio, Factura.cliente_documento).outerjoin(
+        Factura, Factura.id == Domicilio.factura_id
+    ).filter(
+        Domicilio.id > desde_id,
+        Domicilio.id <= hasta_id,
+        Domicilio.cliente_id.is_(None)
+    ).order_by(Domicilio.id).all()
+    cambios = {}
+    for domicilio, documento in filas:
+        _acumular(domicilio, cambios, (documento or '').strip())
+    _aplicar(cambios)
+    return len(filas)
+
+
+# =========================
+# BÚSQUEDA
+# =========================
+
+def buscar_por_telefono(prefijo, limite=LIMITE_BUSQUEDA):
+    """Clientes cuyo teléfono empieza por prefijo (el exacto primero)"""
+    digitos = normalizar_telefono(prefijo)
+    if len(digitos) < MINIMO_DIGITOS_BUSQUEDA:
+        return []
+    # ':' es el carácter siguiente a '9': todos los teléfonos con ese prefijo quedan en el rango
+    return Cliente.query.filter(
+        Cliente.telefono >= digitos,
+        Cliente.telefono < digitos + ':'
+    ).order_by(Cliente.telefono).limit(limite).all()
+
+
+def a_dict(cliente):
+    return {
+        'id': cliente.id,
+        'telefono': cliente.telefono,
+        'nombre': cliente.nombre or '',
+        'direccion': cliente.direccion or '',
+        'barrio': cliente.barrio or '',
+        'referencias': cliente.referencias or '',
+        'pedidos': cliente.pedidos,
+        'gasto_total': cliente.gasto_total,
+        'ultimo_pedido': cliente.ultimo_pedido.strftime('%d/%m/%Y') if cliente.ultimo_pedido else None,
+    }
@@ -0,0 +1,271 @@
+"""
+Cola de impresión de tickets de cocina (comandas).
+
+RAZÓN: Las cocinas sin pantalla necesitan la comanda en papel. Los pedidos se
+encolan al confirmarse y un hilo en segundo plano:
+- Agrupa en un solo ticket los productos de la misma mesa/domicilio que llegan
+  dentro de una ventana corta (un mesero suele enviar varios pedidos seguidos).
+- Separa el ticket por estación (cocina, bar, postres...) según la categoría.
+- Envía cada ticket a la impresora de su estación con reintentos.
+Nada de esto ocurre en el hilo de la petición.
+
+Configuración (variables de entorno):
+    IMPRESORAS_COCINA   "cocina=tcp://192.168.1.50:9100,bar=file:///dev/usb/lp0"
+    ESTACIONES_CATEGORIAS "Bebidas=bar,Postres=postres" (lo demás va a 'cocina')
+    VENTANA_TICKETS_SEGUNDOS  segundos para agrupar (por defecto 3)
+    ANCHO_TICKETS       '58' o '80' (por defecto '80')
+
+Con varios workers de gunicorn cada proceso tiene su propia cola; la
+agrupación es por proceso.
+
+Impresora simulada para pruebas:
+    python cola_impresion.py 9100 tickets.bin
+y configurar IMPRESORAS_COCINA="cocina=tcp://127.0.0.1:9100".
+"""
+
+import logging
+import os
+import queue
+import socket
+import sys
+import threading
+import time
+from datetime import datetime
+from urllib.parse import urlparse
+
+import impresion
+
+logger = logging.getLogger(__name__)
+
+ESTACION_POR_DEFECTO = 'cocina'
+
+
+# =========================
+# IMPRESORAS
+# =========================
+
+class ImpresoraRed:
+    """Impresora térmica en red (puerto RAW 9100)"""
+
+    def __init__(self, host, puerto=9100, timeout=5):
+        self.host = host
+        self.puerto = puerto
+        self.timeout = timeout
+
+    def enviar(self, datos):
+        with socket.create_connection((self.host, self.puerto), timeout=self.timeout) as conexion:
+            conexion.sendall(datos)
+
+    def __repr__(self):
+        return f"tcp://{self.host}:{self.puerto}"
+
+
+class ImpresoraArchivo:
+    """
+    Impresora como archivo: un dispositivo (/dev/usb/lp0) o un archivo normal
+    que sirve de impresora simulada en pruebas (los tickets se agregan al final).
+    """
+
+    def __init__(self, ruta):
+        self.ruta = ruta
+
+    def enviar(self, datos):
+        with open(self.ruta, 'ab') as archivo:
+            archivo.write(datos)
+
+    def __repr__(self):
+        return f"file://{self.ruta}"
+
+
+def impresora_desde_url(url):
+    """tcp://host:puerto o file:///ruta"""
+    partes = urlparse(url)
+    if partes.scheme == 'tcp':
+        return ImpresoraRed(partes.hostname, partes.port or 9100)
+    if partes.scheme == 'file':
+        return ImpresoraArchivo(partes.path)
+    raise ValueError(f"URL de impresora no soportada: {url}")
+
+
+def parsear_pares(valor):
+    """'a=b,c=d' -> {'a': 'b', 'c': 'd'}"""
+    pares = {}
+    for par in (valor or '').split(','):
+        if '=' in par:
+            clave, dato = par.split('=', 1)
+            pares[clave.strip()] = dato.strip()
+    return pares
+
+
+class SalidaImpresora:
+    """
+    Hilo de envío para una impresora. Cada impresora tiene el suyo para que
+    una impresora apagada (reintentando) no detenga los tickets de las demás.
+    """
+
+    def __init__(self, impresora, reintentos=4, espera_base=1.0):
+        self.impresora = impresora
+        self.reintentos = reintentos
+        self.espera_base = espera_base
+        self._cola = queue.Queue()
+        self._hilo = threading.Thread(target=self._trabajar, name=f"impresora-{impresora}", daemon=True)
+        self._hilo.start()
+
+    def enviar(self, datos):
+        self._cola.put(datos)
+
+    def _trabajar(self):
+        while True:
+            datos = self._cola.get()
+            for intento in range(self.reintentos):
+                try:
+                    self.impresora.enviar(datos)
+                    break
+                except OSError as e:
+                    logger.warning("Error imprimiendo en %s (intento %s): %s", self.impresora, intento + 1, e)
+                    if intento + 1 < self.reintentos:
+                        time.sleep(self.espera_base * (2 ** intento))
+            else:
+                logger.error("Ticket descartado: %s no respondió tras %s intentos", self.impresora, self.reintentos)
+            self._cola.task_done()
+
+    def esperar(self):
+        """Bloquea hasta que se envíen los tickets pendientes (útil en pruebas)"""
+        self._cola.join()
+
+
+# =========================
+# COLA DE TICKETS
+# =========================
+
+class ColaImpresion:
+    """
+    Agrupa productos por mesa/domicilio durante `ventana` segundos y luego
+    imprime un ticket por estación.
+    """
+
+    def __init__(self, impresoras, estaciones_categorias=None, ventana=3.0, ancho='80'):
+        self.salidas = {estacion: SalidaImpresora(impresora) for estacion, impresora in impresoras.items()}
+        self.estaciones_categorias = {k.lower(): v for k, v in (estaciones_categorias or {}).items()}
+        self.ventana = ventana
+        self.ancho = impresion.ANCHOS[ancho]
+        self._entrada = queue.Queue()
+        self._hilo = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def desde_entorno(cls):
+        impresoras = {
+            estacion: impresora_desde_url(url)
+            for estacion, url in parsear_pares(os.environ.get('IMPRESORAS_COCINA')).items()
+        }
+        return cls(
+            impresoras,
+            estaciones_categorias=parsear_pares(os.environ.get('ESTACIONES_CATEGORIAS')),
+            ventana=float(os.environ.get('VENTANA_TICKETS_SEGUNDOS', 3)),
+            ancho=os.environ.get('ANCHO_TICKETS', '80'),
+        )
+
+    @property
+    def activa(self):
+        return bool(self.salidas)
+
+    def estacion_para(self, categoria):
+        """Estación que prepara los productos de una categoría del menú"""
+        if categoria:
+            estacion = self.estaciones_categorias.get(categoria.lower())
+            if estacion:
+                return estacion
+        return ESTACION_POR_DEFECTO
+
+    def encolar(self, clave, titulo, items):
+        """
+        Agrega productos al ticket de `clave` (p.ej. ('mesa', 3)).
+        items: lista de dicts con producto, cantidad, notas y categoria.
+        Retorna inmediatamente; la impresión ocurre en segundo plano.
+        """
+        if not self.activa or not items:
+            return
+        self._iniciar()
+        self._entrada.put((clave, titulo, items))
+
+    def _iniciar(self):
+        if self._hilo is None:
+            with self._lock:
+                if self._hilo is None:
+                    self._hilo = threading.Thread(target=self._trabajar, name='cola-impresion', daemon=True)
+                    self._hilo.start()
+
+    def _trabajar(self):
+        pendientes = {}  # clave -> {'titulo', 'items', 'limite'}
+        while True:
+            if pendientes:
+                proximo = min(p['limite'] for p in pendientes.values())
+                timeout = max(0, proximo - time.monotonic())
+            else:
+                timeout = None
+
+            try:
+                clave, titulo, items = self._entrada.get(timeout=timeout)
+                if clave not in pendientes:
+                    pendientes[clave] = {
+                        'titulo': titulo,
+                        'items': [],
+                        'limite': time.monotonic() + self.ventana,
+                    }
+                pendientes[clave]['items'].extend(items)
+            except queue.Empty:
+                pass
+
+            ahora = time.monotonic()
+            for clave in [c for c, p in pendientes.items() if p['limite'] <= ahora]:
+                ticket = pendientes.pop(clave)
+                try:
+                    self._imprimir(ticket['titulo'], ticket['items'])
+                except Exception:
+                    logger.exception("Error preparando ticket de %s", ticket['titulo'])
+
+    def _imprimir(self, titulo, items):
+        por_estacion = {}
+        for item in items:
+            por_estacion.setdefault(self.estacion_para(item.get('categoria')), []).append(item)
+
+        fecha = datetime.now()
+        for estacion, items_estacion in por_estacion.items():
+            salida = self.salidas.get(estacion) or self.salidas.get(ESTACION_POR_DEFECTO)
+            if not salida:
+                logger.error("No hay impresora para la estación '%s'", estacion)
+                continue
+            lineas = impresion.texto_ticket_cocina(titulo, estacion, items_estacion, fecha, self.ancho)
+            salida.enviar(impresion.a_escpos(lineas))
+
+
+# =========================
+# IMPRESORA SIMULADA
+# =========================
+
+def servidor_impresora_prueba(puerto, ruta_salida):
+    """
+    Escucha en `puerto` como una impresora RAW y guarda lo recibido en
+    `ruta_salida`. Sirve para probar la cola sin impresora física.
+    """
+    impresora = ImpresoraArchivo(ruta_salida)
+    with socket.create_server(('127.0.0.1', puerto)) as servidor:
+        print(f"Impresora simulada escuchando en 127.0.0.1:{puerto} -> {ruta_salida}")
+        while True:
+            conexion, _ = servidor.accept()
+            with conexion:
+                datos = bytearray()
+                while True:
+                    bloque = conexion.recv(4096)
+                    if not bloque:
+                        break
+                    datos += bloque
+            impresora.enviar(bytes(datos))
+            print(f"Ticket recibido ({len(datos)} bytes)")
+
+
+if __name__ == '__main__':
+    puerto = int(sys.argv[1]) if len(sys.argv) > 1 else 9100
+    ruta = sys.argv[2] if len(sys.argv) > 2 else 'tickets.bin'
+    servidor_impresora_prueba(puerto, ruta)
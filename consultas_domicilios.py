@@ -0,0 +1,69 @@
+"""
+Campos calculados de los domicilios, resueltos en la misma consulta.
+
+RAZÓN: Las pantallas de domicilios calculaban tiempo_transcurrido y
+esta_retrasado fila por fila en Python, y len(d.items) cargaba los items de
+cada domicilio con una consulta aparte. Ahora la consulta trae los segundos
+transcurridos, si está retrasado y cuántos items tiene (subconsulta
+correlacionada sobre el índice de item_domicilio.domicilio_id). El filtro
+"solo retrasados" también corre en la base de datos, sobre el índice
+(estado, fecha_pedido).
+
+Retrasado = no está cerrado y pasó su hora de entrega estimada (ver
+eta_domicilios.py), o, si no la tiene, lleva más de DOMICILIO_SLA_MINUTOS.
+`ahora` siempre va como parámetro: las fechas de la app son hora local y el
+reloj del servidor de base de datos puede estar en UTC.
+"""
+
+from datetime import timedelta
+
+from extensiones import db
+from modelos import Domicilio, ItemDomicilio, EstadoDomicilio, SLA_DOMICILIO_MINUTOS
+
+ESTADOS_ABIERTOS = [
+    EstadoDomicilio.PENDIENTE,
+    EstadoDomicilio.PREPARANDO,
+    EstadoDomicilio.LISTO,
+    EstadoDomicilio.EN_CAMINO,
+]
+
+
+def segundos_transcurridos(ahora):
+    """Segundos desde fecha_pedido hasta `ahora`, calculados en SQL"""
+    momento = db.literal(ahora, db.DateTime)
+    if db.session.get_bind().dialect.name == 'sqlite':
+        return (db.func.julianday(momento) - db.func.julianday(Domicilio.fecha_pedido)) * 86400
+    return db.func.extract('epoch', momento - Domicilio.fecha_pedido)
+
+
+def condicion_retrasado(ahora):
+    """Sirve como columna (verdadero/falso) y como filtro"""
+    return db.and_(
+        Domicilio.estado.in_(ESTADOS_ABIERTOS),
+        db.or_(
+            Domicilio.fecha_entrega_estimada < ahora,
+            db.and_(
+                Domicilio.fecha_entrega_estimada.is_(None),
+                Domicilio.fecha_pedido < ahora - timedelta(minutes=SLA_DOMICILIO_MINUTOS),
+            ),
+        ),
+    )
+
+
+def cantidad_items():
+    return (
+        db.select(db.func.count(ItemDomicilio.id))
+        .where(ItemDomicilio.domicilio_id == Domicilio.id)
+        .correlate(Domicilio)
+        .scalar_subquery()
+    )
+
+
+def con_calculados(consulta, ahora):
+    """Agrega a una consulta de Domicilio los campos segundos_transcurridos, retrasado y cantidad_items"""
+    return consulta.options(
+        db.with_expression(Domicilio.segundos_transcurridos, segundos_transcurridos(ahora)),
+        # Sin coalesce, un domicilio sin hora estimada y a tiempo daría NULL
+        db.with_expression(Domicilio.retrasado, db.func.coalesce(condicion_retrasado(ahora), db.false())),
+        db.with_expression(Domicilio.cantidad_items, cantidad_items()),
+    )
@@ -0,0 +1,150 @@
+"""
+Resúmenes de las sesiones de mesa calculados en la base de datos.
+
+RAZÓN: El historial cargaba las últimas 100 sesiones, pedía s.facturas de
+cada una (una consulta por sesión, tres veces por día) y sumaba en Python;
+después se quedaba con 7 días. Ahora los totales de cada día operativo
+(03:00 a 03:00) salen de una consulta agrupada, "facturada" es un EXISTS
+sobre ix_factura_sesion_id, y las sesiones con sus pedidos y facturas solo
+se cargan, en tres consultas, para el día que se despliega. El rango de
+fechas usa ix_sesion_sucursal_fecha_inicio.
+
+ver_mesa hacía lo mismo con las sesiones anteriores de la mesa: recorría
+sesion.pedidos de cada una para sumar total, pagado y pendiente. Esos
+totales son ahora contadores de la sesión (ver totales_sesion.py); aquí solo
+se les da la forma que usan las plantillas (totales_guardados), y la cuenta
+detallada de cada sesión anterior es una consulta agrupada por producto
+(lineas_por_sesion), sin cargar sus pedidos. El dashboard cuenta los pedidos
+por estado de todas las mesas en una consulta agrupada.
+"""
+
+from datetime import timedelta
+
+from extensiones import db
+from modelos import Sesion, Pedido, Factura
+from ventas import inicio_dia, expresion_dia, como_fecha
+
+
+def facturada():
+    """La sesión tiene factura (sirve como columna y como filtro)"""
+    return db.select(Factura.id).where(Factura.sesion_id == Sesion.id).correlate(Sesion).exists()
+
+
+def _rango(desde=None, hasta=None):
+    condiciones = []
+    if desde is not None:
+        condiciones.append(Sesion.fecha_inicio >= inicio_dia(desde))
+    if hasta is not None:
+        condiciones.append(Sesion.fecha_inicio < inicio_dia(hasta + timedelta(days=1)))
+    return condiciones
+
+
+def resumen_por_dia(desde=None, hasta=None, limite=None):
+    """
+    Un dict por día operativo con sesiones, del más reciente al más antiguo:
+    {'dia', 'sesiones_activas', 'sesiones_cerradas', 'total_general',
+     'total_facturado', 'total_sin_facturar'}. Los totales son de las
+    sesiones cerradas. Una consulta agrupada.
+    """
+    dia = expresion_dia(Sesion.fecha_inicio)
+    cerrada = Sesion.activa == False
+    total = db.func.coalesce(Sesion.total, 0)
+    consulta = (
+        db.select(
+            dia,
+            db.func.sum(db.case((cerrada, 0), else_=1)),
+            db.func.sum(db.case((cerrada, 1), else_=0)),
+            db.func.sum(db.case((cerrada, total), else_=0)),
+            db.func.sum(db.case((db.and_(cerrada, facturada()), total), else_=0)),
+        )
+        .where(*_rango(desde, hasta))
+        .group_by(dia)
+        .order_by(dia.desc())
+    )
+    if limite is not None:
+        consulta = consulta.limit(limite)
+
+    return [
+        {
+            'dia': como_fecha(valor_dia),
+            'sesiones_activas': activas or 0,
+            'sesiones_cerradas': cerradas or 0,
+            'total_general': total_general or 0,
+            'total_facturado': total_facturado or 0,
+            'total_sin_facturar': (total_general or 0) - (total_facturado or 0),
+        }
+        for valor_dia, activas, cerradas, total_general, total_facturado in db.session.execute(consulta)
+    ]
+
+
+def sesiones_del_dia(dia):
+    """Sesiones de un día operativo con su mesa, pedidos y facturas (consultas fijas, sin N+1)"""
+    return (
+        Sesion.query
+        .options(
+            db.joinedload(Sesion.mesa),
+            db.selectinload(Sesion.pedidos),
+            db.selectinload(Sesion.facturas),
+        )
+        .filter(*_rango(dia, dia))
+        .order_by(Sesion.fecha_inicio.desc())
+        .all()
+    )
+
+
+def estados_por_sesion(sesion_ids):
+    """{sesion_id: {estado: pedidos}} de esas sesiones, en una consulta agrupada"""
+    estados = {sesion_id: {} for sesion_id in sesion_ids}
+    if not estados:
+        return estados
+    filas = db.session.execute(
+        db.select(Pedido.sesion_id, Pedido.estado, db.func.count())
+        .where(Pedido.sesion_id.in_(list(estados)))
+        .group_by(Pedido.sesion_id, Pedido.estado)
+    )
+    for sesion_id, estado, pedidos in filas:
+        estados[sesion_id][estado] = pedidos
+    return estados
+
+
+def lineas_por_sesion(sesion_ids):
+    """
+    Cuenta detallada de esas sesiones sin cargar sus pedidos:
+    {sesion_id: [{'producto', 'cantidad', 'precio_unitario', 'pagado'}]}, con
+    los pedidos iguales (producto, precio y pago) en una línea. Una consulta.
+    """
+    lineas = {sesion_id: [] for sesion_id in sesion_ids}
+    if not lineas:
+        return lineas
+    filas = db.session.execute(
+        db.select(Pedido.sesion_id, Pedido.producto, Pedido.precio_unitario, Pedido.pagado,
+                  db.func.sum(Pedido.cantidad))
+        .where(Pedido.sesion_id.in_(list(lineas)))
+        .group_by(Pedido.sesion_id, Pedido.producto, Pedido.precio_unitario, Pedido.pagado)
+        .order_by(Pedido.sesion_id, db.func.min(Pedido.fecha))
+    )
+    for sesion_id, producto, precio_unitario, pagado, cantidad in filas:
+        lineas[sesion_id].append({'producto': producto, 'cantidad': cantidad or 0,
+                                  'precio_unitario': precio_unitario or 0, 'pagado': bool(pagado)})
+    return lineas
+
+
+def totales_guardados(sesion):
+    """
+    Los contadores de la sesión (ver totales_sesion.py) como los usa
+    ver_mesa.html: {'total_general', 'total_pagado', 'total_pendiente',
+    'pedidos', 'pedidos_pagados'}
+    """
+    return {
+        'total_general': sesion.subtotal or 0,
+        'total_pagado': sesion.total_pagado or 0,
+        'total_pendiente': sesion.total_pendiente,
+        'pedidos': sesion.num_pedidos or 0,
+        'pedidos_pagados': (sesion.num_pedidos or 0) - (sesion.pedidos_sin_pagar or 0),
+    }
+
+
+def totales_vacios():
+    """Totales de una sesión sin pedidos"""
+    return {'total_general': 0, 'total_pagado': 0, 'total_pendiente': 0,
+            'pedidos': 0, 'pedidos_pagados': 0}
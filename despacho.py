@@ -0,0 +1,151 @@
+"""
+Planificador de despachos: agrupa los domicilios listos en viajes de varias paradas.
+
+RAZÓN: Cada repartidor salía con un solo domicilio porque nada sugería
+combinarlos, aunque hubiera tres listos para el mismo barrio. El plan se
+arma en memoria sobre los domicilios en estado 'listo' (una consulta) y se
+recalcula cada vez que la pantalla de domicilios lo pide.
+
+Reglas:
+- Un viaje lleva domicilios de la misma zona (o del mismo barrio si el barrio
+  no está en ninguna zona), como máximo la capacidad del vehículo.
+- Cada parada antes de la suya retrasa una entrega MINUTOS_POR_PARADA; no se
+  agrega un domicilio si eso lo haría pasar su hora de entrega estimada.
+- Un domicilio listo espera a lo sumo ESPERA_MAXIMA a que se le sumen otros.
+  Después de eso el viaje se marca urgente y debe salir como esté.
+"""
+
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+from extensiones import db
+from modelos import Domicilio, EstadoDomicilio, Repartidor
+from cache_local import CacheLRU
+from ventas import normalizar_nombre
+import eta_domicilios
+
+ESPERA_MAXIMA = timedelta(minutes=10)
+MINUTOS_POR_PARADA = 8
+
+# Domicilios por viaje según el vehículo
+CAPACIDAD_VEHICULO = {'bicicleta': 2, 'moto': 3, 'carro': 5}
+VEHICULO_DEFECTO = 'moto'
+
+# Un domicilio 'listo' de hace más de esto quedó sin cerrar; no se planifica
+VENTANA_LISTOS = timedelta(hours=12)
+
+cache_vehiculos = CacheLRU(max_elementos=1, ttl=60)
+
+
+def _capacidad(vehiculo):
+    return CAPACIDAD_VEHICULO.get(vehiculo, CAPACIDAD_VEHICULO[VEHICULO_DEFECTO])
+
+
+def _orden_paradas(paradas):
+    """Primero las que vencen antes; las sin hora estimada al final"""
+    return sorted(paradas, key=lambda d: (d['limite'] is None, d['limite'] or d['listo_desde'], d['id']))
+
+
+def _cabe(paradas, ahora):
+    """Ninguna parada pasa su hora de entrega por las que van antes (salvo la primera)"""
+    for posicion, parada in enumerate(_orden_paradas(paradas)):
+        if posicion and parada['limite'] is not None:
+            if ahora + timedelta(minutes=posicion * MINUTOS_POR_PARADA) > parada['limite']:
+                return False
+    return True
+
+
+def planificar(domicilios, vehiculos, ahora):
+    """
+    domicilios: dicts con id, cliente, direccion, barrio, zona_id, zona,
+    listo_desde y limite (hora de entrega estimada o None).
+    vehiculos: {tipo_vehiculo: repartidores activos}; vacío = VEHICULO_DEFECTO.
+    Retorna los viajes, los urgentes primero.
+    """
+    tipos = sorted(vehiculos or {VEHICULO_DEFECTO: 1}, key=_capacidad)
+    capacidad_maxima = _capacidad(tipos[-1])
+
+    por_zona = defaultdict(list)
+    for domicilio in domicilios:
+        clave = domicilio['zona_id'] or f"barrio:{normalizar_nombre(domicilio['barrio'])}"
+        por_zona[clave].append(domicilio)
+
+    viajes = []
+    for grupo in por_zona.values():
+        # Los que llevan más tiempo listos arman el viaje
+        pendientes = sorted(grupo, key=lambda d: (d['listo_desde'], d['id']))
+        while pendientes:
+            paradas, resto = [pendientes[0]], []
+            for domicilio in pendientes[1:]:
+                if len(paradas) < capacidad_maxima and _cabe(paradas + [domicilio], ahora):
+                    paradas.append(domicilio)
+                else:
+                    resto.append(domicilio)
+            pendientes = resto
+
+            paradas = _orden_paradas(paradas)
+            listo_desde = min(d['listo_desde'] for d in paradas)
+            salir_antes = listo_desde + ESPERA_MAXIMA
+            vehiculo = next((t for t in tipos if _capacidad(t) >= len(paradas)), tipos[-1])
+            viajes.append({
+                'zona': paradas[0]['zona'] or paradas[0]['barrio'] or 'Sin barrio',
+                'vehiculo': vehiculo,
+                'paradas': len(paradas),
+                'capacidad': _capacidad(vehiculo),
+                'salir_antes': salir_antes,
+                'urgente': ahora >= salir_antes or any(d['limite'] and d['limite'] <= ahora for d in paradas),
+                'domicilios': paradas,
+            })
+
+    viajes.sort(key=lambda v: (not v['urgente'], v['salir_antes']))
+    return viajes
+
+
+# =========================
+# DATOS ACTUALES
+# =========================
+
+def vehiculos_activos():
+    """{tipo_vehiculo: cantidad} de los repartidores activos (se relee cada minuto)"""
+    vehiculos = cache_vehiculos.obtener('vehiculos')
+    if vehiculos is None:
+        vehiculos = {
+            (tipo or VEHICULO_DEFECTO).strip().lower(): cantidad
+            for tipo, cantidad in db.session.execute(
+                db.select(Repartidor.tipo_vehiculo, db.func.count(Repartidor.id))
+                .where(Repartidor.activo == True)
+                .group_by(Repartidor.tipo_vehiculo)
+            )
+        }
+        cache_vehiculos.guardar('vehiculos', vehiculos)
+    return vehiculos
+
+
+def domicilios_listos(ahora):
+    modelo = eta_domicilios.obtener_modelo()
+    filas = db.session.execute(
+        db.select(Domicilio.id, Domicilio.cliente_nombre, Domicilio.cliente_direccion,
+                  Domicilio.cliente_barrio, Domicilio.estado_actualizado,
+                  Domicilio.fecha_pedido, Domicilio.fecha_entrega_estimada)
+        .where(Domicilio.estado == EstadoDomicilio.LISTO,
+               Domicilio.fecha_pedido >= ahora - VENTANA_LISTOS)
+    ).all()
+    domicilios = []
+    for id_, cliente, direccion, barrio, listo_desde, fecha_pedido, limite in filas:
+        zona = modelo.zona(barrio)
+        domicilios.append({
+            'id': id_,
+            'cliente': cliente,
+            'direccion': direccion,
+            'barrio': barrio or '',
+            'zona_id': zona['id'] if zona else None,
+            'zona': zona['nombre'] if zona else None,
+            'listo_desde': listo_desde or fecha_pedido,
+            'limite': limite,
+        })
+    return domicilios
+
+
+def plan_actual(ahora=None):
+    ahora = ahora or datetime.now()
+    return planificar(domicilios_listos(ahora), vehiculos_activos(), ahora)
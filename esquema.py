@@ -0,0 +1,221 @@
+"""
+Preparación de la base de datos al desplegar.
+
+RAZÓN: El comando de arranque ejecuta `flask init-db` en cada despliegue y en
+cada reinicio del contenedor. Antes eso hacía create_all() y una consulta por
+cada usuario/categoría de ejemplo. Ahora se guarda una huella del esquema en la
+tabla version_esquema: si coincide con la del código, el arranque hace una sola
+consulta y no toca nada más.
+
+Los datos iniciales (sucursal, usuarios, mesas, categorías de gasto, configuración) solo
+se cargan la primera vez o de forma explícita con `flask init-db --sembrar`,
+con inserciones en bloque que ignoran los registros existentes.
+"""
+
+import hashlib
+from datetime import datetime
+
+from sqlalchemy import inspect
+from sqlalchemy.exc import OperationalError, ProgrammingError
+from werkzeug.security import generate_password_hash
+
+from extensiones import db
+from modelos import Sucursal, Usuario, Mesa, CategoriaGasto, ConfiguracionRestaurante, VersionEsquema
+
+# =========================
+# DATOS INICIALES
+# =========================
+
+USUARIOS_INICIALES = [
+    {'username': 'admin', 'password': 'admin123', 'nombre': 'Administrador', 'rol': 'admin'},
+    {'username': 'mesero1', 'password': 'mesero123', 'nombre': 'Mesero 1', 'rol': 'mesero'},
+    {'username': 'cocina', 'password': 'cocina123', 'nombre': 'Cocina', 'rol': 'cocina'},
+]
+
+NUMERO_MESAS_INICIALES = 10
+
+CATEGORIAS_GASTO_INICIALES = [
+    {'nombre': 'Ingredientes y Materia Prima', 'descripcion': 'Compras de alimentos, bebidas y suministros de cocina', 'color': '#28a745'},
+    {'nombre': 'Salarios y Nómina', 'descripcion': 'Pagos a empleados, prestaciones y seguridad social', 'color': '#007bff'},
+    {'nombre': 'Servicios Públicos', 'descripcion': 'Agua, luz, gas, internet, teléfono', 'color': '#ffc107'},
+    {'nombre': 'Arriendo', 'descripcion': 'Pago de arriendo del local', 'color': '#dc3545'},
+    {'nombre': 'Mantenimiento', 'descripcion': 'Reparaciones, limpieza, mantenimiento de equipos', 'color': '#6c757d'},
+    {'nombre': 'Marketing', 'descripcion': 'Publicidad, redes sociales, volantes', 'color': '#e83e8c'},
+    {'nombre': 'Impuestos', 'descripcion': 'Impuestos, declaraciones, trámites legales', 'color': '#fd7e14'},
+    {'nombre': 'Otros Gastos', 'descripcion': 'Gastos misceláneos', 'color': '#6610f2'}
+]
+
+CONFIGURACION_INICIAL = {
+    'nombre': 'Mi Restaurante',
+    'nit': '900.000.000-0',
+    'direccion': 'Calle 123 #45-67',
+    'ciudad': 'Zarzal, Valle del Cauca',
+    'telefono': '(+57) 300 000 0000',
+    'regimen': 'Régimen Simplificado'
+}
+
+SUCURSAL_INICIAL = {'codigo': 'principal', 'prefijo_factura': 'FACT', 'ultimo_consecutivo': 0}
+
+
+# =========================
+# HUELLA DEL ESQUEMA
+# =========================
+
+def huella_esquema(metadata=None):
+    """
+    sha256 de las tablas, columnas, llaves e índices definidos en los modelos.
+    Se calcula sin consultar la base de datos y no depende del motor (SQLite/PostgreSQL).
+    """
+    metadata = metadata if metadata is not None else db.metadata
+    partes = []
+    for tabla in sorted(metadata.tables.values(), key=lambda t: t.name):
+        partes.append(f"T {tabla.name}")
+        for columna in sorted(tabla.columns, key=lambda c: c.name):
+            partes.append(
+                f"C {columna.name} {columna.type} nulo={columna.nullable} "
+                f"pk={columna.primary_key} unico={bool(columna.unique)}"
+            )
+            for fk in sorted(columna.foreign_keys, key=lambda f: f.target_fullname):
+                partes.append(f"F {columna.name} {fk.target_fullname}")
+        for indice in sorted(tabla.indexes, key=lambda i: i.name or ''):
+            columnas = ','.join(c.name for c in indice.columns)
+            partes.append(f"I {indice.name} {columnas} unico={indice.unique}")
+    return hashlib.sha256('\n'.join(partes).encode('utf-8')).hexdigest()
+
+
+def leer_huella():
+    """Huella guardada en la base de datos (None si la tabla aún no existe)"""
+    try:
+        return db.session.execute(
+            db.select(VersionEsquema.huella).where(VersionEsquema.id == 1)
+        ).scalar()
+    except (OperationalError, ProgrammingError):
+        db.session.rollback()
+        return None
+
+
+def guardar_huella(huella):
+    db.session.merge(VersionEsquema(id=1, huella=huella, fecha_aplicacion=datetime.now()))
+
+
+# =========================
+# SEMILLA (INSERCIÓN EN BLOQUE)
+# =========================
+
+def _insertar_sin_duplicados(modelo, filas, columnas_unicas):
+    """
+    INSERT ... ON CONFLICT DO NOTHING en una sola sentencia.
+    Si otro proceso insertó el mismo registro al mismo tiempo, se ignora.
+    """
+    if not filas:
+        return 0
+    dialecto = db.session.get_bind().dialect.name
+    if dialecto == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert
+    elif dialecto == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        db.session.execute(db.insert(modelo.__table__), filas)
+        return len(filas)
+    sentencia = insert(modelo.__table__).values(filas).on_conflict_do_nothing(index_elements=columnas_unicas)
+    return db.session.execute(sentencia).rowcount
+
+
+def sembrar_datos_iniciales(usuarios=None, configuracion=None):
+    """
+    Carga los datos iniciales que falten. Idempotente; no hace commit.
+    - Sucursal: si no hay ninguna, una con el nombre del restaurante.
+    - Usuarios: se agregan los que no existan (por username).
+    - Mesas, categorías de gasto y configuración: solo si la tabla está vacía,
+      para no recrear lo que el administrador borró a propósito.
+    Retorna {tabla: registros creados}.
+    """
+    usuarios = USUARIOS_INICIALES if usuarios is None else usuarios
+    configuracion = CONFIGURACION_INICIAL if configuracion is None else configuracion
+    creados = {}
+
+    sucursal_id = db.session.scalar(db.select(db.func.min(Sucursal.id)))
+    creados['sucursales'] = 0
+    if sucursal_id is None:
+        db.session.execute(db.insert(Sucursal.__table__), [dict(SUCURSAL_INICIAL, nombre=configuracion['nombre'])])
+        sucursal_id = db.session.scalar(db.select(db.func.min(Sucursal.id)))
+        creados['sucursales'] = 1
+
+    # Una consulta para los usuarios existentes; solo se calcula el hash de los que faltan
+    existentes = set(db.session.scalars(
+        db.select(Usuario.username).where(Usuario.username.in_([u['username'] for u in usuarios]))
+    ))
+    filas = [
+        {
+            'username': u['username'],
+            'nombre': u['nombre'],
+            'rol': u['rol'],
+            'password_hash': generate_password_hash(u['password']),
+        }
+        for u in usuarios if u['username'] not in existentes
+    ]
+    creados['usuarios'] = _insertar_sin_duplicados(Usuario, filas, ['username'])
+
+    # Una consulta para saber qué tablas están vacías
+    hay_mesas, hay_categorias, hay_configuracion = db.session.execute(db.select(
+        db.select(Mesa.id).exists(),
+        db.select(CategoriaGasto.id).exists(),
+        db.select(ConfiguracionRestaurante.id).exists(),
+    )).one()
+
+    creados['mesas'] = 0
+    if not hay_mesas:
+        filas = [{'sucursal_id': sucursal_id, 'numero': i, 'capacidad': 4}
+                 for i in range(1, NUMERO_MESAS_INICIALES + 1)]
+        creados['mesas'] = _insertar_sin_duplicados(Mesa, filas, ['sucursal_id', 'numero'])
+
+    creados['categorias_gasto'] = 0
+    if not hay_categorias:
+        db.session.execute(db.insert(CategoriaGasto.__table__), CATEGORIAS_GASTO_INICIALES)
+        creados['categorias_gasto'] = len(CATEGORIAS_GASTO_INICIALES)
+
+    creados['configuracion'] = 0
+    if not hay_configuracion:
+        db.session.execute(db.insert(ConfiguracionRestaurante.__table__), [dict(configuracion, sucursal_id=sucursal_id)])
+        creados['configuracion'] = 1
+
+    return creados
+
+
+# =========================
+# PREPARAR BASE DE DATOS
+# =========================
+
+def preparar_base_datos(sembrar=False):
+    """
+    Crea las tablas si el esquema cambió y carga los datos iniciales si es la
+    primera vez (o si sembrar=True). Si la huella coincide, no hace nada más.
+    Retorna un texto con lo que se hizo.
+    """
+    huella = huella_esquema()
+    guardada = leer_huella()
+
+    if guardada == huella and not sembrar:
+        return f"Esquema al día ({huella[:12]}); no hay nada que hacer"
+
+    # Sin huella pero con tablas: una base anterior a la huella. Sus tablas
+    # aún no tienen las columnas nuevas (las agrega `flask migrar`), así que
+    # no se siembra hasta migrar; ya tiene sus usuarios y mesas.
+    base_anterior = guardada is None and inspect(db.engine).has_table(Usuario.__tablename__)
+
+    db.create_all()
+    mensajes = []
+    if guardada != huella:
+        mensajes.append(f"Esquema actualizado a {huella[:12]}")
+
+    if base_anterior and not sembrar:
+        mensajes.append("Base de datos existente: los datos iniciales que falten se cargan con "
+                        "`flask init-db --sembrar` después de `flask migrar`")
+    elif sembrar or guardada is None:
+        creados = sembrar_datos_iniciales()
+        detalle = ', '.join(f"{tabla}: {n}" for tabla, n in creados.items())
+        mensajes.append(f"Datos iniciales cargados ({detalle})")
+
+    guardar_huella(huella)
+    db.session.commit()
+    return '. '.join(mensajes)
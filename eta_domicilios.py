@@ -0,0 +1,317 @@
+"""
+Tiempo estimado de entrega de los domicilios, aprendido del historial.
+
+RAZÓN: ZonaDelivery.tiempo_estimado es un número fijo y un domicilio se
+marcaba "retrasado" a los 45 minutos, fuera a la otra cuadra o al otro lado
+de la ciudad, a las 3 de la tarde o en pleno viernes por la noche. Ahora:
+
+- `flask calcular-eta` (periódico, p.ej. cada noche) recorre los domicilios
+  entregados de los últimos DIAS_HISTORIAL días y guarda en TiempoEntrega los
+  percentiles 50/80/90 de (fecha_entrega_real - fecha_pedido) por zona, hora
+  del pedido y carga de la cocina (la de su sucursal) en ese momento.
+- Cada worker carga esa tabla en memoria (se relee cada ETA_TTL segundos).
+  Solo la lee: nunca recalcula ni hace commit dentro de una petición (estimar
+  va en medio de la transacción que crea el domicilio). Si las tablas no
+  existen o tienen más de VIGENCIA_TABLAS, se estima con el tiempo fijo de la
+  zona.
+  Estimar es buscar en un diccionario: no consulta la base de datos. La carga
+  actual de la cocina se cuenta a lo sumo cada TTL_CARGA segundos.
+- Al crear un domicilio se guarda fecha_entrega_estimada = pedido + p90 ("a
+  más tardar"); esta_retrasado compara contra esa hora.
+
+Si una combinación tiene pocas muestras se usa la siguiente más general:
+zona+hora+carga, zona+hora, zona+carga, zona, el tiempo fijo de la zona,
+y por último el historial de todas las zonas.
+"""
+
+import logging
+import os
+import threading
+import time
+from bisect import bisect_left
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+from extensiones import db
+from modelos import Domicilio, EstadoDomicilio, Pedido, TiempoEntrega, ZonaDelivery, SLA_DOMICILIO_MINUTOS
+from cache_local import CacheLRU
+from ventas import normalizar_nombre
+from sucursales import sucursal_actual_id
+
+logger = logging.getLogger(__name__)
+
+DIAS_HISTORIAL = 60
+
+# Menos muestras que esto no alcanzan para un percentil confiable
+MIN_MUESTRAS = 10
+
+# Entregas de más de 4 horas son domicilios que se olvidó marcar como entregados
+MAXIMO_MINUTOS = 240
+
+# Carga = domicilios en curso + pedidos de mesa en cocina
+NIVELES_CARGA = ((5, 'baja'), (12, 'media'))
+NIVEL_MAXIMO = 'alta'
+
+# Sin historial ni zona conocida
+MINUTOS_DEFECTO = 30
+MINUTOS_RETRASO_DEFECTO = SLA_DOMICILIO_MINUTOS
+
+# Un pedido de mesa sin avanzar en este tiempo ya no cuenta como carga
+VENTANA_PEDIDO_MESA = timedelta(hours=3)
+
+TTL_MODELO = int(os.environ.get('ETA_TTL', 600))
+TTL_CARGA = 30
+
+# Tablas calculadas hace más de esto no se usan (nadie corrió `flask calcular-eta`)
+VIGENCIA_TABLAS = timedelta(days=7)
+
+ESTADOS_EN_CURSO = [
+    EstadoDomicilio.PENDIENTE,
+    EstadoDomicilio.PREPARANDO,
+    EstadoDomicilio.LISTO,
+    EstadoDomicilio.EN_CAMINO,
+]
+
+
+def nivel_carga(carga):
+    for limite, nombre in NIVELES_CARGA:
+        if carga < limite:
+            return nombre
+    return NIVEL_MAXIMO
+
+
+def percentil(ordenados, p):
+    """Percentil con interpolación lineal sobre una lista ordenada"""
+    posicion = (len(ordenados) - 1) * p / 100
+    i = int(posicion)
+    if i + 1 >= len(ordenados):
+        return ordenados[-1]
+    return ordenados[i] + (ordenados[i + 1] - ordenados[i]) * (posicion - i)
+
+
+def _zonas_por_barrio(zonas):
+    """{barrio normalizado: zona} de las zonas activas"""
+    mapa = {}
+    for zona in sorted(zonas, key=lambda z: z['orden']):
+        for barrio in (zona['barrios'] or '').split(','):
+            mapa.setdefault(normalizar_nombre(barrio), zona)
+    mapa.pop('', None)
+    return mapa
+
+
+def _leer_zonas():
+    return [
+        {'id': id_, 'nombre': nombre, 'barrios': barrios, 'costo_envio': costo or 0,
+         'tiempo_estimado': tiempo or MINUTOS_DEFECTO, 'orden': orden or 0}
+        for id_, nombre, barrios, costo, tiempo, orden in db.session.execute(
+            db.select(ZonaDelivery.id, ZonaDelivery.nombre, ZonaDelivery.barrios,
+                      ZonaDelivery.costo_envio, ZonaDelivery.tiempo_estimado, ZonaDelivery.orden)
+            .where(ZonaDelivery.activa == True)
+        )
+    ]
+
+
+# =========================
+# CÁLCULO PERIÓDICO
+# =========================
+
+class _CargaHistorica:
+    """Carga de la cocina en cualquier momento del historial, con dos búsquedas binarias"""
+
+    def __init__(self, intervalos):
+        self._inicios = sorted(inicio for inicio, _ in intervalos)
+        self._fines = sorted(fin for _, fin in intervalos)
+
+    def en(self, momento):
+        return bisect_left(self._inicios, momento) - bisect_left(self._fines, momento)
+
+
+def _intervalos_carga(desde):
+    """{sucursal_id: [(inicio, fin)]} de cada domicilio y pedido de mesa que ocupó la cocina desde `desde`"""
+    domicilios = db.session.execute(
+        db.select(Domicilio.sucursal_id, Domicilio.fecha_pedido,
+                  db.func.coalesce(Domicilio.fecha_entrega_real, Domicilio.estado_actualizado))
+        .where(Domicilio.fecha_pedido >= desde,
+               Domicilio.estado.in_([EstadoDomicilio.ENTREGADO, EstadoDomicilio.CANCELADO]))
+    ).all()
+    # Para los pedidos de mesa solo se sabe el último cambio de estado: se toma como fin
+    pedidos = db.session.execute(
+        db.select(Pedido.sucursal_id, Pedido.fecha, Pedido.estado_actualizado)
+        .where(Pedido.fecha >= desde, Pedido.estado.in_(['listo', 'entregado']),
+               Pedido.estado_actualizado.isnot(None))
+    ).all()
+    intervalos = defaultdict(list)
+    for sucursal_id, inicio, fin in domicilios + [
+        (sucursal_id, inicio, fin) for sucursal_id, inicio, fin in pedidos
+        if inicio and fin and fin - inicio <= VENTANA_PEDIDO_MESA
+    ]:
+        if inicio and fin and fin >= inicio:
+            intervalos[sucursal_id].append((inicio, fin))
+    return intervalos
+
+
+def calcular_tablas(dias=DIAS_HISTORIAL, ahora=None):
+    """
+    Reemplaza las filas de TiempoEntrega con los percentiles del historial.
+    No hace commit. Retorna (filas, entregas usadas).
+    """
+    ahora = ahora or datetime.now()
+    desde = ahora - timedelta(days=dias)
+    zonas = _zonas_por_barrio(_leer_zonas())
+    cargas = {
+        sucursal_id: _CargaHistorica(intervalos)
+        for sucursal_id, intervalos in _intervalos_carga(desde - timedelta(hours=6)).items()
+    }
+
+    grupos = defaultdict(list)
+    entregas = 0
+    for sucursal_id, fecha_pedido, fecha_entrega, barrio in db.session.execute(
+        db.select(Domicilio.sucursal_id, Domicilio.fecha_pedido, Domicilio.fecha_entrega_real,
+                  Domicilio.cliente_barrio)
+        .where(Domicilio.estado == EstadoDomicilio.ENTREGADO,
+               Domicilio.fecha_pedido >= desde,
+               Domicilio.fecha_entrega_real.isnot(None))
+    ):
+        minutos = (fecha_entrega - fecha_pedido).total_seconds() / 60
+        if not 0 < minutos <= MAXIMO_MINUTOS:
+            continue
+        entregas += 1
+        zona = zonas.get(normalizar_nombre(barrio))
+        zona_id = zona['id'] if zona else None
+        carga = cargas.get(sucursal_id)
+        nivel = nivel_carga(carga.en(fecha_pedido) if carga else 0)
+        claves = {(z, h, c) for z in (zona_id, None)
+                  for h in (fecha_pedido.hour, None) for c in (nivel, None)}
+        for clave in claves:
+            grupos[clave].append(minutos)
+
+    filas = []
+    for (zona_id, hora, nivel), minutos in grupos.items():
+        if len(minutos) < MIN_MUESTRAS:
+            continue
+        minutos.sort()
+        filas.append(TiempoEntrega(
+            zona_id=zona_id, hora=hora, carga=nivel, muestras=len(minutos),
+            p50=round(percentil(minutos, 50), 1), p80=round(percentil(minutos, 80), 1),
+            p90=round(percentil(minutos, 90), 1), fecha_calculo=ahora
+        ))
+
+    db.session.execute(db.delete(TiempoEntrega))
+    db.session.add_all(filas)
+    return len(filas), entregas
+
+
+# =========================
+# MODELO EN MEMORIA
+# =========================
+
+class ModeloETA:
+    """Percentiles por (zona_id, hora, carga) y zonas por barrio, en memoria"""
+
+    def __init__(self, filas, zonas):
+        """filas: (zona_id, hora, carga, muestras, p50, p80, p90). zonas: ver _leer_zonas"""
+        self.tabla = {
+            (zona_id, hora, carga): {'p50': p50, 'p80': p80, 'p90': p90, 'muestras': muestras}
+            for zona_id, hora, carga, muestras, p50, p80, p90 in filas
+        }
+        self.zonas_por_barrio = _zonas_por_barrio(zonas)
+
+    def zona(self, barrio):
+        return self.zonas_por_barrio.get(normalizar_nombre(barrio))
+
+    def estimar(self, barrio, momento, carga):
+        """{'p50', 'p80', 'p90' (minutos), 'muestras', 'fuente', 'zona'}"""
+        zona = self.zona(barrio)
+        hora, nivel = momento.hour, nivel_carga(carga)
+
+        candidatas = []
+        if zona:
+            candidatas = [(zona['id'], hora, nivel), (zona['id'], hora, None),
+                          (zona['id'], None, nivel), (zona['id'], None, None)]
+        for clave in candidatas:
+            if clave in self.tabla:
+                return dict(self.tabla[clave], fuente='historial', zona=zona)
+
+        if zona:
+            minutos = zona['tiempo_estimado']
+            return {'p50': minutos, 'p80': minutos, 'p90': max(minutos, MINUTOS_RETRASO_DEFECTO),
+                    'muestras': 0, 'fuente': 'zona', 'zona': zona}
+
+        for clave in [(None, hora, nivel), (None, hora, None), (None, None, nivel), (None, None, None)]:
+            if clave in self.tabla:
+                return dict(self.tabla[clave], fuente='historial', zona=None)
+
+        return {'p50': MINUTOS_DEFECTO, 'p80': MINUTOS_DEFECTO, 'p90': MINUTOS_RETRASO_DEFECTO,
+                'muestras': 0, 'fuente': 'defecto', 'zona': None}
+
+
+_modelo = None
+_cargado = 0.0
+_lock = threading.Lock()
+
+cache_carga = CacheLRU(max_elementos=32, ttl=TTL_CARGA)  # una entrada por sucursal
+
+
+def _leer_tablas():
+    return db.session.execute(
+        db.select(TiempoEntrega.zona_id, TiempoEntrega.hora, TiempoEntrega.carga, TiempoEntrega.muestras,
+                  TiempoEntrega.p50, TiempoEntrega.p80, TiempoEntrega.p90, TiempoEntrega.fecha_calculo)
+    ).all()
+
+
+def _cargar_modelo():
+    filas = _leer_tablas()
+    ultimo_calculo = max((fila[-1] for fila in filas if fila[-1]), default=None)
+    if filas and (ultimo_calculo is None or datetime.now() - ultimo_calculo > VIGENCIA_TABLAS):
+        logger.warning('Tiempos de entrega sin recalcular desde %s: se usa el tiempo de cada zona. '
+                       'Programar `flask calcular-eta`.', ultimo_calculo)
+        filas = []
+    return ModeloETA([fila[:-1] for fila in filas], _leer_zonas())
+
+
+def obtener_modelo():
+    """Modelo de este worker; se relee si venció el TTL o si se invalidó"""
+    global _modelo, _cargado
+    if _modelo is None or time.monotonic() - _cargado > TTL_MODELO:
+        with _lock:
+            if _modelo is None or time.monotonic() - _cargado > TTL_MODELO:
+                _modelo = _cargar_modelo()
+                _cargado = time.monotonic()
+    return _modelo
+
+
+def invalidar():
+    """Llamar después de modificar zonas o recalcular las tablas"""
+    global _modelo
+    _modelo = None
+
+
+def carga_actual():
+    """Domicilios en curso + pedidos de mesa en la cocina de la sucursal (se cuenta cada TTL_CARGA segundos)"""
+    clave = sucursal_actual_id()
+    carga = cache_carga.obtener(clave)
+    if carga is None:
+        desde = datetime.now() - VENTANA_PEDIDO_MESA
+        domicilios = db.session.query(db.func.count(Domicilio.id)).filter(
+            Domicilio.estado.in_(ESTADOS_EN_CURSO), Domicilio.fecha_pedido >= desde - timedelta(hours=3)
+        ).scalar()
+        pedidos = db.session.query(db.func.count(Pedido.id)).filter(
+            Pedido.estado.in_(['pendiente', 'preparando']), Pedido.fecha >= desde
+        ).scalar()
+        carga = domicilios + pedidos
+        cache_carga.guardar(clave, carga)
+    return carga
+
+
+def estimar(barrio, momento=None, carga=None):
+    return obtener_modelo().estimar(
+        barrio, momento or datetime.now(), carga_actual() if carga is None else carga
+    )
+
+
+def estimar_entrega(domicilio):
+    """Guarda en el domicilio la hora de entrega a más tardar (p90). No hace commit"""
+    fecha_pedido = domicilio.fecha_pedido or datetime.now()
+    estimacion = estimar(domicilio.cliente_barrio, fecha_pedido)
+    domicilio.fecha_entrega_estimada = fecha_pedido + timedelta(minutes=estimacion['p90'])
+    return estimacion
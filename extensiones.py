@@ -0,0 +1,19 @@
+"""
+Extensiones compartidas por la app y los módulos de rutas.
+Se crean sin app y se inicializan en create_app() (app.py).
+"""
+
+from flask_login import LoginManager
+from flask_sqlalchemy import SQLAlchemy
+
+import cola_impresion
+from replica import SesionEnrutada
+
+# Los SELECT de las vistas de reportes pueden ir a una réplica (ver replica.py)
+db = SQLAlchemy(session_options={'class_': SesionEnrutada})
+
+login_manager = LoginManager()
+login_manager.login_view = 'auth.login'
+
+# Cola de tickets de cocina (inactiva si no hay IMPRESORAS_COCINA configuradas)
+cola_tickets = cola_impresion.ColaImpresion.desde_entorno()
@@ -0,0 +1,164 @@
+"""
+Claves de idempotencia para los formularios que crean o cobran algo.
+
+RAZÓN: Con la red lenta los meseros tocan "Enviar" dos veces y el navegador
+reintenta el POST; así se duplicaban pedidos y facturas, y un abono se
+descontaba dos veces. Cada formulario lleva una clave única generada al
+mostrarlo (`clave_idempotencia()` en la plantilla, o el encabezado
+Idempotency-Key). La primera petición con esa clave se ejecuta y su resultado
+(la redirección y los mensajes flash) se guarda en `clave_idempotencia`; las
+repeticiones reciben ese mismo resultado sin volver a ejecutar la vista.
+
+- Una repetición que llega mientras la primera todavía corre espera a que
+  termine (hasta ESPERA_SEGUNDOS).
+- Solo se guardan las redirecciones, que es como responden estas vistas. Si
+  la vista falla o muestra otra página, la clave se libera y se puede
+  reintentar.
+- Las claves vencen a las IDEMPOTENCIA_TTL_HORAS horas (24 por defecto).
+"""
+
+import hashlib
+import json
+import os
+import time
+import uuid
+from datetime import datetime, timedelta
+from functools import wraps
+
+from flask import request, session, redirect, url_for, flash, make_response, abort
+from flask_login import current_user
+from sqlalchemy.exc import IntegrityError
+
+from extensiones import db
+from modelos import ClaveIdempotencia
+
+CAMPO = 'clave_idempotencia'
+ENCABEZADO = 'Idempotency-Key'
+
+TTL = timedelta(hours=int(os.environ.get('IDEMPOTENCIA_TTL_HORAS', 24)))
+
+# Cuánto espera una repetición a que termine la primera petición
+ESPERA_SEGUNDOS = 5
+
+# Cada worker borra las claves vencidas como máximo cada tanto
+INTERVALO_LIMPIEZA = 600
+
+_ultima_limpieza = 0.0
+
+
+def nueva_clave():
+    """Para las plantillas: <input type="hidden" name="clave_idempotencia" value="{{ clave_idempotencia() }}">"""
+    return uuid.uuid4().hex
+
+
+def _huella():
+    """Hash de la vista y los datos enviados, sin la clave"""
+    datos = sorted((k, v) for k, v in request.form.items(multi=True) if k != CAMPO)
+    contenido = json.dumps([request.endpoint, request.view_args, datos], sort_keys=True, default=str)
+    return hashlib.sha256(contenido.encode()).hexdigest()[:32]
+
+
+def _limpiar_vencidas(ahora):
+    global _ultima_limpieza
+    if time.monotonic() - _ultima_limpieza < INTERVALO_LIMPIEZA:
+        return
+    _ultima_limpieza = time.monotonic()
+    db.session.execute(db.delete(ClaveIdempotencia).where(ClaveIdempotencia.expira < ahora))
+
+
+def _reservar(clave, huella):
+    """
+    Guarda la clave como 'en_proceso'. Retorna None si esta petición es la
+    primera, o el registro de la petición anterior con la misma clave.
+    """
+    limite = time.monotonic() + ESPERA_SEGUNDOS
+    while True:
+        ahora = datetime.now()
+        _limpiar_vencidas(ahora)
+        db.session.add(ClaveIdempotencia(
+            clave=clave, usuario_id=current_user.id, endpoint=(request.endpoint or '')[:60],
+            huella=huella, estado='en_proceso', fecha=ahora, expira=ahora + TTL
+        ))
+        try:
+            db.session.commit()
+            return None
+        except IntegrityError:
+            db.session.rollback()
+
+        registro = db.session.get(ClaveIdempotencia, clave, populate_existing=True)
+        if registro is not None and registro.expira < ahora:
+            db.session.delete(registro)
+            db.session.commit()
+            continue
+        if registro is not None and (registro.estado == 'completada' or time.monotonic() >= limite):
+            return registro
+        # La primera sigue en curso (o falló y liberó la clave): esperar y volver a intentar
+        db.session.rollback()
+        time.sleep(0.1)
+
+
+def _liberar(clave):
+    db.session.execute(db.delete(ClaveIdempotencia).where(ClaveIdempotencia.clave == clave))
+    db.session.commit()
+
+
+def _volver():
+    return redirect(request.referrer or url_for('mesas.dashboard'))
+
+
+def _repetir(registro, huella):
+    """Respuesta para una petición repetida"""
+    if registro.usuario_id != current_user.id or registro.endpoint != request.endpoint or registro.huella != huella:
+        # Mismo formulario enviado otra vez con otros datos (p.ej. volviendo atrás)
+        flash('Este formulario ya se había enviado. Revisa los datos y vuelve a enviarlo.', 'error')
+        return _volver()
+    if registro.estado != 'completada':
+        flash('La solicitud anterior todavía se está procesando. Revisa antes de repetirla.', 'error')
+        return _volver()
+
+    for categoria, mensaje in json.loads(registro.mensajes or '[]'):
+        flash(mensaje, categoria)
+    respuesta = redirect(registro.ubicacion, code=registro.codigo)
+    respuesta.headers['Idempotent-Replayed'] = 'true'
+    return respuesta
+
+
+def idempotente(vista):
+    """
+    Decorador para vistas POST que redirigen al terminar. Va debajo de
+    @login_required. Sin clave en la petición, la vista se ejecuta como antes.
+    """
+    @wraps(vista)
+    def envoltura(*args, **kwargs):
+        clave = request.headers.get(ENCABEZADO) or request.form.get(CAMPO)
+        if request.method != 'POST' or not clave:
+            return vista(*args, **kwargs)
+        if len(clave) > 64:
+            abort(400)
+
+        huella = _huella()
+        anterior = _reservar(clave, huella)
+        if anterior is not None:
+            return _repetir(anterior, huella)
+
+        mensajes_previos = len(session.get('_flashes', []))
+        try:
+            respuesta = make_response(vista(*args, **kwargs))
+        except Exception:
+            db.session.rollback()
+            _liberar(clave)
+            raise
+
+        if not 300 <= respuesta.status_code < 400:
+            _liberar(clave)
+            return respuesta
+
+        registro = db.session.get(ClaveIdempotencia, clave)
+        registro.estado = 'completada'
+        registro.codigo = respuesta.status_code
+        registro.ubicacion = respuesta.location[:255]
+        registro.mensajes = json.dumps(session.get('_flashes', [])[mensajes_previos:])
+        db.session.commit()
+        return respuesta
+
+    return envoltura
@@ -0,0 +1,238 @@
+"""
+Formatos de impresión para impresoras térmicas (58mm / 80mm).
+
+RAZÓN: Las facturas y tickets se imprimen en impresoras térmicas que reciben
+texto plano de ancho fijo o comandos ESC/POS. Estas funciones solo transforman
+datos en texto/bytes; no consultan la base de datos.
+"""
+
+# Columnas de texto por ancho de papel (fuente A estándar)
+ANCHOS = {
+    '58': 32,
+    '80': 48,
+}
+
+# =========================
+# COMANDOS ESC/POS
+# =========================
+ESC_INIT = b'\x1b@'              # Reiniciar impresora
+ESC_CODEPAGE_850 = b'\x1bt\x02'  # Página de códigos PC850 (tildes y ñ)
+ESC_ALIGN_LEFT = b'\x1ba\x00'
+ESC_ALIGN_CENTER = b'\x1ba\x01'
+ESC_BOLD_ON = b'\x1bE\x01'
+ESC_BOLD_OFF = b'\x1bE\x00'
+ESC_DOUBLE_ON = b'\x1d!\x11'     # Doble alto y doble ancho
+ESC_DOUBLE_OFF = b'\x1d!\x00'
+ESC_FEED_CUT = b'\x1dVB\x03'     # Avanzar papel y corte parcial
+
+CODIFICACION_ESCPOS = 'cp850'
+
+
+def formatear_moneda(valor):
+    """$12,500 (sin decimales, igual que los templates)"""
+    return "${:,.0f}".format(valor or 0)
+
+
+def centrar(texto, ancho):
+    return texto[:ancho].center(ancho).rstrip()
+
+
+def linea_valor(etiqueta, valor, ancho):
+    """Etiqueta a la izquierda y valor alineado a la derecha"""
+    espacio = ancho - len(valor) - 1
+    return etiqueta[:espacio].ljust(espacio) + ' ' + valor
+
+
+def partir(texto, ancho):
+    """Divide un texto en líneas de máximo `ancho` caracteres respetando palabras"""
+    lineas = []
+    actual = ''
+    for palabra in (texto or '').split():
+        while len(palabra) > ancho:
+            if actual:
+                lineas.append(actual)
+                actual = ''
+            lineas.append(palabra[:ancho])
+            palabra = palabra[ancho:]
+        if not actual:
+            actual = palabra
+        elif len(actual) + 1 + len(palabra) <= ancho:
+            actual += ' ' + palabra
+        else:
+            lineas.append(actual)
+            actual = palabra
+    if actual:
+        lineas.append(actual)
+    return lineas
+
+
+# =========================
+# FACTURAS
+# =========================
+
+def items_factura(factura):
+    """
+    Devuelve los renglones de una factura como tuplas (producto, cantidad, valor, notas).
+    Mesa: pedidos de la sesión. Domicilio: items + costo de envío.
+    """
+    items = []
+    if factura.sesion:
+        for pedido in factura.sesion.pedidos:
+            items.append((pedido.producto, pedido.cantidad, pedido.total, pedido.notas))
+    else:
+        domicilio = factura.domicilios.first()
+        if domicilio:
+            for item in domicilio.items:
+                items.append((item.producto_nombre, item.cantidad, item.subtotal, item.notas))
+            items.append(('Domicilio', 1, domicilio.costo_domicilio, None))
+    return items
+
+
+def texto_factura(factura, config, items, desglose, ancho):
+    """
+    Recibo de factura en texto plano de `ancho` columnas.
+    Retorna una lista de tuplas (estilo, linea) donde estilo es
+    'normal', 'centro', 'titulo' o 'negrita' (lo usa el formato ESC/POS).
+    """
+    separador = '-' * ancho
+    lineas = []
+
+    # Encabezado
+    lineas.append(('titulo', config.nombre or ''))
+    for texto in (f"NIT: {config.nit}", config.direccion, config.ciudad,
+                  f"Tel: {config.telefono}", config.email, config.regimen,
+                  config.resolucion_dian, config.rango_facturacion):
+        if texto:
+            for parte in partir(texto, ancho):
+                lineas.append(('centro', parte))
+    lineas.append(('normal', separador))
+
+    # Información de factura
+    fecha = factura.fecha_emision.strftime('%d/%m/%Y %I:%M %p')
+    lineas.append(('negrita', centrar('FACTURA DE VENTA', ancho)))
+    lineas.append(('negrita', centrar(f"No. {factura.numero_consecutivo}", ancho)))
+    lineas.append(('centro', fecha))
+    if factura.sesion:
+        lineas.append(('centro', f"Mesa: {factura.sesion.mesa.numero}"))
+    else:
+        lineas.append(('centro', 'DOMICILIO'))
+    lineas.append(('normal', separador))
+
+    # Cliente
+    if factura.cliente_nombre or factura.cliente_documento:
+        lineas.append(('negrita', 'CLIENTE:'))
+        if factura.cliente_nombre:
+            for parte in partir(factura.cliente_nombre, ancho):
+                lineas.append(('normal', parte))
+        if factura.cliente_documento:
+            lineas.append(('normal', f"CC/NIT: {factura.cliente_documento}"))
+        lineas.append(('normal', separador))
+
+    # Productos: "2 x Producto ......... $10,000"
+    for producto, cantidad, valor, notas in items:
+        valor_txt = formatear_moneda(valor)
+        prefijo = f"{cantidad} x "
+        disponible = ancho - len(valor_txt) - 1
+        partes = partir(prefijo + (producto or ''), disponible) or [prefijo]
+        lineas.append(('normal', linea_valor(partes[0], valor_txt, ancho)))
+        for parte in partes[1:]:
+            lineas.append(('normal', '    ' + parte))
+        if notas:
+            for parte in partir(f"* {notas}", ancho - 2):
+                lineas.append(('normal', '  ' + parte))
+    lineas.append(('normal', separador))
+
+    # Totales
+    lineas.append(('negrita', linea_valor('SUBTOTAL:', formatear_moneda(factura.subtotal), ancho)))
+    if (factura.iva or 0) > 0:
+        lineas.append(('normal', linea_valor(f"IVA ({config.iva_porcentaje}%):", formatear_moneda(factura.iva), ancho)))
+    if (factura.propina or 0) > 0:
+        lineas.append(('normal', linea_valor('Propina:', formatear_moneda(factura.propina), ancho)))
+    lineas.append(('normal', '=' * ancho))
+    lineas.append(('negrita', linea_valor('TOTAL:', formatear_moneda(factura.total), ancho)))
+    lineas.append(('normal', '=' * ancho))
+
+    # Método de pago
+    lineas.append(('normal', f"METODO DE PAGO: {(factura.metodo_pago or '').upper()}"))
+    if desglose:
+        for metodo in ('efectivo', 'tarjeta', 'transferencia'):
+            if desglose.get(metodo):
+                lineas.append(('normal', linea_valor(f"  {metodo.capitalize()}:", formatear_moneda(desglose[metodo]), ancho)))
+    if factura.estado_pago == 'pendiente':
+        lineas.append(('negrita', 'CREDITO - PENDIENTE DE PAGO'))
+        if factura.fecha_vencimiento:
+            lineas.append(('normal', f"Vence: {factura.fecha_vencimiento.strftime('%d/%m/%Y')}"))
+    elif factura.estado_pago == 'pagada':
+        lineas.append(('negrita', 'PAGADO'))
+
+    if factura.notas:
+        lineas.append(('normal', separador))
+        lineas.append(('negrita', 'NOTAS:'))
+        for parte in partir(factura.notas, ancho):
+            lineas.append(('normal', parte))
+
+    # Pie de página
+    lineas.append(('normal', separador))
+    lineas.append(('centro', '¡GRACIAS POR SU COMPRA!'))
+    lineas.append(('centro', 'Vuelva Pronto'))
+    if factura.estado_pago != 'pendiente':
+        lineas.append(('centro', fecha))
+
+    return lineas
+
+
+def a_texto(lineas, ancho):
+    """Convierte las líneas con estilo a texto plano"""
+    salida = []
+    for estilo, linea in lineas:
+        if estilo in ('centro', 'titulo'):
+            salida.append(centrar(linea, ancho))
+        else:
+            salida.append(linea[:ancho].rstrip())
+    return '\n'.join(salida) + '\n'
+
+
+def a_escpos(lineas, cortar=True):
+    """
+    Convierte las líneas con estilo a bytes ESC/POS listos para enviar
+    a la impresora (socket 9100, archivo de dispositivo o cola CUPS raw).
+    """
+    datos = bytearray(ESC_INIT + ESC_CODEPAGE_850)
+    for estilo, linea in lineas:
+        texto = linea.encode(CODIFICACION_ESCPOS, errors='replace')
+        if estilo == 'titulo':
+            datos += ESC_ALIGN_CENTER + ESC_DOUBLE_ON + texto + b'\n' + ESC_DOUBLE_OFF + ESC_ALIGN_LEFT
+        elif estilo == 'centro':
+            datos += ESC_ALIGN_CENTER + texto + b'\n' + ESC_ALIGN_LEFT
+        elif estilo == 'negrita':
+            datos += ESC_BOLD_ON + texto + b'\n' + ESC_BOLD_OFF
+        else:
+            datos += texto + b'\n'
+    if cortar:
+        datos += ESC_FEED_CUT
+    return bytes(datos)
+
+
+# =========================
+# TICKETS DE COCINA
+# =========================
+
+def texto_ticket_cocina(titulo, estacion, items, fecha, ancho):
+    """
+    Ticket de cocina (comanda) para una mesa o domicilio.
+    items: lista de dicts con producto, cantidad y notas.
+    """
+    lineas = [
+        ('titulo', titulo),
+        ('centro', f"{estacion.upper()} - {fecha.strftime('%d/%m/%Y %I:%M %p')}"),
+        ('normal', '-' * ancho),
+    ]
+    for item in items:
+        for parte in partir(f"{item['cantidad']} x {item['producto']}", ancho):
+            lineas.append(('negrita', parte))
+        if item.get('notas'):
+            for parte in partir(f"* {item['notas']}", ancho - 2):
+                lineas.append(('normal', '  ' + parte))
+    lineas.append(('normal', '-' * ancho))
+    lineas.append(('centro', f"{sum(i['cantidad'] for i in items)} producto(s)"))
+    return lineas
@@ -4,7 +4,8 @@ Ejecutar con: python init_db.py
 También se ejecuta automáticamente en Railway al desplegar
 """
 
-from app import app, db, Usuario, Mesa, CategoriaGasto, ConfiguracionRestaurante, Presupuesto
+from app import app, db, Usuario, Mesa, CategoriaGasto, Presupuesto
+import esquema
 from datetime import datetime
 import sys
 
@@ -18,104 +19,26 @@ def init_database():
             db.create_all()
             
             # =========================
-            # USUARIOS POR DEFECTO
+            # USUARIOS, MESAS, CATEGORÍAS Y CONFIGURACIÓN
             # =========================
-            usuarios_default = [
-                {
-                    'username': 'admin',
-                    'password': 'admin123',
-                    'nombre': 'Administrador',
-                    'rol': 'admin'
-                },
-                {
-                    'username': 'mesero1',
-                    'password': 'mesero123',
-                    'nombre': 'Mesero 1',
-                    'rol': 'mesero'
-                },
+            # Inserción en bloque: solo se crea lo que falta (ver esquema.py)
+            usuarios_default = esquema.USUARIOS_INICIALES + [
                 {
                     'username': 'mesero2',
                     'password': 'mesero123',
                     'nombre': 'Mesero 2',
                     'rol': 'mesero'
-                },
-                {
-                    'username': 'cocina',
-                    'password': 'cocina123',
-                    'nombre': 'Cocina',
-                    'rol': 'cocina'
                 }
             ]
+            configuracion = dict(esquema.CONFIGURACION_INICIAL, nombre='Ivaluth Restaurant')
             
-            print("\n👥 Creando usuarios...")
-            usuarios_creados = 0
-            for user_data in usuarios_default:
-                if not Usuario.query.filter_by(username=user_data['username']).first():
-                    usuario = Usuario(
-                        username=user_data['username'],
-                        nombre=user_data['nombre'],
-                        rol=user_data['rol']
-                    )
-                    usuario.set_password(user_data['password'])
-                    db.session.add(usuario)
-                    print(f"   ✓ Usuario creado: {user_data['username']} (rol: {user_data['rol']})")
-                    usuarios_creados += 1
+            print("\n👥 Creando usuarios, mesas, categorías de gastos y configuración...")
+            creados = esquema.sembrar_datos_iniciales(usuarios=usuarios_default, configuracion=configuracion)
+            for tabla, cantidad in creados.items():
+                if cantidad:
+                    print(f"   ✓ {tabla}: {cantidad} creados")
                 else:
-                    print(f"   ⚠ Usuario ya existe: {user_data['username']}")
-            
-            # =========================
-            # MESAS
-            # =========================
-            print("\n🪑 Creando mesas...")
-            if Mesa.query.count() == 0:
-                for i in range(1, 11):
-                    mesa = Mesa(numero=i, capacidad=4)
-                    db.session.add(mesa)
-                print(f"   ✓ Creadas 10 mesas (1-10)")
-            else:
-                print(f"   ⚠ Ya existen {Mesa.query.count()} mesas")
-            
-            # =========================
-            # CATEGORÍAS DE GASTOS
-            # =========================
-            print("\n💰 Creando categorías de gastos...")
-            if CategoriaGasto.query.count() == 0:
-                categorias_default = [
-                    {'nombre': 'Ingredientes y Materia Prima', 'descripcion': 'Compras de alimentos, bebidas y suministros de cocina', 'color': '#28a745'},
-                    {'nombre': 'Salarios y Nómina', 'descripcion': 'Pagos a empleados, prestaciones y seguridad social', 'color': '#007bff'},
-                    {'nombre': 'Servicios Públicos', 'descripcion': 'Agua, luz, gas, internet, teléfono', 'color': '#ffc107'},
-                    {'nombre': 'Arriendo', 'descripcion': 'Pago de arriendo del local', 'color': '#dc3545'},
-                    {'nombre': 'Mantenimiento', 'descripcion': 'Reparaciones, limpieza, mantenimiento de equipos', 'color': '#6c757d'},
-                    {'nombre': 'Marketing', 'descripcion': 'Publicidad, redes sociales, volantes', 'color': '#e83e8c'},
-                    {'nombre': 'Impuestos', 'descripcion': 'Impuestos, declaraciones, trámites legales', 'color': '#fd7e14'},
-                    {'nombre': 'Otros Gastos', 'descripcion': 'Gastos misceláneos', 'color': '#6610f2'}
-                ]
-                
-                for cat_data in categorias_default:
-                    categoria = CategoriaGasto(**cat_data)
-                    db.session.add(categoria)
-                
-                print(f"   ✓ Creadas {len(categorias_default)} categorías de gastos")
-            else:
-                print(f"   ⚠ Ya existen {CategoriaGasto.query.count()} categorías")
-            
-            # =========================
-            # CONFIGURACIÓN DEL RESTAURANTE
-            # =========================
-            print("\n⚙️  Creando configuración del restaurante...")
-            if ConfiguracionRestaurante.query.count() == 0:
-                config = ConfiguracionRestaurante(
-                    nombre='Ivaluth Restaurant',
-                    nit='900.000.000-0',
-                    direccion='Calle 123 #45-67',
-                    ciudad='Zarzal, Valle del Cauca',
-                    telefono='(+57) 300 000 0000',
-                    regimen='Régimen Simplificado'
-                )
-                db.session.add(config)
-                print("   ✓ Configuración creada")
-            else:
-                print("   ⚠ Configuración ya existe")
+                    print(f"   ⚠ {tabla}: ya existen")
             
             # =========================
             # PRESUPUESTOS DE EJEMPLO
@@ -178,6 +101,7 @@ def init_database():
             # =========================
             # GUARDAR CAMBIOS
             # =========================
+            esquema.guardar_huella(esquema.huella_esquema())
             db.session.commit()
             
             print("\n" + "="*60)
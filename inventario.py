@@ -0,0 +1,249 @@
+"""
+Inventario por receta: existencias de ingredientes y platillos agotados.
+
+RAZÓN: ConsumoInterno registraba lo que consume el personal pero nada llevaba
+las existencias, e ItemMenu.disponible se cambiaba a mano cuando la cocina
+avisaba que algo se había acabado. Ahora cada platillo tiene su receta
+(Receta: cantidad de cada ingrediente por porción) y cada flush que crea,
+cambia o borra un Pedido, un ItemDomicilio o un ConsumoInterno descuenta (o
+devuelve) sus ingredientes, en la misma transacción:
+
+- Un solo UPDATE por flush: stock = stock - SUM(receta × unidades pedidas).
+  La resta la hace la base de datos, así que dos meseros que piden a la vez
+  no se pisan (no hay leer-modificar-escribir en Python), y si la
+  transacción falla no se descuenta nada.
+- Los platillos con un ingrediente que ya no alcanza para una porción pasan a
+  disponible=False, agotado=True; los agotados cuyo ingrediente se repuso
+  vuelven a estar disponibles. Los que ocultó el administrador no se tocan.
+- Si algún platillo cambió, sube Sucursal.version_menu y, al confirmar, se
+  invalida el índice del menú de este worker; los demás workers lo notan en
+  pocos segundos (ver busqueda_menu.py).
+
+Un platillo agotado no bloquea pedidos (las operaciones sin conexión se
+tomaron cuando sí estaba en el menú): el stock puede quedar negativo, lo que
+también avisa que hay que hacer un conteo. Cancelar un domicilio no devuelve
+ingredientes (la comida pudo haberse preparado); borrar la fila sí.
+
+Lo importa rutas/inventario.py: con el módulo de inventario deshabilitado no
+se llevan existencias ni se agotan platillos solos.
+"""
+
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+
+from extensiones import db
+from modelos import Pedido, ItemDomicilio, ConsumoInterno, ItemMenu, Ingrediente, Receta, Sucursal
+from busqueda_menu import invalidar_indice
+
+# modelo -> columna con el platillo del menú (las unidades van en `cantidad`)
+MODELOS_CONSUMO = {
+    Pedido: 'item_menu_id',
+    ItemDomicilio: 'item_menu_id',
+    ConsumoInterno: 'item_id',
+}
+
+# En sesion.info: algún platillo se agotó o volvió en esta transacción
+CLAVE_MENU_CAMBIADO = 'inventario_menu_cambiado'
+
+
+# =========================
+# VALOR ANTERIOR
+# =========================
+# RAZÓN: Después de un commit las filas quedan expiradas. Cambiar o borrar una
+# sin volver a leerla dejaba la historia sin el valor anterior, y se devolvía
+# (o descontaba) de menos. Con active_history el cambio carga el valor anterior,
+# y antes del flush se cargan las filas que se van a borrar.
+
+def _sin_cambios(objetivo, valor, anterior, iniciador):
+    return valor
+
+
+for _modelo, _campo in MODELOS_CONSUMO.items():
+    for _atributo in (_campo, 'cantidad'):
+        event.listen(getattr(_modelo, _atributo), 'set', _sin_cambios, active_history=True)
+
+
+@event.listens_for(Session, 'before_flush')
+def _cargar_borrados(sesion, contexto, instancias):
+    for obj in sesion.deleted:
+        if type(obj) in MODELOS_CONSUMO and inspect(obj).expired_attributes:
+            sesion.refresh(obj)
+
+
+# =========================
+# UNIDADES DEL FLUSH
+# =========================
+
+def _anterior(atributos, campo):
+    """Valor de la columna antes del flush"""
+    historia = atributos[campo].history
+    return (historia.deleted or historia.unchanged or historia.added or [None])[0]
+
+
+def unidades_del_flush(sesion):
+    """
+    {item_menu_id: unidades} que consume este flush (negativo: devuelve).
+    Usar dentro de after_flush, donde la historia de los atributos sigue disponible.
+    """
+    unidades = {}
+
+    def sumar(item_id, cantidad):
+        if item_id is not None and cantidad:
+            unidades[item_id] = unidades.get(item_id, 0) + cantidad
+
+    for obj in sesion.new:
+        campo = MODELOS_CONSUMO.get(type(obj))
+        if campo:
+            sumar(getattr(obj, campo), obj.cantidad)
+
+    for obj in sesion.deleted:
+        campo = MODELOS_CONSUMO.get(type(obj))
+        if campo:
+            atributos = inspect(obj).attrs
+            sumar(_anterior(atributos, campo), -(_anterior(atributos, 'cantidad') or 0))
+
+    for obj in sesion.dirty:
+        campo = MODELOS_CONSUMO.get(type(obj))
+        if not campo:
+            continue
+        atributos = inspect(obj).attrs
+        if not (atributos[campo].history.has_changes() or atributos['cantidad'].history.has_changes()):
+            continue
+        # Cambió el platillo o la cantidad: se devuelve lo anterior y se descuenta lo nuevo
+        sumar(_anterior(atributos, campo), -(_anterior(atributos, 'cantidad') or 0))
+        sumar(getattr(obj, campo), obj.cantidad)
+
+    return {item_id: cantidad for item_id, cantidad in unidades.items() if cantidad}
+
+
+# =========================
+# SENTENCIAS
+# =========================
+
+def _descontar(conexion, unidades):
+    """
+    stock = stock - SUM(receta.cantidad × unidades del platillo) en los
+    ingredientes activos de esos platillos, en un UPDATE.
+    Retorna los ids de los ingredientes que cambiaron.
+    """
+    items = list(unidades)
+    por_platillo = db.case(unidades, value=Receta.item_menu_id, else_=0)
+    consumo = (
+        db.select(db.func.sum(Receta.cantidad * por_platillo))
+        .where(Receta.ingrediente_id == Ingrediente.id, Receta.item_menu_id.in_(items))
+        .scalar_subquery()
+    )
+    return conexion.execute(
+        db.update(Ingrediente)
+        .where(
+            Ingrediente.activo == True,
+            Ingrediente.id.in_(db.select(Receta.ingrediente_id).where(Receta.item_menu_id.in_(items))),
+        )
+        .values(stock=Ingrediente.stock - consumo)
+        .returning(Ingrediente.id)
+    ).scalars().all()
+
+
+def _falta_ingrediente():
+    """El platillo lleva un ingrediente activo que no alcanza para una porción"""
+    return db.exists().where(
+        Receta.item_menu_id == ItemMenu.id,
+        Receta.ingrediente_id == Ingrediente.id,
+        Ingrediente.activo == True,
+        Ingrediente.stock < Receta.cantidad,
+    )
+
+
+def _reevaluar_platillos(conexion, ingrediente_ids=None, item_ids=None):
+    """
+    Agota los platillos disponibles a los que les falta un ingrediente y
+    vuelve a mostrar los agotados que ya tienen todo. Los candidatos son los
+    platillos que usan ingrediente_ids, o item_ids.
+    Retorna True si algún platillo cambió.
+    """
+    if ingrediente_ids is not None:
+        candidatos = ItemMenu.id.in_(
+            db.select(Receta.item_menu_id).where(Receta.ingrediente_id.in_(ingrediente_ids)))
+    else:
+        candidatos = ItemMenu.id.in_(item_ids)
+
+    agotados = conexion.execute(
+        db.update(ItemMenu)
+        .where(candidatos, ItemMenu.disponible == True, _falta_ingrediente())
+        .values(disponible=False, agotado=True)
+        .returning(ItemMenu.sucursal_id)
+    ).scalars().all()
+    repuestos = conexion.execute(
+        db.update(ItemMenu)
+        .where(candidatos, ItemMenu.agotado == True, ~_falta_ingrediente())
+        .values(disponible=True, agotado=False)
+        .returning(ItemMenu.sucursal_id)
+    ).scalars().all()
+
+    sucursal_ids = {s for s in agotados + repuestos if s is not None}
+    if sucursal_ids:
+        conexion.execute(
+            db.update(Sucursal)
+            .where(Sucursal.id.in_(sucursal_ids))
+            .values(version_menu=Sucursal.version_menu + 1)
+        )
+    return bool(agotados or repuestos)
+
+
+# =========================
+# EVENTOS DE LA SESIÓN
+# =========================
+
+@event.listens_for(Session, 'after_flush')
+def _descontar_inventario(sesion, contexto):
+    unidades = unidades_del_flush(sesion)
+    if not unidades:
+        return
+    conexion = sesion.connection()
+    ingrediente_ids = _descontar(conexion, unidades)
+    if ingrediente_ids and _reevaluar_platillos(conexion, ingrediente_ids=ingrediente_ids):
+        sesion.info[CLAVE_MENU_CAMBIADO] = True
+
+
+@event.listens_for(Session, 'after_commit')
+def _actualizar_menu(sesion):
+    if sesion.info.pop(CLAVE_MENU_CAMBIADO, False):
+        invalidar_indice()
+
+
+@event.listens_for(Session, 'after_rollback')
+def _descartar(sesion):
+    sesion.info.pop(CLAVE_MENU_CAMBIADO, None)
+
+
+# =========================
+# AJUSTES MANUALES
+# =========================
+
+def reevaluar(ingrediente_ids=None, item_ids=None):
+    """
+    Después de cambiar recetas o activar/desactivar ingredientes: agota o
+    vuelve a mostrar los platillos afectados. El llamador hace commit.
+    """
+    db.session.flush()
+    if _reevaluar_platillos(db.session.connection(), ingrediente_ids=ingrediente_ids, item_ids=item_ids):
+        db.session.info[CLAVE_MENU_CAMBIADO] = True
+
+
+def ajustar_stock(ingrediente, cantidad=None, conteo=None):
+    """
+    Entrada (+cantidad) o salida (-cantidad) de mercancía, o conteo físico
+    (stock = conteo). La entrada es una suma en la base de datos, así que no
+    se pierden los descuentos de los pedidos que llegan mientras tanto.
+    Retorna el stock nuevo. El llamador hace commit.
+    """
+    nuevo = conteo if conteo is not None else Ingrediente.stock + cantidad
+    stock = db.session.connection().execute(
+        db.update(Ingrediente)
+        .where(Ingrediente.id == ingrediente.id)
+        .values(stock=nuevo)
+        .returning(Ingrediente.stock)
+    ).scalar_one()
+    db.session.expire(ingrediente, ['stock'])
+    reevaluar(ingrediente_ids=[ingrediente.id])
+    return stock
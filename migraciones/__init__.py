@@ -0,0 +1,475 @@
+"""
+Migraciones de esquema versionadas (SQLite y PostgreSQL).
+
+RAZÓN: Los scripts anteriores (update_database.py, migrate_factura.py,
+migracion_domicilios.py) abrían restaurante.db directamente, así que nunca
+tocaban la base de PostgreSQL de producción, y migrate_factura.py copiaba,
+borraba y recreaba la tabla completa. Aquí cada cambio es un módulo versionado
+que se aplica una sola vez, en el mismo motor que usa la app, sin bloquear la
+toma de pedidos:
+
+    expandir(op)   Cambios compatibles con el código que está corriendo:
+                   columnas nulas, índices. La DDL corre con lock_timeout
+                   corto y reintentos, para no quedar en cola detrás de una
+                   transacción larga (y bloquear a todos los que vienen detrás).
+    rellenar(op)   Backfill en lotes por rango de id, un commit por lote.
+                   El progreso se guarda en la misma transacción del lote, así
+                   que si se interrumpe se reanuda donde quedó.
+    contraer(op)   Quitar lo que el código nuevo ya no usa. Solo corre con
+                   `flask migrar --contraer`, después de desplegar ese código.
+
+Cada migración es un archivo vNNNN_descripcion.py en este paquete con las
+funciones que necesite. El estado queda en la tabla migracion_esquema.
+
+Las fases van por turnos: primero se expande todo lo pendiente, después se
+rellena y al final se contrae. Así un relleno puede usar los modelos de la
+app, que tienen todas las columnas del código desplegado, aunque la base
+venga de varias versiones atrás.
+
+Uso:
+    flask migrar                 expandir + rellenar lo pendiente
+    flask migrar --contraer      además, contraer
+    flask migrar --estado        ver en qué va cada migración
+    flask migrar --lote 2000     tamaño de lote para los rellenos
+"""
+
+import importlib
+import json
+import pkgutil
+import re
+import sqlite3
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+from sqlalchemy import inspect, text
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.schema import CreateIndex, CreateTable
+
+from extensiones import db
+from modelos import MigracionEsquema
+
+PATRON_MODULO = re.compile(r'^v(\d{4})_(\w+)$')
+
+LOTE_POR_DEFECTO = 5000
+PAUSA_ENTRE_LOTES = 0.05       # segundos; deja respirar a las peticiones
+LOCK_TIMEOUT_MS = 2000         # lo máximo que una DDL espera por un bloqueo
+REINTENTOS_DDL = 5
+
+# Clave del advisory lock de PostgreSQL (dos despliegues no migran a la vez)
+CLAVE_BLOQUEO = 731_031
+
+CODIGO_LOCK_NOT_AVAILABLE = '55P03'
+
+
+# =========================
+# OPERACIONES
+# =========================
+
+class Operaciones:
+    """Operaciones de esquema idempotentes que reciben las migraciones"""
+
+    def __init__(self, version, lote=LOTE_POR_DEFECTO, pausa=PAUSA_ENTRE_LOTES, salida=print):
+        self.version = version
+        self.lote = lote
+        self.pausa = pausa
+        self.salida = salida
+        self.motor = db.engine
+        self.dialecto = self.motor.dialect.name
+
+    # ---------- Inspección ----------
+
+    def _inspector(self):
+        # Nuevo cada vez: el inspector guarda en caché lo que ya leyó
+        return inspect(self.motor)
+
+    def existe_tabla(self, tabla):
+        return self._inspector().has_table(tabla)
+
+    def columnas(self, tabla):
+        return {c['name']: c for c in self._inspector().get_columns(tabla)}
+
+    def existe_columna(self, tabla, columna):
+        return columna in self.columnas(tabla)
+
+    # ---------- DDL ----------
+
+    def _es_bloqueo(self, error):
+        if self.dialecto == 'postgresql':
+            return getattr(error.orig, 'pgcode', None) == CODIGO_LOCK_NOT_AVAILABLE
+        return 'database is locked' in str(error.orig)
+
+    def _fijar_timeout(self, conexion, local=True):
+        if self.dialecto == 'postgresql':
+            alcance = 'LOCAL ' if local else ''
+            conexion.exec_driver_sql(f"SET {alcance}lock_timeout = '{LOCK_TIMEOUT_MS}ms'")
+        elif self.dialecto == 'sqlite':
+            conexion.exec_driver_sql(f"PRAGMA busy_timeout = {LOCK_TIMEOUT_MS}")
+
+    def ddl(self, *sentencias, transaccional=True):
+        """
+        Ejecuta DDL con lock_timeout. Si no consigue el bloqueo a tiempo,
+        reintenta con espera exponencial en vez de quedarse esperando.
+        transaccional=False para sentencias que no pueden ir en una
+        transacción (CREATE INDEX CONCURRENTLY).
+        """
+        for intento in range(REINTENTOS_DDL):
+            try:
+                if transaccional:
+                    with self.motor.begin() as conexion:
+                        self._fijar_timeout(conexion)
+                        for sentencia in sentencias:
+                            conexion.exec_driver_sql(sentencia)
+                else:
+                    with self.motor.connect().execution_options(isolation_level='AUTOCOMMIT') as conexion:
+                        self._fijar_timeout(conexion, local=False)
+                        try:
+                            for sentencia in sentencias:
+                                conexion.exec_driver_sql(sentencia)
+                        finally:
+                            if self.dialecto == 'postgresql':
+                                conexion.exec_driver_sql("RESET lock_timeout")
+                return
+            except OperationalError as e:
+                if not self._es_bloqueo(e) or intento + 1 == REINTENTOS_DDL:
+                    raise
+                espera = 0.5 * (2 ** intento)
+                self.salida(f"   … tabla ocupada, reintentando en {espera:.1f}s")
+                time.sleep(espera)
+
+    def crear_tabla(self, modelo):
+        """Crea la tabla de un modelo (con sus índices) si no existe"""
+        if self.existe_tabla(modelo.__tablename__):
+            return False
+        modelo.__table__.create(self.motor, checkfirst=True)
+        self.salida(f"   + tabla {modelo.__tablename__}")
+        return True
+
+    def agregar_columna(self, tabla, columna, tipo, default=None):
+        """
+        Agrega una columna nula (instantáneo en PostgreSQL 11+ y en SQLite).
+        tipo: tipo de SQLAlchemy (db.Float(), db.String(20)...).
+        default: literal SQL opcional ("0", "'pendiente'").
+        """
+        if self.existe_columna(tabla, columna):
+            return False
+        tipo_sql = tipo.compile(dialect=self.motor.dialect)
+        sentencia = f"ALTER TABLE {tabla} ADD COLUMN {columna} {tipo_sql}"
+        if default is not None:
+            sentencia += f" DEFAULT {default}"
+        self.ddl(sentencia)
+        self.salida(f"   + {tabla}.{columna}")
+        return True
+
+    def eliminar_columna(self, tabla, columna):
+        if not self.existe_columna(tabla, columna):
+            return False
+        if self.dialecto == 'sqlite' and sqlite3.sqlite_version_info < (3, 35):
+            self._reconstruir_sqlite(tabla)
+        else:
+            self.ddl(f"ALTER TABLE {tabla} DROP COLUMN {columna}")
+        self.salida(f"   - {tabla}.{columna}")
+        return True
+
+    def permitir_nulos(self, tabla, columna):
+        """Quita el NOT NULL de una columna"""
+        if self.columnas(tabla)[columna]['nullable']:
+            return False
+        if self.dialecto == 'sqlite':
+            # SQLite no tiene ALTER COLUMN
+            self._reconstruir_sqlite(tabla)
+        else:
+            self.ddl(f"ALTER TABLE {tabla} ALTER COLUMN {columna} DROP NOT NULL")
+        self.salida(f"   ~ {tabla}.{columna} acepta nulos")
+        return True
+
+    def quitar_unico(self, tabla, columna):
+        """Quita la restricción UNIQUE de una sola columna"""
+        restricciones = [
+            u for u in self._inspector().get_unique_constraints(tabla) if u['column_names'] == [columna]
+        ]
+        if not restricciones:
+            return False
+        if self.dialecto == 'sqlite':
+            # En SQLite la restricción es parte de la definición de la tabla
+            self._reconstruir_sqlite(tabla)
+        else:
+            self.ddl(*(f"ALTER TABLE {tabla} DROP CONSTRAINT {u['name']}" for u in restricciones))
+        self.salida(f"   ~ {tabla}.{columna} ya no es única")
+        return True
+
+    def eliminar_tabla(self, tabla):
+        if not self.existe_tabla(tabla):
+            return False
+        self.ddl(f"DROP TABLE {tabla}")
+        self.salida(f"   - tabla {tabla}")
+        return True
+
+    def crear_indice(self, nombre, tabla, columnas, unico=False):
+        """En PostgreSQL usa CONCURRENTLY: no bloquea escrituras mientras se construye"""
+        columnas_sql = ', '.join(columnas)
+        tipo = 'UNIQUE INDEX' if unico else 'INDEX'
+        if self.dialecto == 'postgresql':
+            # Un CONCURRENTLY interrumpido deja el índice inválido; se borra y se vuelve a crear
+            invalido = self._escalar(
+                "SELECT NOT i.indisvalid FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid "
+                "WHERE c.relname = :nombre", nombre=nombre
+            )
+            if invalido:
+                self.ddl(f"DROP INDEX CONCURRENTLY IF EXISTS {nombre}", transaccional=False)
+            self.ddl(f"CREATE {tipo} CONCURRENTLY IF NOT EXISTS {nombre} ON {tabla} ({columnas_sql})",
+                     transaccional=False)
+        else:
+            self.ddl(f"CREATE {tipo} IF NOT EXISTS {nombre} ON {tabla} ({columnas_sql})")
+        self.salida(f"   + índice {nombre}")
+
+    def agregar_llave_foranea(self, nombre, tabla, columna, referencia):
+        """
+        FOREIGN KEY en PostgreSQL, en dos pasos que no bloquean escrituras:
+        NOT VALID (instantáneo) y luego VALIDATE (lee la tabla sin bloquearla).
+        En SQLite no se puede agregar a una tabla existente; se omite.
+        referencia: "tabla(columna)".
+        """
+        if self.dialecto != 'postgresql':
+            return False
+        existe = self._escalar("SELECT 1 FROM pg_constraint WHERE conname = :nombre", nombre=nombre)
+        if not existe:
+            self.ddl(f"ALTER TABLE {tabla} ADD CONSTRAINT {nombre} "
+                     f"FOREIGN KEY ({columna}) REFERENCES {referencia} NOT VALID")
+        self.ddl(f"ALTER TABLE {tabla} VALIDATE CONSTRAINT {nombre}")
+        self.salida(f"   + llave foránea {nombre}")
+        return True
+
+    def _reconstruir_sqlite(self, tabla):
+        """
+        Recrea la tabla con la definición actual del modelo, copiando los datos,
+        en una sola transacción (solo SQLite, para cambios que no admite ALTER TABLE).
+        """
+        modelo = db.metadata.tables[tabla]
+        temporal = f"{tabla}__nueva"
+        comunes = [c for c in self.columnas(tabla) if c in modelo.columns]
+        lista = ', '.join(comunes)
+        definicion = str(CreateTable(modelo).compile(dialect=self.motor.dialect)).replace(
+            f"CREATE TABLE {tabla} ", f"CREATE TABLE {temporal} ", 1)
+        indices = [str(CreateIndex(indice).compile(dialect=self.motor.dialect)) for indice in modelo.indexes]
+        self.ddl(
+            f"DROP TABLE IF EXISTS {temporal}",
+            definicion,
+            f"INSERT INTO {temporal} ({lista}) SELECT {lista} FROM {tabla}",
+            f"DROP TABLE {tabla}",
+            f"ALTER TABLE {temporal} RENAME TO {tabla}",
+            *indices,
+        )
+
+    # ---------- Relleno en lotes ----------
+
+    def _escalar(self, sql, **parametros):
+        with self.motor.connect() as conexion:
+            return conexion.execute(text(sql), parametros).scalar()
+
+    def rellenar(self, nombre, tabla, asignacion, condicion=None, lote=None):
+        """
+        UPDATE {tabla} SET {asignacion} [WHERE condicion] por rangos de id.
+        Cada lote es una transacción corta que también guarda el progreso,
+        así que se puede interrumpir (Ctrl+C, reinicio) y reanudar.
+        Las filas nuevas ya las escribe el código desplegado; solo hace falta
+        llegar hasta el id máximo que existe al empezar.
+        """
+        lote = lote or self.lote
+        progreso = _leer_progreso(self.version)
+        desde = progreso.get(nombre, 0)
+        maximo = self._escalar(f"SELECT MAX(id) FROM {tabla}") or 0
+        if desde >= maximo:
+            return 0
+
+        filtro = f" AND ({condicion})" if condicion else ''
+        sentencia = text(f"UPDATE {tabla} SET {asignacion} WHERE id > :desde AND id <= :hasta{filtro}")
+        total = 0
+        inicio = desde
+        while desde < maximo:
+            hasta = min(desde + lote, maximo)
+            for intento in range(REINTENTOS_DDL):
+                try:
+                    with self.motor.begin() as conexion:
+                        self._fijar_timeout(conexion)
+                        filas = conexion.execute(sentencia, {'desde': desde, 'hasta': hasta}).rowcount
+                        progreso[nombre] = hasta
+                        conexion.execute(
+                            MigracionEsquema.__table__.update()
+                            .where(MigracionEsquema.version == self.version)
+                            .values(progreso=json.dumps(progreso),
+                                    filas_rellenadas=MigracionEsquema.filas_rellenadas + filas)
+                        )
+                    break
+                except OperationalError as e:
+                    if not self._es_bloqueo(e) or intento + 1 == REINTENTOS_DDL:
+                        raise
+                    time.sleep(0.5 * (2 ** intento))
+            total += filas
+            desde = hasta
+            porcentaje = 100 * (desde - inicio) / (maximo - inicio)
+            self.salida(f"   {nombre}: id {desde}/{maximo} ({porcentaje:.0f}%), {total} filas")
+            if self.pausa:
+                time.sleep(self.pausa)
+        return total
+
+    def procesar_lotes(self, nombre, tabla, funcion, lote=None):
+        """
+        Como rellenar(), pero cada lote lo procesa funcion(desde_id, hasta_id)
+        con db.session (para rellenos que necesitan lógica de Python).
+        funcion retorna cuántos registros procesó; el progreso se guarda en el
+        mismo commit del lote.
+        """
+        lote = lote or self.lote
+        progreso = _leer_progreso(self.version)
+        desde = progreso.get(nombre, 0)
+        maximo = self._escalar(f"SELECT MAX(id) FROM {tabla}") or 0
+        total = 0
+        inicio = desde
+        while desde < maximo:
+            hasta = min(desde + lote, maximo)
+            try:
+                procesados = funcion(desde, hasta) or 0
+                progreso[nombre] = hasta
+                db.session.execute(
+                    MigracionEsquema.__table__.update()
+                    .where(MigracionEsquema.version == self.version)
+                    .values(progreso=json.dumps(progreso),
+                            filas_rellenadas=MigracionEsquema.filas_rellenadas + procesados)
+                )
+                db.session.commit()
+            except Exception:
+                db.session.rollback()
+                raise
+            total += procesados
+            desde = hasta
+            porcentaje = 100 * (desde - inicio) / (maximo - inicio)
+            self.salida(f"   {nombre}: id {desde}/{maximo} ({porcentaje:.0f}%), {total} registros")
+            if self.pausa:
+                time.sleep(self.pausa)
+        return total
+
+
+# =========================
+# ESTADO
+# =========================
+
+def _leer_progreso(version):
+    with db.engine.connect() as conexion:
+        valor = conexion.execute(
+            db.select(MigracionEsquema.progreso).where(MigracionEsquema.version == version)
+        ).scalar()
+    return json.loads(valor) if valor else {}
+
+
+def _marcar(version, **campos):
+    with db.engine.begin() as conexion:
+        conexion.execute(
+            MigracionEsquema.__table__.update().where(MigracionEsquema.version == version).values(**campos)
+        )
+
+
+def descubrir():
+    """Migraciones del paquete ordenadas por versión: [(version, nombre, modulo_importado)]"""
+    encontradas = []
+    for info in pkgutil.iter_modules(__path__):
+        coincidencia = PATRON_MODULO.match(info.name)
+        if coincidencia:
+            encontradas.append((coincidencia.group(1), coincidencia.group(2), info.name))
+    encontradas.sort()
+    return [(version, nombre, importlib.import_module(f"{__name__}.{modulo}"))
+            for version, nombre, modulo in encontradas]
+
+
+def estado():
+    """{version: fila de migracion_esquema} (vacío si la tabla no existe)"""
+    MigracionEsquema.__table__.create(db.engine, checkfirst=True)
+    with db.engine.connect() as conexion:
+        filas = conexion.execute(db.select(MigracionEsquema.__table__)).mappings().all()
+    return {fila['version']: fila for fila in filas}
+
+
+@contextmanager
+def _bloqueo_migraciones():
+    """En PostgreSQL, un advisory lock evita que dos despliegues migren a la vez"""
+    if db.engine.dialect.name != 'postgresql':
+        yield True
+        return
+    conexion = db.engine.connect().execution_options(isolation_level='AUTOCOMMIT')
+    obtenido = False
+    try:
+        obtenido = conexion.exec_driver_sql(f"SELECT pg_try_advisory_lock({CLAVE_BLOQUEO})").scalar()
+        yield obtenido
+    finally:
+        if obtenido:
+            conexion.exec_driver_sql(f"SELECT pg_advisory_unlock({CLAVE_BLOQUEO})")
+        conexion.close()
+
+
+# =========================
+# EJECUCIÓN
+# =========================
+
+def migrar(contraer=False, lote=LOTE_POR_DEFECTO, salida=print):
+    """
+    Aplica las fases pendientes: primero expandir de todas las migraciones,
+    después rellenar de todas y, con contraer=True, contraer; dentro de cada
+    fase, en orden de versión. Retorna la cantidad de fases aplicadas.
+    """
+    estados = estado()
+    migraciones = descubrir()
+
+    def pendiente(version):
+        fila = estados.get(version)
+        if not fila or not fila['fecha_expandida'] or not fila['fecha_rellenada']:
+            return True
+        return contraer and not fila['fecha_contraida']
+
+    if not any(pendiente(version) for version, _, _ in migraciones):
+        salida("Migraciones al día")
+        return 0
+
+    aplicadas = 0
+    with _bloqueo_migraciones() as obtenido:
+        if not obtenido:
+            salida("Otra migración está en curso; no se hace nada")
+            return 0
+
+        estados = estado()
+        for version, nombre, _ in migraciones:
+            if version not in estados:
+                with db.engine.begin() as conexion:
+                    conexion.execute(MigracionEsquema.__table__.insert().values(
+                        version=version, nombre=nombre, filas_rellenadas=0))
+
+        fases = [('expandir', 'fecha_expandida'), ('rellenar', 'fecha_rellenada')]
+        if contraer:
+            fases.append(('contraer', 'fecha_contraida'))
+
+        # Cada fase de todas las migraciones antes de la siguiente fase: los
+        # rellenos usan los modelos actuales, que ya traen las columnas de las
+        # migraciones posteriores (sesion.sucursal_id, los contadores...).
+        for fase, campo in fases:
+            for version, nombre, modulo in migraciones:
+                if (estados.get(version) or {}).get(campo):
+                    continue
+                funcion = getattr(modulo, fase, None)
+                if funcion:
+                    salida(f"{version} {nombre}: {fase}")
+                    funcion(Operaciones(version, lote=lote, salida=salida))
+                    aplicadas += 1
+                _marcar(version, **{campo: datetime.now()})
+
+    salida(f"{aplicadas} fase(s) aplicadas")
+    return aplicadas
+
+
+def imprimir_estado(salida=print):
+    estados = estado()
+    for version, nombre, _ in descubrir():
+        fila = estados.get(version) or {}
+        fases = []
+        for fase, campo in (('expandida', 'fecha_expandida'), ('rellenada', 'fecha_rellenada'),
+                            ('contraída', 'fecha_contraida')):
+            fases.append(f"{fase}: {fila[campo].strftime('%d/%m/%Y %H:%M') if fila.get(campo) else '—'}")
+        salida(f"{version} {nombre:<40} {' | '.join(fases)} | filas: {fila.get('filas_rellenadas') or 0}")
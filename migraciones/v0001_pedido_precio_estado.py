@@ -0,0 +1,16 @@
+"""
+Pedido: precio_unitario y estado_actualizado (antes update_database.py).
+"""
+
+from extensiones import db
+
+
+def expandir(op):
+    op.agregar_columna('pedido', 'precio_unitario', db.Float(), default='0')
+    op.agregar_columna('pedido', 'estado_actualizado', db.DateTime())
+
+
+def rellenar(op):
+    # Pedidos listos anteriores: la fecha de creación como aproximación
+    op.rellenar('estado_actualizado', 'pedido', 'estado_actualizado = fecha',
+                condicion="estado = 'listo' AND estado_actualizado IS NULL")
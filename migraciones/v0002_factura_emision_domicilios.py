@@ -0,0 +1,16 @@
+"""
+Factura: fecha_emision y sesion_id opcional para facturar domicilios
+(antes migrate_factura.py, que borraba y recreaba la tabla).
+"""
+
+from extensiones import db
+
+
+def expandir(op):
+    op.agregar_columna('factura', 'fecha_emision', db.DateTime())
+    op.permitir_nulos('factura', 'sesion_id')
+
+
+def rellenar(op):
+    op.rellenar('fecha_emision', 'factura', 'fecha_emision = COALESCE(fecha_pago_real, CURRENT_TIMESTAMP)',
+                condicion='fecha_emision IS NULL')
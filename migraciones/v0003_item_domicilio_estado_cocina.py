@@ -0,0 +1,16 @@
+"""
+ItemDomicilio: estado_cocina (antes migracion_domicilios.py).
+"""
+
+from extensiones import db
+
+
+def expandir(op):
+    # Sin DEFAULT en la base: los items nuevos lo reciben del modelo ('pendiente')
+    op.agregar_columna('item_domicilio', 'estado_cocina', db.String(20))
+
+
+def rellenar(op):
+    # Los items anteriores ya salieron de cocina
+    op.rellenar('estado_cocina', 'item_domicilio', "estado_cocina = 'listo'",
+                condicion="estado_cocina IS NULL OR estado_cocina = ''")
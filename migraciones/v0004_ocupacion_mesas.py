@@ -0,0 +1,15 @@
+"""
+Agregados de ocupación por mesa y hora (ver ocupacion.py), a partir de las
+sesiones ya cerradas. Las sesiones que se cierren después las suma la app.
+"""
+
+from modelos import OcupacionMesaHora
+from ocupacion import registrar_sesiones_cerradas
+
+
+def expandir(op):
+    op.crear_tabla(OcupacionMesaHora)
+
+
+def rellenar(op):
+    op.procesar_lotes('ocupacion', 'sesion', registrar_sesiones_cerradas, lote=500)
@@ -0,0 +1,30 @@
+"""
+Pedido.item_menu_id y agregados de ventas por día (ver ventas.py).
+Los pedidos e items de domicilio antiguos sin platillo se vinculan al menú
+comparando el nombre escrito con los platillos (sin tildes, mayúsculas ni
+espacios de más, y tolerando errores de escritura pequeños).
+"""
+
+from extensiones import db
+from modelos import VentasDia, VentaItemDia
+from ventas import EmparejadorProductos, vincular_pedidos, vincular_items_domicilio, invalidar_todo
+
+
+def expandir(op):
+    op.agregar_columna('pedido', 'item_menu_id', db.Integer())
+    op.agregar_llave_foranea('pedido_item_menu_id_fkey', 'pedido', 'item_menu_id', 'item_menu(id)')
+    op.crear_indice('ix_pedido_item_menu_id', 'pedido', ['item_menu_id'])
+    op.crear_indice('ix_pedido_fecha_item_menu', 'pedido', ['fecha', 'item_menu_id'])
+    op.crear_tabla(VentasDia)
+    op.crear_tabla(VentaItemDia)
+
+
+def rellenar(op):
+    emparejador = EmparejadorProductos()
+    op.procesar_lotes('pedidos', 'pedido',
+                      lambda desde, hasta: vincular_pedidos(desde, hasta, emparejador))
+    op.procesar_lotes('items_domicilio', 'item_domicilio',
+                      lambda desde, hasta: vincular_items_domicilio(desde, hasta, emparejador))
+    # Los días que se hayan calculado mientras tanto tenían pedidos sin vincular
+    invalidar_todo()
+    db.session.commit()
@@ -0,0 +1,10 @@
+"""
+Índices para las pantallas de domicilios (ver consultas_domicilios.py):
+activos y retrasados por (estado, fecha_pedido), y la cantidad de items
+por domicilio sin recorrer toda la tabla item_domicilio.
+"""
+
+
+def expandir(op):
+    op.crear_indice('ix_domicilio_estado_fecha_pedido', 'domicilio', ['estado', 'fecha_pedido'])
+    op.crear_indice('ix_item_domicilio_domicilio_id', 'item_domicilio', ['domicilio_id'])
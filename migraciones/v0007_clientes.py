@@ -0,0 +1,21 @@
+"""
+Directorio de clientes (ver clientes.py): tabla cliente y domicilio.cliente_id.
+Los domicilios antiguos se agrupan por teléfono normalizado; el documento
+sale de la factura del domicilio cuando lo tiene. Los domicilios que se creen
+mientras tanto ya llegan con cliente y el relleno los salta.
+"""
+
+from extensiones import db
+from modelos import Cliente
+from clientes import vincular_domicilios
+
+
+def expandir(op):
+    op.crear_tabla(Cliente)
+    op.agregar_columna('domicilio', 'cliente_id', db.Integer())
+    op.agregar_llave_foranea('domicilio_cliente_id_fkey', 'domicilio', 'cliente_id', 'cliente(id)')
+    op.crear_indice('ix_domicilio_cliente_id', 'domicilio', ['cliente_id'])
+
+
+def rellenar(op):
+    op.procesar_lotes('clientes', 'domicilio', vincular_domicilios, lote=500)
@@ -0,0 +1,94 @@
+"""
+Varias sucursales (ver sucursales.py): tabla sucursal, sucursal_id en las
+tablas de la operación con sus índices compuestos, y los agregados de ventas
+por sucursal y día.
+
+Todo lo que ya existe queda en la sucursal inicial, cuyo consecutivo de
+facturas sigue desde la última factura FACT- emitida. Los agregados de ventas
+nuevos se calculan solos la primera vez que se consultan; contraer borra las
+tablas ventas_dia y venta_item_dia anteriores y la unicidad de mesa.numero
+(el número ahora es único dentro de cada sucursal).
+"""
+
+from datetime import datetime
+
+from extensiones import db
+from esquema import SUCURSAL_INICIAL
+from modelos import (
+    Sucursal, Usuario, VentasDia, VentaItemDia, TransicionEstado, Ingrediente, PagoFactura, ConsumoInterno,
+)
+from sucursales import MODELOS_POR_SUCURSAL
+
+# Tablas que ya existían y reciben sucursal_id (los agregados nuevos y las
+# tablas de migraciones posteriores se crean con ella)
+MODELOS_EXISTENTES = [
+    m for m in MODELOS_POR_SUCURSAL
+    if m not in (VentasDia, VentaItemDia, TransicionEstado, Ingrediente, PagoFactura, ConsumoInterno)
+]
+
+
+def _sucursal_inicial(op):
+    """Crea la sucursal inicial si no hay ninguna y retorna su id"""
+    sucursal_id = op._escalar("SELECT MIN(id) FROM sucursal")
+    if sucursal_id is None:
+        nombre = op._escalar("SELECT nombre FROM configuracion_restaurante ORDER BY id LIMIT 1") or 'Principal'
+        with op.motor.begin() as conexion:
+            conexion.execute(Sucursal.__table__.insert().values(
+                **SUCURSAL_INICIAL, nombre=nombre, activa=True, fecha_creacion=datetime.now()))
+        sucursal_id = op._escalar("SELECT MIN(id) FROM sucursal")
+        op.salida(f"   + sucursal {nombre}")
+    return sucursal_id
+
+
+def expandir(op):
+    op.crear_tabla(Sucursal)
+    _sucursal_inicial(op)
+
+    for modelo in MODELOS_EXISTENTES + [Usuario]:
+        tabla = modelo.__tablename__
+        op.agregar_columna(tabla, 'sucursal_id', db.Integer())
+        op.agregar_llave_foranea(f'{tabla}_sucursal_id_fkey', tabla, 'sucursal_id', 'sucursal(id)')
+
+    # Los índices compuestos que empiezan por sucursal_id, tal como están en los modelos
+    for modelo in MODELOS_EXISTENTES:
+        for indice in modelo.__table__.indexes:
+            columnas = [c.name for c in indice.columns]
+            if columnas[0] == 'sucursal_id':
+                op.crear_indice(indice.name, modelo.__tablename__, columnas, unico=indice.unique)
+    op.crear_indice('uq_configuracion_restaurante_sucursal', 'configuracion_restaurante',
+                    ['sucursal_id'], unico=True)
+
+    op.crear_tabla(VentasDia)
+    op.crear_tabla(VentaItemDia)
+
+
+def rellenar(op):
+    sucursal_id = _sucursal_inicial(op)
+    for modelo in MODELOS_EXISTENTES:
+        tabla = modelo.__tablename__
+        condicion = 'sucursal_id IS NULL'
+        if modelo.__table__.c.sucursal_id.unique:
+            # Una sola configuración por sucursal: las sobrantes quedan sin sucursal
+            condicion += f" AND id = (SELECT MIN(id) FROM {tabla})"
+        op.rellenar(tabla, tabla, f"sucursal_id = {int(sucursal_id)}", condicion)
+
+    # El consecutivo de la sucursal inicial sigue desde la última factura emitida
+    ultimo = op._escalar(
+        "SELECT MAX(CAST(SUBSTR(numero_consecutivo, :inicio) AS INTEGER)) FROM factura "
+        "WHERE numero_consecutivo LIKE :patron",
+        inicio=len(SUCURSAL_INICIAL['prefijo_factura']) + 2,
+        patron=f"{SUCURSAL_INICIAL['prefijo_factura']}-%",
+    ) or 0
+    with op.motor.begin() as conexion:
+        conexion.execute(
+            Sucursal.__table__.update()
+            .where(Sucursal.id == sucursal_id, Sucursal.ultimo_consecutivo < ultimo)
+            .values(ultimo_consecutivo=ultimo)
+        )
+    op.salida(f"   consecutivo de facturas en {ultimo}")
+
+
+def contraer(op):
+    op.quitar_unico('mesa', 'numero')
+    op.eliminar_tabla('venta_item_dia')
+    op.eliminar_tabla('ventas_dia')
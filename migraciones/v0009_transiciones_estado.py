@@ -0,0 +1,12 @@
+"""
+Registro de cambios de estado (ver transiciones.py): tabla transicion_estado
+con su índice BRIN por sucursal y fecha (B-tree en SQLite). No hay relleno:
+estado_actualizado solo guarda el último cambio, así que los tiempos por
+etapa empiezan a medirse desde el despliegue.
+"""
+
+from modelos import TransicionEstado
+
+
+def expandir(op):
+    op.crear_tabla(TransicionEstado)
@@ -0,0 +1,16 @@
+"""
+Inventario por receta (ver inventario.py): tablas ingrediente y receta,
+item_menu.agotado (platillos que ocultó el inventario) y sucursal.version_menu.
+No hay relleno: los platillos existentes no tienen receta, así que no
+descuentan nada hasta que se les cargue una.
+"""
+
+from extensiones import db
+from modelos import Ingrediente, Receta
+
+
+def expandir(op):
+    op.crear_tabla(Ingrediente)
+    op.crear_tabla(Receta)
+    op.agregar_columna('item_menu', 'agotado', db.Boolean(), default='false')
+    op.agregar_columna('sucursal', 'version_menu', db.Integer(), default='0')
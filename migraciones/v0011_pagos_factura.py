@@ -0,0 +1,18 @@
+"""
+Pagos normalizados (ver pagos.py): tabla pago_factura con su índice para el
+cierre de caja. El relleno crea los pagos de las facturas existentes a partir
+de metodo_pago y del JSON de desglose_pago; las facturas pendientes con
+abonos reciben un pago por lo abonado. Las facturas que se paguen mientras
+tanto ya tienen sus pagos y el relleno las salta.
+"""
+
+from modelos import PagoFactura
+from pagos import registrar_pagos_existentes
+
+
+def expandir(op):
+    op.crear_tabla(PagoFactura)
+
+
+def rellenar(op):
+    op.procesar_lotes('pagos', 'factura', registrar_pagos_existentes, lote=500)
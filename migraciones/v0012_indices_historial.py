@@ -0,0 +1,10 @@
+"""
+Índices para el historial de sesiones (ver consultas_sesiones.py): los días
+de una sucursal por (sucursal_id, fecha_inicio) y el EXISTS de "sesión
+facturada" sin recorrer toda la tabla factura.
+"""
+
+
+def expandir(op):
+    op.crear_indice('ix_sesion_sucursal_fecha_inicio', 'sesion', ['sucursal_id', 'fecha_inicio'])
+    op.crear_indice('ix_factura_sesion_id', 'factura', ['sesion_id'])
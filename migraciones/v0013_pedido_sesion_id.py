@@ -0,0 +1,9 @@
+"""
+Índice de pedido.sesion_id: ver_mesa lee los pedidos de la sesión activa y
+la cuenta de las anteriores (consultas_sesiones.lineas_por_sesion) por
+sesion_id, y totales_sesion.recalcular() suma los pedidos de cada sesión.
+"""
+
+
+def expandir(op):
+    op.crear_indice('ix_pedido_sesion_id', 'pedido', ['sesion_id'])
@@ -0,0 +1,21 @@
+"""
+Contadores de cada sesión de mesa (ver totales_sesion.py): subtotal,
+total_pagado, num_pedidos, pedidos_sin_pagar y ultima_actividad. El relleno
+los calcula desde los pedidos. Un pedido que entra mientras se rellena su
+lote puede quedar fuera: `flask conciliar-sesiones --corregir` al terminar.
+"""
+
+from extensiones import db
+from totales_sesion import recalcular_existentes
+
+
+def expandir(op):
+    op.agregar_columna('sesion', 'subtotal', db.Float(), default='0')
+    op.agregar_columna('sesion', 'total_pagado', db.Float(), default='0')
+    op.agregar_columna('sesion', 'num_pedidos', db.Integer(), default='0')
+    op.agregar_columna('sesion', 'pedidos_sin_pagar', db.Integer(), default='0')
+    op.agregar_columna('sesion', 'ultima_actividad', db.DateTime())
+
+
+def rellenar(op):
+    op.procesar_lotes('totales', 'sesion', recalcular_existentes, lote=1000)
@@ -0,0 +1,23 @@
+"""
+sucursal_id en consumo_interno: cada consumo descuenta las existencias de una
+sucursal y solo lo ve (y lo borra) esa sucursal. El relleno toma la sucursal
+del platillo consumido, o la inicial si el platillo ya no existe.
+"""
+
+from extensiones import db
+
+
+def expandir(op):
+    op.agregar_columna('consumo_interno', 'sucursal_id', db.Integer())
+    op.agregar_llave_foranea('consumo_interno_sucursal_id_fkey', 'consumo_interno', 'sucursal_id', 'sucursal(id)')
+    op.crear_indice('ix_consumo_interno_sucursal_fecha', 'consumo_interno', ['sucursal_id', 'fecha'])
+
+
+def rellenar(op):
+    op.rellenar(
+        'sucursal', 'consumo_interno',
+        "sucursal_id = COALESCE("
+        "(SELECT item_menu.sucursal_id FROM item_menu WHERE item_menu.id = consumo_interno.item_id), "
+        "(SELECT MIN(id) FROM sucursal))",
+        'sucursal_id IS NULL',
+    )
@@ -0,0 +1,11 @@
+"""
+Recibos pre-renderizados de las facturas que no tienen (anteriores al
+pre-renderizado): ver_factura e imprimir_factura solo leen. Las facturas
+nuevas ya traen su recibo y el relleno las salta.
+"""
+
+from servicios import generar_recibos_faltantes
+
+
+def rellenar(op):
+    op.procesar_lotes('recibos', 'factura', generar_recibos_faltantes, lote=200)
@@ -0,0 +1,967 @@
+"""
+Modelos de la base de datos.
+"""
+
+from datetime import datetime
+import hashlib
+import os
+
+from flask_login import UserMixin
+from werkzeug.security import generate_password_hash, check_password_hash
+
+from extensiones import db
+
+# =========================
+# MODELOS
+# =========================
+
+class Sucursal(db.Model):
+    """
+    RAZÓN: Un solo despliegue atiende todos los locales. Las tablas de la
+    operación llevan sucursal_id y cada petición solo ve las filas de su
+    sucursal (ver sucursales.py). Cada sucursal tiene su propio consecutivo
+    de facturas con su prefijo.
+    """
+    id = db.Column(db.Integer, primary_key=True)
+    nombre = db.Column(db.String(100), nullable=False)
+    codigo = db.Column(db.String(20), unique=True, nullable=False)  # "centro" (menú público: /menu?sucursal=centro)
+    prefijo_factura = db.Column(db.String(10), unique=True, nullable=False, default='FACT')
+    ultimo_consecutivo = db.Column(db.Integer, nullable=False, default=0)
+    activa = db.Column(db.Boolean, default=True)
+    fecha_creacion = db.Column(db.DateTime, default=datetime.now)
+    # Sube cada vez que un platillo se agota o vuelve a estar disponible por
+    # inventario: los demás workers reconstruyen su índice del menú (ver busqueda_menu.py)
+    version_menu = db.Column(db.Integer, nullable=False, default=0)
+
+
+class Usuario(UserMixin, db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    username = db.Column(db.String(80), unique=True, nullable=False)
+    password_hash = db.Column(db.String(200), nullable=False)
+    nombre = db.Column(db.String(100), nullable=False)
+    rol = db.Column(db.String(20), default='mesero')  # mesero, cocina, admin
+    # Sucursal donde trabaja; NULL = todas (el dueño elige en cuál está)
+    sucursal_id = db.Column(db.Integer, db.ForeignKey('sucursal.id'))
+
+    def set_password(self, password):
+        self.password_hash = generate_password_hash(password)
+
+    def check_password(self, password):
+        return check_password_hash(self.password_hash, password)
+
+    @property
+    def sello(self):
+        """Sello de versión: cambia si cambian los datos de acceso del usuario"""
+        datos = f"{self.username}|{self.password_hash}|{self.nombre}|{self.rol}"
+        if self.sucursal_id:
+            datos += f"|{self.sucursal_id}"
+        return hashlib.sha1(datos.encode('utf-8')).hexdigest()[:12]
+
+    def get_id(self):
+        # El sello viaja en la cookie de sesión junto con el id (ver load_user)
+        return f"{self.id}:{self.sello}"
+
+
+class IdentidadUsuario(UserMixin):
+    """
+    RAZÓN: Copia ligera del usuario autenticado que se guarda en cache.
+    current_user solo necesita id, nombre y rol, así que no hace falta
+    un objeto de SQLAlchemy (ni una consulta) en cada petición.
+    """
+    def __init__(self, id, username, nombre, rol, sello, sucursal_id=None):
+        self.id = id
+        self.username = username
+        self.nombre = nombre
+        self.rol = rol
+        self.sello = sello
+        self.sucursal_id = sucursal_id
+
+    @classmethod
+    def desde_usuario(cls, usuario):
+        return cls(usuario.id, usuario.username, usuario.nombre, usuario.rol, usuario.sello, usuario.sucursal_id)
+
+    def get_id(self):
+        return f"{self.id}:{self.sello}"
+
+class Mesa(db.Model):
+    __table_args__ = (
+        # Cada sucursal numera sus mesas desde 1
+        db.Index('uq_mesa_sucursal_numero', 'sucursal_id', 'numero', unique=True),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    sucursal_id = db.Column(db.Integer, db.ForeignKey('sucursal.id'))
+    numero = db.Column(db.Integer, nullable=False)
+    capacidad = db.Column(db.Integer, default=4)
+    activa = db.Column(db.Boolean, default=True)
+
+class Sesion(db.Model):
+    __table_args__ = (
+        db.Index('ix_sesion_sucursal_activa', 'sucursal_id', 'activa'),
+        db.Index('ix_sesion_sucursal_fecha_inicio', 'sucursal_id', 'fecha_inicio'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    sucursal_id = db.Column(db.Integer, db.ForeignKey('sucursal.id'))
+    mesa_id = db.Column(db.Integer, db.ForeignKey('mesa.id'), nullable=False)
+    fecha_inicio = db.Column(db.DateTime, default=datetime.now)
+    fecha_fin = db.Column(db.DateTime, nullable=True)
+    total = db.Column(db.Float, default=0)  # NUEVO CAMPO para guardar el total
+    activa = db.Column(db.Boolean, default=True)
+    # Contadores de sus pedidos, al día en cada flush (ver totales_sesion.py)
+    subtotal = db.Column(db.Float, nullable=False, default=0)
+    total_pagado = db.Column(db.Float, nullable=False, default=0)
+    num_pedidos = db.Column(db.Integer, nullable=False, default=0)
+    pedidos_sin_pagar = db.Column(db.Integer, nullable=False, default=0)
+    ultima_actividad = db.Column(db.DateTime, default=datetime.now)
+    
+    mesa = db.relationship('Mesa', backref='sesiones')
+    pedidos = db.relationship('Pedido', backref='sesion', lazy='select')
+
+    @property
+    def total_pendiente(self):
+        return (self.subtotal or 0) - (self.total_pagado or 0)
+
+class Pedido(db.Model):
+    __table_args__ = (
+        # Ventas por producto en un rango de fechas (ver ventas.py)
+        db.Index('ix_pedido_fecha_item_menu', 'fecha', 'item_menu_id'),
+        # Lo mismo y la cocina, dentro de una sucursal
+        db.Index('ix_pedido_sucursal_fecha_item_menu', 'sucursal_id', 'fecha', 'item_menu_id'),
+        db.Index('ix_pedido_sucursal_estado', 'sucursal_id', 'estado'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    sucursal_id = db.Column(db.Integer, db.ForeignKey('sucursal.id'))
+    fecha = db.Column(db.DateTime, default=datetime.now)
+    mesa_id = db.Column(db.Integer, db.ForeignKey('mesa.id'), nullable=False)
+    sesion_id = db.Column(db.Integer, db.ForeignKey('sesion.id'), nullable=True, index=True)
+    mesero_id = db.Column(db.Integer, db.ForeignKey('usuario.id'), nullable=False)
+    producto = db.Column(db.String(200), nullable=False)
+    # Platillo del menú (None si se escribió a mano); producto guarda el nombre tal como se pidió
+    item_menu_id = db.Column(db.Integer, db.ForeignKey('item_menu.id'), nullable=True, index=True)
+    cantidad = db.Column(db.Integer, default=1)
+    precio_unitario = db.Column(db.Float, default=0)  # NUEVO CAMPO
+    notas = db.Column(db.Text)
+    estado = db.Column(db.String(20), default='pendiente')  # pendiente, preparando, listo, entregado
+    pagado = db.Column(db.Boolean, default=False)
+    # Timestamp cuando se actualizó el estado por última vez
+    estado_actualizado = db.Column(db.DateTime, default=datetime.now)
+    
+    mesa = db.relationship('Mesa', backref='pedidos')
+    mesero = db.relationship('Usuario', backref='pedidos')
+    item_menu = db.relationship('ItemMenu', backref='pedidos')
+    
+    @property
+    def total(self):
+        """Calcula el total del pedido"""
+        return self.cantidad * self.precio_unitario
+
+class CategoriaMenu(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    nombre = db.Column(db.String(100), nullable=False)
+    orden = db.Column(db.Integer, default=0)
+    activa = db.Column(db.Boolean, default=True)
+    
+    items = db.relationship('ItemMenu', backref='categoria', lazy='select', cascade='all, delete-orphan')
+
+class ItemMenu(db.Model):
+    __table_args__ = (
+        db.Index('ix_item_menu_sucursal_categoria', 'sucursal_id', 'categoria_id'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    sucursal_id = db.Column(db.Integer, db.ForeignKey('sucursal.id'))
+    nombre = db.Column(db.String(200), nullable=False)
+    descripcion = db.Column(db.Text)
+    precio = db.Column(db.Float, nullable=False)
+    categoria_id = db.Column(db.Integer, db.ForeignKey('categoria_menu.id'), nullable=False)
+    disponible = db.Column(db.Boolean, default=True)
+    # True si lo ocultó el inventario (se acabó un ingrediente) y no el administrador:
+    # solo esos vuelven a mostrarse solos cuando llega el ingrediente (ver inventario.py)
+    agotado = db.Column(db.Boolean, default=False)
+    imagen_url = db.Column(db.String(500))
+    orden = db.Column(db.Integer, default=0)
+
+# Modelo para Factura (agregar con los otros modelos)
+class Factura(db.Model):
+    __table_args__ = (
+        db.Index('ix_factura_sucursal_fecha_emision', 'sucursal_id', 'fecha_emision'),
+        db.Index('ix_factura_sucursal_estado_pago', 'sucursal_id', 'estado_pago'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    sucursal_id = db.Column(db.Integer, db.ForeignKey('sucursal.id'))
+    numero_consecutivo = db.Column(db.String(50), unique=True, nullable=False)
+    sesion_id = db.Column(db.Integer, db.ForeignKey('sesion.id'), nullable=True, index=True)
+    subtotal = db.Column(db.Float, default=0)
+    iva = db.Column(db.Float, default=0)
+    propina = db.Column(db.Float, default=0)
+    total = db.Column(db.Float, default=0)
+    metodo_pago = db.Column(db.String(50), default='efectivo')
+    desglose_pago = db.Column(db.Text)
+    cliente_nombre = db.Column(db.String(200))
+    cliente_documento = db.Column(db.String(50))
+    notas = db.Column(db.Text)
+    
+    # ========== NUEVOS CAMPOS PARA CUENTAS POR COBRAR ==========
+    estado_pago = db.Column(db.String(20), default='pagada')  # pagada, pendiente, vencida
+    fecha_vencimiento = db.Column(db.Date, nullable=True)  # Cuándo debe pagar el cliente
+    fecha_pago_real = db.Column(db.DateTime, nullable=True)  # Cuándo pagó realmente
+    saldo_pendiente = db.Column(db.Float, default=0)  # Si pagó parcialmente
+    fecha_emision = db.Column(db.DateTime, default=datetime.now)
+    
+    sesion = db.relationship('Sesion', backref='facturas')
+
+class ReciboFactura(db.Model):
+    """
+    RAZÓN: Recibo de una factura pre-renderizado una sola vez al facturar
+    (HTML, texto 58/80mm y ESC/POS). Las reimpresiones sirven estos datos
+    directamente. Se vuelve a renderizar al editar la factura o al registrarle
+    un pago (ver servicios.regenerar_recibo) y se borra al eliminarla.
+    """
+    id = db.Column(db.Integer, primary_key=True)
+    factura_id = db.Column(db.Integer, db.ForeignKey('factura.id'), unique=True, nullable=False)
+    html = db.Column(db.Text, nullable=False)
+    texto_58 = db.Column(db.Text, nullable=False)
+    texto_80 = db.Column(db.Text, nullable=False)
+    escpos_58 = db.Column(db.LargeBinary, nullable=False)
+    escpos_80 = db.Column(db.LargeBinary, nullable=False)
+    hash_contenido = db.Column(db.String(64), nullable=False)  # sha256 de todos los formatos
+    fecha_generacion = db.Column(db.DateTime, default=datetime.now)
+
+    factura = db.relationship('Factura', backref=db.backref('recibo', uselist=False, cascade='all, delete-orphan'))
+
+class PagoFactura(db.Model):
+    """
+    RAZÓN: El método de pago vivía en Factura.metodo_pago y, si era mixto, en
+    el JSON de desglose_pago, así que el cierre de caja tenía que cargar y
+    decodificar cada factura en Python. Cada pago (al facturar o cada abono
+    de una cuenta por cobrar) es ahora una fila con su método, monto y hora,
+    y el cierre es un GROUP BY (ver pagos.py).
+    """
+    __tablename__ = 'pago_factura'
+    __table_args__ = (
+        # Cierre de caja: pagos de una sucursal en un rango de horas, por método
+        db.Index('ix_pago_factura_sucursal_fecha_metodo', 'sucursal_id', 'fecha', 'metodo', 'monto'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    sucursal_id = db.Column(db.Integer, db.ForeignKey('sucursal.id'))
+    factura_id = db.Column(db.Integer, db.ForeignKey('factura.id'), nullable=False, index=True)
+    metodo = db.Column(db.String(20), nullable=False)  # efectivo, tarjeta, transferencia
+    monto = db.Column(db.Float, nullable=False)
+    fecha = db.Column(db.DateTime, nullable=False, default=datetime.now)
+    usuario_id = db.Column(db.Integer, db.ForeignKey('usuario.id'))
+
+    factura = db.relationship('Factura', backref=db.backref(
+        'pagos', cascade='all, delete-orphan', order_by='PagoFactura.fecha'))
+
+# Modelo para configuración del restaurante (agregar con los otros modelos)
+class ConfiguracionRestaurante(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    # Una configuración (datos del recibo) por sucursal
+    sucursal_id = db.Column(db.Integer, db.ForeignKey('sucursal.id'), unique=True)
+    nombre = db.Column(db.String(200), default='Mi Restaurante')
+    nit = db.Column(db.String(50), default='900.000.000-0')
+    direccion = db.Column(db.String(300), default='Calle 123 #45-67')
+    ciudad = db.Column(db.String(100), default='Zarzal, Valle del Cauca')
+    telefono = db.Column(db.String(50), default='(+57) 300 000 0000')
+    email = db.Column(db.String(100))
+    regimen = db.Column(db.String(100), default='Régimen Simplificado')
+    resolucion_dian = db.Column(db.String(200))
+    rango_facturacion = db.Column(db.String(100))
+    iva_porcentaje = db.Column(db.Float, default=19.0)
+    logo_url = db.Column(db.String(500))
+
+class Presupuesto(db.Model):
+    """
+    RAZÓN: Define límites de gasto por categoría y período.
+    Permite alertas automáticas cuando se supera el presupuesto.
+    """
+    __table_args__ = (
+        db.Index('ix_presupuesto_sucursal_periodo', 'sucursal_id', 'anio', 'mes'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    sucursal_id = db.Column(db.Integer, db.ForeignKey('sucursal.id'))
+    categoria_id = db.Column(db.Integer, db.ForeignKey('categoria_gasto.id'), nullable=False)
+    monto_limite = db.Column(db.Float, nullable=False)  # Límite de gasto
+    periodo = db.Column(db.String(20), default='mensual')  # mensual, semanal, anual
+    mes = db.Column(db.Integer, nullable=True)  # 1-12 para identificar el mes
+    anio = db.Column(db.Integer, nullable=True)  # 2026, 2027, etc.
+    activo = db.Column(db.Boolean, default=True)
+    fecha_creacion = db.Column(db.DateTime, default=datetime.now)
+    
+    # Alertas
+    alerta_porcentaje = db.Column(db.Integer, default=80)  # Alertar al 80%
+    
+    categoria = db.relationship('CategoriaGasto', backref='presupuestos')
+    
+    @property
+    def gasto_actual(self):
+        """Calcula cuánto se ha gastado en esta categoría en el período"""
+        from datetime import date
+        
+        if self.periodo == 'mensual' and self.mes and self.anio:
+            # Primer y último día del mes
+            fecha_inicio = date(self.anio, self.mes, 1)
+            if self.mes == 12:
+                fecha_fin = date(self.anio + 1, 1, 1)
+            else:
+                fecha_fin = date(self.anio, self.mes + 1, 1)
+            
+            # Sumar gastos del mes
+            total = db.session.query(
+                db.func.sum(Gasto.monto)
+            ).filter(
+                Gasto.categoria_id == self.categoria_id,
+                Gasto.fecha >= fecha_inicio,
+                Gasto.fecha < fecha_fin
+            ).scalar() or 0
+            
+            return float(total)
+        
+        return 0
+    
+    @property
+    def porcentaje_usado(self):
+        """Porcentaje del presupuesto que se ha usado"""
+        if self.monto_limite > 0:
+            return (self.gasto_actual / self.monto_limite) * 100
+        return 0
+    
+    @property
+    def disponible(self):
+        """Cuánto dinero queda disponible"""
+        return self.monto_limite - self.gasto_actual
+    
+    @property
+    def estado(self):
+        """Estado del presupuesto: normal, alerta, excedido"""
+        porcentaje = self.porcentaje_usado
+        if porcentaje >= 100:
+            return 'excedido'
+        elif porcentaje >= self.alerta_porcentaje:
+            return 'alerta'
+        else:
+            return 'normal'
+
+# AGREGAR ESTOS MODELOS DESPUÉS DE LA CLASE ConfiguracionRestaurante
+
+class CategoriaGasto(db.Model):
+    """
+    RAZÓN: Organizar los gastos por categorías facilita el análisis.
+    Ejemplo: "Ingredientes", "Salarios", "Servicios", "Mantenimiento"
+    """
+    id = db.Column(db.Integer, primary_key=True)
+    nombre = db.Column(db.String(100), nullable=False)
+    descripcion = db.Column(db.Text)
+    color = db.Column(db.String(7), default='#6c757d')  # Color hex para visualización
+    activa = db.Column(db.Boolean, default=True)
+    
+    # Relación: Una categoría puede tener muchos gastos
+    gastos = db.relationship('Gasto', backref='categoria', lazy='select')
+
+
+class Proveedor(db.Model):
+    """
+    RAZÓN: Registrar proveedores permite:
+    - Autocompletar datos al crear gastos
+    - Analizar qué proveedor es más usado
+    - Llevar control de contactos
+    """
+    id = db.Column(db.Integer, primary_key=True)
+    nombre = db.Column(db.String(200), nullable=False)
+    nit = db.Column(db.String(50))
+    telefono = db.Column(db.String(50))
+    email = db.Column(db.String(100))
+    direccion = db.Column(db.String(300))
+    notas = db.Column(db.Text)
+    activo = db.Column(db.Boolean, default=True)
+    fecha_registro = db.Column(db.DateTime, default=datetime.now)
+    
+    # Relación: Un proveedor puede tener muchos gastos
+    gastos = db.relationship('Gasto', backref='proveedor', lazy='select')
+
+
+class Gasto(db.Model):
+    __table_args__ = (
+        db.Index('ix_gasto_sucursal_fecha', 'sucursal_id', 'fecha'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    sucursal_id = db.Column(db.Integer, db.ForeignKey('sucursal.id'))
+    
+    # Información básica del gasto (YA EXISTE)
+    fecha = db.Column(db.DateTime, default=datetime.now, nullable=False)
+    concepto = db.Column(db.String(300), nullable=False)
+    monto = db.Column(db.Float, nullable=False)
+    
+    # Relaciones con otras tablas (YA EXISTE)
+    categoria_id = db.Column(db.Integer, db.ForeignKey('categoria_gasto.id'), nullable=False)
+    proveedor_id = db.Column(db.Integer, db.ForeignKey('proveedor.id'), nullable=True)
+    usuario_id = db.Column(db.Integer, db.ForeignKey('usuario.id'), nullable=False)
+    
+    # Información adicional (YA EXISTE)
+    metodo_pago = db.Column(db.String(50), default='efectivo')
+    numero_factura = db.Column(db.String(100))
+    notas = db.Column(db.Text)
+    archivo_adjunto = db.Column(db.String(500))
+    
+    # Control (YA EXISTE)
+    aprobado = db.Column(db.Boolean, default=True)
+    fecha_aprobacion = db.Column(db.DateTime)
+    aprobado_por_id = db.Column(db.Integer, db.ForeignKey('usuario.id'), nullable=True)
+    
+    # ========== NUEVOS CAMPOS PARA CUENTAS POR PAGAR ==========
+    estado_pago = db.Column(db.String(20), default='pagado')  # pagado, pendiente, vencido
+    fecha_vencimiento = db.Column(db.Date, nullable=True)  # Cuándo se debe pagar
+    fecha_pago_real = db.Column(db.DateTime, nullable=True)  # Cuándo se pagó realmente
+    
+    # Relaciones
+    usuario = db.relationship('Usuario', foreign_keys=[usuario_id], backref='gastos_registrados')
+    aprobado_por = db.relationship('Usuario', foreign_keys=[aprobado_por_id], backref='gastos_aprobados')
+
+
+# =========================
+# Consumo Interno (solo para administración)
+# =========================
+class ConsumoInterno(db.Model):
+    __table_args__ = (
+        db.Index('ix_consumo_interno_sucursal_fecha', 'sucursal_id', 'fecha'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    # Descuenta de las existencias de esta sucursal (ver inventario.py)
+    sucursal_id = db.Column(db.Integer, db.ForeignKey('sucursal.id'))
+    item_id = db.Column(db.Integer, db.ForeignKey('item_menu.id'), nullable=False)
+    cantidad = db.Column(db.Integer, default=1)
+    costo = db.Column(db.Float, default=0.0)  # Costo para el dueño por unidad
+    fecha = db.Column(db.DateTime, default=datetime.now)
+    usuario_id = db.Column(db.Integer, db.ForeignKey('usuario.id'), nullable=False)
+    notas = db.Column(db.Text)
+
+    item = db.relationship('ItemMenu', backref='consumos_internos', lazy='joined')
+    usuario = db.relationship('Usuario', backref='consumos_registrados')
+
+
+# =========================
+# INVENTARIO
+# =========================
+class Ingrediente(db.Model):
+    """
+    RAZÓN: Existencias de cada insumo de la sucursal. El stock baja solo
+    cuando se confirman pedidos, items de domicilio y consumos internos de
+    platillos que lo usan en su receta (ver inventario.py); cuando ya no
+    alcanza para una porción, esos platillos se ocultan del menú.
+    """
+    __table_args__ = (
+        db.Index('uq_ingrediente_sucursal_nombre', 'sucursal_id', 'nombre', unique=True),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    sucursal_id = db.Column(db.Integer, db.ForeignKey('sucursal.id'))
+    nombre = db.Column(db.String(100), nullable=False)
+    unidad = db.Column(db.String(20), nullable=False, default='unidad')  # g, ml, unidad...
+    stock = db.Column(db.Float, nullable=False, default=0)  # Puede quedar negativo si se vendió sin existencias
+    stock_minimo = db.Column(db.Float, default=0)  # Por debajo se muestra como bajo en la lista
+    activo = db.Column(db.Boolean, default=True)  # Inactivo: no descuenta ni agota platillos
+
+    @property
+    def bajo(self):
+        return self.stock <= (self.stock_minimo or 0)
+
+
+class Receta(db.Model):
+    """Cantidad de un ingrediente (en su unidad) que lleva una porción de un platillo"""
+    __table_args__ = (
+        db.UniqueConstraint('item_menu_id', 'ingrediente_id', name='uq_receta_item_ingrediente'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    item_menu_id = db.Column(db.Integer, db.ForeignKey('item_menu.id'), nullable=False)
+    ingrediente_id = db.Column(db.Integer, db.ForeignKey('ingrediente.id'), nullable=False, index=True)
+    cantidad = db.Column(db.Float, nullable=False)
+
+    item_menu = db.relationship('ItemMenu', backref=db.backref('receta', cascade='all, delete-orphan'))
+    ingrediente = db.relationship('Ingrediente', backref=db.backref('recetas', cascade='all, delete-orphan'))
+
+# =========================
+# MODELOS DE DOMICILIOS
+# =========================
+
+class EstadoDomicilio:
+    """Estados posibles de un domicilio"""
+    PENDIENTE = 'pendiente'
+    PREPARANDO = 'preparando'
+    LISTO = 'listo'
+    EN_CAMINO = 'en_camino'
+    ENTREGADO = 'entregado'
+    CANCELADO = 'cancelado'
+
+
+# Minutos para considerar retrasado un domicilio sin hora de entrega estimada
+SLA_DOMICILIO_MINUTOS = int(os.environ.get('DOMICILIO_SLA_MINUTOS', 45))
+
+
+class Domicilio(db.Model):
+    """
+    RAZÓN: Gestionar pedidos a domicilio con toda su información.
+    Similar a una sesión de mesa, pero para entregas externas.
+    """
+    __table_args__ = (
+        # Pantallas de domicilios: activos del día y "solo retrasados"
+        db.Index('ix_domicilio_estado_fecha_pedido', 'estado', 'fecha_pedido'),
+        db.Index('ix_domicilio_sucursal_estado_fecha_pedido', 'sucursal_id', 'estado', 'fecha_pedido'),
+    )
+
+    # =================================================================
+    # IDENTIFICADOR ÚNICO
+    # =================================================================
+    id = db.Column(db.Integer, primary_key=True)
+    sucursal_id = db.Column(db.Integer, db.ForeignKey('sucursal.id'))
+    
+    # =================================================================
+    # INFORMACIÓN DEL CLIENTE (datos de contacto y dirección)
+    # =================================================================
+    cliente_nombre = db.Column(db.String(200), nullable=False)       # "Juan Pérez"
+    cliente_telefono = db.Column(db.String(50), nullable=False)      # "3001234567"
+    cliente_direccion = db.Column(db.Text, nullable=False)           # "Calle 10 #5-20"
+    cliente_barrio = db.Column(db.String(100))                       # "Centro"
+    cliente_referencias = db.Column(db.Text)                         # "Casa azul, portón negro"
+    
+    # Cliente del directorio (por teléfono, ver clientes.py); NULL si el teléfono no sirve
+    cliente_id = db.Column(db.Integer, db.ForeignKey('cliente.id'), index=True)
+    
+    # =================================================================
+    # INFORMACIÓN DEL PEDIDO (fechas y tiempos)
+    # =================================================================
+    fecha_pedido = db.Column(db.DateTime, default=datetime.now, nullable=False)
+    fecha_entrega_estimada = db.Column(db.DateTime)                  # Opcional
+    fecha_entrega_real = db.Column(db.DateTime)                      # Cuando se entrega
+    
+    # =================================================================
+    # ESTADO DEL DOMICILIO (flujo del pedido)
+    # =================================================================
+    # Valores posibles: 'pendiente', 'preparando', 'listo', 'en_camino', 'entregado', 'cancelado'
+    estado = db.Column(db.String(20), default=EstadoDomicilio.PENDIENTE)
+    
+    # =================================================================
+    # COSTOS (cálculo del total)
+    # =================================================================
+    subtotal = db.Column(db.Float, default=0)              # Suma de productos
+    costo_domicilio = db.Column(db.Float, default=0)       # Costo de envío
+    propina = db.Column(db.Float, default=0)               # Propina opcional
+    total = db.Column(db.Float, default=0)                 # subtotal + costo_domicilio + propina
+    
+    # =================================================================
+    # MÉTODO DE PAGO (cómo paga el cliente)
+    # =================================================================
+    metodo_pago = db.Column(db.String(50), default='efectivo')  # 'efectivo', 'tarjeta', 'transferencia'
+    pagado = db.Column(db.Boolean, default=False)               # Si ya pagó
+    
+    # =================================================================
+    # RESPONSABLES (quién toma y quién entrega)
+    # =================================================================
+    # ID del usuario que tomó el pedido (mesero/admin)
+    tomado_por_id = db.Column(db.Integer, db.ForeignKey('usuario.id'), nullable=False)
+    
+    # ID del repartidor asignado (puede ser NULL si aún no se asigna)
+    repartidor_id = db.Column(db.Integer, db.ForeignKey('usuario.id'))
+    
+    # =================================================================
+    # FACTURACIÓN (relación con tabla Factura)
+    # =================================================================
+    # ID de la factura generada (NULL si aún no se factura)
+    factura_id = db.Column(db.Integer, db.ForeignKey('factura.id'))
+    
+    # =================================================================
+    # NOTAS ADICIONALES
+    # =================================================================
+    notas = db.Column(db.Text)                          # Notas del pedido
+    notas_cancelacion = db.Column(db.Text)              # Por qué se canceló
+    
+    # =================================================================
+    # TIMESTAMPS (control de tiempos)
+    # =================================================================
+    estado_actualizado = db.Column(db.DateTime, default=datetime.now)
+    
+    # =================================================================
+    # RELACIONES (conexiones con otras tablas)
+    # =================================================================
+    
+    # Relación con Usuario (quién tomó el pedido)
+    tomado_por = db.relationship('Usuario', 
+                                 foreign_keys=[tomado_por_id], 
+                                 backref='domicilios_tomados')
+    
+    # Relación con Usuario (quién entrega)
+    repartidor = db.relationship('Usuario', 
+                                 foreign_keys=[repartidor_id], 
+                                 backref='domicilios_asignados')
+    
+    # Relación con ItemDomicilio (productos del pedido)
+    # lazy='select' = carga bajo demanda
+    # cascade='all, delete-orphan' = si eliminas el domicilio, elimina los items
+    items = db.relationship('ItemDomicilio', 
+                           backref='domicilio', 
+                           lazy='select', 
+                           cascade='all, delete-orphan')
+    
+    # =================================================================
+    # 🔥 RELACIÓN CON FACTURA (LA MÁS IMPORTANTE PARA TU PROBLEMA)
+    # =================================================================
+    # Esta línea crea una relación bidireccional:
+    # - domicilio.factura → accede a la factura
+    # - factura.domicilios → accede a los domicilios de esa factura
+    #
+    # lazy='dynamic' significa que factura.domicilios devuelve una query
+    # que puedes filtrar o usar .first(), .all(), etc.
+    factura = db.relationship('Factura', 
+                             backref=db.backref('domicilios', lazy='dynamic'))
+    
+    # cliente.domicilios → historial del cliente (por el índice de cliente_id)
+    cliente = db.relationship('Cliente',
+                              backref=db.backref('domicilios', lazy='dynamic'))
+    
+    # =================================================================
+    # CALCULADOS EN LA CONSULTA (ver consultas_domicilios.py)
+    # =================================================================
+    # Solo tienen valor si la consulta los pidió con with_expression;
+    # si no, las propiedades de abajo los calculan en Python
+    segundos_transcurridos = db.query_expression()
+    retrasado = db.query_expression()
+    cantidad_items = db.query_expression()
+    
+    # =================================================================
+    # PROPIEDADES CALCULADAS (@property)
+    # =================================================================
+    
+    @property
+    def tiempo_transcurrido(self):
+        """
+        Calcula cuánto tiempo ha pasado desde que se tomó el pedido
+        Retorna string legible: "15 min" o "1h 30min"
+        """
+        segundos = self.segundos_transcurridos
+        if segundos is None:
+            segundos = (datetime.now() - self.fecha_pedido).total_seconds()
+        minutos = int(segundos / 60)
+        if minutos < 60:
+            return f"{minutos} min"
+        else:
+            horas = minutos // 60
+            mins = minutos % 60
+            return f"{horas}h {mins}min"
+    
+    @property
+    def esta_retrasado(self):
+        """
+        Verifica si el domicilio está tardando más de lo normal
+        Retorna True si pasó la hora estimada de entrega (p90 del historial de
+        su zona, ver eta_domicilios.py) y no ha sido entregado
+        """
+        if self.retrasado is not None:
+            return bool(self.retrasado)
+        
+        if self.estado in [EstadoDomicilio.ENTREGADO, EstadoDomicilio.CANCELADO]:
+            return False
+        
+        if self.fecha_entrega_estimada:
+            return datetime.now() > self.fecha_entrega_estimada
+        
+        # Domicilios creados antes de la estimación por historial
+        delta = datetime.now() - self.fecha_pedido
+        minutos = int(delta.total_seconds() / 60)
+        
+        # Alertar si lleva más del SLA y no ha sido entregado
+        return minutos > SLA_DOMICILIO_MINUTOS
+    
+    @property
+    def color_estado(self):
+        """
+        Color del badge según el estado (para mostrar en HTML)
+        Retorna código de color hexadecimal
+        """
+        colores = {
+            'pendiente': '#ffc107',      # amarillo/warning
+            'preparando': '#17a2b8',     # cyan/info
+            'listo': '#007bff',          # azul/primary
+            'en_camino': '#6f42c1',      # púrpura
+            'entregado': '#28a745',      # verde/success
+            'cancelado': '#dc3545'       # rojo/danger
+        }
+        return colores.get(self.estado, '#6c757d')
+    
+    @property
+    def domiciliario(self):
+        """
+        Nombre del repartidor asignado
+        Retorna "No asignado" si no hay repartidor
+        """
+        if self.repartidor:
+            return self.repartidor.nombre
+        return "No asignado"
+
+
+class ItemDomicilio(db.Model):
+    """
+    RAZÓN: Items individuales de cada domicilio.
+    Similar a los pedidos de mesa, pero asociados a domicilios.
+    """
+    id = db.Column(db.Integer, primary_key=True)
+    domicilio_id = db.Column(db.Integer, db.ForeignKey('domicilio.id'), nullable=False, index=True)
+    
+    # Producto
+    item_menu_id = db.Column(db.Integer, db.ForeignKey('item_menu.id'))
+    producto_nombre = db.Column(db.String(200), nullable=False)
+    cantidad = db.Column(db.Integer, default=1)
+    precio_unitario = db.Column(db.Float, nullable=False)
+    
+    # Personalización
+    notas = db.Column(db.Text)
+    
+    # NUEVO: Estado de preparación en cocina
+    estado_cocina = db.Column(db.String(20), default='pendiente')  # pendiente, preparando, listo
+    
+    # Relaciones
+    item_menu = db.relationship('ItemMenu', backref='items_domicilio')
+    
+    @property
+    def subtotal(self):
+        return self.cantidad * self.precio_unitario
+    
+    @property
+    def producto(self):
+        """Alias para compatibilidad con templates"""
+        return self.producto_nombre
+
+
+class Repartidor(db.Model):
+    """
+    RAZÓN: Gestionar información de repartidores.
+    Opcional: Si los repartidores no son usuarios del sistema.
+    """
+    id = db.Column(db.Integer, primary_key=True)
+    nombre = db.Column(db.String(200), nullable=False)
+    telefono = db.Column(db.String(50))
+    placa_vehiculo = db.Column(db.String(20))
+    tipo_vehiculo = db.Column(db.String(50))  # moto, bicicleta, carro
+    activo = db.Column(db.Boolean, default=True)
+    fecha_registro = db.Column(db.DateTime, default=datetime.now)
+    
+    # Estadísticas
+    total_domicilios = db.Column(db.Integer, default=0)
+    calificacion_promedio = db.Column(db.Float, default=5.0)
+    
+    # Relaciones (si no usas Usuario como repartidor)
+    # domicilios = db.relationship('Domicilio', backref='repartidor_externo')
+
+
+class Cliente(db.Model):
+    """
+    RAZÓN: Directorio de clientes de domicilio, uno por teléfono.
+    Los contadores se mantienen al crear, editar y cancelar domicilios
+    (ver clientes.py), no se recalculan.
+    """
+    id = db.Column(db.Integer, primary_key=True)
+    telefono = db.Column(db.String(20), unique=True, index=True, nullable=False)  # Solo dígitos: "3001234567"
+    nombre = db.Column(db.String(200))
+    direccion = db.Column(db.Text)
+    barrio = db.Column(db.String(100))
+    referencias = db.Column(db.Text)
+    documento = db.Column(db.String(50))
+    
+    # Domicilios no cancelados y lo que suman
+    pedidos = db.Column(db.Integer, default=0, nullable=False)
+    gasto_total = db.Column(db.Float, default=0, nullable=False)
+    ultimo_pedido = db.Column(db.DateTime)
+    fecha_registro = db.Column(db.DateTime, default=datetime.now)
+
+
+class ZonaDelivery(db.Model):
+    """
+    RAZÓN: Definir zonas de cobertura y costos de envío.
+    Permite calcular automáticamente el costo según el barrio.
+    """
+    id = db.Column(db.Integer, primary_key=True)
+    nombre = db.Column(db.String(100), nullable=False)  # "Centro", "Norte", "Sur"
+    barrios = db.Column(db.Text)  # Lista de barrios separados por comas
+    costo_envio = db.Column(db.Float, default=0)
+    tiempo_estimado = db.Column(db.Integer, default=30)  # minutos
+    activa = db.Column(db.Boolean, default=True)
+    orden = db.Column(db.Integer, default=0)
+    
+    @property
+    def lista_barrios(self):
+        """Devuelve lista de barrios"""
+        if self.barrios:
+            return [b.strip() for b in self.barrios.split(',')]
+        return []
+
+
+class OcupacionMesaHora(db.Model):
+    """
+    RAZÓN: Ocupación y rotación por mesa y por hora, acumuladas al cerrar cada
+    sesión (ver ocupacion.py). Los reportes leen estas filas (una por mesa y
+    hora con actividad) en lugar de recorrer todas las sesiones del período.
+    """
+    __table_args__ = (
+        db.UniqueConstraint('mesa_id', 'dia', 'hora', name='uq_ocupacion_mesa_dia_hora'),
+        db.Index('ix_ocupacion_mesa_hora_dia', 'dia'),
+        db.Index('ix_ocupacion_mesa_hora_sucursal_dia', 'sucursal_id', 'dia'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    sucursal_id = db.Column(db.Integer, db.ForeignKey('sucursal.id'))
+    mesa_id = db.Column(db.Integer, db.ForeignKey('mesa.id'), nullable=False)
+    dia = db.Column(db.Date, nullable=False)  # Día operativo (de 03:00 a 03:00)
+    dia_semana = db.Column(db.Integer, nullable=False)  # 0 = lunes (del día operativo)
+    hora = db.Column(db.Integer, nullable=False)  # Hora del reloj, 0-23
+    minutos_ocupados = db.Column(db.Float, default=0)
+    # Sesiones que empezaron en esta hora, su duración total y lo que facturaron
+    sesiones = db.Column(db.Integer, default=0)
+    minutos_sesiones = db.Column(db.Float, default=0)
+    ingresos = db.Column(db.Float, default=0)
+
+    mesa = db.relationship('Mesa')
+
+
+class TiempoEntrega(db.Model):
+    """
+    RAZÓN: Percentiles del tiempo real de entrega (de fecha_pedido a
+    fecha_entrega_real) por zona, hora del pedido y carga de la cocina,
+    calculados periódicamente con `flask calcular-eta` (ver eta_domicilios.py).
+    Cada worker los guarda en memoria para estimar sin consultas.
+    NULL en zona_id, hora o carga = todas (filas de respaldo con más muestras).
+    """
+    id = db.Column(db.Integer, primary_key=True)
+    zona_id = db.Column(db.Integer, db.ForeignKey('zona_delivery.id'))
+    hora = db.Column(db.Integer)  # Hora del pedido, 0-23
+    carga = db.Column(db.String(10))  # baja, media, alta
+    muestras = db.Column(db.Integer, nullable=False)
+    p50 = db.Column(db.Float, nullable=False)  # minutos
+    p80 = db.Column(db.Float, nullable=False)
+    p90 = db.Column(db.Float, nullable=False)
+    fecha_calculo = db.Column(db.DateTime, default=datetime.now)
+
+
+class VentasDia(db.Model):
+    """
+    RAZÓN: Ventas de una sucursal en un día operativo ya cerrado (ver
+    ventas.py). Que la fila exista significa que el día ya se calculó;
+    VentaItemDia tiene el detalle por platillo. Lo que no está vinculado al
+    menú es la diferencia. El reporte consolidado suma estas filas.
+    """
+    __tablename__ = 'ventas_sucursal_dia'
+
+    sucursal_id = db.Column(db.Integer, db.ForeignKey('sucursal.id'), primary_key=True)
+    dia = db.Column(db.Date, primary_key=True)  # Día operativo (de 03:00 a 03:00)
+    unidades = db.Column(db.Integer, default=0)
+    ingresos = db.Column(db.Float, default=0)
+    fecha_calculo = db.Column(db.DateTime, default=datetime.now)
+
+
+class VentaItemDia(db.Model):
+    """
+    RAZÓN: Unidades e ingresos por sucursal, platillo y día operativo cerrado (mesas y
+    domicilios). El ranking de un año suma estas filas en vez de agrupar
+    todos los pedidos por su texto.
+    """
+    __tablename__ = 'venta_item_sucursal_dia'
+    __table_args__ = (
+        db.UniqueConstraint('sucursal_id', 'dia', 'item_menu_id', name='uq_venta_item_sucursal_dia'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    sucursal_id = db.Column(db.Integer, db.ForeignKey('sucursal.id'), nullable=False)
+    dia = db.Column(db.Date, nullable=False)
+    item_menu_id = db.Column(db.Integer, db.ForeignKey('item_menu.id'), nullable=False)
+    unidades = db.Column(db.Integer, default=0)
+    ingresos = db.Column(db.Float, default=0)
+
+
+class TransicionEstado(db.Model):
+    """
+    RAZÓN: estado y estado_actualizado solo guardan el último cambio, así que
+    no se sabía cuánto duró cada etapa. Cada cambio de estado de un pedido de
+    mesa, un domicilio o un item de domicilio agrega una fila aquí, en la
+    misma transacción (ver transiciones.py). Las filas nunca se modifican.
+    """
+    __tablename__ = 'transicion_estado'
+    __table_args__ = (
+        # Rangos de fechas. Las filas llegan en orden de fecha, así que en
+        # PostgreSQL un BRIN ocupa unas pocas páginas en vez de un B-tree del tamaño de la tabla
+        db.Index('ix_transicion_estado_sucursal_fecha', 'sucursal_id', 'fecha', postgresql_using='brin'),
+        # Historia de un pedido o domicilio
+        db.Index('ix_transicion_estado_entidad', 'entidad', 'entidad_id'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    sucursal_id = db.Column(db.Integer, db.ForeignKey('sucursal.id'))
+    entidad = db.Column(db.String(20), nullable=False)  # pedido, domicilio, item_domicilio
+    entidad_id = db.Column(db.Integer, nullable=False)
+    estado_anterior = db.Column(db.String(20))  # NULL al crearse
+    estado_nuevo = db.Column(db.String(20), nullable=False)
+    usuario_id = db.Column(db.Integer, db.ForeignKey('usuario.id'))
+    fecha = db.Column(db.DateTime, nullable=False, default=datetime.now)
+
+
+class OperacionSincronizada(db.Model):
+    """
+    RAZÓN: Operaciones que los meseros hicieron sin conexión y llegaron por
+    /api/sincronizar (ver sincronizacion.py). El id lo genera el navegador;
+    si el lote se reenvía (se cortó la respuesta), la operación no se
+    aplica dos veces y se responde con el resultado guardado.
+    """
+    id = db.Column(db.String(36), primary_key=True)  # UUID generado por el cliente
+    usuario_id = db.Column(db.Integer, db.ForeignKey('usuario.id'), nullable=False)
+    tipo = db.Column(db.String(30), nullable=False)
+    estado = db.Column(db.String(20), nullable=False)  # aplicada, rechazada
+    resultado = db.Column(db.Text)  # JSON
+    fecha_cliente = db.Column(db.DateTime)  # Cuándo se hizo en el dispositivo
+    fecha_aplicada = db.Column(db.DateTime, default=datetime.now, index=True)
+
+
+class ClaveIdempotencia(db.Model):
+    """
+    RAZÓN: Un doble toque o un reintento del navegador reenviaba el mismo
+    formulario (pedido, factura, pago, gasto) y se aplicaba dos veces. Cada
+    formulario lleva una clave única; la primera petición guarda aquí su
+    resultado y las repeticiones reciben ese mismo resultado (ver idempotencia.py).
+    """
+    clave = db.Column(db.String(64), primary_key=True)
+    usuario_id = db.Column(db.Integer, db.ForeignKey('usuario.id'), nullable=False)
+    endpoint = db.Column(db.String(60), nullable=False)
+    huella = db.Column(db.String(32), nullable=False)  # Hash de los datos enviados
+    estado = db.Column(db.String(20), nullable=False, default='en_proceso')  # en_proceso, completada
+    codigo = db.Column(db.Integer)  # Código HTTP de la respuesta
+    ubicacion = db.Column(db.String(255))  # A dónde redirigió
+    mensajes = db.Column(db.Text)  # JSON: [[categoría, mensaje], ...] de flash
+    fecha = db.Column(db.DateTime, default=datetime.now)
+    expira = db.Column(db.DateTime, nullable=False, index=True)
+
+
+class VersionEsquema(db.Model):
+    """
+    RAZÓN: Huella del esquema con el que se inicializó la base de datos.
+    Al arrancar basta una consulta para saber si hay que crear tablas (ver esquema.py).
+    """
+    id = db.Column(db.Integer, primary_key=True)  # siempre 1
+    huella = db.Column(db.String(64), nullable=False)
+    fecha_aplicacion = db.Column(db.DateTime, default=datetime.now)
+
+
+class MigracionEsquema(db.Model):
+    """
+    RAZÓN: Estado de cada migración versionada (ver migraciones/__init__.py).
+    Guarda en qué fase va y hasta qué id llegó cada relleno, para poder reanudar.
+    """
+    version = db.Column(db.String(10), primary_key=True)  # '0001'
+    nombre = db.Column(db.String(200), nullable=False)
+    fecha_expandida = db.Column(db.DateTime, nullable=True)
+    fecha_rellenada = db.Column(db.DateTime, nullable=True)
+    fecha_contraida = db.Column(db.DateTime, nullable=True)
+    progreso = db.Column(db.Text)  # JSON {nombre_relleno: ultimo_id}
+    filas_rellenadas = db.Column(db.Integer, default=0)
@@ -0,0 +1,371 @@
+"""
+Tiempos de cocina y de entrega en vivo (p50/p90 de la última hora).
+
+RAZÓN: Durante el servicio el encargado quiere ver si la cocina y los
+repartidores van a tiempo, pero calcular percentiles sobre los pedidos y
+domicilios del día en cada refresco de la pantalla es recorrerlos todos cada
+30 segundos. En su lugar, cada cambio de estado que cierra un tiempo (ver
+transiciones.py) se suma, al confirmarse la transacción, a un bosquejo de
+cuantiles en memoria:
+
+- cocina: de que se pidió el producto (pedido de mesa o item de domicilio) a
+  que queda listo, por categoría del menú y por estación (según
+  ESTACIONES_CATEGORIAS, ver cola_impresion.py).
+- entrega: de que se pidió el domicilio a que se entregó, por zona.
+
+Los bosquejos son por cubetas de CUBETA_SEGUNDOS; una ventana deslizante es
+la unión de sus cubetas. Un bosquejo guarda conteos por rangos logarítmicos
+(estilo DDSketch): ocupa unos cientos de números sin importar cuántos
+tiempos se sumen, cualquier cuantil sale con error relativo de PRECISION y
+dos bosquejos se unen sumando sus conteos.
+
+Cada worker de gunicorn escribe sus bosquejos en un archivo SQLite local
+compartido (SLA_ALMACEN, por defecto instance/monitor_sla.db) y la consulta
+une los de todos los workers. Con varias máquinas cada una ve solo lo suyo.
+Si el archivo no se puede usar, se responde con lo de este worker.
+
+Lo importa rutas/cocina.py, que es donde se muestra: con el módulo de cocina
+deshabilitado no se lleva el monitor.
+"""
+
+import json
+import logging
+import math
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from datetime import datetime
+
+from flask import current_app
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from cache_local import CacheLRU
+from extensiones import db, cola_tickets
+from modelos import (
+    Domicilio,
+    ItemMenu,
+    CategoriaMenu,
+    ZonaDelivery,
+    EstadoDomicilio,
+    SLA_DOMICILIO_MINUTOS,
+)
+from transiciones import cambios_de_estado
+from ventas import normalizar_nombre
+
+logger = logging.getLogger(__name__)
+
+# Error relativo de los cuantiles (2%: un p90 de 20 min sale entre 19.6 y 20.4)
+PRECISION = 0.02
+
+CUBETA_SEGUNDOS = 300
+RETENCION_MINUTOS = 180
+VENTANA_DEFECTO = 60
+
+# Tiempos de más de 4 horas son estados que se olvidó actualizar
+MAXIMO_MINUTOS = 240
+
+OBJETIVOS = {
+    'cocina': float(os.environ.get('COCINA_SLA_MINUTOS', 20)),
+    'entrega': float(SLA_DOMICILIO_MINUTOS),
+}
+DIMENSIONES = {'cocina': ('categoria', 'estacion'), 'entrega': ('zona',)}
+
+SIN_CATEGORIA = 'Sin categoría'
+SIN_ZONA = 'Sin zona'
+
+# Observaciones del flush que esperan el commit (en sesion.info)
+CLAVE_PENDIENTES = 'observaciones_sla'
+
+cache_categorias = CacheLRU(max_elementos=1024, ttl=300)
+cache_zonas = CacheLRU(max_elementos=1, ttl=300)
+
+
+# =========================
+# BOSQUEJO DE CUANTILES
+# =========================
+
+class BosquejoCuantiles:
+    """
+    Conteos por rangos [gamma^(i-1), gamma^i) de minutos. Cualquier valor del
+    rango se representa por su punto medio, así que el error relativo de un
+    cuantil es a lo sumo PRECISION.
+    """
+
+    MINIMO = 0.01  # minutos; lo menor cuenta como 0
+
+    def __init__(self, precision=PRECISION):
+        self.precision = precision
+        self.gamma = (1 + precision) / (1 - precision)
+        self._log_gamma = math.log(self.gamma)
+        self.cubetas = {}  # índice -> cantidad
+        self.ceros = 0
+        self.cantidad = 0
+
+    def agregar(self, valor):
+        if valor < self.MINIMO:
+            self.ceros += 1
+        else:
+            indice = math.ceil(math.log(valor) / self._log_gamma)
+            self.cubetas[indice] = self.cubetas.get(indice, 0) + 1
+        self.cantidad += 1
+
+    def fusionar(self, otro):
+        for indice, cantidad in otro.cubetas.items():
+            self.cubetas[indice] = self.cubetas.get(indice, 0) + cantidad
+        self.ceros += otro.ceros
+        self.cantidad += otro.cantidad
+
+    def cuantil(self, q):
+        if not self.cantidad:
+            return None
+        rango = q * (self.cantidad - 1)
+        acumulado = self.ceros
+        if rango < acumulado:
+            return 0.0
+        for indice in sorted(self.cubetas):
+            acumulado += self.cubetas[indice]
+            if rango < acumulado:
+                return 2 * self.gamma ** indice / (self.gamma + 1)
+        return 2 * self.gamma ** max(self.cubetas) / (self.gamma + 1)
+
+    def a_texto(self):
+        return json.dumps({'p': self.precision, 'z': self.ceros, 'c': self.cubetas})
+
+    @classmethod
+    def desde_texto(cls, texto):
+        datos = json.loads(texto)
+        bosquejo = cls(datos['p'])
+        bosquejo.ceros = datos['z']
+        bosquejo.cubetas = {int(indice): cantidad for indice, cantidad in datos['c'].items()}
+        bosquejo.cantidad = bosquejo.ceros + sum(bosquejo.cubetas.values())
+        return bosquejo
+
+
+# =========================
+# MONITOR
+# =========================
+
+class MonitorSLA:
+    """Bosquejos de este worker por (sucursal, métrica, dimensión, valor, cubeta), compartidos en un SQLite local"""
+
+    def __init__(self, ruta=None):
+        self.ruta = ruta
+        self.proceso = uuid.uuid4().hex[:12]  # no el pid: se reutiliza al reiniciar un worker
+        self._bosquejos = {}
+        self._lock = threading.Lock()
+        self._tabla_creada = False
+
+    def _ruta(self):
+        if self.ruta is None:
+            self.ruta = os.environ.get('SLA_ALMACEN') or os.path.join(current_app.instance_path, 'monitor_sla.db')
+            os.makedirs(os.path.dirname(os.path.abspath(self.ruta)), exist_ok=True)
+        return self.ruta
+
+    def _conectar(self):
+        conexion = sqlite3.connect(self._ruta(), timeout=2)
+        if not self._tabla_creada:
+            conexion.execute("PRAGMA journal_mode=WAL")
+            conexion.execute(
+                "CREATE TABLE IF NOT EXISTS bosquejo ("
+                " proceso TEXT, sucursal_id INTEGER, metrica TEXT, dimension TEXT, valor TEXT,"
+                " inicio INTEGER, datos TEXT,"
+                " PRIMARY KEY (proceso, sucursal_id, metrica, dimension, valor, inicio))"
+            )
+            conexion.execute("CREATE INDEX IF NOT EXISTS ix_bosquejo_inicio ON bosquejo (inicio)")
+            self._tabla_creada = True
+        return conexion
+
+    def registrar(self, observaciones):
+        """observaciones: (sucursal_id, métrica, minutos, momento, {dimensión: valor})"""
+        limite = time.time() - RETENCION_MINUTOS * 60
+        with self._lock:
+            cambiadas = set()
+            for sucursal_id, metrica, minutos, momento, dimensiones in observaciones:
+                inicio = int(momento.timestamp()) // CUBETA_SEGUNDOS * CUBETA_SEGUNDOS
+                if inicio < limite:
+                    continue
+                for dimension, valor in [('total', '')] + sorted(dimensiones.items()):
+                    clave = (sucursal_id or 0, metrica, dimension, valor, inicio)
+                    self._bosquejos.setdefault(clave, BosquejoCuantiles()).agregar(minutos)
+                    cambiadas.add(clave)
+            for clave in [c for c in self._bosquejos if c[-1] < limite]:
+                del self._bosquejos[clave]
+            # Se escribe el bosquejo completo de la cubeta: reintentar no duplica conteos
+            filas = [(self.proceso, *clave, self._bosquejos[clave].a_texto()) for clave in cambiadas]
+        if not filas:
+            return
+        try:
+            conexion = self._conectar()
+            try:
+                with conexion:
+                    conexion.executemany("INSERT OR REPLACE INTO bosquejo VALUES (?, ?, ?, ?, ?, ?, ?)", filas)
+                    conexion.execute("DELETE FROM bosquejo WHERE inicio < ?", (limite,))
+            finally:
+                conexion.close()
+        except sqlite3.Error as e:
+            logger.warning('No se pudo guardar el monitor de tiempos en %s: %s', self.ruta, e)
+
+    def _filas(self, sucursal_id, desde):
+        """(métrica, dimensión, valor, datos) de todos los workers; si el archivo falla, las de este worker"""
+        try:
+            conexion = self._conectar()
+            try:
+                consulta = "SELECT metrica, dimension, valor, datos FROM bosquejo WHERE inicio >= ?"
+                parametros = [desde]
+                if sucursal_id is not None:
+                    consulta += " AND sucursal_id = ?"
+                    parametros.append(sucursal_id)
+                return conexion.execute(consulta, parametros).fetchall()
+            finally:
+                conexion.close()
+        except sqlite3.Error as e:
+            logger.warning('No se pudo leer el monitor de tiempos en %s: %s', self.ruta, e)
+        with self._lock:
+            return [
+                (metrica, dimension, valor, bosquejo.a_texto())
+                for (sucursal, metrica, dimension, valor, inicio), bosquejo in self._bosquejos.items()
+                if inicio >= desde and sucursal_id in (None, sucursal)
+            ]
+
+    def resumen(self, sucursal_id=None, ventana_minutos=VENTANA_DEFECTO):
+        """
+        {métrica: {'objetivo_minutos', 'total', 'por_<dimensión>': {valor: cifras}}}
+        con cifras = {'cantidad', 'p50', 'p90', 'fuera_de_objetivo'} de las
+        cubetas que tocan los últimos ventana_minutos. sucursal_id None = todas.
+        """
+        desde = int(time.time() - ventana_minutos * 60) // CUBETA_SEGUNDOS * CUBETA_SEGUNDOS
+        unidos = {}
+        for metrica, dimension, valor, datos in self._filas(sucursal_id, desde):
+            bosquejo = BosquejoCuantiles.desde_texto(datos)
+            actual = unidos.get((metrica, dimension, valor))
+            if actual is None:
+                unidos[(metrica, dimension, valor)] = bosquejo
+            else:
+                actual.fusionar(bosquejo)
+
+        resultado = {}
+        for metrica, objetivo in OBJETIVOS.items():
+            resultado[metrica] = {'objetivo_minutos': objetivo, 'total': _cifras(None, objetivo)}
+            for dimension in DIMENSIONES[metrica]:
+                resultado[metrica][f'por_{dimension}'] = {}
+        for (metrica, dimension, valor), bosquejo in sorted(unidos.items()):
+            if metrica not in resultado:
+                continue
+            cifras = _cifras(bosquejo, resultado[metrica]['objetivo_minutos'])
+            if dimension == 'total':
+                resultado[metrica]['total'] = cifras
+            elif f'por_{dimension}' in resultado[metrica]:
+                resultado[metrica][f'por_{dimension}'][valor] = cifras
+        return resultado
+
+    def limpiar(self):
+        with self._lock:
+            self._bosquejos.clear()
+
+
+def _cifras(bosquejo, objetivo):
+    if bosquejo is None or not bosquejo.cantidad:
+        return {'cantidad': 0, 'p50': None, 'p90': None, 'fuera_de_objetivo': False}
+    p90 = bosquejo.cuantil(0.9)
+    return {
+        'cantidad': bosquejo.cantidad,
+        'p50': round(bosquejo.cuantil(0.5), 1),
+        'p90': round(p90, 1),
+        'fuera_de_objetivo': p90 > objetivo,
+    }
+
+
+monitor = MonitorSLA()
+
+
+# =========================
+# OBSERVACIONES DESDE LOS CAMBIOS DE ESTADO
+# =========================
+
+def _minutos(inicio, fin):
+    if inicio is None or fin is None:
+        return None
+    minutos = (fin - inicio).total_seconds() / 60
+    return minutos if 0 <= minutos <= MAXIMO_MINUTOS else None
+
+
+def _categoria(sesion, item_menu_id):
+    if not item_menu_id:
+        return SIN_CATEGORIA
+    categoria = cache_categorias.obtener(item_menu_id)
+    if categoria is None:
+        categoria = sesion.execute(
+            db.select(CategoriaMenu.nombre)
+            .join(ItemMenu, ItemMenu.categoria_id == CategoriaMenu.id)
+            .where(ItemMenu.id == item_menu_id)
+        ).scalar() or SIN_CATEGORIA
+        cache_categorias.guardar(item_menu_id, categoria)
+    return categoria
+
+
+def _zona(sesion, barrio):
+    """Nombre de la zona del barrio (misma regla que eta_domicilios: la de menor orden)"""
+    zonas = cache_zonas.obtener('zonas')
+    if zonas is None:
+        zonas = {}
+        for nombre, barrios in sesion.execute(
+            db.select(ZonaDelivery.nombre, ZonaDelivery.barrios)
+            .where(ZonaDelivery.activa == True)
+            .order_by(ZonaDelivery.orden)
+        ):
+            for b in (barrios or '').split(','):
+                zonas.setdefault(normalizar_nombre(b), nombre)
+        zonas.pop('', None)
+        cache_zonas.guardar('zonas', zonas)
+    return zonas.get(normalizar_nombre(barrio or ''), SIN_ZONA)
+
+
+def _observacion_cocina(sesion, obj, entidad, fecha):
+    if entidad == 'pedido':
+        inicio, sucursal_id = obj.fecha, obj.sucursal_id
+    else:
+        domicilio = sesion.get(Domicilio, obj.domicilio_id)
+        if domicilio is None:
+            return None
+        inicio, sucursal_id = domicilio.fecha_pedido, domicilio.sucursal_id
+    minutos = _minutos(inicio, fecha)
+    if minutos is None:
+        return None
+    categoria = _categoria(sesion, obj.item_menu_id)
+    dimensiones = {'categoria': categoria, 'estacion': cola_tickets.estacion_para(categoria)}
+    return sucursal_id, 'cocina', minutos, fecha, dimensiones
+
+
+def _observacion_entrega(sesion, domicilio, fecha):
+    minutos = _minutos(domicilio.fecha_pedido, fecha)
+    if minutos is None:
+        return None
+    return domicilio.sucursal_id, 'entrega', minutos, fecha, {'zona': _zona(sesion, domicilio.cliente_barrio)}
+
+
+@event.listens_for(Session, 'after_flush')
+def _observar(sesion, contexto):
+    for obj, entidad, anterior, nuevo, fecha in cambios_de_estado(sesion, datetime.now()):
+        if entidad in ('pedido', 'item_domicilio') and nuevo == 'listo':
+            observacion = _observacion_cocina(sesion, obj, entidad, fecha)
+        elif entidad == 'domicilio' and nuevo == EstadoDomicilio.ENTREGADO:
+            observacion = _observacion_entrega(sesion, obj, fecha)
+        else:
+            continue
+        if observacion is not None:
+            sesion.info.setdefault(CLAVE_PENDIENTES, []).append(observacion)
+
+
+@event.listens_for(Session, 'after_commit')
+def _confirmar(sesion):
+    observaciones = sesion.info.pop(CLAVE_PENDIENTES, None)
+    if observaciones:
+        monitor.registrar(observaciones)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _descartar(sesion):
+    sesion.info.pop(CLAVE_PENDIENTES, None)
@@ -0,0 +1,251 @@
+"""
+Analítica de ocupación y rotación de mesas.
+
+RAZÓN: Las sesiones tienen inicio, fin y total, pero calcular ocupación por
+hora o rotación por mesa sobre un año de sesiones significa recorrerlas todas
+en cada consulta. En su lugar, cada sesión se suma a OcupacionMesaHora cuando
+se cierra (y se resta si su factura se elimina y la sesión se reabre). Los
+reportes agregan a lo sumo una fila por mesa y hora con actividad.
+
+Los días son días operativos: de 03:00 a 03:00 del día siguiente, igual que
+los reportes financieros. Una sesión de la 01:00 del sábado cuenta para el viernes.
+"""
+
+from collections import Counter
+from datetime import timedelta
+
+from extensiones import db
+from modelos import Mesa, Sesion, OcupacionMesaHora
+from sucursales import todas_las_sucursales, sucursal_para_nuevos
+
+HORA_INICIO_DIA = 3
+
+DIAS_SEMANA = ['Lunes', 'Martes', 'Miércoles', 'Jueves', 'Viernes', 'Sábado', 'Domingo']
+
+# Horas en el orden del día operativo: 03:00 ... 23:00, 00:00 ... 02:00
+HORAS_DIA_OPERATIVO = [(HORA_INICIO_DIA + i) % 24 for i in range(24)]
+
+
+def dia_operativo(momento):
+    return (momento - timedelta(hours=HORA_INICIO_DIA)).date()
+
+
+def franjas_horarias(inicio, fin):
+    """Divide [inicio, fin) en tramos dentro de cada hora del reloj: (momento, minutos)"""
+    actual = inicio
+    while actual < fin:
+        siguiente = min(actual.replace(minute=0, second=0, microsecond=0) + timedelta(hours=1), fin)
+        yield actual, (siguiente - actual).total_seconds() / 60
+        actual = siguiente
+
+
+# =========================
+# MANTENIMIENTO INCREMENTAL
+# =========================
+
+def _acumular(sesion, cambios):
+    """Suma el aporte de una sesión cerrada a cambios[(mesa_id, dia, hora)]"""
+    if not sesion.fecha_inicio or not sesion.fecha_fin or sesion.fecha_fin < sesion.fecha_inicio:
+        return
+
+    def fila(momento):
+        # [minutos_ocupados, sesiones, minutos_sesiones, ingresos]
+        return cambios.setdefault((sesion.mesa_id, dia_operativo(momento), momento.hour), [0, 0, 0, 0])
+
+    for momento, minutos in franjas_horarias(sesion.fecha_inicio, sesion.fecha_fin):
+        fila(momento)[0] += minutos
+
+    inicio = fila(sesion.fecha_inicio)
+    inicio[1] += 1
+    inicio[2] += (sesion.fecha_fin - sesion.fecha_inicio).total_seconds() / 60
+    inicio[3] += sesion.total or 0
+
+
+# Columnas que se suman al aplicar los cambios de una cubeta (mesa, día, hora)
+COLUMNAS_SUMADAS = ('minutos_ocupados', 'sesiones', 'minutos_sesiones', 'ingresos')
+
+
+def _aplicar(cambios, signo=1):
+    """
+    Suma los cambios acumulados con un solo INSERT ... ON CONFLICT DO UPDATE.
+    RAZÓN: El primer cierre de una (mesa, día, hora) crea la fila; si dos
+    cierres llegan a la vez, el segundo suma sobre la fila del primero en vez
+    de fallar por uq_ocupacion_mesa_dia_hora. La suma la hace la base de datos.
+    """
+    if not cambios:
+        return
+    sucursal_id = sucursal_para_nuevos()
+    filas = [
+        dict(sucursal_id=sucursal_id, mesa_id=mesa_id, dia=dia, dia_semana=dia.weekday(), hora=hora,
+             **{columna: signo * valor for columna, valor in zip(COLUMNAS_SUMADAS, valores)})
+        for (mesa_id, dia, hora), valores in cambios.items()
+    ]
+    dialecto = db.session.get_bind().dialect.name
+    if dialecto == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert
+    elif dialecto == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        _aplicar_sin_upsert(filas)
+        return
+    tabla = OcupacionMesaHora.__table__
+    sentencia = insert(tabla).values(filas)
+    sentencia = sentencia.on_conflict_do_update(
+        index_elements=['mesa_id', 'dia', 'hora'],
+        set_={columna: tabla.c[columna] + sentencia.excluded[columna] for columna in COLUMNAS_SUMADAS},
+    )
+    db.session.execute(sentencia)
+
+
+def _aplicar_sin_upsert(filas):
+    """Otros motores: una consulta de las filas existentes y UPDATE con expresiones SQL"""
+    existentes = {
+        (fila.mesa_id, fila.dia, fila.hora): fila
+        for fila in OcupacionMesaHora.query.filter(
+            OcupacionMesaHora.mesa_id.in_({f['mesa_id'] for f in filas}),
+            OcupacionMesaHora.dia.in_({f['dia'] for f in filas})
+        )
+    }
+    for valores in filas:
+        fila = existentes.get((valores['mesa_id'], valores['dia'], valores['hora']))
+        if fila is None:
+            db.session.add(OcupacionMesaHora(**valores))
+        else:
+            for columna in COLUMNAS_SUMADAS:
+                setattr(fila, columna, getattr(OcupacionMesaHora, columna) + valores[columna])
+
+
+def registrar_sesion(sesion, signo=1):
+    """
+    Suma una sesión cerrada a los agregados (signo=-1 la resta, al reabrirla).
+    Llamar dentro de la transacción que cierra/reabre la sesión; no hace commit.
+    """
+    cambios = {}
+    _acumular(sesion, cambios)
+    _aplicar(cambios, signo)
+
+
+def registrar_sesiones_cerradas(desde_id, hasta_id):
+    """Backfill: suma las sesiones cerradas con id en (desde_id, hasta_id]. Retorna cuántas"""
+    sesiones = Sesion.query.filter(
+        Sesion.id > desde_id,
+        Sesion.id <= hasta_id,
+        Sesion.activa == False,
+        Sesion.fecha_fin.isnot(None)
+    ).all()
+    cambios = {}
+    for sesion in sesiones:
+        _acumular(sesion, cambios)
+    _aplicar(cambios)
+    return len(sesiones)
+
+
+# =========================
+# REPORTES
+# =========================
+
+def _filtro_rango(desde, hasta):
+    return [OcupacionMesaHora.dia >= desde, OcupacionMesaHora.dia <= hasta]
+
+
+def mapa_calor(desde, hasta):
+    """
+    Ocupación promedio por día de la semana y hora, entre dos días operativos (inclusive).
+    Retorna {dia_semana: {hora: {'mesas': promedio de mesas ocupadas,
+                                  'ocupacion': % de las mesas activas,
+                                  'llegadas': sesiones nuevas promedio}}}
+    """
+    filas = db.session.query(
+        OcupacionMesaHora.dia_semana,
+        OcupacionMesaHora.hora,
+        db.func.sum(OcupacionMesaHora.minutos_ocupados),
+        db.func.sum(OcupacionMesaHora.sesiones)
+    ).filter(*_filtro_rango(desde, hasta)).group_by(
+        OcupacionMesaHora.dia_semana, OcupacionMesaHora.hora
+    ).all()
+
+    # Cuántos lunes, martes... hay en el rango
+    veces_dia = Counter((desde + timedelta(days=i)).weekday() for i in range((hasta - desde).days + 1))
+    total_mesas = Mesa.query.filter_by(activa=True).count() or 1
+
+    mapa = {dia: {} for dia in range(7)}
+    for dia_semana, hora, minutos, sesiones in filas:
+        veces = veces_dia.get(dia_semana) or 1
+        mesas = (minutos or 0) / 60 / veces
+        mapa[dia_semana][hora] = {
+            'mesas': mesas,
+            'ocupacion': min(100, mesas / total_mesas * 100),
+            'llegadas': (sesiones or 0) / veces,
+        }
+    return mapa
+
+
+def indicadores_mesas(desde, hasta):
+    """
+    KPIs por mesa entre dos días operativos (inclusive):
+    rotaciones, rotaciones por día, tiempo promedio por rotación, % del tiempo
+    de servicio ocupada, ingresos e ingreso por puesto-hora de servicio (RevPASH).
+    Las horas de servicio son las horas del período con al menos una mesa ocupada.
+    """
+    dias = (hasta - desde).days + 1
+
+    horas_servicio = db.session.query(db.func.count()).select_from(
+        db.session.query(OcupacionMesaHora.dia, OcupacionMesaHora.hora)
+        .filter(*_filtro_rango(desde, hasta), OcupacionMesaHora.minutos_ocupados > 0)
+        .distinct().subquery()
+    ).scalar() or 0
+
+    filas = db.session.query(
+        OcupacionMesaHora.mesa_id,
+        db.func.sum(OcupacionMesaHora.minutos_ocupados),
+        db.func.sum(OcupacionMesaHora.sesiones),
+        db.func.sum(OcupacionMesaHora.minutos_sesiones),
+        db.func.sum(OcupacionMesaHora.ingresos)
+    ).filter(*_filtro_rango(desde, hasta)).group_by(OcupacionMesaHora.mesa_id).all()
+    por_mesa = {fila[0]: fila[1:] for fila in filas}
+
+    indicadores = []
+    for mesa in Mesa.query.order_by(Mesa.numero).all():
+        minutos, sesiones, minutos_sesiones, ingresos = por_mesa.get(mesa.id, (0, 0, 0, 0))
+        minutos, sesiones = minutos or 0, sesiones or 0
+        minutos_sesiones, ingresos = minutos_sesiones or 0, ingresos or 0
+        if not mesa.activa and not sesiones:
+            continue
+        puestos_hora = (mesa.capacidad or 0) * horas_servicio
+        indicadores.append({
+            'mesa': mesa,
+            'rotaciones': sesiones,
+            'rotaciones_dia': sesiones / dias,
+            'minutos_rotacion': minutos_sesiones / sesiones if sesiones else 0,
+            'ocupacion': min(100, minutos / 60 / horas_servicio * 100) if horas_servicio else 0,
+            'ingresos': ingresos,
+            'ingreso_puesto_hora': ingresos / puestos_hora if puestos_hora else 0,
+        })
+    return {'mesas': indicadores, 'horas_servicio': horas_servicio, 'dias': dias}
+
+
+def resumen_por_sucursal(desde, hasta):
+    """
+    Sesiones, horas-mesa ocupadas e ingresos de mesas de cada sucursal entre
+    dos días operativos (inclusive), para el reporte consolidado.
+    Retorna {sucursal_id: {'sesiones', 'horas_ocupadas', 'ingresos', 'mesas'}}.
+    """
+    with todas_las_sucursales():
+        filas = db.session.query(
+            OcupacionMesaHora.sucursal_id,
+            db.func.sum(OcupacionMesaHora.sesiones),
+            db.func.sum(OcupacionMesaHora.minutos_ocupados),
+            db.func.sum(OcupacionMesaHora.ingresos)
+        ).filter(*_filtro_rango(desde, hasta)).group_by(OcupacionMesaHora.sucursal_id).all()
+        mesas = dict(db.session.query(Mesa.sucursal_id, db.func.count(Mesa.id))
+                     .filter(Mesa.activa == True).group_by(Mesa.sucursal_id).all())
+
+    return {
+        sucursal_id: {
+            'sesiones': sesiones or 0,
+            'horas_ocupadas': (minutos or 0) / 60,
+            'ingresos': ingresos or 0,
+            'mesas': mesas.get(sucursal_id, 0),
+        }
+        for sucursal_id, sesiones, minutos, ingresos in filas
+    }
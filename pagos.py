@@ -0,0 +1,166 @@
+"""
+Pagos de facturas y cierre de caja.
+
+RAZÓN: Los pagos mixtos se guardaban como JSON en Factura.desglose_pago y los
+abonos de las cuentas por cobrar solo restaban saldo_pendiente, sin método
+ni hora. El cierre de caja (o cualquier reporte por método de pago) tenía que
+cargar todas las facturas y hacer json.loads en Python, y aun así no veía
+los abonos. Ahora cada pago es una fila de PagoFactura:
+
+- Al facturar pagado: una fila por método (varias si es mixto), por el total
+  o por lo que se anotó en el desglose.
+- Cada abono de marcar_factura_pagada: una fila con el método con que pagó.
+- Al editar una factura: si queda pagada, sus pagos se rehacen con el método
+  nuevo en la hora del primer pago; si queda pendiente, se borran.
+
+cierre_caja() agrupa esas filas por día operativo (03:00 a 03:00) y método
+en una sola consulta sobre ix_pago_factura_sucursal_fecha_metodo.
+desglose_pago se sigue guardando porque el recibo impreso lo muestra.
+"""
+
+import json
+from datetime import datetime, timedelta
+
+from flask import has_request_context
+from flask_login import current_user
+
+from extensiones import db
+from modelos import Factura, PagoFactura
+from ventas import inicio_dia, expresion_dia, como_fecha
+
+METODOS = ('efectivo', 'tarjeta', 'transferencia')
+
+
+def leer_desglose(factura):
+    """Desglose de un pago mixto {'efectivo': 20000, ...}, o None"""
+    if not factura.desglose_pago:
+        return None
+    try:
+        return json.loads(factura.desglose_pago)
+    except ValueError:
+        return None
+
+
+def lineas_pago(metodo_pago, desglose, monto):
+    """
+    [(metodo, monto)] de un pago: una línea por método con monto en el
+    desglose si es mixto, o una sola línea por `monto`
+    """
+    if metodo_pago == 'mixto' and desglose:
+        lineas = [(metodo, float(valor or 0)) for metodo, valor in desglose.items() if float(valor or 0) > 0]
+        if lineas:
+            return lineas
+    return [(metodo_pago or 'efectivo', monto)]
+
+
+def _usuario_id():
+    if has_request_context() and current_user.is_authenticated:
+        return current_user.id
+    return None
+
+
+# =========================
+# REGISTRO
+# =========================
+
+def registrar_pago(factura, metodo, monto, fecha=None):
+    """Agrega una fila de pago a la factura (no hace commit)"""
+    pago = PagoFactura(
+        sucursal_id=factura.sucursal_id,
+        factura=factura,
+        metodo=metodo,
+        monto=monto,
+        fecha=fecha or datetime.now(),
+        usuario_id=_usuario_id(),
+    )
+    db.session.add(pago)
+    return pago
+
+
+def registrar_pago_factura(factura, fecha=None):
+    """Pago de la factura completa con su método (o su desglose si es mixto)"""
+    for metodo, monto in lineas_pago(factura.metodo_pago, leer_desglose(factura), factura.total):
+        registrar_pago(factura, metodo, monto, fecha)
+
+
+def actualizar_pagos_editados(factura):
+    """
+    Después de editar una factura. Pagada: los pagos se rehacen con el método
+    y el total nuevos, en la hora del primer pago (el cierre de ese día no se
+    mueve). Pendiente: no tiene pagos. Vencida: no se tocan.
+    """
+    if factura.estado_pago not in ('pagada', 'pendiente'):
+        return
+    primera = min((pago.fecha for pago in factura.pagos), default=None)
+    factura.pagos.clear()
+    if factura.estado_pago == 'pagada':
+        registrar_pago_factura(factura, primera or factura.fecha_pago_real)
+
+
+def registrar_pagos_existentes(desde_id, hasta_id):
+    """
+    Backfill: pagos de las facturas con id en (desde_id, hasta_id] que aún no
+    tienen. Pagadas: por el total (o el desglose) en la hora del pago.
+    Pendientes con abonos: lo abonado (total - saldo) con su método, en la
+    fecha de emisión, porque los abonos no guardaban hora.
+    Retorna cuántas facturas procesó.
+    """
+    facturas = Factura.query.filter(
+        Factura.id > desde_id,
+        Factura.id <= hasta_id,
+        ~Factura.pagos.any()
+    ).order_by(Factura.id).all()
+    filas = []
+    for factura in facturas:
+        total = factura.total or 0
+        if factura.estado_pago == 'pagada':
+            fecha = factura.fecha_pago_real or factura.fecha_emision
+            lineas = lineas_pago(factura.metodo_pago, leer_desglose(factura), total)
+        else:
+            abonado = total - (factura.saldo_pendiente or total)
+            fecha = factura.fecha_emision
+            metodo = factura.metodo_pago if factura.metodo_pago in METODOS else 'efectivo'
+            lineas = [(metodo, abonado)] if abonado > 0 else []
+        filas.extend(
+            {'sucursal_id': factura.sucursal_id, 'factura_id': factura.id,
+             'metodo': metodo, 'monto': monto, 'fecha': fecha or datetime.now()}
+            for metodo, monto in lineas
+        )
+    if filas:
+        db.session.execute(db.insert(PagoFactura), filas)
+    return len(facturas)
+
+
+# =========================
+# CIERRE DE CAJA
+# =========================
+
+def cierre_caja(desde, hasta):
+    """
+    Pagos recibidos por día operativo y método entre dos días (inclusive),
+    en una consulta agrupada:
+    [{'dia', 'metodos': {metodo: {'pagos', 'monto'}}, 'pagos', 'total'}]
+    del más reciente al más antiguo, y los totales del rango con la misma forma.
+    """
+    dia = expresion_dia(PagoFactura.fecha)
+    filas = db.session.execute(
+        db.select(dia, PagoFactura.metodo, db.func.count(), db.func.sum(PagoFactura.monto))
+        .where(PagoFactura.fecha >= inicio_dia(desde),
+               PagoFactura.fecha < inicio_dia(hasta + timedelta(days=1)))
+        .group_by(dia, PagoFactura.metodo)
+    ).all()
+
+    def vacio(dia=None):
+        return {'dia': dia, 'metodos': {}, 'pagos': 0, 'total': 0}
+
+    dias = {}
+    totales = vacio()
+    for valor_dia, metodo, pagos, monto in filas:
+        valor_dia = como_fecha(valor_dia)
+        for destino in (dias.setdefault(valor_dia, vacio(valor_dia)), totales):
+            actual = destino['metodos'].setdefault(metodo, {'pagos': 0, 'monto': 0})
+            actual['pagos'] += pagos
+            actual['monto'] += monto or 0
+            destino['pagos'] += pagos
+            destino['total'] += monto or 0
+    return sorted(dias.values(), key=lambda d: d['dia'], reverse=True), totales
@@ -0,0 +1,187 @@
+"""
+Lecturas de los reportes en una réplica de la base de datos.
+
+RAZÓN: El reporte financiero, el historial, las listas de gastos y
+presupuestos y las cuentas por cobrar/pagar recorren meses de datos en la
+misma base de datos donde los meseros toman pedidos. Con DATABASE_REPLICA_URL
+configurada, las consultas SELECT de esas rutas (marcadas con
+@lectura_replica) van a la réplica; todo lo demás, y cualquier escritura,
+sigue yendo a la base principal.
+
+- Si la réplica no responde o va más de REPLICA_RETRASO_MAXIMO segundos
+  atrasada, se lee de la principal. Su estado se revisa cada pocos segundos.
+- Quien acaba de escribir (p.ej. registró un gasto y abre la lista de gastos)
+  lee de la principal hasta que la réplica alcance esa escritura: la hora de
+  la última escritura va en la cookie de sesión y se compara con el retraso
+  medido de la réplica.
+- Si una consulta a la réplica falla a mitad de la página, la vista se repite
+  una vez sobre la principal.
+
+Para probar sin una réplica real sirve otra base PostgreSQL o una copia del
+archivo SQLite (DATABASE_REPLICA_URL=sqlite:///copia.db); su retraso se toma
+como 0.
+"""
+
+import os
+import time
+from functools import wraps
+
+from flask import current_app, g, has_request_context, session as sesion_flask
+from flask_sqlalchemy.session import Session as SesionFlask
+from sqlalchemy import event
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.orm import Session
+from sqlalchemy.sql import Select
+
+from cache_local import CacheLRU
+
+CLAVE_BIND = 'replica'
+
+# Hora (time.time()) de la última escritura del usuario, en la cookie de sesión
+CLAVE_ESCRITURA = 'ultima_escritura'
+
+RETRASO_MAXIMO = float(os.environ.get('REPLICA_RETRASO_MAXIMO', 30))
+# Margen sobre el retraso medido antes de leer de la réplica después de escribir
+MARGEN_LECTURA = float(os.environ.get('REPLICA_MARGEN_SEGUNDOS', 2))
+VERIFICACION_TTL = 5
+
+# 0 si la base no es una réplica en recuperación (otra base o copia de prueba)
+SQL_RETRASO_POSTGRES = """
+SELECT CASE
+    WHEN NOT pg_is_in_recovery() THEN 0
+    WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+    ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+END
+"""
+
+cache_estado = CacheLRU(max_elementos=1, ttl=VERIFICACION_TTL)
+
+
+# =========================
+# CONFIGURACIÓN
+# =========================
+
+def url_replica():
+    """DATABASE_REPLICA_URL (con postgres:// corregido), o None"""
+    url = os.environ.get('DATABASE_REPLICA_URL')
+    return url.replace('postgres://', 'postgresql://') if url else None
+
+
+def configurada():
+    return CLAVE_BIND in current_app.config.get('SQLALCHEMY_BINDS', {})
+
+
+def _motor():
+    return current_app.extensions['sqlalchemy'].engines[CLAVE_BIND]
+
+
+# =========================
+# ESTADO DE LA RÉPLICA
+# =========================
+
+def retraso():
+    """Segundos que la réplica va atrasada; None si no responde (se revisa cada VERIFICACION_TTL s)"""
+    estado = cache_estado.obtener('estado')
+    if estado is not None:
+        return estado[0]
+    try:
+        with _motor().connect() as conexion:
+            if conexion.dialect.name == 'postgresql':
+                segundos = float(conexion.exec_driver_sql(SQL_RETRASO_POSTGRES).scalar() or 0)
+            else:
+                conexion.exec_driver_sql("SELECT 1")
+                segundos = 0.0
+    except DBAPIError as e:
+        current_app.logger.warning('Réplica no disponible, se lee de la principal: %s', e)
+        segundos = None
+    cache_estado.guardar('estado', (segundos,))
+    return segundos
+
+
+def marcar_caida():
+    cache_estado.guardar('estado', (None,))
+
+
+def puede_leer_replica():
+    """La réplica responde, no va muy atrasada y ya tiene la última escritura de este usuario"""
+    if not configurada():
+        return False
+    segundos = retraso()
+    if segundos is None or segundos > RETRASO_MAXIMO:
+        return False
+    ultima = sesion_flask.get(CLAVE_ESCRITURA)
+    if ultima and time.time() - ultima < segundos + MARGEN_LECTURA:
+        return False
+    return True
+
+
+# =========================
+# ENRUTAMIENTO
+# =========================
+
+def lectura_replica(vista):
+    """Las consultas SELECT de la vista van a la réplica cuando se puede"""
+    @wraps(vista)
+    def envoltura(*args, **kwargs):
+        g.usar_replica = puede_leer_replica()
+        if not g.usar_replica:
+            return vista(*args, **kwargs)
+        try:
+            return vista(*args, **kwargs)
+        except DBAPIError as e:
+            # La vista solo lee: repetirla sobre la principal es seguro
+            current_app.logger.warning('Falló una lectura en la réplica, se repite en la principal: %s', e)
+            current_app.extensions['sqlalchemy'].session.rollback()
+            marcar_caida()
+            g.usar_replica = False
+            return vista(*args, **kwargs)
+    return envoltura
+
+
+def _es_lectura_replica(clause):
+    return (
+        has_request_context()
+        and g.get('usar_replica', False)
+        and isinstance(clause, Select)
+        and clause._for_update_arg is None
+    )
+
+
+class SesionEnrutada(SesionFlask):
+    """Sesión de Flask-SQLAlchemy que manda los SELECT de las vistas @lectura_replica a la réplica"""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        # Los flush (INSERT/UPDATE/DELETE) siempre van a la principal
+        if bind is None and not self._flushing and _es_lectura_replica(clause):
+            return self._db.engines[CLAVE_BIND]
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+# =========================
+# LEER LO QUE UNO ESCRIBIÓ
+# =========================
+
+@event.listens_for(Session, 'after_flush')
+def _escritura_por_flush(sesion, contexto):
+    if has_request_context():
+        g.hubo_escritura = True
+
+
+@event.listens_for(Session, 'do_orm_execute')
+def _escritura_directa(estado):
+    if (estado.is_insert or estado.is_update or estado.is_delete) and has_request_context():
+        g.hubo_escritura = True
+
+
+def instalar(app):
+    """Configura la réplica (antes de db.init_app) y registra la hora de las escrituras de cada usuario"""
+    url = url_replica()
+    if url:
+        app.config.setdefault('SQLALCHEMY_BINDS', {})[CLAVE_BIND] = url
+
+    @app.after_request
+    def registrar_escritura(respuesta):
+        # Lo que escriben las vistas de reportes (p.ej. marcar vencidas) no obliga a leer de la principal
+        if g.get('hubo_escritura') and not g.get('usar_replica') and configurada():
+            sesion_flask[CLAVE_ESCRITURA] = time.time()
+        return respuesta
@@ -0,0 +1,53 @@
+"""
+Módulos de rutas (blueprints) por dominio.
+
+RAZÓN: No todos los locales usan todo (p.ej. sin domicilios o sin presupuestos).
+Con MODULOS_DESHABILITADOS="presupuestos,domicilios" esos módulos no se
+importan ni se registran, así que no suman al arranque de cada worker.
+Los blueprints no tienen prefijo: las URLs son las mismas de siempre.
+"""
+
+import importlib
+
+MODULOS = {
+    'auth': 'rutas.auth',
+    'mesas': 'rutas.mesas',
+    'cocina': 'rutas.cocina',
+    'facturacion': 'rutas.facturacion',
+    'gastos': 'rutas.gastos',
+    'presupuestos': 'rutas.presupuestos',
+    'domicilios': 'rutas.domicilios',
+    'menu': 'rutas.menu',
+    'inventario': 'rutas.inventario',
+    'sucursales': 'rutas.sucursales',
+}
+
+# Sin login no se puede usar nada más
+OBLIGATORIOS = {'auth'}
+
+
+def parsear_deshabilitados(valor):
+    """'presupuestos, domicilios' -> {'presupuestos', 'domicilios'}"""
+    deshabilitados = {m.strip() for m in (valor or '').split(',') if m.strip()}
+    desconocidos = deshabilitados - set(MODULOS)
+    if desconocidos:
+        raise ValueError(f"Módulos desconocidos en MODULOS_DESHABILITADOS: {', '.join(sorted(desconocidos))}")
+    return deshabilitados - OBLIGATORIOS
+
+
+def registrar_modulos(app, deshabilitados=()):
+    """Importa y registra solo los módulos activos"""
+    for nombre, ruta in MODULOS.items():
+        if nombre in deshabilitados:
+            continue
+        modulo = importlib.import_module(ruta)
+        app.register_blueprint(modulo.bp)
+
+    def url_modulo_deshabilitado(error, endpoint, values):
+        # Los enlaces a un módulo deshabilitado (p.ej. en el menú de navegación) no rompen la página
+        if endpoint.split('.', 1)[0] in deshabilitados:
+            return '#'
+        return None
+
+    app.url_build_error_handlers.append(url_modulo_deshabilitado)
+    app.config['MODULOS_ACTIVOS'] = [m for m in MODULOS if m not in deshabilitados]
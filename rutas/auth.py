@@ -0,0 +1,146 @@
+"""
+Rutas de autenticación y administración de usuarios.
+"""
+
+import os
+
+from flask import Blueprint, render_template, redirect, url_for, request, flash
+from flask_login import login_user, logout_user, login_required, current_user
+
+from cache_local import CacheLRU
+from extensiones import db, login_manager
+from modelos import Usuario, IdentidadUsuario
+import sucursales
+
+bp = Blueprint('auth', __name__)
+
+
+# Cache de usuarios autenticados: clave (id, sello) -> IdentidadUsuario.
+# El TTL es el límite: invalidar_usuario solo limpia este worker, así que en los
+# demás un cambio de contraseña o de rol tarda hasta CACHE_USUARIOS_TTL segundos.
+cache_usuarios = CacheLRU(max_elementos=256, ttl=int(os.environ.get('CACHE_USUARIOS_TTL', 30)))
+
+@login_manager.user_loader
+def load_user(user_id):
+    """
+    RAZÓN: Se ejecuta en cada petición autenticada (incluidos los polls de cocina
+    y meseros). Primero busca en la cache; solo consulta la tabla usuario si no está.
+    Si el sello de la cookie no coincide con el usuario actual, la sesión ya no es válida.
+    Las cookies sin sello (anteriores al sello) obligan a iniciar sesión de nuevo.
+    """
+    id_str, _, sello = str(user_id).partition(':')
+    if not sello:
+        return None
+    try:
+        clave = (int(id_str), sello)
+    except ValueError:
+        return None
+    
+    identidad = cache_usuarios.obtener(clave)
+    if identidad is not None:
+        return identidad
+    
+    usuario = db.session.get(Usuario, clave[0])
+    if not usuario:
+        return None
+    if sello != usuario.sello:
+        # El usuario cambió (contraseña, rol...) desde que inició sesión
+        return None
+    
+    identidad = IdentidadUsuario.desde_usuario(usuario)
+    cache_usuarios.guardar(clave, identidad)
+    return identidad
+
+
+def invalidar_usuario(user_id):
+    """Quita al usuario de la cache (en este proceso; en los demás vence con el TTL)"""
+    cache_usuarios.eliminar_si(lambda clave: clave[0] == user_id)
+
+        
+@bp.route("/", methods=["GET", "POST"])
+def login():
+    if current_user.is_authenticated:
+        return redirect(url_for('mesas.dashboard'))
+    
+    if request.method == "POST":
+        username = request.form.get("username")
+        password = request.form.get("password")
+        
+        usuario = Usuario.query.filter_by(username=username).first()
+        
+        if usuario and usuario.check_password(password):
+            login_user(usuario)
+            flash(f'Bienvenido, {usuario.nombre}!', 'success')
+            return redirect(url_for('mesas.dashboard'))
+        else:
+            flash('Usuario o contraseña incorrectos', 'error')
+    
+    return render_template("login.html")
+
+@bp.route("/logout")
+@login_required
+def logout():
+    logout_user()
+    flash('Sesión cerrada exitosamente', 'success')
+    return redirect(url_for('auth.login'))
+
+@bp.route("/administrar_usuarios", methods=["GET", "POST"])
+@login_required
+def administrar_usuarios():
+    if current_user.rol != 'admin':
+        flash('Solo los administradores pueden gestionar usuarios', 'error')
+        return redirect(url_for('mesas.dashboard'))
+    
+    if request.method == "POST":
+        username = request.form.get("username")
+        password = request.form.get("password")
+        nombre = request.form.get("nombre")
+        rol = request.form.get("rol", "mesero")
+        # El dueño elige la sucursal (vacío = todas); el administrador de una sucursal crea en la suya
+        if sucursales.es_dueno(current_user):
+            sucursal_id = request.form.get("sucursal_id", type=int)
+        else:
+            sucursal_id = current_user.sucursal_id
+        
+        if Usuario.query.filter_by(username=username).first():
+            flash(f'El usuario {username} ya existe', 'error')
+        else:
+            usuario = Usuario(username=username, nombre=nombre, rol=rol, sucursal_id=sucursal_id)
+            usuario.set_password(password)
+            db.session.add(usuario)
+            db.session.commit()
+            invalidar_usuario(usuario.id)
+            flash(f'Usuario {username} creado exitosamente', 'success')
+        
+        return redirect(url_for('auth.administrar_usuarios'))
+    
+    # Los usuarios no se filtran por sucursal automáticamente: el dueño los ve todos
+    consulta = Usuario.query
+    if not sucursales.es_dueno(current_user):
+        consulta = consulta.filter(Usuario.sucursal_id == current_user.sucursal_id)
+    usuarios = consulta.order_by(Usuario.nombre).all()
+    nombres_sucursales = {s['id']: s['nombre'] for s in sucursales.listar()}
+    return render_template("administrar_usuarios.html", usuarios=usuarios,
+                           nombres_sucursales=nombres_sucursales)
+
+@bp.route("/eliminar_usuario/<int:user_id>", methods=["POST", "GET"])
+@login_required
+def eliminar_usuario(user_id):
+    if current_user.rol != 'admin':
+        flash('Solo los administradores pueden eliminar usuarios', 'error')
+        return redirect(url_for('mesas.dashboard'))
+    
+    if user_id == current_user.id:
+        flash('No puedes eliminar tu propio usuario', 'error')
+        return redirect(url_for('auth.administrar_usuarios'))
+    
+    usuario = Usuario.query.get_or_404(user_id)
+    if not sucursales.es_dueno(current_user) and usuario.sucursal_id != current_user.sucursal_id:
+        flash('Ese usuario es de otra sucursal', 'error')
+        return redirect(url_for('auth.administrar_usuarios'))
+    nombre = usuario.nombre
+    db.session.delete(usuario)
+    db.session.commit()
+    invalidar_usuario(user_id)
+    flash(f'Usuario {nombre} eliminado', 'success')
+    return redirect(url_for('auth.administrar_usuarios'))
@@ -0,0 +1,150 @@
+"""
+Rutas de la pantalla de cocina (pedidos de mesa).
+"""
+
+from datetime import datetime, timedelta
+
+from flask import Blueprint, render_template, jsonify, request
+from flask_login import login_required, current_user
+
+from extensiones import db
+from modelos import Pedido
+from replica import lectura_replica
+from ocupacion import dia_operativo
+from ventas import inicio_dia
+from sucursales import sucursal_actual_id
+import transiciones
+import monitor_sla
+
+bp = Blueprint('cocina', __name__)
+
+
+@bp.route("/cocina")
+@login_required
+def cocina():
+    hoy = datetime.now().date()
+    
+    pedidos_pendientes = Pedido.query.filter(
+        db.func.date(Pedido.fecha) == hoy,
+        Pedido.estado.in_(['pendiente', 'preparando'])
+    ).order_by(Pedido.fecha).all()
+    
+    return render_template(
+        "cocina.html",
+        pedidos=pedidos_pendientes,
+        now=datetime.now()
+    )
+
+@bp.route("/api/cocina/pedidos")
+@login_required
+def api_cocina_pedidos():
+    hoy = datetime.now().date()
+    
+    pedidos = Pedido.query.filter(
+        db.func.date(Pedido.fecha) == hoy,
+        Pedido.estado.in_(['pendiente', 'preparando'])
+    ).order_by(Pedido.fecha).all()
+    
+    data = []
+    for p in pedidos:
+        data.append({
+            "id": p.id,
+            "mesa": p.mesa.numero,
+            "producto": p.producto,
+            "cantidad": p.cantidad,
+            "notas": p.notas or "",
+            "estado": p.estado,
+            "fecha": p.fecha.isoformat()
+        })
+    
+    return jsonify(data)
+
+
+@bp.route("/api/cocina/verificar_nuevos")
+@login_required
+def verificar_nuevos_pedidos():
+    """
+    RAZÓN: Endpoint ligero para verificar nuevos pedidos sin recargar toda la página
+    """
+    hoy = datetime.now().date()
+    
+    # Solo pedidos pendientes y preparando
+    pedidos = Pedido.query.filter(
+        db.func.date(Pedido.fecha) == hoy,
+        Pedido.estado.in_(['pendiente', 'preparando'])
+    ).all()
+    
+    # Devolver solo los IDs y timestamps
+    data = {
+        'pedidos': [
+            {
+                'id': p.id,
+                'mesa': p.mesa.numero,
+                'producto': p.producto,
+                'cantidad': p.cantidad,
+                'estado': p.estado,
+                'timestamp': p.fecha.timestamp()
+            }
+            for p in pedidos
+        ],
+        'total': len(pedidos),
+        'pendientes': len([p for p in pedidos if p.estado == 'pendiente']),
+        'preparando': len([p for p in pedidos if p.estado == 'preparando'])
+    }
+    
+    return jsonify(data)
+
+
+@bp.route("/api/cocina/sla")
+@login_required
+def api_sla():
+    """
+    RAZÓN: p50/p90 en vivo del tiempo de cocina (por categoría y estación) y
+    de entrega (por zona) en los últimos `ventana` minutos (ver monitor_sla.py).
+    No consulta la base de datos.
+    """
+    ventana = request.args.get('ventana', monitor_sla.VENTANA_DEFECTO, type=int)
+    ventana = min(max(ventana, 5), monitor_sla.RETENCION_MINUTOS)
+    return jsonify({
+        'generado': datetime.now().isoformat(timespec='seconds'),
+        'ventana_minutos': ventana,
+        **monitor_sla.monitor.resumen(sucursal_actual_id(), ventana),
+    })
+
+
+@bp.route("/api/reportes/tiempos_preparacion")
+@login_required
+@lectura_replica
+def api_tiempos_preparacion():
+    """
+    RAZÓN: Cuánto dura cada etapa (pendiente, preparando, listo, en_camino)
+    por producto, estación y hora, según el registro de cambios de estado
+    (ver transiciones.py).
+    Parámetros: fecha_inicio y fecha_fin (días operativos, por defecto los
+    últimos 7) y entidad (pedido, item_domicilio o domicilio; por defecto
+    pedidos de mesa e items de domicilio).
+    """
+    if current_user.rol != 'admin':
+        return jsonify({'error': 'Solo los administradores pueden ver este reporte'}), 403
+    
+    hoy = dia_operativo(datetime.now())
+    try:
+        fecha_fin = datetime.strptime(request.args.get('fecha_fin'), '%Y-%m-%d').date() if request.args.get('fecha_fin') else hoy
+        fecha_inicio = datetime.strptime(request.args.get('fecha_inicio'), '%Y-%m-%d').date() if request.args.get('fecha_inicio') else fecha_fin - timedelta(days=6)
+    except ValueError:
+        return jsonify({'error': 'Fecha inválida'}), 400
+    if fecha_inicio > fecha_fin:
+        fecha_inicio, fecha_fin = fecha_fin, fecha_inicio
+    
+    entidad = request.args.get('entidad')
+    if entidad and entidad not in [e for e, _, _, _ in transiciones.ENTIDADES.values()]:
+        return jsonify({'error': 'Entidad inválida'}), 400
+    entidades = (entidad,) if entidad else transiciones.ENTIDADES_PRODUCTO
+    
+    tiempos = transiciones.tiempos_preparacion(inicio_dia(fecha_inicio), inicio_dia(fecha_fin + timedelta(days=1)), entidades)
+    return jsonify({
+        'fecha_inicio': fecha_inicio.isoformat(),
+        'fecha_fin': fecha_fin.isoformat(),
+        'entidades': list(entidades),
+        **tiempos,
+    })
@@ -0,0 +1,821 @@
+"""
+Rutas de domicilios, cocina de domicilios y zonas de delivery.
+"""
+
+from datetime import datetime, timedelta
+import json
+
+from flask import Blueprint, render_template, redirect, url_for, request, flash, jsonify
+from flask_login import login_required, current_user
+
+from extensiones import db
+from modelos import (
+    Usuario,
+    Factura,
+    ConfiguracionRestaurante,
+    EstadoDomicilio,
+    Domicilio,
+    ItemDomicilio,
+    ZonaDelivery,
+)
+from servicios import generar_recibo, enviar_tickets_cocina
+from ventas import invalidar_dia
+from busqueda_menu import buscar_platillos
+from idempotencia import idempotente, nueva_clave
+from sucursales import siguiente_numero_factura
+import eta_domicilios
+import despacho
+import clientes
+import pagos
+import transiciones  # noqa: F401  (registra los cambios de estado, ver transiciones.py)
+from consultas_domicilios import con_calculados, condicion_retrasado, segundos_transcurridos, cantidad_items
+
+bp = Blueprint('domicilios', __name__)
+
+# Clave única por formulario contra envíos repetidos (ver idempotencia.py)
+bp.add_app_template_global(nueva_clave, 'clave_idempotencia')
+
+# Platillos que se muestran antes de buscar
+LIMITE_FRECUENTES = 12
+
+# Pedidos anteriores del cliente en el detalle de un domicilio
+LIMITE_HISTORIAL = 5
+
+
+# =========================
+# RUTAS DE DOMICILIOS
+# =========================
+
+@bp.route("/domicilios")
+@login_required
+def lista_domicilios():
+    """
+    RAZÓN: Vista principal de domicilios con filtros por estado y fecha.
+    """
+    # Obtener filtros
+    estado = request.args.get('estado', 'todos')
+    fecha = request.args.get('fecha')
+    
+    ahora = datetime.now()
+    
+    # Query base: tiempo, retraso y cantidad de items calculados en SQL
+    query = con_calculados(Domicilio.query, ahora)
+    
+    # Filtrar por estado
+    if estado == 'retrasados':
+        query = query.filter(condicion_retrasado(ahora))
+    elif estado != 'todos':
+        query = query.filter(Domicilio.estado == estado)
+    
+    # Filtrar por fecha (con lógica de cierre a las 03:00)
+    if fecha:
+        try:
+            fecha_obj = datetime.strptime(fecha, '%Y-%m-%d').date()
+            inicio = datetime(fecha_obj.year, fecha_obj.month, fecha_obj.day, 3, 0, 0)
+            fin = inicio + timedelta(days=1)
+            query = query.filter(Domicilio.fecha_pedido >= inicio, Domicilio.fecha_pedido < fin)
+        except ValueError:
+            flash('Fecha inválida', 'error')
+    else:
+        # Por defecto, mostrar domicilios del día actual
+        hoy = datetime.now().date()
+        inicio = datetime(hoy.year, hoy.month, hoy.day, 3, 0, 0)
+        if datetime.now().hour < 3:
+            inicio = inicio - timedelta(days=1)
+        fin = inicio + timedelta(days=1)
+        query = query.filter(Domicilio.fecha_pedido >= inicio, Domicilio.fecha_pedido < fin)
+    
+    # Ordenar por fecha descendente
+    domicilios = query.order_by(Domicilio.fecha_pedido.desc()).all()
+    
+    # Calcular estadísticas
+    total_domicilios = len(domicilios)
+    pendientes = sum(1 for d in domicilios if d.estado == EstadoDomicilio.PENDIENTE)
+    en_preparacion = sum(1 for d in domicilios if d.estado == EstadoDomicilio.PREPARANDO)
+    en_camino = sum(1 for d in domicilios if d.estado == EstadoDomicilio.EN_CAMINO)
+    entregados = sum(1 for d in domicilios if d.estado == EstadoDomicilio.ENTREGADO)
+    total_ventas = sum(d.total for d in domicilios if d.estado == EstadoDomicilio.ENTREGADO)
+    
+    # Para despachar los viajes sugeridos (ver despacho.py)
+    repartidores = Usuario.query.filter(
+        Usuario.rol.in_(['admin', 'mesero'])
+    ).order_by(Usuario.nombre).all()
+    
+    return render_template("domicilios/lista_domicilios.html",
+                         domicilios=domicilios,
+                         total_domicilios=total_domicilios,
+                         pendientes=pendientes,
+                         en_preparacion=en_preparacion,
+                         en_camino=en_camino,
+                         entregados=entregados,
+                         total_ventas=total_ventas,
+                         estado_filtro=estado,
+                         fecha_filtro=fecha,
+                         repartidores=repartidores,
+                         now=datetime.now())
+
+# =========================
+# AGREGAR ESTA RUTA EN app.py
+# Insertarla DESPUÉS de lista_domicilios() y ANTES de nuevo_domicilio()
+# =========================
+
+@bp.route("/domicilio/<int:domicilio_id>")
+@login_required
+def ver_domicilio(domicilio_id):
+    """
+    RAZÓN: Ver detalles completos de un domicilio específico.
+    Muestra información del cliente, productos, estado y permite acciones.
+    """
+    domicilio = con_calculados(Domicilio.query, datetime.now()).filter(
+        Domicilio.id == domicilio_id
+    ).first_or_404()
+    
+    # Obtener usuarios que pueden ser repartidores (para el formulario de cambio de estado)
+    repartidores = Usuario.query.filter(
+        Usuario.rol.in_(['admin', 'mesero'])
+    ).order_by(Usuario.nombre).all()
+    
+    # Obtener zonas para el formulario de edición
+    zonas = ZonaDelivery.query.filter_by(activa=True).order_by(ZonaDelivery.orden).all()
+    
+    # Pedidos anteriores del mismo cliente (índice de domicilio.cliente_id)
+    historial = []
+    if domicilio.cliente_id:
+        historial = domicilio.cliente.domicilios.filter(
+            Domicilio.id != domicilio.id
+        ).order_by(Domicilio.fecha_pedido.desc()).limit(LIMITE_HISTORIAL).all()
+    
+    return render_template("domicilios/ver_domicilio.html",
+                         domicilio=domicilio,
+                         repartidores=repartidores,
+                         zonas=zonas,
+                         historial=historial,
+                         now=datetime.now())
+
+
+@bp.route("/domicilio/nuevo", methods=["GET", "POST"])
+@login_required
+def nuevo_domicilio():
+    """
+    RAZÓN: Formulario para crear un nuevo pedido a domicilio.
+    """
+    if request.method == "POST":
+        try:
+            # Datos del cliente
+            cliente_nombre = request.form.get("cliente_nombre")
+            cliente_telefono = request.form.get("cliente_telefono")
+            cliente_direccion = request.form.get("cliente_direccion")
+            cliente_barrio = request.form.get("cliente_barrio")
+            cliente_referencias = request.form.get("cliente_referencias", "")
+            
+            # Costos
+            costo_domicilio = request.form.get("costo_domicilio", 0, type=float)
+            metodo_pago = request.form.get("metodo_pago", "efectivo")
+            notas = request.form.get("notas", "")
+            
+            # Items del pedido (JSON)
+            items_json = request.form.get("items_json")
+            if not items_json:
+                flash('Debes agregar al menos un producto', 'error')
+                return redirect(url_for('domicilios.nuevo_domicilio'))
+            
+            items_data = json.loads(items_json)
+            
+            if not items_data:
+                flash('Debes agregar al menos un producto', 'error')
+                return redirect(url_for('domicilios.nuevo_domicilio'))
+            
+            # Calcular subtotal
+            subtotal = sum(item['cantidad'] * item['precio'] for item in items_data)
+            total = subtotal + costo_domicilio
+            
+            # Crear domicilio
+            domicilio = Domicilio(
+                cliente_nombre=cliente_nombre,
+                cliente_telefono=cliente_telefono,
+                cliente_direccion=cliente_direccion,
+                cliente_barrio=cliente_barrio,
+                cliente_referencias=cliente_referencias,
+                subtotal=subtotal,
+                costo_domicilio=costo_domicilio,
+                total=total,
+                metodo_pago=metodo_pago,
+                notas=notas,
+                tomado_por_id=current_user.id
+            )
+            
+            db.session.add(domicilio)
+            db.session.flush()  # Para obtener el ID
+            eta_domicilios.estimar_entrega(domicilio)
+            clientes.registrar_domicilio(domicilio)
+            
+            # Agregar items
+            for item_data in items_data:
+                item = ItemDomicilio(
+                    domicilio_id=domicilio.id,
+                    item_menu_id=item_data.get('item_id'),
+                    producto_nombre=item_data['nombre'],
+                    cantidad=item_data['cantidad'],
+                    precio_unitario=item_data['precio'],
+                    notas=item_data.get('notas', '')
+                )
+                db.session.add(item)
+            
+            db.session.commit()
+            
+            enviar_tickets_cocina(('domicilio', domicilio.id), f"DOMICILIO #{domicilio.id}", [
+                {
+                    'producto': item_data['nombre'],
+                    'cantidad': item_data['cantidad'],
+                    'notas': item_data.get('notas', ''),
+                    'item_menu_id': item_data.get('item_id')
+                }
+                for item_data in items_data
+            ])
+            
+            flash(f'Domicilio #{domicilio.id} creado exitosamente - Total: ${total:,.0f} - '
+                  f'Entrega a más tardar: {domicilio.fecha_entrega_estimada.strftime("%I:%M %p")}', 'success')
+            return redirect(url_for('domicilios.ver_domicilio', domicilio_id=domicilio.id))
+            
+        except Exception as e:
+            db.session.rollback()
+            flash(f'Error al crear domicilio: {str(e)}', 'error')
+            return redirect(url_for('domicilios.nuevo_domicilio'))
+    
+    # GET: Mostrar formulario
+    # Solo los más pedidos; el resto se busca con /api/menu/buscar
+    items_menu = buscar_platillos('', LIMITE_FRECUENTES)
+    
+    zonas = ZonaDelivery.query.filter_by(activa=True).order_by(ZonaDelivery.orden).all()
+    usuarios = Usuario.query.filter(Usuario.rol.in_(['admin', 'mesero'])).order_by(Usuario.nombre).all()
+    
+    return render_template("domicilios/nuevo_domicilio.html",
+                         items_menu=items_menu,
+                         zonas=zonas,
+                         usuarios=usuarios,
+                         now=datetime.now())
+
+
+# =========================
+# NUEVA RUTA: ACTUALIZAR ESTADO ITEM COCINA
+# =========================
+
+@bp.route("/domicilio/item/<int:item_id>/estado", methods=["POST"])
+@login_required
+def actualizar_estado_item_domicilio(item_id):
+    """
+    RAZÓN: Permite a cocina actualizar el estado de preparación de cada item
+    """
+    item = ItemDomicilio.query.get_or_404(item_id)
+    nuevo_estado = request.form.get("estado")
+    
+    estados_validos = ['pendiente', 'preparando', 'listo']
+    
+    if nuevo_estado not in estados_validos:
+        flash('Estado inválido', 'error')
+        return redirect(url_for('domicilios.ver_domicilio', domicilio_id=item.domicilio_id))
+    
+    item.estado_cocina = nuevo_estado
+    db.session.commit()
+    
+    # Si todos los items están listos, actualizar estado del domicilio
+    if nuevo_estado == 'listo':
+        todos_listos = all(i.estado_cocina == 'listo' for i in item.domicilio.items)
+        if todos_listos and item.domicilio.estado == 'preparando':
+            item.domicilio.estado = EstadoDomicilio.LISTO
+            item.domicilio.estado_actualizado = datetime.now()
+            db.session.commit()
+            flash(f'Domicilio #{item.domicilio_id} marcado como LISTO para enviar', 'success')
+    
+    flash(f'Estado actualizado: {nuevo_estado}', 'success')
+    return redirect(url_for('domicilios.ver_domicilio', domicilio_id=item.domicilio_id))
+
+
+
+@bp.route("/domicilio/<int:domicilio_id>/actualizar_estado", methods=["POST"])
+@login_required
+def actualizar_estado_domicilio(domicilio_id):
+    """
+    RAZÓN: Cambiar el estado del domicilio (pendiente → preparando → listo → en_camino → entregado)
+    """
+    domicilio = Domicilio.query.get_or_404(domicilio_id)
+    nuevo_estado = request.form.get("estado")
+    
+    estados_validos = [
+        EstadoDomicilio.PENDIENTE,
+        EstadoDomicilio.PREPARANDO,
+        EstadoDomicilio.LISTO,
+        EstadoDomicilio.EN_CAMINO,
+        EstadoDomicilio.ENTREGADO,
+        EstadoDomicilio.CANCELADO
+    ]
+    
+    if nuevo_estado not in estados_validos:
+        flash('Estado inválido', 'error')
+        return redirect(url_for('domicilios.ver_domicilio', domicilio_id=domicilio_id))
+    
+    if EstadoDomicilio.CANCELADO in (domicilio.estado, nuevo_estado):
+        invalidar_dia(domicilio.fecha_pedido)
+    estado_anterior = domicilio.estado
+    domicilio.estado = nuevo_estado
+    domicilio.estado_actualizado = datetime.now()
+    clientes.cambio_estado(domicilio, estado_anterior)
+    
+    # Si se marca como entregado, guardar la hora de entrega
+    if nuevo_estado == EstadoDomicilio.ENTREGADO:
+        domicilio.fecha_entrega_real = datetime.now()
+        domicilio.pagado = True
+    
+    # Si se asigna repartidor
+    repartidor_id = request.form.get("repartidor_id", type=int)
+    if repartidor_id:
+        domicilio.repartidor_id = repartidor_id
+    
+    db.session.commit()
+    
+    flash(f'Estado actualizado a: {nuevo_estado}', 'success')
+    return redirect(url_for('domicilios.ver_domicilio', domicilio_id=domicilio_id))
+
+
+@bp.route("/domicilio/<int:domicilio_id>/editar", methods=["GET", "POST"])
+@login_required
+def editar_domicilio(domicilio_id):
+    """
+    RAZÓN: Editar información de un domicilio existente.
+    """
+    domicilio = Domicilio.query.get_or_404(domicilio_id)
+    
+    # Solo se puede editar si no ha sido entregado
+    if domicilio.estado == EstadoDomicilio.ENTREGADO and current_user.rol != 'admin':
+        flash('No se puede editar un domicilio ya entregado', 'error')
+        return redirect(url_for('domicilios.ver_domicilio', domicilio_id=domicilio_id))
+    
+    if request.method == "POST":
+        try:
+            barrio_anterior = domicilio.cliente_barrio
+            telefono_anterior = domicilio.cliente_telefono
+            total_anterior = domicilio.total
+            
+            # Actualizar datos del cliente
+            domicilio.cliente_nombre = request.form.get("cliente_nombre")
+            domicilio.cliente_telefono = request.form.get("cliente_telefono")
+            domicilio.cliente_direccion = request.form.get("cliente_direccion")
+            domicilio.cliente_barrio = request.form.get("cliente_barrio")
+            domicilio.cliente_referencias = request.form.get("cliente_referencias", "")
+            
+            # Actualizar costos
+            domicilio.costo_domicilio = request.form.get("costo_domicilio", 0, type=float)
+            domicilio.metodo_pago = request.form.get("metodo_pago")
+            domicilio.notas = request.form.get("notas", "")
+            
+            # Recalcular total
+            domicilio.total = domicilio.subtotal + domicilio.costo_domicilio
+            
+            # Otra zona, otro tiempo de entrega
+            if domicilio.cliente_barrio != barrio_anterior and domicilio.estado != EstadoDomicilio.ENTREGADO:
+                eta_domicilios.estimar_entrega(domicilio)
+            
+            clientes.domicilio_editado(domicilio, telefono_anterior, total_anterior)
+            db.session.commit()
+            
+            flash('Domicilio actualizado exitosamente', 'success')
+            return redirect(url_for('domicilios.ver_domicilio', domicilio_id=domicilio_id))
+            
+        except Exception as e:
+            db.session.rollback()
+            flash(f'Error al actualizar: {str(e)}', 'error')
+    
+    # GET
+    zonas = ZonaDelivery.query.filter_by(activa=True).order_by(ZonaDelivery.orden).all()
+    usuarios = Usuario.query.filter(Usuario.rol.in_(['admin', 'mesero'])).order_by(Usuario.nombre).all()
+    
+    return render_template("domicilios/editar_domicilio.html",
+                         domicilio=domicilio,
+                         zonas=zonas,
+                         usuarios=usuarios)
+
+
+@bp.route("/domicilio/<int:domicilio_id>/cancelar", methods=["POST"])
+@login_required
+def cancelar_domicilio(domicilio_id):
+    """
+    RAZÓN: Cancelar un domicilio con motivo.
+    """
+    if current_user.rol not in ['admin', 'mesero']:
+        flash('No tienes permisos para cancelar domicilios', 'error')
+        return redirect(url_for('domicilios.lista_domicilios'))
+    
+    domicilio = Domicilio.query.get_or_404(domicilio_id)
+    
+    if domicilio.estado == EstadoDomicilio.ENTREGADO:
+        flash('No se puede cancelar un domicilio ya entregado', 'error')
+        return redirect(url_for('domicilios.ver_domicilio', domicilio_id=domicilio_id))
+    
+    motivo = request.form.get("motivo_cancelacion", "")
+    
+    estado_anterior = domicilio.estado
+    domicilio.estado = EstadoDomicilio.CANCELADO
+    domicilio.notas_cancelacion = motivo
+    invalidar_dia(domicilio.fecha_pedido)
+    domicilio.estado_actualizado = datetime.now()
+    clientes.cambio_estado(domicilio, estado_anterior)
+    
+    db.session.commit()
+    
+    flash(f'Domicilio #{domicilio_id} cancelado', 'success')
+    return redirect(url_for('domicilios.lista_domicilios'))
+
+
+@bp.route("/domicilio/<int:domicilio_id>/facturar", methods=["GET", "POST"])
+@login_required
+@idempotente
+def facturar_domicilio(domicilio_id):
+    """
+    RAZÓN: Generar factura para un domicilio entregado.
+    Similar a facturar_sesion pero para domicilios.
+    """
+    domicilio = Domicilio.query.get_or_404(domicilio_id)
+    config = ConfiguracionRestaurante.query.first()
+    
+    if not config:
+        config = ConfiguracionRestaurante()
+        db.session.add(config)
+        db.session.commit()
+    
+    if domicilio.factura_id:
+        flash('Este domicilio ya tiene una factura generada', 'error')
+        return redirect(url_for('facturacion.ver_factura', factura_id=domicilio.factura_id))
+    
+    if request.method == "POST":
+        try:
+            # Obtener datos del formulario
+            propina = request.form.get("propina", 0, type=float)
+            estado_pago = request.form.get("estado_pago", "pagada")
+            fecha_vencimiento_str = request.form.get("fecha_vencimiento")
+            notas_factura = request.form.get("notas", "")
+            
+            # Calcular totales
+            subtotal = domicilio.subtotal + domicilio.costo_domicilio
+            iva = 0
+            total = subtotal + propina
+            
+            # Generar número consecutivo (cada sucursal lleva el suyo)
+            numero_consecutivo = siguiente_numero_factura()
+            
+            # Convertir fecha de vencimiento
+            fecha_vencimiento = None
+            if fecha_vencimiento_str and estado_pago == 'pendiente':
+                fecha_vencimiento = datetime.strptime(fecha_vencimiento_str, '%Y-%m-%d').date()
+            
+            # Crear factura (sin sesion_id porque es domicilio)
+            factura = Factura(
+                numero_consecutivo=numero_consecutivo,
+                sesion_id=None,  # NULL para domicilios
+                subtotal=subtotal,
+                iva=iva,
+                propina=propina,
+                total=total,
+                metodo_pago=domicilio.metodo_pago,
+                cliente_nombre=domicilio.cliente_nombre,
+                cliente_documento="",
+                notas=notas_factura,
+                estado_pago=estado_pago,
+                fecha_vencimiento=fecha_vencimiento,
+                fecha_pago_real=datetime.now() if estado_pago == 'pagada' else None,
+                saldo_pendiente=total if estado_pago == 'pendiente' else 0
+            )
+            
+            db.session.add(factura)
+            db.session.flush()
+            if estado_pago == 'pagada':
+                pagos.registrar_pago_factura(factura, factura.fecha_pago_real)
+            
+            # Asociar factura al domicilio
+            domicilio.factura_id = factura.id
+            domicilio.pagado = True
+            
+            # Pre-renderizar el recibo para impresión (misma transacción)
+            generar_recibo(factura, config)
+            db.session.commit()
+            
+            flash(f'Factura {numero_consecutivo} generada exitosamente', 'success')
+            return redirect(url_for('facturacion.ver_factura', factura_id=factura.id))
+            
+        except Exception as e:
+            db.session.rollback()
+            flash(f'Error al generar factura: {str(e)}', 'error')
+            return redirect(url_for('domicilios.facturar_domicilio', domicilio_id=domicilio_id))
+    
+    # GET: Calcular fecha de vencimiento por defecto (15 días)
+    fecha_vencimiento_default = (datetime.now() + timedelta(days=15)).strftime('%Y-%m-%d')
+    
+    return render_template("domicilios/facturar_domicilio.html",
+                         domicilio=domicilio,
+                         config=config,
+                         datetime=datetime,
+                         fecha_vencimiento_default=fecha_vencimiento_default)
+# =========================
+# VISTA DE COCINA PARA DOMICILIOS
+# =========================
+
+@bp.route("/cocina/domicilios")
+@login_required
+def cocina_domicilios():
+    """
+    RAZÓN: Vista especial para que cocina vea items de domicilios pendientes
+    """
+    if current_user.rol != 'cocina':
+        flash('Solo el personal de cocina puede acceder', 'error')
+        return redirect(url_for('mesas.dashboard'))
+    
+    # Obtener domicilios activos del día
+    hoy = datetime.now().date()
+    inicio = datetime(hoy.year, hoy.month, hoy.day, 3, 0, 0)
+    if datetime.now().hour < 3:
+        inicio = inicio - timedelta(days=1)
+    fin = inicio + timedelta(days=1)
+    
+    domicilios_activos = con_calculados(Domicilio.query, datetime.now()).options(
+        db.selectinload(Domicilio.items)
+    ).filter(
+        Domicilio.fecha_pedido >= inicio,
+        Domicilio.fecha_pedido < fin,
+        Domicilio.estado.in_([
+            EstadoDomicilio.PENDIENTE,
+            EstadoDomicilio.PREPARANDO,
+            EstadoDomicilio.LISTO
+        ])
+    ).order_by(Domicilio.fecha_pedido).all()
+    
+    return render_template("domicilios/cocina_domicilios.html",
+                         domicilios=domicilios_activos,
+                         now=datetime.now())
+
+
+# =========================
+# RUTAS DE ZONAS DE DELIVERY
+# =========================
+
+@bp.route("/zonas_delivery")
+@login_required
+def lista_zonas_delivery():
+    """
+    RAZÓN: Administrar zonas de cobertura y costos de envío.
+    """
+    if current_user.rol != 'admin':
+        flash('Solo administradores pueden gestionar zonas', 'error')
+        return redirect(url_for('mesas.dashboard'))
+    
+    zonas = ZonaDelivery.query.order_by(ZonaDelivery.orden).all()
+    
+    return render_template("domicilios/zonas_delivery.html", zonas=zonas)
+
+
+@bp.route("/zona_delivery/nueva", methods=["GET", "POST"])
+@login_required
+def nueva_zona_delivery():
+    """
+    RAZÓN: Crear una nueva zona de delivery.
+    """
+    if current_user.rol != 'admin':
+        flash('Solo administradores pueden crear zonas', 'error')
+        return redirect(url_for('mesas.dashboard'))
+    
+    if request.method == "POST":
+        zona = ZonaDelivery(
+            nombre=request.form.get("nombre"),
+            barrios=request.form.get("barrios"),
+            costo_envio=request.form.get("costo_envio", type=float),
+            tiempo_estimado=request.form.get("tiempo_estimado", 30, type=int),
+            orden=request.form.get("orden", 0, type=int)
+        )
+        
+        db.session.add(zona)
+        db.session.commit()
+        eta_domicilios.invalidar()
+        
+        flash(f'Zona {zona.nombre} creada exitosamente', 'success')
+        return redirect(url_for('domicilios.lista_zonas_delivery'))
+    
+    return render_template("domicilios/nueva_zona.html")
+
+
+@bp.route("/zona_delivery/<int:zona_id>/editar", methods=["GET", "POST"])
+@login_required
+def editar_zona_delivery(zona_id):
+    """
+    RAZÓN: Editar una zona existente.
+    """
+    if current_user.rol != 'admin':
+        flash('Solo administradores pueden editar zonas', 'error')
+        return redirect(url_for('mesas.dashboard'))
+    
+    zona = ZonaDelivery.query.get_or_404(zona_id)
+    
+    if request.method == "POST":
+        zona.nombre = request.form.get("nombre")
+        zona.barrios = request.form.get("barrios")
+        zona.costo_envio = request.form.get("costo_envio", type=float)
+        zona.tiempo_estimado = request.form.get("tiempo_estimado", type=int)
+        zona.orden = request.form.get("orden", type=int)
+        db.session.commit()
+        eta_domicilios.invalidar()
+        
+        flash('Zona actualizada', 'success')
+        return redirect(url_for('domicilios.lista_zonas_delivery'))
+
+    return render_template("domicilios/editar_zona.html", zona=zona)
+@bp.route("/zona_delivery/<int:zona_id>/toggle")
+@login_required
+def toggle_zona_delivery(zona_id):
+    """
+    RAZÓN: Activar/desactivar una zona.
+    """
+    if current_user.rol != 'admin':
+        flash('Solo administradores pueden modificar zonas', 'error')
+        return redirect(url_for('mesas.dashboard'))
+    
+    zona = ZonaDelivery.query.get_or_404(zona_id)
+    zona.activa = not zona.activa
+    db.session.commit()
+    eta_domicilios.invalidar()
+
+    estado = "activada" if zona.activa else "desactivada"
+    flash(f'Zona {zona.nombre} {estado}', 'success')
+    return redirect(url_for('domicilios.lista_zonas_delivery'))
+    
+"""=========================
+API PARA DOMICILIOS (AJAX)
+========================="""
+@bp.route("/api/domicilios/activos")
+@login_required
+def api_domicilios_activos():
+    """
+    RAZÓN: Endpoint para actualizar en tiempo real los domicilios activos.
+    Para pantalla de cocina o repartidores.
+    """
+    ahora = datetime.now()
+    hoy = ahora.date()
+    inicio = datetime(hoy.year, hoy.month, hoy.day, 3, 0, 0)
+    if ahora.hour < 3:
+        inicio = inicio - timedelta(days=1)
+    fin = inicio + timedelta(days=1)
+    
+    # Una sola consulta de columnas: sin objetos ni items cargados por fila
+    filas = db.session.execute(
+        db.select(
+            Domicilio.id, Domicilio.cliente_nombre, Domicilio.cliente_direccion,
+            Domicilio.cliente_barrio, Domicilio.total, Domicilio.estado,
+            Domicilio.fecha_entrega_estimada,
+            segundos_transcurridos(ahora).label('segundos'),
+            db.func.coalesce(condicion_retrasado(ahora), db.false()).label('retrasado'),
+            cantidad_items().label('items'),
+        ).where(
+            Domicilio.fecha_pedido >= inicio,
+            Domicilio.fecha_pedido < fin,
+            Domicilio.estado.in_([
+                EstadoDomicilio.PENDIENTE,
+                EstadoDomicilio.PREPARANDO,
+                EstadoDomicilio.LISTO,
+                EstadoDomicilio.EN_CAMINO
+            ])
+        ).order_by(Domicilio.fecha_pedido)
+    ).all()
+
+    data = []
+    for f in filas:
+        minutos = int((f.segundos or 0) // 60)
+        data.append({
+            'id': f.id,
+            'cliente': f.cliente_nombre,
+            'direccion': f.cliente_direccion,
+            'barrio': f.cliente_barrio,
+            'total': float(f.total),
+            'estado': f.estado,
+            'tiempo': f"{minutos} min" if minutos < 60 else f"{minutos // 60}h {minutos % 60}min",
+            'segundos': int(f.segundos or 0),
+            'retrasado': bool(f.retrasado),
+            'entrega_estimada': f.fecha_entrega_estimada.isoformat() if f.fecha_entrega_estimada else None,
+            'items_count': f.items
+        })
+
+    return jsonify(data)
+
+
+@bp.route("/api/domicilios/despacho")
+@login_required
+def api_plan_despacho():
+    """
+    RAZÓN: Viajes sugeridos para los domicilios listos, agrupados por zona
+    (ver despacho.py). Lo consulta la pantalla de domicilios.
+    """
+    ahora = datetime.now()
+    viajes = despacho.plan_actual(ahora)
+    return jsonify({
+        'generado': ahora.isoformat(timespec='seconds'),
+        'viajes': [
+            {
+                'zona': v['zona'],
+                'vehiculo': v['vehiculo'],
+                'paradas': v['paradas'],
+                'capacidad': v['capacidad'],
+                'salir_antes': v['salir_antes'].isoformat(timespec='seconds'),
+                'urgente': v['urgente'],
+                'domicilios': [
+                    {
+                        'id': d['id'],
+                        'cliente': d['cliente'],
+                        'direccion': d['direccion'],
+                        'barrio': d['barrio'],
+                        'listo_hace': int((ahora - d['listo_desde']).total_seconds() // 60),
+                        'entrega_estimada': d['limite'].isoformat(timespec='seconds') if d['limite'] else None,
+                    }
+                    for d in v['domicilios']
+                ],
+            }
+            for v in viajes
+        ],
+    })
+
+
+@bp.route("/domicilios/despachar", methods=["POST"])
+@login_required
+def despachar_viaje():
+    """
+    RAZÓN: Sale un viaje sugerido: todos sus domicilios pasan a en_camino con
+    el mismo repartidor.
+    """
+    if current_user.rol not in ['admin', 'mesero']:
+        flash('No tienes permisos para despachar domicilios', 'error')
+        return redirect(url_for('domicilios.lista_domicilios'))
+    
+    ids = request.form.getlist("domicilio_ids", type=int)
+    repartidor_id = request.form.get("repartidor_id", type=int)
+    if not ids or not repartidor_id:
+        flash('Selecciona el repartidor del viaje', 'error')
+        return redirect(url_for('domicilios.lista_domicilios'))
+    
+    # Solo los que siguen listos (otra pantalla pudo despacharlos ya)
+    domicilios = Domicilio.query.filter(
+        Domicilio.id.in_(ids), Domicilio.estado == EstadoDomicilio.LISTO
+    ).all()
+    ahora = datetime.now()
+    for domicilio in domicilios:
+        domicilio.estado = EstadoDomicilio.EN_CAMINO
+        domicilio.estado_actualizado = ahora
+        domicilio.repartidor_id = repartidor_id
+    db.session.commit()
+    
+    if domicilios:
+        numeros = ', '.join(f"#{d.id}" for d in domicilios)
+        flash(f'Viaje despachado: {numeros}', 'success')
+    else:
+        flash('Esos domicilios ya no están listos para despachar', 'error')
+    return redirect(url_for('domicilios.lista_domicilios'))
+
+
+@bp.route("/api/zona/calcular_costo", methods=["POST"])
+@login_required
+def api_calcular_costo_zona():
+    """
+    RAZÓN: Costo de envío y tiempo de entrega según el barrio, desde el modelo
+    en memoria (ver eta_domicilios.py): sin consultas por petición.
+    tiempo_estimado es el tiempo típico (p50); tiempo_maximo, el p90.
+    """
+    barrio = (request.json or {}).get('barrio', '')
+    estimacion = eta_domicilios.estimar(barrio)
+    zona = estimacion['zona']
+
+    if zona:
+        return jsonify({
+            'success': True,
+            'zona': zona['nombre'],
+            'costo': float(zona['costo_envio']),
+            'tiempo_estimado': round(estimacion['p50']),
+            'tiempo_maximo': round(estimacion['p90']),
+            'fuente': estimacion['fuente']
+        })
+
+    # Si no se encuentra el barrio, devolver costo por defecto
+    return jsonify({
+        'success': False,
+        'message': 'Barrio no encontrado en zonas de cobertura',
+        'costo': 3000,  # Costo por defecto
+        'tiempo_estimado': round(estimacion['p50']),
+        'tiempo_maximo': round(estimacion['p90'])
+    })
+
+
+# =========================
+# CLIENTES
+# =========================
+
+@bp.route("/api/clientes/buscar")
+@login_required
+def api_buscar_clientes():
+    """
+    RAZÓN: Autocompletar el formulario de domicilio a partir del teléfono.
+    Búsqueda por prefijo sobre el índice único de cliente.telefono (ver clientes.py).
+    """
+    encontrados = clientes.buscar_por_telefono(request.args.get('telefono', ''))
+    return jsonify([clientes.a_dict(cliente) for cliente in encontrados])
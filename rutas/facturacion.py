@@ -0,0 +1,556 @@
+"""
+Rutas de facturación: facturas, recibos, cuentas por cobrar y configuración del restaurante.
+"""
+
+from datetime import datetime, timedelta
+import json
+
+from flask import Blueprint, render_template, redirect, url_for, request, flash, make_response, abort
+from flask_login import login_required, current_user
+from sqlalchemy.orm.attributes import set_committed_value
+
+from extensiones import db
+from modelos import Sesion, Pedido, Factura, ReciboFactura, ConfiguracionRestaurante, Domicilio
+from servicios import generar_recibo, obtener_recibo, regenerar_recibo
+from ocupacion import registrar_sesion
+from idempotencia import idempotente, nueva_clave
+from sucursales import siguiente_numero_factura
+from replica import lectura_replica
+from ocupacion import dia_operativo
+import pagos
+import totales_sesion
+
+bp = Blueprint('facturacion', __name__)
+
+# Clave única por formulario contra envíos repetidos (ver idempotencia.py)
+bp.add_app_template_global(nueva_clave, 'clave_idempotencia')
+
+
+@bp.route("/facturar_sesion/<int:sesion_id>", methods=["GET", "POST"])
+@login_required
+@idempotente
+def facturar_sesion(sesion_id):
+    """
+    Generar factura para una sesión - AHORA CON ESTADO DE PAGO
+    """
+    sesion = Sesion.query.get_or_404(sesion_id)
+    config = ConfiguracionRestaurante.query.first()
+    
+    if not config:
+        config = ConfiguracionRestaurante()
+        db.session.add(config)
+        db.session.commit()
+    
+    if request.method == "POST":
+        # Obtener datos del formulario
+        metodo_pago = request.form.get("metodo_pago", "efectivo")
+        propina = request.form.get("propina", 0, type=float)
+        cliente_nombre = request.form.get("cliente_nombre", "")
+        cliente_documento = request.form.get("cliente_documento", "")
+        notas = request.form.get("notas", "")
+        
+        # NUEVOS CAMPOS
+        estado_pago = request.form.get("estado_pago", "pagada")
+        fecha_vencimiento_str = request.form.get("fecha_vencimiento")
+        
+        # Desglose de pago para método mixto
+        desglose_pago = None
+        if metodo_pago == "mixto":
+            desglose_pago = {
+                "efectivo": request.form.get("efectivo", 0, type=float),
+                "tarjeta": request.form.get("tarjeta", 0, type=float),
+                "transferencia": request.form.get("transferencia", 0, type=float)
+            }
+        
+        # Calcular totales (los contadores de la sesión, ver totales_sesion.py)
+        subtotal = sesion.subtotal
+        iva = 0  # Sin IVA
+        total = subtotal + propina
+
+        # Generar número consecutivo (cada sucursal lleva el suyo)
+        numero_consecutivo = siguiente_numero_factura()
+        
+        # Convertir fecha de vencimiento
+        fecha_vencimiento = None
+        if fecha_vencimiento_str and estado_pago == 'pendiente':
+            fecha_vencimiento = datetime.strptime(fecha_vencimiento_str, '%Y-%m-%d').date()
+        
+        # Fecha de pago real
+        fecha_pago_real = datetime.now() if estado_pago == 'pagada' else None
+        
+        # Saldo pendiente
+        saldo_pendiente = total if estado_pago == 'pendiente' else 0
+        
+        # Crear factura
+        factura = Factura(
+            numero_consecutivo=numero_consecutivo,
+            sesion_id=sesion_id,
+            subtotal=subtotal,
+            iva=iva,
+            propina=propina,
+            total=total,
+            metodo_pago=metodo_pago,
+            desglose_pago=json.dumps(desglose_pago) if desglose_pago else None,
+            cliente_nombre=cliente_nombre,
+            cliente_documento=cliente_documento,
+            notas=notas,
+            estado_pago=estado_pago,
+            fecha_vencimiento=fecha_vencimiento,
+            fecha_pago_real=fecha_pago_real,
+            saldo_pendiente=saldo_pendiente
+        )
+        
+        # Actualizar sesión
+        sesion.total = total
+        sesion.activa = False
+        sesion.fecha_fin = datetime.now()
+        registrar_sesion(sesion)
+        
+        # Marcar todos los pedidos como pagados (actualización en bloque)
+        db.session.query(Pedido).filter(Pedido.sesion_id == sesion.id).update({"pagado": True, "estado": "entregado"}, synchronize_session=False)
+        totales_sesion.recalcular([sesion.id], actividad=datetime.now())
+        
+        db.session.add(factura)
+        db.session.flush()
+        if estado_pago == 'pagada':
+            pagos.registrar_pago_factura(factura, fecha_pago_real)
+        
+        # Pre-renderizar el recibo para impresión (misma transacción)
+        generar_recibo(factura, config)
+        db.session.commit()
+        
+        flash(f'Factura {numero_consecutivo} generada exitosamente', 'success')
+        return redirect(url_for('facturacion.ver_factura', factura_id=factura.id))
+    
+    # GET: Totales para mostrar en el formulario (contadores de la sesión)
+    subtotal = sesion.subtotal
+    iva = 0  # Sin IVA
+    
+    # ============================================
+    # SOLUCIÓN: PASAR datetime AL TEMPLATE
+    # ============================================
+    return render_template("facturar_sesion.html", 
+                         sesion=sesion, 
+                         config=config,
+                         subtotal=subtotal,
+                         iva=iva,
+                         datetime=datetime)  # ← ESTA LÍNEA ES CLAVE
+
+# =================================================================
+# REEMPLAZAR LA RUTA ver_factura EN app.py (línea ~620)
+# =================================================================
+
+@bp.route("/factura/<int:factura_id>")
+@login_required
+def ver_factura(factura_id):
+    """Ver una factura generada - OPTIMIZADA PARA IMPRESORAS TÉRMICAS"""
+    factura = Factura.query.options(db.joinedload(Factura.recibo)).get_or_404(factura_id)
+    
+    # El recibo se renderizó al facturar; aquí solo se inserta el HTML guardado
+    recibo = obtener_recibo(factura)
+    
+    return render_template("ver_factura.html", 
+                         factura=factura, 
+                         recibo_html=recibo.html)
+
+
+@bp.route("/factura/<int:factura_id>/imprimir/<formato>")
+@login_required
+def imprimir_factura(factura_id, formato):
+    """
+    RAZÓN: Sirve el recibo pre-renderizado directamente a la impresora térmica.
+    Formatos: escpos-80, escpos-58 (bytes crudos), texto-80, texto-58, html.
+    """
+    recibo = ReciboFactura.query.filter_by(factura_id=factura_id).first()
+    if not recibo:
+        recibo = obtener_recibo(Factura.query.get_or_404(factura_id))
+    
+    formatos = {
+        'escpos-80': (recibo.escpos_80, 'application/octet-stream'),
+        'escpos-58': (recibo.escpos_58, 'application/octet-stream'),
+        'texto-80': (recibo.texto_80, 'text/plain'),
+        'texto-58': (recibo.texto_58, 'text/plain'),
+        'html': (recibo.html, 'text/html'),
+    }
+    if formato not in formatos:
+        abort(404)
+    
+    datos, mimetype = formatos[formato]
+    response = make_response(datos)
+    response.mimetype = mimetype
+    if formato.startswith('escpos'):
+        response.headers['Content-Disposition'] = f'attachment; filename=factura-{factura_id}-{formato}.bin'
+    
+    # El contenido no cambia hasta que se edite la factura: el navegador revalida con ETag
+    response.set_etag(f"{recibo.hash_contenido}-{formato}")
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response.make_conditional(request)
+
+@bp.route("/facturas")
+@login_required
+def lista_facturas():
+    """Listar todas las facturas"""
+    fecha_param = request.args.get('fecha')
+    
+    if fecha_param:
+        try:
+            fecha_obj = datetime.strptime(fecha_param, '%Y-%m-%d').date()
+            facturas = Factura.query.filter(
+                db.func.date(Factura.fecha_emision) == fecha_obj
+            ).order_by(Factura.fecha_emision.desc()).all()
+        except ValueError:
+            flash('Fecha inválida', 'error')
+            facturas = Factura.query.order_by(Factura.fecha_emision.desc()).limit(50).all()
+    else:
+        # Últimas 50 facturas
+        facturas = Factura.query.order_by(Factura.fecha_emision.desc()).limit(50).all()
+    
+    return render_template("lista_facturas.html", facturas=facturas)
+
+
+@bp.route('/factura/<int:factura_id>/editar', methods=['GET', 'POST'])
+@login_required
+def editar_factura(factura_id):
+    factura = Factura.query.get_or_404(factura_id)
+    if getattr(current_user, 'rol', None) != 'admin':
+        flash('No tienes permisos para editar facturas', 'error')
+        return redirect(url_for('facturacion.ver_factura', factura_id=factura_id))
+
+    config = ConfiguracionRestaurante.query.first()
+
+    if request.method == 'POST':
+        metodo_pago = request.form.get('metodo_pago', factura.metodo_pago)
+        propina = request.form.get('propina', factura.propina, type=float)
+        cliente_nombre = request.form.get('cliente_nombre', factura.cliente_nombre)
+        cliente_documento = request.form.get('cliente_documento', factura.cliente_documento)
+        notas = request.form.get('notas', factura.notas)
+        estado_pago = request.form.get('estado_pago', factura.estado_pago)
+        fecha_vencimiento_str = request.form.get('fecha_vencimiento')
+
+        desglose_pago = None
+        if metodo_pago == 'mixto':
+            desglose_pago = {
+                'efectivo': request.form.get('efectivo', 0, type=float),
+                'tarjeta': request.form.get('tarjeta', 0, type=float),
+                'transferencia': request.form.get('transferencia', 0, type=float)
+            }
+
+        # Recalcular subtotal desde la sesión asociada
+        subtotal = db.session.query(db.func.coalesce(db.func.sum(Pedido.cantidad * Pedido.precio_unitario), 0)).filter(Pedido.sesion_id == factura.sesion_id).scalar() or 0
+        iva = factura.iva if factura.iva is not None else 0
+        total = subtotal + propina + (iva or 0)
+
+        # Actualizar campos
+        factura.metodo_pago = metodo_pago
+        factura.propina = propina
+        factura.cliente_nombre = cliente_nombre
+        factura.cliente_documento = cliente_documento
+        factura.notas = notas
+        factura.estado_pago = estado_pago
+        factura.desglose_pago = json.dumps(desglose_pago) if desglose_pago else None
+        factura.subtotal = subtotal
+        factura.total = total
+
+        # Fecha vencimiento
+        if fecha_vencimiento_str:
+            try:
+                factura.fecha_vencimiento = datetime.strptime(fecha_vencimiento_str, '%Y-%m-%d').date()
+            except Exception:
+                factura.fecha_vencimiento = None
+        else:
+            factura.fecha_vencimiento = None
+
+        # Ajustes según estado de pago
+        if estado_pago == 'pagada':
+            factura.fecha_pago_real = datetime.now()
+            factura.saldo_pendiente = 0
+        elif estado_pago == 'pendiente':
+            factura.fecha_pago_real = None
+            factura.saldo_pendiente = total
+        pagos.actualizar_pagos_editados(factura)
+        
+        # La factura cambió: volver a renderizar el recibo guardado
+        if not config:
+            config = ConfiguracionRestaurante()
+            db.session.add(config)
+            db.session.flush()
+        generar_recibo(factura, config)
+        db.session.commit()
+        flash(f'Factura {factura.numero_consecutivo} actualizada', 'success')
+        return redirect(url_for('facturacion.ver_factura', factura_id=factura.id))
+
+    # GET
+    desglose = pagos.leer_desglose(factura)
+    return render_template('editar_factura.html', factura=factura, config=config, desglose=desglose)
+
+
+@bp.route('/factura/<int:factura_id>/eliminar', methods=['POST'])
+@login_required
+def eliminar_factura(factura_id):
+    """
+    RAZÓN: Eliminar facturas y revertir los cambios asociados.
+    Funciona tanto para facturas de sesiones como de domicilios.
+    Al eliminar, la factura desaparece de los reportes de ingresos automáticamente.
+    """
+    factura = Factura.query.get_or_404(factura_id)
+    
+    # Solo admin puede eliminar facturas
+    if getattr(current_user, 'rol', None) != 'admin':
+        flash('No tienes permisos para eliminar facturas', 'error')
+        return redirect(url_for('facturacion.ver_factura', factura_id=factura_id))
+
+    numero_factura = factura.numero_consecutivo
+    monto = factura.total
+    
+    try:
+        # ============================================
+        # CASO 1: FACTURA DE SESIÓN (MESA)
+        # ============================================
+        if factura.sesion_id:
+            sesion = factura.sesion
+            if sesion:
+                # Descontarla de la ocupación antes de reactivarla
+                if not sesion.activa:
+                    registrar_sesion(sesion, signo=-1)
+                
+                # Reactivar la sesión
+                sesion.activa = True
+                sesion.fecha_fin = None
+                sesion.total = 0
+                
+                # Revertir estado de los pedidos
+                db.session.query(Pedido).filter(
+                    Pedido.sesion_id == sesion.id
+                ).update({
+                    "pagado": False,
+                    "estado": "pendiente"
+                }, synchronize_session=False)
+                totales_sesion.recalcular([sesion.id], actividad=datetime.now())
+        
+        # ============================================
+        # CASO 2: FACTURA DE DOMICILIO
+        # ============================================
+        else:
+            # Buscar domicilio asociado a esta factura
+            domicilio = Domicilio.query.filter_by(factura_id=factura_id).first()
+            if domicilio:
+                # Desasociar la factura del domicilio
+                domicilio.factura_id = None
+                domicilio.pagado = False
+                # El domicilio queda en su estado actual (entregado)
+                # pero sin factura asociada, permitiendo re-facturar
+        
+        # ============================================
+        # ELIMINAR LA FACTURA (y su recibo pre-renderizado)
+        # ============================================
+        if factura.recibo:
+            db.session.delete(factura.recibo)
+        db.session.delete(factura)
+        db.session.commit()
+        
+        flash(f'✓ Factura {numero_factura} eliminada exitosamente (${monto:,.0f})', 'success')
+        flash('La factura ha sido eliminada de los reportes de ingresos', 'info')
+        
+    except Exception as e:
+        db.session.rollback()
+        flash(f'❌ Error al eliminar la factura: {str(e)}', 'error')
+        return redirect(url_for('facturacion.ver_factura', factura_id=factura_id))
+    
+    # Redirigir a la lista de facturas
+    return redirect(url_for('facturacion.lista_facturas'))
+
+# ==========================================
+# RUTAS PARA CUENTAS POR COBRAR
+# ==========================================
+
+@bp.route("/cuentas_por_cobrar")
+@login_required
+@lectura_replica
+def cuentas_por_cobrar():
+    """
+    RAZÓN: Vista principal de deudas de clientes.
+    Muestra facturas pendientes de cobro y vencidas.
+    """
+    # Obtener filtros
+    estado = request.args.get('estado', 'todos')  # todos, pendiente, vencida, pagada
+    
+    # Actualizar estados de facturas vencidas automáticamente.
+    # Un solo UPDATE condicional en la base principal: la lista puede venir de
+    # la réplica, y marcar ahí una factura que ya se pagó la devolvería a vencida.
+    from datetime import date
+    hoy = date.today()
+    
+    Factura.query.filter(
+        Factura.estado_pago == 'pendiente',
+        Factura.fecha_vencimiento < hoy
+    ).update({Factura.estado_pago: 'vencida'}, synchronize_session=False)
+    db.session.commit()
+    
+    # Query base
+    query = Factura.query
+    
+    # Aplicar filtros
+    if estado != 'todos':
+        query = query.filter(Factura.estado_pago == estado)
+    
+    # Ordenar por fecha de vencimiento
+    facturas = query.order_by(Factura.fecha_vencimiento).all()
+    
+    # La réplica puede no tener aún el UPDATE: se muestran vencidas igual (sin volver a escribirlas)
+    for factura in facturas:
+        if factura.estado_pago == 'pendiente' and factura.fecha_vencimiento and factura.fecha_vencimiento < hoy:
+            set_committed_value(factura, 'estado_pago', 'vencida')
+    
+    # Calcular totales
+    total_pendiente = sum(f.saldo_pendiente or f.total for f in facturas if f.estado_pago == 'pendiente')
+    total_vencido = sum(f.saldo_pendiente or f.total for f in facturas if f.estado_pago == 'vencida')
+    total_general = total_pendiente + total_vencido
+    
+    # Agrupar por cliente
+    facturas_por_cliente = {}
+    for factura in facturas:
+        if factura.estado_pago in ['pendiente', 'vencida'] and factura.cliente_nombre:
+            cliente = factura.cliente_nombre
+            if cliente not in facturas_por_cliente:
+                facturas_por_cliente[cliente] = {
+                    'cliente': cliente,
+                    'total': 0,
+                    'cantidad': 0
+                }
+            facturas_por_cliente[cliente]['total'] += (factura.saldo_pendiente or factura.total)
+            facturas_por_cliente[cliente]['cantidad'] += 1
+    
+    # ============================================
+    # SOLUCIÓN: AGREGAR datetime AL RETURN
+    # ============================================
+    return render_template("cuentas/cuentas_por_cobrar.html",
+                         facturas=facturas,
+                         total_pendiente=total_pendiente,
+                         total_vencido=total_vencido,
+                         total_general=total_general,
+                         facturas_por_cliente=facturas_por_cliente.values(),
+                         estado_filtro=estado,
+                         datetime=datetime)  # ← AGREGAR ESTA LÍNEA
+                         
+
+@bp.route("/marcar_factura_pagada/<int:factura_id>", methods=["POST"])
+@login_required
+@idempotente
+def marcar_factura_pagada(factura_id):
+    """
+    RAZÓN: Marca una factura como pagada cuando el cliente paga.
+    """
+    factura = Factura.query.get_or_404(factura_id)
+    if factura.estado_pago == 'pagada':
+        # Un reintento o una pestaña vieja no debe sumar otra vez a la caja
+        flash(f'La factura {factura.numero_consecutivo} ya está pagada', 'error')
+        return redirect(request.referrer or url_for('facturacion.cuentas_por_cobrar'))
+    
+    monto_pago = request.form.get('monto_pago', type=float)
+    metodo = request.form.get('metodo_pago')
+    if metodo not in pagos.METODOS:
+        metodo = factura.metodo_pago if factura.metodo_pago in pagos.METODOS else 'efectivo'
+    
+    if not monto_pago or monto_pago < 0:
+        monto_pago = factura.saldo_pendiente or factura.total
+    
+    # Calcular saldo pendiente
+    saldo_actual = factura.saldo_pendiente or factura.total
+    nuevo_saldo = saldo_actual - monto_pago
+    
+    # En caja entra lo que se abona a la factura (lo que sobra es cambio)
+    pagos.registrar_pago(factura, metodo, min(monto_pago, saldo_actual))
+    
+    if nuevo_saldo <= 0:
+        # Pago completo
+        factura.estado_pago = 'pagada'
+        factura.saldo_pendiente = 0
+        factura.fecha_pago_real = datetime.now()
+        flash(f'Factura {factura.numero_consecutivo} marcada como pagada completamente', 'success')
+    else:
+        # Pago parcial
+        factura.saldo_pendiente = nuevo_saldo
+        flash(f'Pago parcial registrado. Saldo pendiente: ${nuevo_saldo:,.2f}', 'success')
+    
+    # El recibo guardado debe dejar de decir "pendiente"
+    regenerar_recibo(factura)
+    db.session.commit()
+    
+    return redirect(request.referrer or url_for('facturacion.cuentas_por_cobrar'))
+
+
+
+
+# ==========================================
+# CIERRE DE CAJA
+# ==========================================
+
+@bp.route("/cierre_caja")
+@login_required
+@lectura_replica
+def cierre_caja():
+    """
+    RAZÓN: Cierre de caja (reporte Z): lo recibido por método de pago en cada
+    día operativo, incluidos los abonos de cuentas por cobrar. Una consulta
+    agrupada sobre PagoFactura (ver pagos.py).
+    """
+    if current_user.rol != 'admin':
+        flash('Solo los administradores pueden ver el cierre de caja', 'error')
+        return redirect(url_for('mesas.dashboard'))
+
+    # Por defecto, el día operativo en curso
+    hoy = dia_operativo(datetime.now())
+    try:
+        fecha_fin = datetime.strptime(request.args.get('fecha_fin'), '%Y-%m-%d').date() if request.args.get('fecha_fin') else hoy
+        fecha_inicio = datetime.strptime(request.args.get('fecha_inicio'), '%Y-%m-%d').date() if request.args.get('fecha_inicio') else fecha_fin
+    except ValueError:
+        flash('Fecha inválida', 'error')
+        return redirect(url_for('facturacion.cierre_caja'))
+    if fecha_inicio > fecha_fin:
+        fecha_inicio, fecha_fin = fecha_fin, fecha_inicio
+    fecha_inicio = max(fecha_inicio, fecha_fin - timedelta(days=366))
+
+    dias, totales = pagos.cierre_caja(fecha_inicio, fecha_fin)
+    metodos = list(pagos.METODOS) + sorted(set(totales['metodos']) - set(pagos.METODOS))
+
+    return render_template("reportes/cierre_caja.html",
+                         dias=dias,
+                         totales=totales,
+                         metodos=metodos,
+                         fecha_inicio=fecha_inicio.strftime('%Y-%m-%d'),
+                         fecha_fin=fecha_fin.strftime('%Y-%m-%d'))
+
+
+@bp.route("/configuracion_restaurante", methods=["GET", "POST"])
+@login_required
+def configuracion_restaurante():
+    """Configurar datos del restaurante"""
+    if current_user.rol != 'admin':
+        flash('Solo los administradores pueden modificar la configuración', 'error')
+        return redirect(url_for('mesas.dashboard'))
+    
+    config = ConfiguracionRestaurante.query.first()
+    
+    if not config:
+        config = ConfiguracionRestaurante()
+        db.session.add(config)
+        db.session.commit()
+    
+    if request.method == "POST":
+        config.nombre = request.form.get("nombre")
+        config.nit = request.form.get("nit")
+        config.direccion = request.form.get("direccion")
+        config.ciudad = request.form.get("ciudad")
+        config.telefono = request.form.get("telefono")
+        config.email = request.form.get("email", "")
+        config.regimen = request.form.get("regimen")
+        config.resolucion_dian = request.form.get("resolucion_dian", "")
+        config.rango_facturacion = request.form.get("rango_facturacion", "")
+        config.iva_porcentaje = request.form.get("iva_porcentaje", 19.0, type=float)
+        config.logo_url = request.form.get("logo_url", "")
+        
+        db.session.commit()
+        flash('Configuración actualizada exitosamente', 'success')
+        return redirect(url_for('facturacion.configuracion_restaurante'))
+    
+    return render_template("configuracion_restaurante.html", config=config, now=datetime.now())
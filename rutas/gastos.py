@@ -0,0 +1,715 @@
+"""
+Rutas de gastos, proveedores, cuentas por pagar, consumo interno y reporte financiero.
+"""
+
+from datetime import datetime, timedelta
+
+from flask import Blueprint, render_template, redirect, url_for, request, flash
+from flask_login import login_required, current_user
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm.attributes import set_committed_value
+
+from extensiones import db
+from modelos import (
+    Usuario,
+    ItemMenu,
+    Factura,
+    Presupuesto,
+    CategoriaGasto,
+    Proveedor,
+    Gasto,
+    ConsumoInterno,
+)
+from idempotencia import idempotente, nueva_clave
+from replica import lectura_replica
+
+bp = Blueprint('gastos', __name__)
+
+# Clave única por formulario contra envíos repetidos (ver idempotencia.py)
+bp.add_app_template_global(nueva_clave, 'clave_idempotencia')
+
+
+# ==========================================
+# RUTAS PARA CONSUMO INTERNO (ADMIN)
+# ==========================================
+@bp.route('/consumo_interno')
+@login_required
+def lista_consumos_internos():
+    if getattr(current_user, 'rol', None) != 'admin':
+        flash('No tienes permisos para ver consumos internos', 'error')
+        return redirect(url_for('mesas.dashboard'))
+
+    fecha = request.args.get('fecha')
+    fecha_inicio = request.args.get('fecha_inicio')
+    fecha_fin = request.args.get('fecha_fin')
+
+    query = ConsumoInterno.query
+
+    # Si se especifica `fecha`, interpretamos el día como [fecha 03:00, fecha+1 03:00)
+    if fecha:
+        try:
+            d = datetime.strptime(fecha, '%Y-%m-%d').date()
+            start = datetime(d.year, d.month, d.day, 3, 0, 0)
+            end = start + timedelta(days=1)
+            query = query.filter(ConsumoInterno.fecha >= start, ConsumoInterno.fecha < end)
+        except ValueError:
+            flash('Fecha inválida', 'error')
+    else:
+        # Si se usa rango, aplicamos cierre diario a las 03:00: fecha_inicio comienza a las 03:00; fecha_fin termina el día siguiente a las 03:00 (exclusivo)
+        if fecha_inicio:
+            try:
+                fi_date = datetime.strptime(fecha_inicio, '%Y-%m-%d').date()
+                start = datetime(fi_date.year, fi_date.month, fi_date.day, 3, 0, 0)
+                query = query.filter(ConsumoInterno.fecha >= start)
+            except ValueError:
+                flash('Fecha inicio inválida', 'error')
+        if fecha_fin:
+            try:
+                ff_date = datetime.strptime(fecha_fin, '%Y-%m-%d').date()
+                end = datetime(ff_date.year, ff_date.month, ff_date.day, 3, 0, 0) + timedelta(days=1)
+                query = query.filter(ConsumoInterno.fecha < end)
+            except ValueError:
+                flash('Fecha fin inválida', 'error')
+
+    try:
+        consumos = query.order_by(ConsumoInterno.fecha.desc()).limit(200).all()
+        total_costo = sum(c.costo * c.cantidad for c in consumos)
+    except OperationalError:
+        # Tabla aún no creada; instrucciones para el desarrollador
+        flash("La tabla 'consumo_interno' no existe. Ejecuta `flask init-db` para crearla.", 'error')
+        return redirect(url_for('mesas.dashboard'))
+
+    return render_template('consumo_interno/lista_consumos.html', consumos=consumos, total_costo=total_costo)
+
+
+@bp.route('/consumo_interno/nuevo', methods=['GET', 'POST'])
+@login_required
+def nuevo_consumo_interno():
+    if getattr(current_user, 'rol', None) != 'admin':
+        flash('No tienes permisos para crear consumos internos', 'error')
+        return redirect(url_for('mesas.dashboard'))
+
+    items = ItemMenu.query.order_by(ItemMenu.nombre).all()
+    users = Usuario.query.order_by(Usuario.nombre).all()
+
+    if request.method == 'POST':
+        item_id = request.form.get('item_id', type=int)
+        usuario_id = request.form.get('usuario_id', type=int)
+        cantidad = request.form.get('cantidad', 1, type=int)
+        costo = request.form.get('costo', 0.0, type=float)
+        notas = request.form.get('notas')
+
+        if not item_id or not usuario_id or cantidad <= 0:
+            flash('Item, usuario o cantidad inválida', 'error')
+            return redirect(url_for('gastos.nuevo_consumo_interno'))
+
+        # Verificar que el usuario seleccionado exista
+        usuario = Usuario.query.get(usuario_id)
+        if not usuario:
+            flash('Usuario seleccionado no existe', 'error')
+            return redirect(url_for('gastos.nuevo_consumo_interno'))
+
+        consumo = ConsumoInterno(item_id=item_id, cantidad=cantidad, costo=costo, usuario_id=usuario_id, notas=notas)
+        db.session.add(consumo)
+        db.session.commit()
+        flash('Consumo interno registrado', 'success')
+        return redirect(url_for('gastos.lista_consumos_internos'))
+
+    return render_template('consumo_interno/nuevo_consumo.html', items=items, users=users) 
+
+
+@bp.route('/consumo_interno/<int:consumo_id>/eliminar', methods=['POST'])
+@login_required
+def eliminar_consumo_interno(consumo_id):
+    if getattr(current_user, 'rol', None) != 'admin':
+        flash('No tienes permisos para eliminar consumos internos', 'error')
+        return redirect(url_for('mesas.dashboard'))
+
+    consumo = ConsumoInterno.query.get_or_404(consumo_id)
+    try:
+        db.session.delete(consumo)
+        db.session.commit()
+        flash('Consumo interno eliminado', 'success')
+    except Exception:
+        db.session.rollback()
+        flash('Error al eliminar consumo interno', 'error')
+
+    return redirect(url_for('gastos.lista_consumos_internos'))
+
+# ==========================================
+# RUTAS PARA GESTIÓN DE GASTOS
+# ==========================================
+
+@bp.route("/gastos")
+@login_required
+@lectura_replica
+def lista_gastos():
+    """
+    RAZÓN: Vista principal de gastos con filtros por fecha y categoría.
+    Permite búsqueda rápida y visualización de totales.
+    """
+    # Obtener parámetros de filtro
+    fecha_inicio = request.args.get('fecha_inicio')
+    fecha_fin = request.args.get('fecha_fin')
+    categoria_id = request.args.get('categoria_id', type=int)
+    
+    # Query base
+    query = Gasto.query
+    
+    # Aplicar filtros
+    if fecha_inicio:
+        try:
+            # Empezamos el día a las 03:00 (cierre a partir de las 03:00)
+            fecha_inicio_obj = datetime.strptime(fecha_inicio, '%Y-%m-%d').replace(hour=3, minute=0, second=0)
+            query = query.filter(Gasto.fecha >= fecha_inicio_obj)
+        except ValueError:
+            flash('Fecha de inicio inválida', 'error')
+    
+    if fecha_fin:
+        try:
+            # La fecha de fin será el inicio del día siguiente a las 03:00 (end-exclusive)
+            fecha_fin_obj = datetime.strptime(fecha_fin, '%Y-%m-%d').replace(hour=3, minute=0, second=0) + timedelta(days=1)
+            query = query.filter(Gasto.fecha < fecha_fin_obj)
+        except ValueError:
+            flash('Fecha de fin inválida', 'error')
+    
+    if categoria_id:
+        query = query.filter(Gasto.categoria_id == categoria_id)
+    
+    # Obtener gastos ordenados por fecha descendente
+    gastos = query.order_by(Gasto.fecha.desc()).all()
+    
+    # Calcular totales
+    total_gastos = sum(g.monto for g in gastos)
+    
+    # Totales por categoría (para el dashboard)
+    totales_por_categoria = db.session.query(
+        CategoriaGasto.nombre,
+        CategoriaGasto.color,
+        db.func.sum(Gasto.monto).label('total')
+    ).join(Gasto).group_by(CategoriaGasto.id).all()
+    
+    # Obtener todas las categorías para el filtro
+    categorias = CategoriaGasto.query.filter_by(activa=True).order_by(CategoriaGasto.nombre).all()
+    
+    return render_template("gastos/lista_gastos.html",
+                         gastos=gastos,
+                         total_gastos=total_gastos,
+                         totales_por_categoria=totales_por_categoria,
+                         categorias=categorias,
+                         fecha_inicio=fecha_inicio,
+                         fecha_fin=fecha_fin,
+                         categoria_id=categoria_id)
+
+
+# ==========================================
+# ACTUALIZAR RUTA DE NUEVO GASTO
+# ==========================================
+
+# REEMPLAZA tu ruta actual de nuevo_gasto con esta versión mejorada:
+
+@bp.route("/gasto/nuevo", methods=["GET", "POST"])
+@login_required
+@idempotente
+def nuevo_gasto():
+    """
+    RAZÓN: Formulario para registrar un nuevo gasto.
+    Ahora incluye estado de pago y fecha de vencimiento.
+    """
+    if current_user.rol == 'cocina':
+        flash('No tienes permisos para registrar gastos', 'error')
+        return redirect(url_for('mesas.dashboard'))
+    
+    if request.method == "POST":
+        try:
+            # Obtener datos del formulario
+            fecha_str = request.form.get("fecha")
+            concepto = request.form.get("concepto")
+            monto = request.form.get("monto", type=float)
+            categoria_id = request.form.get("categoria_id", type=int)
+            proveedor_id = request.form.get("proveedor_id", type=int) or None
+            metodo_pago = request.form.get("metodo_pago", "efectivo")
+            numero_factura = request.form.get("numero_factura", "")
+            notas = request.form.get("notas", "")
+            
+            # NUEVOS CAMPOS
+            estado_pago = request.form.get("estado_pago", "pagado")
+            fecha_vencimiento_str = request.form.get("fecha_vencimiento")
+            
+            # Validaciones básicas
+            if not concepto or monto <= 0:
+                flash('Debes completar todos los campos requeridos', 'error')
+                return redirect(url_for('gastos.nuevo_gasto'))
+            
+            # Convertir fecha
+            if fecha_str:
+                fecha = datetime.strptime(fecha_str, '%Y-%m-%dT%H:%M')
+            else:
+                fecha = datetime.now()
+            
+            # Convertir fecha de vencimiento
+            fecha_vencimiento = None
+            if fecha_vencimiento_str and estado_pago == 'pendiente':
+                fecha_vencimiento = datetime.strptime(fecha_vencimiento_str, '%Y-%m-%d').date()
+            
+            # Si está pagado, la fecha de pago es ahora
+            fecha_pago_real = datetime.now() if estado_pago == 'pagado' else None
+            
+            # Crear gasto
+            gasto = Gasto(
+                fecha=fecha,
+                concepto=concepto,
+                monto=monto,
+                categoria_id=categoria_id,
+                proveedor_id=proveedor_id,
+                usuario_id=current_user.id,
+                metodo_pago=metodo_pago,
+                numero_factura=numero_factura,
+                notas=notas,
+                estado_pago=estado_pago,
+                fecha_vencimiento=fecha_vencimiento,
+                fecha_pago_real=fecha_pago_real
+            )
+            
+            db.session.add(gasto)
+            db.session.commit()
+            
+            # Verificar si se excedió el presupuesto
+            verificar_presupuesto(categoria_id)
+            
+            flash(f'Gasto de ${monto:,.2f} registrado exitosamente', 'success')
+            return redirect(url_for('gastos.lista_gastos'))
+            
+        except Exception as e:
+            db.session.rollback()
+            flash(f'Error al registrar el gasto: {str(e)}', 'error')
+            return redirect(url_for('gastos.nuevo_gasto'))
+    
+    # GET: Mostrar formulario
+    categorias = CategoriaGasto.query.filter_by(activa=True).order_by(CategoriaGasto.nombre).all()
+    proveedores = Proveedor.query.filter_by(activo=True).order_by(Proveedor.nombre).all()
+    
+    return render_template("gastos/nuevo_gasto.html",
+                         categorias=categorias,
+                         proveedores=proveedores,
+                         now=datetime.now())
+
+
+# Función auxiliar para verificar presupuestos
+def verificar_presupuesto(categoria_id):
+    """
+    RAZÓN: Verifica si se excedió el presupuesto de una categoría
+    y genera alertas en flash messages.
+    """
+    from datetime import datetime
+    mes_actual = datetime.now().month
+    anio_actual = datetime.now().year
+    
+    presupuesto = Presupuesto.query.filter_by(
+        categoria_id=categoria_id,
+        mes=mes_actual,
+        anio=anio_actual,
+        activo=True
+    ).first()
+    
+    if presupuesto:
+        porcentaje = presupuesto.porcentaje_usado
+        categoria = presupuesto.categoria.nombre
+        
+        if porcentaje >= 100:
+            flash(f'⚠️ ALERTA: Presupuesto de "{categoria}" EXCEDIDO ({porcentaje:.1f}%)', 'error')
+        elif porcentaje >= presupuesto.alerta_porcentaje:
+            flash(f'⚠️ Advertencia: Presupuesto de "{categoria}" al {porcentaje:.1f}%', 'error')
+
+
+
+@bp.route("/gasto/editar/<int:gasto_id>", methods=["GET", "POST"])
+@login_required
+def editar_gasto(gasto_id):
+    """
+    RAZÓN: Permite corregir errores en gastos registrados.
+    Solo admin puede editar gastos de otros usuarios.
+    """
+    gasto = Gasto.query.get_or_404(gasto_id)
+    
+    # Verificar permisos
+    if current_user.rol != 'admin' and gasto.usuario_id != current_user.id:
+        flash('No tienes permisos para editar este gasto', 'error')
+        return redirect(url_for('gastos.lista_gastos'))
+    
+    if request.method == "POST":
+        try:
+            fecha_str = request.form.get("fecha")
+            gasto.concepto = request.form.get("concepto")
+            gasto.monto = request.form.get("monto", type=float)
+            gasto.categoria_id = request.form.get("categoria_id", type=int)
+            gasto.proveedor_id = request.form.get("proveedor_id", type=int) or None
+            gasto.metodo_pago = request.form.get("metodo_pago")
+            gasto.numero_factura = request.form.get("numero_factura", "")
+            gasto.notas = request.form.get("notas", "")
+            
+            if fecha_str:
+                gasto.fecha = datetime.strptime(fecha_str, '%Y-%m-%dT%H:%M')
+            
+            db.session.commit()
+            flash('Gasto actualizado exitosamente', 'success')
+            return redirect(url_for('gastos.lista_gastos'))
+            
+        except Exception as e:
+            db.session.rollback()
+            flash(f'Error al actualizar: {str(e)}', 'error')
+    
+    categorias = CategoriaGasto.query.filter_by(activa=True).order_by(CategoriaGasto.nombre).all()
+    proveedores = Proveedor.query.filter_by(activo=True).order_by(Proveedor.nombre).all()
+    
+    return render_template("gastos/editar_gasto.html",
+                         gasto=gasto,
+                         categorias=categorias,
+                         proveedores=proveedores)
+
+
+@bp.route("/gasto/eliminar/<int:gasto_id>", methods=["POST"])
+@login_required
+def eliminar_gasto(gasto_id):
+    """
+    RAZÓN: Solo admin puede eliminar gastos para mantener integridad.
+    Se elimina permanentemente (no soft delete).
+    """
+    if current_user.rol != 'admin':
+        flash('Solo administradores pueden eliminar gastos', 'error')
+        return redirect(url_for('gastos.lista_gastos'))
+    
+    gasto = Gasto.query.get_or_404(gasto_id)
+    monto = gasto.monto
+    concepto = gasto.concepto
+    
+    db.session.delete(gasto)
+    db.session.commit()
+    
+    flash(f'Gasto eliminado: {concepto} (${monto:,.2f})', 'success')
+    return redirect(url_for('gastos.lista_gastos'))
+
+# ==========================================
+# RUTAS PARA CUENTAS POR PAGAR
+# ==========================================
+
+@bp.route("/cuentas_por_pagar")
+@login_required
+@lectura_replica
+def cuentas_por_pagar():
+    """
+    RAZÓN: Vista principal de deudas con proveedores.
+    Muestra gastos pendientes de pago y vencidos.
+    """
+    # Obtener filtros
+    estado = request.args.get('estado', 'todos')
+    proveedor_id = request.args.get('proveedor_id', type=int)
+    
+    # Actualizar estados de gastos vencidos automáticamente.
+    # Un solo UPDATE condicional en la base principal: la lista puede venir de
+    # la réplica, y marcar ahí un gasto que ya se pagó lo devolvería a vencido.
+    from datetime import date
+    hoy = date.today()
+    
+    Gasto.query.filter(
+        Gasto.estado_pago == 'pendiente',
+        Gasto.fecha_vencimiento < hoy
+    ).update({Gasto.estado_pago: 'vencido'}, synchronize_session=False)
+    db.session.commit()
+    
+    # Query base
+    query = Gasto.query
+    
+    # Aplicar filtros
+    if estado != 'todos':
+        query = query.filter(Gasto.estado_pago == estado)
+    
+    if proveedor_id:
+        query = query.filter(Gasto.proveedor_id == proveedor_id)
+    
+    # Ordenar por fecha de vencimiento
+    gastos = query.order_by(Gasto.fecha_vencimiento).all()
+    
+    # La réplica puede no tener aún el UPDATE: se muestran vencidos igual (sin volver a escribirlos)
+    for gasto in gastos:
+        if gasto.estado_pago == 'pendiente' and gasto.fecha_vencimiento and gasto.fecha_vencimiento < hoy:
+            set_committed_value(gasto, 'estado_pago', 'vencido')
+    
+    # Calcular totales
+    total_pendiente = sum(g.monto for g in gastos if g.estado_pago == 'pendiente')
+    total_vencido = sum(g.monto for g in gastos if g.estado_pago == 'vencido')
+    total_general = total_pendiente + total_vencido
+    
+    # Agrupar por proveedor
+    gastos_por_proveedor = {}
+    for gasto in gastos:
+        if gasto.estado_pago in ['pendiente', 'vencido']:
+            if gasto.proveedor:
+                prov_id = gasto.proveedor.id
+                if prov_id not in gastos_por_proveedor:
+                    gastos_por_proveedor[prov_id] = {
+                        'proveedor': gasto.proveedor,
+                        'total': 0,
+                        'cantidad': 0
+                    }
+                gastos_por_proveedor[prov_id]['total'] += gasto.monto
+                gastos_por_proveedor[prov_id]['cantidad'] += 1
+    
+    # Obtener proveedores para filtro
+    proveedores = Proveedor.query.filter_by(activo=True).order_by(Proveedor.nombre).all()
+    
+    # ============================================
+    # SOLUCIÓN: AGREGAR datetime AL RETURN
+    # ============================================
+    return render_template("cuentas/cuentas_por_pagar.html",
+                         gastos=gastos,
+                         total_pendiente=total_pendiente,
+                         total_vencido=total_vencido,
+                         total_general=total_general,
+                         gastos_por_proveedor=gastos_por_proveedor.values(),
+                         proveedores=proveedores,
+                         estado_filtro=estado,
+                         proveedor_filtro=proveedor_id,
+                         datetime=datetime)  # ← AGREGAR ESTA LÍNEA
+
+
+@bp.route("/marcar_gasto_pagado/<int:gasto_id>", methods=["POST"])
+@login_required
+def marcar_gasto_pagado(gasto_id):
+    """
+    RAZÓN: Marca un gasto como pagado cuando realmente se paga.
+    """
+    if current_user.rol not in ['admin', 'mesero']:
+        flash('No tienes permisos para esta acción', 'error')
+        return redirect(url_for('gastos.cuentas_por_pagar'))
+    
+    gasto = Gasto.query.get_or_404(gasto_id)
+    
+    gasto.estado_pago = 'pagado'
+    gasto.fecha_pago_real = datetime.now()
+    
+    db.session.commit()
+    
+    flash(f'Gasto marcado como pagado: {gasto.concepto}', 'success')
+    return redirect(request.referrer or url_for('gastos.cuentas_por_pagar'))
+
+
+@bp.route("/gasto/editar_vencimiento/<int:gasto_id>", methods=["POST"])
+@login_required
+def editar_vencimiento_gasto(gasto_id):
+    """
+    RAZÓN: Permite cambiar la fecha de vencimiento de un gasto pendiente.
+    """
+    if current_user.rol != 'admin':
+        flash('Solo administradores pueden modificar vencimientos', 'error')
+        return redirect(url_for('gastos.cuentas_por_pagar'))
+    
+    gasto = Gasto.query.get_or_404(gasto_id)
+    
+    nueva_fecha = request.form.get('fecha_vencimiento')
+    if nueva_fecha:
+        gasto.fecha_vencimiento = datetime.strptime(nueva_fecha, '%Y-%m-%d').date()
+        db.session.commit()
+        flash('Fecha de vencimiento actualizada', 'success')
+    
+    return redirect(url_for('gastos.cuentas_por_pagar'))
+
+
+
+
+# ==========================================
+# RUTAS PARA PROVEEDORES
+# ==========================================
+
+@bp.route("/proveedores")
+@login_required
+def lista_proveedores():
+    """RAZÓN: Gestionar base de datos de proveedores"""
+    proveedores = Proveedor.query.order_by(Proveedor.nombre).all()
+    return render_template("gastos/lista_proveedores.html", proveedores=proveedores)
+
+
+@bp.route("/proveedor/nuevo", methods=["GET", "POST"])
+@login_required
+def nuevo_proveedor():
+    """RAZÓN: Agregar nuevos proveedores al sistema"""
+    if request.method == "POST":
+        proveedor = Proveedor(
+            nombre=request.form.get("nombre"),
+            nit=request.form.get("nit", ""),
+            telefono=request.form.get("telefono", ""),
+            email=request.form.get("email", ""),
+            direccion=request.form.get("direccion", ""),
+            notas=request.form.get("notas", "")
+        )
+        
+        db.session.add(proveedor)
+        db.session.commit()
+        
+        flash(f'Proveedor {proveedor.nombre} agregado', 'success')
+        return redirect(url_for('gastos.lista_proveedores'))
+    
+    return render_template("gastos/nuevo_proveedor.html")
+
+
+@bp.route("/proveedor/editar/<int:proveedor_id>", methods=["GET", "POST"])
+@login_required
+def editar_proveedor(proveedor_id):
+    """RAZÓN: Actualizar información de proveedores"""
+    proveedor = Proveedor.query.get_or_404(proveedor_id)
+    
+    if request.method == "POST":
+        proveedor.nombre = request.form.get("nombre")
+        proveedor.nit = request.form.get("nit", "")
+        proveedor.telefono = request.form.get("telefono", "")
+        proveedor.email = request.form.get("email", "")
+        proveedor.direccion = request.form.get("direccion", "")
+        proveedor.notas = request.form.get("notas", "")
+        
+        db.session.commit()
+        flash('Proveedor actualizado', 'success')
+        return redirect(url_for('gastos.lista_proveedores'))
+    
+    return render_template("gastos/editar_proveedor.html", proveedor=proveedor)
+
+
+@bp.route("/proveedor/toggle/<int:proveedor_id>")
+@login_required
+def toggle_proveedor(proveedor_id):
+    """RAZÓN: Activar/desactivar proveedores sin eliminarlos"""
+    if current_user.rol != 'admin':
+        flash('Solo administradores pueden modificar proveedores', 'error')
+        return redirect(url_for('gastos.lista_proveedores'))
+    
+    proveedor = Proveedor.query.get_or_404(proveedor_id)
+    proveedor.activo = not proveedor.activo
+    db.session.commit()
+    
+    estado = "activado" if proveedor.activo else "desactivado"
+    flash(f'Proveedor {proveedor.nombre} {estado}', 'success')
+    return redirect(url_for('gastos.lista_proveedores'))
+
+
+# ==========================================
+# REPORTES FINANCIEROS
+# ==========================================
+
+@bp.route("/reportes/financiero")
+@login_required
+@lectura_replica
+def reporte_financiero():
+    """
+    RAZÓN: Vista consolidada de ingresos vs gastos.
+    El reporte más importante para tomar decisiones.
+    """
+    # Obtener rango de fechas (por defecto, mes actual)
+    fecha_inicio = request.args.get('fecha_inicio')
+    fecha_fin = request.args.get('fecha_fin')
+    
+    if not fecha_inicio:
+        # Primer día del mes actual
+        hoy = datetime.now()
+        fecha_inicio = hoy.replace(day=1).strftime('%Y-%m-%d')
+    
+    if not fecha_fin:
+        # Hoy
+        fecha_fin = datetime.now().strftime('%Y-%m-%d')
+    
+    # Convertir a objetos datetime
+    # IMPORTANTE: Definimos el inicio del día a las 03:00 (cierre a partir de las 03:00)
+    fecha_inicio_obj = datetime.strptime(fecha_inicio, '%Y-%m-%d').replace(hour=3, minute=0, second=0)
+    # Fecha fin es el inicio del día siguiente a las 03:00 (end-exclusive)
+    fecha_fin_obj = datetime.strptime(fecha_fin, '%Y-%m-%d').replace(hour=3, minute=0, second=0) + timedelta(days=1)
+
+    # INGRESOS: Sumar facturas del período (end-exclusive: >= inicio, < fin)
+    ingresos = db.session.query(
+        db.func.sum(Factura.total)
+    ).filter(
+        Factura.fecha_emision >= fecha_inicio_obj,
+        Factura.fecha_emision < fecha_fin_obj
+    ).scalar() or 0
+    
+    # GASTOS: Sumar gastos del período (end-exclusive)
+    gastos_total = db.session.query(
+        db.func.sum(Gasto.monto)
+    ).filter(
+        Gasto.fecha >= fecha_inicio_obj,
+        Gasto.fecha < fecha_fin_obj
+    ).scalar() or 0
+    
+    # UTILIDAD = INGRESOS - GASTOS
+    utilidad = ingresos - gastos_total
+    margen = (utilidad / ingresos * 100) if ingresos > 0 else 0
+    
+    # Gastos por categoría - CONVERTIR A LISTA DE TUPLAS
+    gastos_por_categoria_raw = db.session.query(
+        CategoriaGasto.nombre,
+        CategoriaGasto.color,
+        db.func.sum(Gasto.monto).label('total'),
+        db.func.count(Gasto.id).label('cantidad')
+    ).join(Gasto).filter(
+        Gasto.fecha >= fecha_inicio_obj,
+        Gasto.fecha < fecha_fin_obj
+    ).group_by(CategoriaGasto.id).order_by(db.desc('total')).all()
+    
+    # SOLUCIÓN: Convertir Row objects a lista de listas para JSON
+    gastos_por_categoria = []
+    gastos_por_categoria_tabla = []
+    
+    for row in gastos_por_categoria_raw:
+        # Para el gráfico (formato JSON)
+        gastos_por_categoria.append([
+            row[0],  # nombre
+            row[1],  # color
+            float(row[2])  # total
+        ])
+        
+        # Para la tabla HTML (objeto completo)
+        gastos_por_categoria_tabla.append({
+            'nombre': row[0],
+            'color': row[1],
+            'total': float(row[2]),
+            'cantidad': row[3]
+        })
+    
+    # Evolución diaria de ingresos y gastos (para gráfico)
+    # Cada "día" va desde 03:00 del día hasta 03:00 del día siguiente
+    dias_rango = (fecha_fin_obj - fecha_inicio_obj).days
+    evolucion_diaria = []
+    
+    for i in range(dias_rango):
+        dia_inicio = fecha_inicio_obj + timedelta(days=i)
+        dia_fin = dia_inicio + timedelta(days=1)
+        
+        ingresos_dia = db.session.query(
+            db.func.sum(Factura.total)
+        ).filter(
+            Factura.fecha_emision >= dia_inicio,
+            Factura.fecha_emision < dia_fin
+        ).scalar() or 0
+        
+        gastos_dia = db.session.query(
+            db.func.sum(Gasto.monto)
+        ).filter(
+            Gasto.fecha >= dia_inicio,
+            Gasto.fecha < dia_fin
+        ).scalar() or 0
+        
+        evolucion_diaria.append({
+            'fecha': dia_inicio.strftime('%Y-%m-%d'),
+            'ingresos': float(ingresos_dia),
+            'gastos': float(gastos_dia),
+            'utilidad': float(ingresos_dia - gastos_dia)
+        })
+    
+    return render_template("reportes/financiero.html",
+                         fecha_inicio=fecha_inicio,
+                         fecha_fin=fecha_fin,
+                         ingresos=float(ingresos),
+                         gastos_total=float(gastos_total),
+                         utilidad=float(utilidad),
+                         margen=float(margen),
+                         gastos_por_categoria=gastos_por_categoria,  # Para JSON/gráficos
+                         gastos_por_categoria_tabla=gastos_por_categoria_tabla,  # Para tabla HTML
+                         evolucion_diaria=evolucion_diaria,
+                         now=datetime.now())
@@ -0,0 +1,184 @@
+"""
+Rutas del inventario: ingredientes, entradas y conteos de existencias, y recetas de los platillos.
+"""
+
+from flask import Blueprint, render_template, redirect, url_for, request, flash
+from flask_login import login_required, current_user
+
+from extensiones import db
+from modelos import Ingrediente, Receta, ItemMenu
+import inventario
+
+bp = Blueprint('inventario', __name__)
+
+TIPOS_AJUSTE = ('entrada', 'salida', 'conteo')
+
+
+def _solo_admin():
+    """Redirección si el usuario no es administrador; None si lo es"""
+    if current_user.rol != 'admin':
+        flash('Solo los administradores pueden gestionar el inventario', 'error')
+        return redirect(url_for('mesas.dashboard'))
+    return None
+
+
+def _nombre_duplicado(nombre, excepto_id=None):
+    consulta = Ingrediente.query.filter(db.func.lower(Ingrediente.nombre) == nombre.lower())
+    if excepto_id is not None:
+        consulta = consulta.filter(Ingrediente.id != excepto_id)
+    return consulta.first() is not None
+
+
+# ==========================================
+# INGREDIENTES
+# ==========================================
+
+@bp.route("/inventario", methods=["GET", "POST"])
+@login_required
+def lista_ingredientes():
+    redireccion = _solo_admin()
+    if redireccion:
+        return redireccion
+
+    if request.method == "POST":
+        nombre = request.form.get("nombre", "").strip()
+        unidad = request.form.get("unidad", "").strip() or 'unidad'
+        stock = request.form.get("stock", 0, type=float)
+        stock_minimo = request.form.get("stock_minimo", 0, type=float)
+        if not nombre:
+            flash('El nombre del ingrediente es obligatorio', 'error')
+        elif _nombre_duplicado(nombre):
+            flash(f'Ya existe el ingrediente "{nombre}"', 'error')
+        else:
+            db.session.add(Ingrediente(nombre=nombre, unidad=unidad, stock=stock, stock_minimo=stock_minimo))
+            db.session.commit()
+            flash(f'Ingrediente "{nombre}" agregado', 'success')
+        return redirect(url_for('inventario.lista_ingredientes'))
+
+    ingredientes = Ingrediente.query.order_by(Ingrediente.activo.desc(), Ingrediente.nombre).all()
+    # Cuántos platillos usa cada ingrediente, en una consulta
+    platillos_por_ingrediente = dict(db.session.execute(
+        db.select(Receta.ingrediente_id, db.func.count(Receta.id))
+        .join(Ingrediente, Ingrediente.id == Receta.ingrediente_id)
+        .group_by(Receta.ingrediente_id)
+    ).all())
+    agotados = ItemMenu.query.filter_by(agotado=True).order_by(ItemMenu.nombre).all()
+
+    return render_template("inventario/ingredientes.html",
+                         ingredientes=ingredientes,
+                         platillos_por_ingrediente=platillos_por_ingrediente,
+                         agotados=agotados)
+
+
+@bp.route("/inventario/<int:ingrediente_id>/ajustar", methods=["POST"])
+@login_required
+def ajustar_ingrediente(ingrediente_id):
+    """
+    RAZÓN: Entradas de mercancía, salidas (merma) y conteos físicos. Se
+    aplican con un UPDATE atómico (ver inventario.ajustar_stock) para no
+    perder los descuentos de los pedidos que llegan al mismo tiempo.
+    """
+    redireccion = _solo_admin()
+    if redireccion:
+        return redireccion
+
+    ingrediente = Ingrediente.query.get_or_404(ingrediente_id)
+    tipo = request.form.get("tipo")
+    cantidad = request.form.get("cantidad", type=float)
+    if tipo not in TIPOS_AJUSTE or cantidad is None or cantidad < 0:
+        flash('Ajuste inválido', 'error')
+        return redirect(url_for('inventario.lista_ingredientes'))
+
+    if tipo == 'conteo':
+        stock = inventario.ajustar_stock(ingrediente, conteo=cantidad)
+    else:
+        stock = inventario.ajustar_stock(ingrediente, cantidad=cantidad if tipo == 'entrada' else -cantidad)
+    db.session.commit()
+
+    flash(f'{ingrediente.nombre}: {stock:g} {ingrediente.unidad} en existencia', 'success')
+    return redirect(url_for('inventario.lista_ingredientes'))
+
+
+@bp.route("/inventario/<int:ingrediente_id>/editar", methods=["POST"])
+@login_required
+def editar_ingrediente(ingrediente_id):
+    redireccion = _solo_admin()
+    if redireccion:
+        return redireccion
+
+    ingrediente = Ingrediente.query.get_or_404(ingrediente_id)
+    nombre = request.form.get("nombre", "").strip()
+    if not nombre:
+        flash('El nombre del ingrediente es obligatorio', 'error')
+        return redirect(url_for('inventario.lista_ingredientes'))
+    if _nombre_duplicado(nombre, excepto_id=ingrediente.id):
+        flash(f'Ya existe el ingrediente "{nombre}"', 'error')
+        return redirect(url_for('inventario.lista_ingredientes'))
+
+    activo = request.form.get("activo") == "on"
+    cambio_activo = activo != ingrediente.activo
+    ingrediente.nombre = nombre
+    ingrediente.unidad = request.form.get("unidad", "").strip() or 'unidad'
+    ingrediente.stock_minimo = request.form.get("stock_minimo", 0, type=float)
+    ingrediente.activo = activo
+    if cambio_activo:
+        # Un ingrediente inactivo no agota platillos
+        inventario.reevaluar(ingrediente_ids=[ingrediente.id])
+    db.session.commit()
+
+    flash(f'Ingrediente "{nombre}" actualizado', 'success')
+    return redirect(url_for('inventario.lista_ingredientes'))
+
+
+# ==========================================
+# RECETAS
+# ==========================================
+
+@bp.route("/inventario/receta/<int:item_id>", methods=["GET", "POST"])
+@login_required
+def receta_item(item_id):
+    """Ingredientes por porción de un platillo. Cantidad 0 quita el ingrediente."""
+    redireccion = _solo_admin()
+    if redireccion:
+        return redireccion
+
+    item = ItemMenu.query.get_or_404(item_id)
+
+    if request.method == "POST":
+        ingrediente = Ingrediente.query.get_or_404(request.form.get("ingrediente_id", type=int))
+        cantidad = request.form.get("cantidad", 0, type=float)
+        linea = Receta.query.filter_by(item_menu_id=item.id, ingrediente_id=ingrediente.id).first()
+        if cantidad <= 0:
+            if linea:
+                db.session.delete(linea)
+            mensaje = f'{ingrediente.nombre} quitado de la receta'
+        elif linea:
+            linea.cantidad = cantidad
+            mensaje = f'{ingrediente.nombre}: {cantidad:g} {ingrediente.unidad} por porción'
+        else:
+            db.session.add(Receta(item_menu_id=item.id, ingrediente_id=ingrediente.id, cantidad=cantidad))
+            mensaje = f'{ingrediente.nombre}: {cantidad:g} {ingrediente.unidad} por porción'
+        inventario.reevaluar(item_ids=[item.id])
+        db.session.commit()
+        flash(mensaje, 'success')
+        return redirect(url_for('inventario.receta_item', item_id=item.id))
+
+    lineas = (
+        Receta.query.filter_by(item_menu_id=item.id)
+        .join(Ingrediente)
+        .options(db.contains_eager(Receta.ingrediente))
+        .order_by(Ingrediente.nombre)
+        .all()
+    )
+    ingredientes = Ingrediente.query.filter_by(activo=True).order_by(Ingrediente.nombre).all()
+    # Porciones que alcanzan con las existencias actuales
+    porciones = min(
+        (int(linea.ingrediente.stock // linea.cantidad) for linea in lineas if linea.ingrediente.activo),
+        default=None,
+    )
+
+    return render_template("inventario/receta.html",
+                         item=item,
+                         lineas=lineas,
+                         ingredientes=ingredientes,
+                         porciones=porciones)
@@ -0,0 +1,174 @@
+"""
+Rutas del menú: menú público y administración de categorías y platillos.
+"""
+
+from flask import Blueprint, render_template, redirect, url_for, request, flash
+from flask_login import login_required, current_user
+
+from extensiones import db
+from modelos import CategoriaMenu, ItemMenu, Pedido, ItemDomicilio
+from busqueda_menu import invalidar_indice
+
+bp = Blueprint('menu', __name__)
+
+
+# =========================
+# RUTAS DEL MENÚ PÚBLICO
+# =========================
+
+@bp.route("/menu")
+def menu_publico():
+    """Menú público accesible sin login"""
+    categorias = CategoriaMenu.query.filter_by(activa=True).order_by(CategoriaMenu.orden).all()
+    return render_template("menu_publico.html", categorias=categorias)
+
+@bp.route("/administrar_menu")
+@login_required
+def administrar_menu():
+    """Panel de administración del menú"""
+    if current_user.rol != 'admin':
+        flash('Solo los administradores pueden gestionar el menú', 'error')
+        return redirect(url_for('mesas.dashboard'))
+    
+    categorias = CategoriaMenu.query.order_by(CategoriaMenu.orden).all()
+    items = ItemMenu.query.order_by(ItemMenu.categoria_id, ItemMenu.orden).all()
+    
+    return render_template("administrar_menu.html", categorias=categorias, items=items)
+
+@bp.route("/agregar_categoria", methods=["POST"])
+@login_required
+def agregar_categoria():
+    if current_user.rol != 'admin':
+        flash('Solo los administradores pueden agregar categorías', 'error')
+        return redirect(url_for('mesas.dashboard'))
+    
+    nombre = request.form.get("nombre")
+    orden = request.form.get("orden", 0, type=int)
+    
+    categoria = CategoriaMenu(nombre=nombre, orden=orden)
+    db.session.add(categoria)
+    db.session.commit()
+    invalidar_indice()
+    
+    flash(f'Categoría "{nombre}" agregada exitosamente', 'success')
+    return redirect(url_for('menu.administrar_menu'))
+
+@bp.route("/agregar_item", methods=["POST"])
+@login_required
+def agregar_item():
+    if current_user.rol != 'admin':
+        flash('Solo los administradores pueden agregar items', 'error')
+        return redirect(url_for('mesas.dashboard'))
+    
+    nombre = request.form.get("nombre")
+    descripcion = request.form.get("descripcion", "")
+    precio = request.form.get("precio", type=float)
+    categoria_id = request.form.get("categoria_id", type=int)
+    imagen_url = request.form.get("imagen_url", "")
+    orden = request.form.get("orden", 0, type=int)
+    
+    item = ItemMenu(
+        nombre=nombre,
+        descripcion=descripcion,
+        precio=precio,
+        categoria_id=categoria_id,
+        imagen_url=imagen_url,
+        orden=orden
+    )
+    
+    db.session.add(item)
+    db.session.commit()
+    invalidar_indice()
+    
+    flash(f'Platillo "{nombre}" agregado exitosamente', 'success')
+    return redirect(url_for('menu.administrar_menu'))
+
+@bp.route("/editar_item/<int:item_id>", methods=["POST"])
+@login_required
+def editar_item(item_id):
+    if current_user.rol != 'admin':
+        flash('Solo los administradores pueden editar items', 'error')
+        return redirect(url_for('mesas.dashboard'))
+    
+    item = ItemMenu.query.get_or_404(item_id)
+    
+    item.nombre = request.form.get("nombre")
+    item.descripcion = request.form.get("descripcion", "")
+    item.precio = request.form.get("precio", type=float)
+    item.categoria_id = request.form.get("categoria_id", type=int)
+    item.imagen_url = request.form.get("imagen_url", "")
+    item.orden = request.form.get("orden", 0, type=int)
+    
+    db.session.commit()
+    invalidar_indice()
+    
+    flash(f'Platillo "{item.nombre}" actualizado', 'success')
+    return redirect(url_for('menu.administrar_menu'))
+
+@bp.route("/toggle_item/<int:item_id>")
+@login_required
+def toggle_item(item_id):
+    if current_user.rol != 'admin':
+        flash('Solo los administradores pueden modificar items', 'error')
+        return redirect(url_for('mesas.dashboard'))
+    
+    item = ItemMenu.query.get_or_404(item_id)
+    item.disponible = not item.disponible
+    # Lo decidió el administrador: el inventario ya no lo vuelve a mostrar solo
+    item.agotado = False
+    db.session.commit()
+    invalidar_indice()
+    
+    estado = "disponible" if item.disponible else "no disponible"
+    flash(f'"{item.nombre}" marcado como {estado}', 'success')
+    return redirect(url_for('menu.administrar_menu'))
+
+@bp.route("/eliminar_item/<int:item_id>", methods=["POST"])
+@login_required
+def eliminar_item(item_id):
+    if current_user.rol != 'admin':
+        flash('Solo los administradores pueden eliminar items', 'error')
+        return redirect(url_for('mesas.dashboard'))
+    
+    item = ItemMenu.query.get_or_404(item_id)
+    nombre = item.nombre
+    
+    # Con ventas registradas se conserva para el historial y los reportes
+    tiene_ventas = db.session.execute(db.select(
+        db.select(Pedido.id).where(Pedido.item_menu_id == item_id).exists()
+        | db.select(ItemDomicilio.id).where(ItemDomicilio.item_menu_id == item_id).exists()
+    )).scalar()
+    if tiene_ventas:
+        item.disponible = False
+        item.agotado = False
+        db.session.commit()
+        invalidar_indice()
+        flash(f'"{nombre}" tiene ventas registradas; se marcó como no disponible en lugar de eliminarlo', 'error')
+        return redirect(url_for('menu.administrar_menu'))
+    
+    db.session.delete(item)
+    db.session.commit()
+    invalidar_indice()
+    
+    flash(f'"{nombre}" eliminado del menú', 'success')
+    return redirect(url_for('menu.administrar_menu'))
+
+@bp.route("/eliminar_categoria/<int:categoria_id>", methods=["POST"])
+@login_required
+def eliminar_categoria(categoria_id):
+    if current_user.rol != 'admin':
+        flash('Solo los administradores pueden eliminar categorías', 'error')
+        return redirect(url_for('mesas.dashboard'))
+    
+    categoria = CategoriaMenu.query.get_or_404(categoria_id)
+    
+    if categoria.items:
+        flash(f'No se puede eliminar "{categoria.nombre}" porque tiene platillos asociados', 'error')
+    else:
+        nombre = categoria.nombre
+        db.session.delete(categoria)
+        db.session.commit()
+        invalidar_indice()
+        flash(f'Categoría "{nombre}" eliminada', 'success')
+    
+    return redirect(url_for('menu.administrar_menu'))
@@ -0,0 +1,510 @@
+"""
+Rutas de mesas y pedidos: dashboard, toma de pedidos, historial y administración de mesas.
+"""
+
+from datetime import datetime, timedelta
+
+from flask import Blueprint, render_template, redirect, url_for, request, flash, jsonify, current_app, send_from_directory
+from flask_login import login_required, current_user
+
+from extensiones import db
+from modelos import Mesa, Sesion, Pedido
+from servicios import enviar_tickets_cocina, registrar_pedido
+from busqueda_menu import buscar_platillos, obtener_indice
+from idempotencia import idempotente, nueva_clave
+from replica import lectura_replica
+import sincronizacion
+import ocupacion
+import ventas
+import consultas_sesiones
+import transiciones  # noqa: F401  (registra los cambios de estado, ver transiciones.py)
+import totales_sesion  # noqa: F401  (contadores de cada sesión de mesa, ver totales_sesion.py)
+from ocupacion import registrar_sesion
+
+bp = Blueprint('mesas', __name__)
+
+# Clave única por formulario contra envíos repetidos (ver idempotencia.py)
+bp.add_app_template_global(nueva_clave, 'clave_idempotencia')
+
+# Platillos que se muestran antes de buscar
+LIMITE_FRECUENTES = 24
+
+# Días con sesiones por página del historial
+DIAS_HISTORIAL = 7
+
+
+@bp.route("/dashboard")
+@login_required
+def dashboard():
+    if current_user.rol == 'cocina':
+        return redirect(url_for('cocina.cocina'))
+    
+    mesas = Mesa.query.filter_by(activa=True).order_by(Mesa.numero).all()
+    
+    # Obtener solo sesiones activas de hoy
+    hoy = datetime.now().date()
+    sesiones_activas = Sesion.query.filter(
+        Sesion.activa == True,
+        db.func.date(Sesion.fecha_inicio) == hoy
+    ).all()
+    
+    # Cuántos pedidos hay en cada estado, de todas las mesas en una consulta;
+    # los totales y lo pendiente de pago son contadores de la sesión (ver totales_sesion.py)
+    estados = consultas_sesiones.estados_por_sesion([s.id for s in sesiones_activas])
+    
+    # Agrupar por mesa con información de la sesión activa
+    info_mesas = {}
+    for mesa in mesas:
+        # Buscar sesión activa de esta mesa
+        sesion_activa = next((s for s in sesiones_activas if s.mesa_id == mesa.id), None)
+        
+        if sesion_activa:
+            estados_sesion = estados[sesion_activa.id]
+            info_mesas[mesa.id] = {
+                'mesa': mesa,
+                'sesion': sesion_activa,
+                'estados': estados_sesion,
+                'tiene_pendientes': sesion_activa.pedidos_sin_pagar > 0,
+                'pedidos_sin_pagar': sesion_activa.pedidos_sin_pagar,
+                'todos_entregados': estados_sesion.get('entregado', 0) == sesion_activa.num_pedidos,
+                'total_pedidos': sesion_activa.num_pedidos,
+                'hora_inicio': sesion_activa.fecha_inicio.strftime('%H:%M')
+            }
+        else:
+            info_mesas[mesa.id] = {
+                'mesa': mesa,
+                'sesion': None,
+                'estados': {},
+                'tiene_pendientes': False,
+                'pedidos_sin_pagar': 0,
+                'todos_entregados': False,
+                'total_pedidos': 0,
+                'hora_inicio': None
+            }
+    
+    return render_template("dashboard.html", 
+                         mesas=mesas, 
+                         info_mesas=info_mesas,
+                         now=datetime.now())
+
+@bp.route("/nuevo_pedido/<int:mesa_id>", methods=["GET", "POST"])
+@login_required
+@idempotente
+def nuevo_pedido(mesa_id):
+    mesa = Mesa.query.get_or_404(mesa_id)
+    
+    if request.method == "POST":
+        producto = request.form.get("producto")
+        cantidad = request.form.get("cantidad", 1, type=int)
+        precio_unitario = request.form.get("precio_unitario", 0, type=float)
+        notas = request.form.get("notas", "")
+        item_menu_id = request.form.get("item_menu_id", type=int)
+        
+        pedido = registrar_pedido(mesa_id, current_user.id, producto, cantidad,
+                                  precio_unitario, notas, item_menu_id)
+        db.session.commit()
+        
+        enviar_tickets_cocina(('mesa', mesa_id), f"MESA {mesa.numero}", [
+            {'producto': pedido.producto, 'cantidad': cantidad, 'notas': notas,
+             'item_menu_id': pedido.item_menu_id}
+        ])
+        
+        flash(f'Pedido agregado: {cantidad}x {pedido.producto} = ${pedido.total:.2f}', 'success')
+        return redirect(url_for('mesas.ver_mesa', mesa_id=mesa_id))
+    
+    # Solo los más pedidos; el resto se busca con /api/menu/buscar
+    items_menu = buscar_platillos('', LIMITE_FRECUENTES)
+    
+    return render_template("nuevo_pedido.html", mesa=mesa, items_menu=items_menu)
+
+@bp.route("/api/menu/buscar")
+@login_required
+def api_buscar_menu():
+    """
+    RAZÓN: Búsqueda de platillos para nuevo_pedido y nuevo_domicilio, sin
+    enviar todo el menú al navegador. Responde desde el índice en memoria
+    (ver busqueda_menu.py).
+    """
+    texto = request.args.get('q', '')[:100]
+    limite = min(request.args.get('limite', 20, type=int), 50)
+    
+    return jsonify([
+        {
+            'id': platillo['id'],
+            'nombre': platillo['nombre'],
+            'descripcion': platillo['descripcion'],
+            'precio': platillo['precio'],
+            'categoria': platillo['categoria'],
+        }
+        for platillo in buscar_platillos(texto, limite)
+    ])
+
+@bp.route("/api/menu/platillos")
+@login_required
+def api_platillos_menu():
+    """
+    RAZÓN: Menú completo en formato compacto para que offline.js lo guarde en
+    el dispositivo y pueda buscar platillos sin conexión.
+    """
+    return jsonify([
+        [platillo['id'], platillo['nombre'], platillo['precio'], platillo['categoria'], platillo['descripcion']]
+        for platillo in obtener_indice().platillos
+    ])
+
+@bp.route("/api/sincronizar", methods=["POST"])
+@login_required
+def api_sincronizar():
+    """
+    RAZÓN: Recibe las operaciones que los meseros hicieron sin conexión
+    (pedidos, cambios de estado, pagos) y las aplica en una transacción.
+    Cuerpo: {"operaciones": [{"id", "tipo", "datos", "fecha"}, ...]}
+    """
+    datos = request.get_json(silent=True) or {}
+    operaciones = datos.get('operaciones')
+    if not isinstance(operaciones, list):
+        return jsonify({'error': 'Se esperaba una lista de operaciones'}), 400
+    
+    try:
+        resultados = sincronizacion.sincronizar(operaciones, current_user)
+    except sincronizacion.OperacionInvalida as e:
+        return jsonify({'error': str(e)}), 400
+    
+    return jsonify({'resultados': resultados})
+
+@bp.route("/sw.js")
+def service_worker():
+    """El service worker se sirve desde la raíz para que controle todas las páginas"""
+    respuesta = send_from_directory(current_app.static_folder, 'sw.js', mimetype='application/javascript')
+    respuesta.headers['Cache-Control'] = 'no-cache'
+    return respuesta
+
+@bp.route("/mesa/<int:mesa_id>")
+@login_required
+def ver_mesa(mesa_id):
+    mesa = Mesa.query.get_or_404(mesa_id)
+    
+    # Obtener sesión activa
+    sesion_activa = Sesion.query.filter_by(
+        mesa_id=mesa_id,
+        activa=True
+    ).first()
+    
+    pedidos_actuales = []
+    if sesion_activa:
+        pedidos_actuales = Pedido.query.filter_by(
+            sesion_id=sesion_activa.id
+        ).order_by(Pedido.fecha.desc()).all()
+    
+    # Sesiones anteriores del día operativo; de sus pedidos solo las líneas de la cuenta
+    hoy = ocupacion.dia_operativo(datetime.now())
+    sesiones_anteriores = Sesion.query.filter(
+        Sesion.mesa_id == mesa_id,
+        Sesion.activa == False,
+        Sesion.fecha_inicio >= ventas.inicio_dia(hoy),
+        Sesion.fecha_inicio < ventas.inicio_dia(hoy + timedelta(days=1))
+    ).order_by(Sesion.fecha_inicio.desc()).all()
+    
+    # Totales: contadores de cada sesión (ver totales_sesion.py)
+    totales_sesion_activa = consultas_sesiones.totales_guardados(sesion_activa) if sesion_activa else consultas_sesiones.totales_vacios()
+    lineas = consultas_sesiones.lineas_por_sesion([sesion.id for sesion in sesiones_anteriores])
+    sesiones_con_totales = [
+        dict(consultas_sesiones.totales_guardados(sesion), sesion=sesion, lineas=lineas[sesion.id])
+        for sesion in sesiones_anteriores
+    ]
+    
+    return render_template("ver_mesa.html", 
+                         mesa=mesa, 
+                         pedidos=pedidos_actuales,
+                         sesion_activa=sesion_activa,
+                         totales_sesion_activa=totales_sesion_activa,
+                         sesiones_anteriores=sesiones_con_totales,
+                         current_user=current_user)
+
+
+@bp.route("/actualizar_estado/<int:pedido_id>/<estado>")
+@login_required
+def actualizar_estado(pedido_id, estado):
+    pedido = Pedido.query.get_or_404(pedido_id)
+    estados_validos = ['pendiente', 'preparando', 'listo', 'entregado']
+    
+    if estado in estados_validos:
+        pedido.estado = estado
+        try:
+            pedido.estado_actualizado = datetime.now()
+        except Exception:
+            # En caso de que la columna no exista en DB todavía
+            pass
+        db.session.commit()
+        flash(f'Estado actualizado a: {estado}', 'success')
+        # Si se marcó como 'listo' y quien lo marcó NO es mesero, creamos una notificación para meseros
+        if estado == 'listo' and getattr(current_user, 'rol', None) != 'mesero':
+            # No necesitamos guardar una entidad de notificación; el JS de meseros hará polling por pedidos 'listo' recientes
+            pass
+    
+    return redirect(request.referrer or url_for('mesas.dashboard'))
+
+@bp.route("/marcar_pagado/<int:pedido_id>")
+@login_required
+def marcar_pagado(pedido_id):
+    pedido = Pedido.query.get_or_404(pedido_id)
+    pedido.pagado = True
+    db.session.commit()
+    flash('Pedido marcado como pagado', 'success')
+    return redirect(request.referrer or url_for('mesas.dashboard'))
+
+
+@bp.route('/notificaciones/pendientes')
+@login_required
+def notificaciones_pendientes():
+    """Endpoint que devuelve pedidos marcados como 'listo' desde un timestamp 'since'.
+    Parámetros: since (ISO 8601 string). Solo accesible a usuarios con rol 'mesero'."""
+    if getattr(current_user, 'rol', None) != 'mesero':
+        return jsonify([])
+
+    since = request.args.get('since')
+    try:
+        since_dt = datetime.fromisoformat(since) if since else (datetime.now() - timedelta(seconds=10))
+    except Exception:
+        since_dt = datetime.now() - timedelta(seconds=10)
+
+    pedidos = Pedido.query.filter(
+        Pedido.estado == 'listo',
+        Pedido.estado_actualizado > since_dt
+    ).order_by(Pedido.estado_actualizado.asc()).all()
+
+    data = []
+    for p in pedidos:
+        data.append({
+            'id': p.id,
+            'mesa': p.mesa.numero if p.mesa else None,
+            'producto': p.producto,
+            'cantidad': p.cantidad,
+            'estado_actualizado': p.estado_actualizado.isoformat() if p.estado_actualizado else None
+        })
+
+    return jsonify(data)
+
+@bp.route("/pagar_mesa/<int:mesa_id>")
+@login_required
+def pagar_mesa(mesa_id):
+    hoy = datetime.now().date()
+    pedidos = Pedido.query.filter(
+        Pedido.mesa_id == mesa_id,
+        db.func.date(Pedido.fecha) == hoy,
+        Pedido.pagado == False
+    ).all()
+    
+    for pedido in pedidos:
+        pedido.pagado = True
+    
+    db.session.commit()
+    flash(f'Todos los pedidos de la mesa {mesa_id} marcados como pagados', 'success')
+    return redirect(url_for('mesas.dashboard'))
+
+@bp.route("/historial")
+@login_required
+@lectura_replica
+def historial():
+    """
+    Totales por día operativo en una consulta agrupada (ver consultas_sesiones.py).
+    Las sesiones con sus pedidos y facturas solo se cargan para el día desplegado.
+    ?fecha=  un solo día
+    ?hasta=  paginación: los DIAS_HISTORIAL días con sesiones hasta esa fecha
+    ?expandir=  día desplegado (por defecto el más reciente de la página)
+    """
+    def leer_fecha(nombre):
+        valor = request.args.get(nombre)
+        if not valor:
+            return None
+        try:
+            return datetime.strptime(valor, '%Y-%m-%d').date()
+        except ValueError:
+            flash('Fecha inválida', 'error')
+            return None
+
+    fecha_seleccionada = leer_fecha('fecha')
+    hasta = leer_fecha('hasta')
+    expandido = leer_fecha('expandir')
+
+    if fecha_seleccionada:
+        dias = consultas_sesiones.resumen_por_dia(desde=fecha_seleccionada, hasta=fecha_seleccionada)
+        anteriores = None
+    else:
+        dias = consultas_sesiones.resumen_por_dia(hasta=hasta, limite=DIAS_HISTORIAL + 1)
+        # Una fila de más dice si hay otra página sin contar todos los días
+        anteriores = None
+        if len(dias) > DIAS_HISTORIAL:
+            dias = dias[:DIAS_HISTORIAL]
+            anteriores = dias[-1]['dia'] - timedelta(days=1)
+
+    if dias and expandido not in [dia['dia'] for dia in dias]:
+        expandido = dias[0]['dia']
+    sesiones = consultas_sesiones.sesiones_del_dia(expandido) if dias else []
+
+    return render_template("historial.html",
+                         dias=dias,
+                         expandido=expandido,
+                         sesiones=sesiones,
+                         hasta=hasta,
+                         anteriores=anteriores,
+                         fecha_seleccionada=fecha_seleccionada,
+                         now=datetime.now())
+
+@bp.route("/administrar_mesas", methods=["GET", "POST"])
+@login_required
+def administrar_mesas():
+    if current_user.rol != 'admin':
+        flash('Solo los administradores pueden gestionar mesas', 'error')
+        return redirect(url_for('mesas.dashboard'))
+    
+    if request.method == "POST":
+        accion = request.form.get("accion")
+        
+        if accion == "agregar":
+            numero = request.form.get("numero", type=int)
+            capacidad = request.form.get("capacidad", type=int, default=4)
+            
+            if Mesa.query.filter_by(numero=numero).first():
+                flash(f'La mesa {numero} ya existe', 'error')
+            else:
+                mesa = Mesa(numero=numero, capacidad=capacidad)
+                db.session.add(mesa)
+                db.session.commit()
+                flash(f'Mesa {numero} agregada exitosamente', 'success')
+        
+        elif accion == "eliminar":
+            mesa_id = request.form.get("mesa_id", type=int)
+            mesa = Mesa.query.get(mesa_id)
+            if mesa:
+                # Verificar si tiene pedidos
+                if Pedido.query.filter_by(mesa_id=mesa_id).first():
+                    flash(f'No se puede eliminar la mesa {mesa.numero} porque tiene pedidos asociados', 'error')
+                else:
+                    db.session.delete(mesa)
+                    db.session.commit()
+                    flash(f'Mesa {mesa.numero} eliminada exitosamente', 'success')
+        
+        elif accion == "toggle":
+            mesa_id = request.form.get("mesa_id", type=int)
+            mesa = Mesa.query.get(mesa_id)
+            if mesa:
+                mesa.activa = not mesa.activa
+                db.session.commit()
+                estado = "activada" if mesa.activa else "desactivada"
+                flash(f'Mesa {mesa.numero} {estado}', 'success')
+        
+        return redirect(url_for('mesas.administrar_mesas'))
+    
+    mesas = Mesa.query.order_by(Mesa.numero).all()
+    return render_template("administrar_mesas.html", mesas=mesas)
+
+@bp.route("/liberar_mesa/<int:mesa_id>")
+@login_required
+def liberar_mesa(mesa_id):
+    """Cierra la sesión activa de una mesa"""
+    sesion_activa = Sesion.query.filter_by(
+        mesa_id=mesa_id,
+        activa=True
+    ).first()
+    
+    if sesion_activa:
+        # Marcar todos los pedidos como entregados y pagados
+        for pedido in sesion_activa.pedidos:
+            pedido.pagado = True
+            pedido.estado = 'entregado'
+        
+        # Cerrar sesión (el total, de los contadores: ver totales_sesion.py)
+        sesion_activa.activa = False
+        sesion_activa.fecha_fin = datetime.now()
+        sesion_activa.total = sesion_activa.subtotal
+        registrar_sesion(sesion_activa)
+        
+        db.session.commit()
+        flash(f'Mesa {mesa_id} liberada exitosamente', 'success')
+    else:
+        flash('No hay sesión activa para esta mesa', 'error')
+    
+    return redirect(url_for('mesas.dashboard'))
+
+@bp.route("/historial/<fecha>")
+@login_required
+def historial_fecha(fecha):
+    """Ver historial de una fecha específica"""
+    try:
+        datetime.strptime(fecha, '%Y-%m-%d')
+    except ValueError:
+        flash('Fecha inválida', 'error')
+        return redirect(url_for('mesas.historial'))
+    
+    return redirect(url_for('mesas.historial', fecha=fecha))
+
+# ==========================================
+# REPORTE DE OCUPACIÓN
+# ==========================================
+
+@bp.route("/reportes/ocupacion")
+@login_required
+def reporte_ocupacion():
+    """
+    RAZÓN: Rotación, ocupación por hora y RevPASH por mesa.
+    Lee los agregados de OcupacionMesaHora (ver ocupacion.py), no las sesiones.
+    """
+    if current_user.rol != 'admin':
+        flash('Solo los administradores pueden ver este reporte', 'error')
+        return redirect(url_for('mesas.dashboard'))
+    
+    # Rango en días operativos (por defecto, los últimos 30)
+    hoy = ocupacion.dia_operativo(datetime.now())
+    try:
+        fecha_fin = datetime.strptime(request.args.get('fecha_fin'), '%Y-%m-%d').date() if request.args.get('fecha_fin') else hoy
+        fecha_inicio = datetime.strptime(request.args.get('fecha_inicio'), '%Y-%m-%d').date() if request.args.get('fecha_inicio') else fecha_fin - timedelta(days=29)
+    except ValueError:
+        flash('Fecha inválida', 'error')
+        return redirect(url_for('mesas.reporte_ocupacion'))
+    if fecha_inicio > fecha_fin:
+        fecha_inicio, fecha_fin = fecha_fin, fecha_inicio
+    
+    mapa = ocupacion.mapa_calor(fecha_inicio, fecha_fin)
+    indicadores = ocupacion.indicadores_mesas(fecha_inicio, fecha_fin)
+    
+    # Solo las horas con actividad, en el orden del día operativo
+    horas_con_datos = {hora for celdas in mapa.values() for hora in celdas}
+    horas = [hora for hora in ocupacion.HORAS_DIA_OPERATIVO if hora in horas_con_datos]
+    
+    return render_template("reportes/ocupacion.html",
+                         mapa=mapa,
+                         horas=horas,
+                         dias_semana=ocupacion.DIAS_SEMANA,
+                         indicadores=indicadores,
+                         fecha_inicio=fecha_inicio.strftime('%Y-%m-%d'),
+                         fecha_fin=fecha_fin.strftime('%Y-%m-%d'))
+
+
+@bp.route("/reportes/ventas")
+@login_required
+def reporte_ventas():
+    """
+    RAZÓN: Platillos y categorías más vendidos, por unidades e ingresos.
+    Agrupa por item_menu_id sobre los agregados por día (ver ventas.py).
+    """
+    if current_user.rol != 'admin':
+        flash('Solo los administradores pueden ver este reporte', 'error')
+        return redirect(url_for('mesas.dashboard'))
+    
+    # Rango en días operativos (por defecto, los últimos 30)
+    hoy = ocupacion.dia_operativo(datetime.now())
+    try:
+        fecha_fin = datetime.strptime(request.args.get('fecha_fin'), '%Y-%m-%d').date() if request.args.get('fecha_fin') else hoy
+        fecha_inicio = datetime.strptime(request.args.get('fecha_inicio'), '%Y-%m-%d').date() if request.args.get('fecha_inicio') else fecha_fin - timedelta(days=29)
+    except ValueError:
+        flash('Fecha inválida', 'error')
+        return redirect(url_for('mesas.reporte_ventas'))
+    if fecha_inicio > fecha_fin:
+        fecha_inicio, fecha_fin = fecha_fin, fecha_inicio
+    
+    ranking = ventas.ranking_ventas(fecha_inicio, fecha_fin)
+    
+    return render_template("reportes/ventas.html",
+                         ranking=ranking,
+                         fecha_inicio=fecha_inicio.strftime('%Y-%m-%d'),
+                         fecha_fin=fecha_fin.strftime('%Y-%m-%d'))
@@ -0,0 +1,227 @@
+"""
+Rutas de presupuestos por categoría de gasto.
+"""
+
+from flask import Blueprint, render_template, redirect, url_for, request, flash
+from flask_login import login_required, current_user
+
+from extensiones import db
+from modelos import Presupuesto, CategoriaGasto
+from replica import lectura_replica
+
+bp = Blueprint('presupuestos', __name__)
+
+
+# ==========================================
+# RUTAS PARA PRESUPUESTOS
+# ==========================================
+
+@bp.route("/presupuestos")
+@login_required
+@lectura_replica
+def lista_presupuestos():
+    """
+    RAZÓN: Vista principal de presupuestos por categoría.
+    Muestra límites de gasto y alertas.
+    """
+    if current_user.rol != 'admin':
+        flash('Solo administradores pueden ver presupuestos', 'error')
+        return redirect(url_for('mesas.dashboard'))
+    
+    # Obtener mes y año actual
+    from datetime import datetime
+    mes_actual = datetime.now().month
+    anio_actual = datetime.now().year
+    
+    # Obtener presupuestos del mes actual
+    presupuestos = Presupuesto.query.filter_by(
+        mes=mes_actual,
+        anio=anio_actual,
+        activo=True
+    ).all()
+    
+    # Si no hay presupuestos para este mes, obtener todos los activos
+    if not presupuestos:
+        presupuestos = Presupuesto.query.filter_by(activo=True).all()
+    
+    # Calcular totales
+    total_presupuestado = sum(p.monto_limite for p in presupuestos)
+    total_gastado = sum(p.gasto_actual for p in presupuestos)
+    total_disponible = total_presupuestado - total_gastado
+    
+    # Contar alertas
+    alertas = sum(1 for p in presupuestos if p.estado in ['alerta', 'excedido'])
+    excedidos = sum(1 for p in presupuestos if p.estado == 'excedido')
+    
+    return render_template("presupuestos/lista_presupuestos.html",
+                         presupuestos=presupuestos,
+                         total_presupuestado=total_presupuestado,
+                         total_gastado=total_gastado,
+                         total_disponible=total_disponible,
+                         alertas=alertas,
+                         excedidos=excedidos,
+                         mes_actual=mes_actual,
+                         anio_actual=anio_actual)
+
+
+@bp.route("/presupuesto/nuevo", methods=["GET", "POST"])
+@login_required
+def nuevo_presupuesto():
+    """
+    RAZÓN: Crear un nuevo presupuesto para una categoría.
+    """
+    if current_user.rol != 'admin':
+        flash('Solo administradores pueden crear presupuestos', 'error')
+        return redirect(url_for('mesas.dashboard'))
+    
+    if request.method == "POST":
+        categoria_id = request.form.get("categoria_id", type=int)
+        monto_limite = request.form.get("monto_limite", type=float)
+        periodo = request.form.get("periodo", "mensual")
+        mes = request.form.get("mes", type=int)
+        anio = request.form.get("anio", type=int)
+        alerta_porcentaje = request.form.get("alerta_porcentaje", 80, type=int)
+        
+        # Verificar si ya existe un presupuesto para esta categoría/mes/año
+        existe = Presupuesto.query.filter_by(
+            categoria_id=categoria_id,
+            mes=mes,
+            anio=anio,
+            activo=True
+        ).first()
+        
+        if existe:
+            flash('Ya existe un presupuesto activo para esta categoría en ese período', 'error')
+            return redirect(url_for('presupuestos.nuevo_presupuesto'))
+        
+        presupuesto = Presupuesto(
+            categoria_id=categoria_id,
+            monto_limite=monto_limite,
+            periodo=periodo,
+            mes=mes,
+            anio=anio,
+            alerta_porcentaje=alerta_porcentaje
+        )
+        
+        db.session.add(presupuesto)
+        db.session.commit()
+        
+        flash('Presupuesto creado exitosamente', 'success')
+        return redirect(url_for('presupuestos.lista_presupuestos'))
+    
+    # GET
+    categorias = CategoriaGasto.query.filter_by(activa=True).order_by(CategoriaGasto.nombre).all()
+    
+    from datetime import datetime
+    mes_actual = datetime.now().month
+    anio_actual = datetime.now().year
+    
+    return render_template("presupuestos/nuevo_presupuesto.html",
+                         categorias=categorias,
+                         mes_actual=mes_actual,
+                         anio_actual=anio_actual)
+
+
+@bp.route("/presupuesto/editar/<int:presupuesto_id>", methods=["GET", "POST"])
+@login_required
+def editar_presupuesto(presupuesto_id):
+    """
+    RAZÓN: Modificar un presupuesto existente.
+    """
+    if current_user.rol != 'admin':
+        flash('Solo administradores pueden editar presupuestos', 'error')
+        return redirect(url_for('mesas.dashboard'))
+    
+    presupuesto = Presupuesto.query.get_or_404(presupuesto_id)
+    
+    if request.method == "POST":
+        presupuesto.monto_limite = request.form.get("monto_limite", type=float)
+        presupuesto.alerta_porcentaje = request.form.get("alerta_porcentaje", type=int)
+        
+        db.session.commit()
+        flash('Presupuesto actualizado', 'success')
+        return redirect(url_for('presupuestos.lista_presupuestos'))
+    
+    return render_template("presupuestos/editar_presupuesto.html",
+                         presupuesto=presupuesto)
+
+
+@bp.route("/presupuesto/desactivar/<int:presupuesto_id>")
+@login_required
+def desactivar_presupuesto(presupuesto_id):
+    """
+    RAZÓN: Desactivar un presupuesto sin eliminarlo.
+    """
+    if current_user.rol != 'admin':
+        flash('Solo administradores pueden desactivar presupuestos', 'error')
+        return redirect(url_for('mesas.dashboard'))
+    
+    presupuesto = Presupuesto.query.get_or_404(presupuesto_id)
+    presupuesto.activo = False
+    
+    db.session.commit()
+    flash('Presupuesto desactivado', 'success')
+    return redirect(url_for('presupuestos.lista_presupuestos'))
+
+
+@bp.route("/presupuesto/copiar_mes_siguiente", methods=["POST"])
+@login_required
+def copiar_presupuestos_mes_siguiente():
+    """
+    RAZÓN: Copia todos los presupuestos del mes actual al mes siguiente.
+    Útil para no tener que recrearlos cada mes.
+    """
+    if current_user.rol != 'admin':
+        flash('Solo administradores pueden copiar presupuestos', 'error')
+        return redirect(url_for('mesas.dashboard'))
+    
+    from datetime import datetime
+    from dateutil.relativedelta import relativedelta
+    
+    mes_actual = datetime.now().month
+    anio_actual = datetime.now().year
+    
+    # Calcular mes siguiente
+    fecha_siguiente = datetime.now() + relativedelta(months=1)
+    mes_siguiente = fecha_siguiente.month
+    anio_siguiente = fecha_siguiente.year
+    
+    # Obtener presupuestos del mes actual
+    presupuestos_actuales = Presupuesto.query.filter_by(
+        mes=mes_actual,
+        anio=anio_actual,
+        activo=True
+    ).all()
+    
+    if not presupuestos_actuales:
+        flash('No hay presupuestos activos en el mes actual para copiar', 'error')
+        return redirect(url_for('presupuestos.lista_presupuestos'))
+    
+    # Verificar si ya existen presupuestos para el mes siguiente
+    existe = Presupuesto.query.filter_by(
+        mes=mes_siguiente,
+        anio=anio_siguiente,
+        activo=True
+    ).first()
+    
+    if existe:
+        flash(f'Ya existen presupuestos para {mes_siguiente}/{anio_siguiente}', 'error')
+        return redirect(url_for('presupuestos.lista_presupuestos'))
+    
+    # Copiar presupuestos
+    copiados = 0
+    for p in presupuestos_actuales:
+        nuevo = Presupuesto(
+            categoria_id=p.categoria_id,
+            monto_limite=p.monto_limite,
+            periodo=p.periodo,
+            mes=mes_siguiente,
+            anio=anio_siguiente,
+            alerta_porcentaje=p.alerta_porcentaje
+        )
+        db.session.add(nuevo)
+        copiados += 1
+    
+    db.session.commit()
+    flash(f'{copiados} presupuesto(s) copiados a {mes_siguiente}/{anio_siguiente}', 'success')
+    return redirect(url_for('presupuestos.lista_presupuestos'))
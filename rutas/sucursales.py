@@ -0,0 +1,194 @@
+"""
+Rutas de sucursales: alta y edición, cambio de sucursal del dueño y reporte consolidado.
+"""
+
+from datetime import datetime, timedelta
+import re
+
+from flask import Blueprint, render_template, redirect, url_for, request, flash, session as sesion_flask
+from flask_login import login_required, current_user
+
+from extensiones import db
+from modelos import Sucursal, ConfiguracionRestaurante
+import ocupacion
+import sucursales
+import ventas
+
+bp = Blueprint('sucursales', __name__)
+
+# Columnas de la configuración que se copian a una sucursal nueva
+CAMPOS_CONFIGURACION = (
+    'nombre', 'nit', 'direccion', 'ciudad', 'telefono', 'email',
+    'regimen', 'resolucion_dian', 'rango_facturacion', 'iva_porcentaje', 'logo_url',
+)
+
+
+def _solo_dueno():
+    """Redirección si el usuario no es el dueño (admin sin sucursal fija); None si lo es"""
+    if not sucursales.es_dueno(current_user):
+        flash('Solo el dueño puede gestionar las sucursales', 'error')
+        return redirect(url_for('mesas.dashboard'))
+    return None
+
+
+def _datos_formulario():
+    """(nombre, codigo, prefijo) del formulario, o None si falta algo (con flash)"""
+    nombre = request.form.get("nombre", "").strip()
+    codigo = re.sub(r'[^a-z0-9-]', '', request.form.get("codigo", "").strip().lower())
+    prefijo = re.sub(r'[^A-Z0-9]', '', request.form.get("prefijo_factura", "").strip().upper())
+    if not nombre or not codigo or not prefijo:
+        flash('Nombre, código y prefijo de factura son obligatorios', 'error')
+        return None
+    return nombre, codigo, prefijo
+
+
+def _duplicada(codigo, prefijo, excepto_id=None):
+    consulta = Sucursal.query.filter(db.or_(Sucursal.codigo == codigo, Sucursal.prefijo_factura == prefijo))
+    if excepto_id is not None:
+        consulta = consulta.filter(Sucursal.id != excepto_id)
+    return consulta.first() is not None
+
+
+@bp.route("/sucursales", methods=["GET", "POST"])
+@login_required
+def administrar_sucursales():
+    redireccion = _solo_dueno()
+    if redireccion:
+        return redireccion
+
+    if request.method == "POST":
+        datos = _datos_formulario()
+        if datos:
+            nombre, codigo, prefijo = datos
+            if _duplicada(codigo, prefijo):
+                flash('Ya existe una sucursal con ese código o prefijo de factura', 'error')
+            else:
+                sucursal = Sucursal(nombre=nombre, codigo=codigo, prefijo_factura=prefijo, ultimo_consecutivo=0)
+                db.session.add(sucursal)
+                db.session.flush()
+                # La sucursal nueva arranca con los datos de recibo de la actual
+                base = ConfiguracionRestaurante.query.first()
+                config = ConfiguracionRestaurante(sucursal_id=sucursal.id)
+                if base:
+                    for campo in CAMPOS_CONFIGURACION:
+                        setattr(config, campo, getattr(base, campo))
+                config.nombre = nombre
+                db.session.add(config)
+                db.session.commit()
+                sucursales.invalidar()
+                flash(f'Sucursal {nombre} creada. Sus facturas serán {prefijo}-000001, {prefijo}-000002...', 'success')
+        return redirect(url_for('sucursales.administrar_sucursales'))
+
+    lista = Sucursal.query.order_by(Sucursal.id).all()
+    return render_template("sucursales/administrar_sucursales.html", sucursales=lista)
+
+
+@bp.route("/sucursal/<int:sucursal_id>/editar", methods=["GET", "POST"])
+@login_required
+def editar_sucursal(sucursal_id):
+    redireccion = _solo_dueno()
+    if redireccion:
+        return redireccion
+
+    sucursal = Sucursal.query.get_or_404(sucursal_id)
+    if request.method == "POST":
+        datos = _datos_formulario()
+        if datos:
+            nombre, codigo, prefijo = datos
+            activa = request.form.get("activa") == "on"
+            if _duplicada(codigo, prefijo, excepto_id=sucursal.id):
+                flash('Ya existe una sucursal con ese código o prefijo de factura', 'error')
+            elif not activa and sucursal.activa and len(sucursales.listar()) <= 1:
+                flash('Debe quedar al menos una sucursal activa', 'error')
+            else:
+                sucursal.nombre = nombre
+                sucursal.codigo = codigo
+                sucursal.prefijo_factura = prefijo
+                sucursal.activa = activa
+                db.session.commit()
+                sucursales.invalidar()
+                flash(f'Sucursal {nombre} actualizada', 'success')
+                return redirect(url_for('sucursales.administrar_sucursales'))
+
+    return render_template("sucursales/editar_sucursal.html", sucursal=sucursal)
+
+
+@bp.route("/sucursal/cambiar", methods=["POST"])
+@login_required
+def cambiar_sucursal():
+    """El dueño elige en qué sucursal trabaja (queda en la cookie de sesión)"""
+    if not sucursales.es_dueno(current_user):
+        flash('Tu usuario pertenece a una sola sucursal', 'error')
+        return redirect(url_for('mesas.dashboard'))
+
+    sucursal_id = request.form.get("sucursal_id", type=int)
+    sucursal = next((s for s in sucursales.listar() if s['id'] == sucursal_id), None)
+    if sucursal is None:
+        flash('Sucursal no encontrada', 'error')
+    else:
+        sesion_flask[sucursales.CLAVE_SESION] = sucursal_id
+        flash(f'Ahora estás en {sucursal["nombre"]}', 'success')
+
+    # Volver a la página anterior solo si es de esta misma aplicación
+    destino = request.form.get("siguiente") or ''
+    if not destino.startswith('/') or destino.startswith('//'):
+        destino = url_for('mesas.dashboard')
+    return redirect(destino)
+
+
+# ==========================================
+# REPORTE CONSOLIDADO
+# ==========================================
+
+@bp.route("/reportes/sucursales")
+@login_required
+def reporte_sucursales():
+    """
+    RAZÓN: Ventas y ocupación de todas las sucursales lado a lado.
+    Lee los agregados por sucursal y día (ver ventas.py y ocupacion.py).
+    """
+    redireccion = _solo_dueno()
+    if redireccion:
+        return redireccion
+
+    # Rango en días operativos (por defecto, los últimos 30)
+    hoy = ocupacion.dia_operativo(datetime.now())
+    try:
+        fecha_fin = datetime.strptime(request.args.get('fecha_fin'), '%Y-%m-%d').date() if request.args.get('fecha_fin') else hoy
+        fecha_inicio = datetime.strptime(request.args.get('fecha_inicio'), '%Y-%m-%d').date() if request.args.get('fecha_inicio') else fecha_fin - timedelta(days=29)
+    except ValueError:
+        flash('Fecha inválida', 'error')
+        return redirect(url_for('sucursales.reporte_sucursales'))
+    if fecha_inicio > fecha_fin:
+        fecha_inicio, fecha_fin = fecha_fin, fecha_inicio
+
+    por_ventas = ventas.ventas_por_sucursal(fecha_inicio, fecha_fin)
+    por_ocupacion = ocupacion.resumen_por_sucursal(fecha_inicio, fecha_fin)
+    dias = (fecha_fin - fecha_inicio).days + 1
+
+    filas = []
+    for sucursal in sucursales.listar():
+        venta = por_ventas.get(sucursal['id'], {'unidades': 0, 'ingresos': 0, 'por_dia': {}})
+        uso = por_ocupacion.get(sucursal['id'], {'sesiones': 0, 'horas_ocupadas': 0, 'ingresos': 0, 'mesas': 0})
+        filas.append({
+            'sucursal': sucursal,
+            'unidades': venta['unidades'],
+            'ingresos': venta['ingresos'],
+            'ingreso_dia': venta['ingresos'] / dias,
+            'mejor_dia': max(venta['por_dia'].items(), key=lambda par: par[1], default=None),
+            'sesiones': uso['sesiones'],
+            'horas_ocupadas': uso['horas_ocupadas'],
+            'ingresos_mesas': uso['ingresos'],
+        })
+    total_ingresos = sum(fila['ingresos'] for fila in filas)
+    for fila in filas:
+        fila['participacion'] = fila['ingresos'] / total_ingresos * 100 if total_ingresos else 0
+    filas.sort(key=lambda fila: fila['ingresos'], reverse=True)
+
+    return render_template("reportes/sucursales.html",
+                         filas=filas,
+                         total_ingresos=total_ingresos,
+                         total_unidades=sum(fila['unidades'] for fila in filas),
+                         total_sesiones=sum(fila['sesiones'] for fila in filas),
+                         fecha_inicio=fecha_inicio.strftime('%Y-%m-%d'),
+                         fecha_fin=fecha_fin.strftime('%Y-%m-%d'))
@@ -0,0 +1,193 @@
+"""
+Lógica compartida entre módulos de rutas (recibos de factura, pedidos de mesa
+y tickets de cocina).
+"""
+
+from datetime import datetime
+import json
+import hashlib
+
+from flask import render_template, current_app
+
+import impresion
+from extensiones import db, cola_tickets
+from modelos import Sesion, Pedido, CategoriaMenu, ItemMenu, Factura, ReciboFactura, ConfiguracionRestaurante
+
+
+# =========================
+# RECIBOS DE FACTURA
+# =========================
+
+def _renderizar(recibo, factura, config):
+    """Llena el recibo con la factura en todos los formatos de impresión"""
+    desglose = None
+    if factura.desglose_pago:
+        try:
+            desglose = json.loads(factura.desglose_pago)
+        except ValueError:
+            desglose = None
+
+    items = impresion.items_factura(factura)
+    lineas_58 = impresion.texto_factura(factura, config, items, desglose, impresion.ANCHOS['58'])
+    lineas_80 = impresion.texto_factura(factura, config, items, desglose, impresion.ANCHOS['80'])
+
+    recibo.html = render_template("recibo_termico.html", factura=factura, config=config, desglose=desglose)
+    recibo.texto_58 = impresion.a_texto(lineas_58, impresion.ANCHOS['58'])
+    recibo.texto_80 = impresion.a_texto(lineas_80, impresion.ANCHOS['80'])
+    recibo.escpos_58 = impresion.a_escpos(lineas_58)
+    recibo.escpos_80 = impresion.a_escpos(lineas_80)
+    recibo.fecha_generacion = datetime.now()
+
+    contenido = hashlib.sha256()
+    for parte in (recibo.html.encode('utf-8'), recibo.texto_58.encode('utf-8'),
+                  recibo.texto_80.encode('utf-8'), recibo.escpos_58, recibo.escpos_80):
+        contenido.update(parte)
+    recibo.hash_contenido = contenido.hexdigest()
+    return recibo
+
+
+def generar_recibo(factura, config):
+    """
+    RAZÓN: Renderiza la factura una sola vez en todos los formatos de impresión
+    (HTML, texto 58/80mm y ESC/POS) y lo guarda en ReciboFactura.
+    Se llama dentro de la transacción que crea o edita la factura (no hace commit).
+    """
+    recibo = _renderizar(factura.recibo or ReciboFactura(), factura, config)
+    recibo.factura = factura
+    db.session.add(recibo)
+    return recibo
+
+
+def _configuracion():
+    config = ConfiguracionRestaurante.query.first()
+    if not config:
+        config = ConfiguracionRestaurante()
+        db.session.add(config)
+        db.session.flush()
+    return config
+
+
+def obtener_recibo(factura):
+    """
+    Devuelve el recibo guardado. Solo lee: las facturas anteriores al
+    pre-renderizado reciben el suyo en la migración v0016. Si aun así falta
+    (una factura de un worker con el código anterior, durante el despliegue),
+    se renderiza sin guardarlo.
+    """
+    if factura.recibo:
+        return factura.recibo
+
+    config = ConfiguracionRestaurante.query.first()
+    if config is None:
+        from esquema import CONFIGURACION_INICIAL
+        config = ConfiguracionRestaurante(**CONFIGURACION_INICIAL)
+    # Sin factura=: el recibo no entra a la sesión por la relación
+    return _renderizar(ReciboFactura(), factura, config)
+
+
+def regenerar_recibo(factura):
+    """
+    Vuelve a renderizar el recibo guardado después de un abono o de un cambio
+    de estado_pago (el recibo dice "CREDITO - PENDIENTE" o "PAGADO"). No hace commit.
+    """
+    return generar_recibo(factura, _configuracion())
+
+
+def generar_recibos_faltantes(desde_id, hasta_id):
+    """
+    Backfill: recibos de las facturas con id en (desde_id, hasta_id] que no
+    tienen, con la configuración de su sucursal. Retorna cuántos generó.
+    """
+    facturas = Factura.query.filter(
+        Factura.id > desde_id,
+        Factura.id <= hasta_id,
+        ~Factura.recibo.has()
+    ).order_by(Factura.id).all()
+    if not facturas:
+        return 0
+    configuraciones = {c.sucursal_id: c for c in ConfiguracionRestaurante.query.order_by(ConfiguracionRestaurante.id)}
+    defecto = next(iter(configuraciones.values()), None) or _configuracion()
+    for factura in facturas:
+        generar_recibo(factura, configuraciones.get(factura.sucursal_id, defecto))
+    return len(facturas)
+
+
+# =========================
+# PEDIDOS DE MESA
+# =========================
+
+def registrar_pedido(mesa_id, mesero_id, producto, cantidad, precio_unitario, notas='',
+                     item_menu_id=None, fecha=None):
+    """
+    Crea el pedido en la sesión activa de la mesa (o abre una).
+    Si viene item_menu_id, o si el producto se escribió igual a un platillo,
+    se vincula al menú y el nombre y el precio salen de él y no del formulario
+    (un pedido vinculado siempre vale lo que dice el menú).
+    No hace commit (lo usan nuevo_pedido y la sincronización en lote).
+    """
+    item = db.session.get(ItemMenu, item_menu_id) if item_menu_id else None
+    if item is None and producto:
+        # Escrito a mano pero igual a un platillo del menú
+        item = ItemMenu.query.filter(
+            db.func.lower(ItemMenu.nombre) == producto.strip().lower()
+        ).first()
+    if item is not None:
+        producto = item.nombre
+        precio_unitario = item.precio
+
+    sesion_activa = Sesion.query.filter_by(mesa_id=mesa_id, activa=True).first()
+    if not sesion_activa:
+        sesion_activa = Sesion(mesa_id=mesa_id)
+        db.session.add(sesion_activa)
+        db.session.flush()  # Para obtener el ID
+
+    pedido = Pedido(
+        mesa_id=mesa_id,
+        sesion_id=sesion_activa.id,
+        mesero_id=mesero_id,
+        producto=producto,
+        item_menu_id=item.id if item else None,
+        cantidad=cantidad,
+        precio_unitario=precio_unitario,
+        notas=notas
+    )
+    if fecha is not None:
+        pedido.fecha = fecha
+    db.session.add(pedido)
+    db.session.flush()
+    return pedido
+
+
+# =========================
+# TICKETS DE COCINA
+# =========================
+
+def enviar_tickets_cocina(clave, titulo, items):
+    """
+    RAZÓN: Encola la comanda en papel después del commit. La categoría de cada
+    producto (para elegir la estación) se resuelve con una sola consulta;
+    la agrupación e impresión ocurren fuera del hilo de la petición.
+    items: dicts con producto, cantidad, notas e item_menu_id (opcional).
+    """
+    if not cola_tickets.activa:
+        return
+    
+    try:
+        ids = {i['item_menu_id'] for i in items if i.get('item_menu_id')}
+        nombres = {i['producto'] for i in items if not i.get('item_menu_id')}
+        filas = db.session.query(ItemMenu.id, ItemMenu.nombre, CategoriaMenu.nombre).join(
+            CategoriaMenu, ItemMenu.categoria_id == CategoriaMenu.id
+        ).filter(db.or_(ItemMenu.id.in_(ids), ItemMenu.nombre.in_(nombres))).all()
+        
+        categoria_por_id = {item_id: categoria for item_id, _, categoria in filas}
+        categoria_por_nombre = {nombre: categoria for _, nombre, categoria in filas}
+        for item in items:
+            if item.get('item_menu_id'):
+                item['categoria'] = categoria_por_id.get(item['item_menu_id'])
+            else:
+                item['categoria'] = categoria_por_nombre.get(item['producto'])
+        
+        cola_tickets.encolar(clave, titulo, items)
+    except Exception:
+        # La impresión nunca debe impedir registrar el pedido
+        current_app.logger.exception('No se pudo encolar el ticket de cocina')
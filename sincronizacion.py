@@ -0,0 +1,223 @@
+"""
+Sincronización de las operaciones hechas sin conexión por los meseros.
+
+RAZÓN: El Wi-Fi del salón se cae, y cada pedido era un POST que bloqueaba la
+página hasta que respondía el servidor. Ahora las páginas de meseros
+(dashboard, ver_mesa, nuevo_pedido) guardan cada operación en IndexedDB y la
+envían en lotes a /api/sincronizar (ver static/offline.js y static/sw.js).
+
+Cada lote se aplica en una sola transacción. Cada operación trae un id
+generado en el navegador; las que ya se aplicaron (porque el lote se reenvió
+después de un corte) no se repiten y devuelven el resultado guardado. Una
+operación inválida se rechaza sin afectar las demás del lote.
+"""
+
+import json
+from datetime import datetime, timedelta
+
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+
+from extensiones import db
+from modelos import Mesa, Pedido, OperacionSincronizada
+from servicios import registrar_pedido, enviar_tickets_cocina
+
+MAXIMO_OPERACIONES = 200
+
+# Una operación hecha sin conexión conserva su hora si llega dentro de este margen
+MAXIMO_RETRASO = timedelta(hours=12)
+
+# Cuánto se guardan los ids aplicados para reconocer reenvíos
+DIAS_RETENCION = 7
+
+ORDEN_ESTADOS = ['pendiente', 'preparando', 'listo', 'entregado']
+
+
+class OperacionInvalida(Exception):
+    pass
+
+
+def _fecha_cliente(valor, ahora):
+    """Hora en que se hizo la operación en el dispositivo, si es creíble"""
+    try:
+        fecha = datetime.fromisoformat(valor) if valor else None
+    except (TypeError, ValueError):
+        return None
+    if fecha is None:
+        return None
+    if fecha.tzinfo is not None:
+        # Las fechas de la app son hora local sin zona
+        fecha = fecha.astimezone().replace(tzinfo=None)
+    if not ahora - MAXIMO_RETRASO <= fecha <= ahora + timedelta(minutes=5):
+        return None
+    return fecha
+
+
+def _entero(datos, campo, defecto=None):
+    valor = datos.get(campo, defecto)
+    try:
+        return int(valor) if valor not in (None, '') else defecto
+    except (TypeError, ValueError):
+        raise OperacionInvalida(f"{campo} inválido")
+
+
+def _pedido_de(datos, aplicadas):
+    """Pedido por id del servidor o por la operación (del mismo u otro lote) que lo creó"""
+    pedido_id = _entero(datos, 'pedido_id')
+    if pedido_id is None and datos.get('operacion_pedido'):
+        resultado = aplicadas.get(datos['operacion_pedido'])
+        if resultado is None:
+            operacion = db.session.get(OperacionSincronizada, datos['operacion_pedido'])
+            resultado = json.loads(operacion.resultado) if operacion and operacion.resultado else {}
+        pedido_id = resultado.get('pedido_id')
+    pedido = db.session.get(Pedido, pedido_id) if pedido_id else None
+    if pedido is None:
+        raise OperacionInvalida("El pedido no existe")
+    return pedido
+
+
+# =========================
+# OPERACIONES
+# =========================
+
+def _crear_pedido(datos, usuario, fecha, creados, aplicadas):
+    mesa = db.session.get(Mesa, _entero(datos, 'mesa_id'))
+    if mesa is None:
+        raise OperacionInvalida("La mesa no existe")
+    producto = (datos.get('producto') or '').strip()
+    cantidad = _entero(datos, 'cantidad', 1)
+    if not producto or cantidad < 1:
+        raise OperacionInvalida("Producto o cantidad inválidos")
+    try:
+        precio_unitario = float(datos.get('precio_unitario') or 0)
+    except (TypeError, ValueError):
+        raise OperacionInvalida("precio_unitario inválido")
+
+    pedido = registrar_pedido(mesa.id, usuario.id, producto, cantidad, precio_unitario,
+                              datos.get('notas') or '', _entero(datos, 'item_menu_id'), fecha)
+    creados.append((mesa.id, mesa.numero, {
+        'producto': pedido.producto, 'cantidad': pedido.cantidad,
+        'notas': pedido.notas, 'item_menu_id': pedido.item_menu_id,
+    }))
+    return {'pedido_id': pedido.id, 'producto': pedido.producto, 'total': pedido.total}
+
+
+def _estado_pedido(datos, usuario, fecha, creados, aplicadas):
+    estado = datos.get('estado')
+    if estado not in ORDEN_ESTADOS:
+        raise OperacionInvalida("Estado inválido")
+    pedido = _pedido_de(datos, aplicadas)
+    # Otro dispositivo (la cocina) pudo avanzarlo mientras este estaba sin conexión
+    actual = pedido.estado if pedido.estado in ORDEN_ESTADOS else 'pendiente'
+    if ORDEN_ESTADOS.index(estado) < ORDEN_ESTADOS.index(actual):
+        return {'pedido_id': pedido.id, 'estado': pedido.estado, 'ignorada': True}
+    pedido.estado = estado
+    pedido.estado_actualizado = fecha or datetime.now()
+    return {'pedido_id': pedido.id, 'estado': estado}
+
+
+def _pedido_pagado(datos, usuario, fecha, creados, aplicadas):
+    pedido = _pedido_de(datos, aplicadas)
+    pedido.pagado = True
+    return {'pedido_id': pedido.id, 'pagado': True}
+
+
+OPERACIONES = {
+    'pedido': _crear_pedido,
+    'estado_pedido': _estado_pedido,
+    'pedido_pagado': _pedido_pagado,
+}
+
+
+# =========================
+# LOTE
+# =========================
+
+def _aplicar(operaciones, usuario):
+    ahora = datetime.now()
+    ids = [op.get('id') for op in operaciones if isinstance(op, dict) and op.get('id')]
+    anteriores = {
+        op.id: op for op in OperacionSincronizada.query.filter(OperacionSincronizada.id.in_(ids))
+    } if ids else {}
+
+    resultados = []
+    aplicadas = {}   # id -> resultado, para referencias dentro del mismo lote
+    creados = []     # (mesa_id, número, item) para los tickets de cocina
+    for op in operaciones:
+        op_id = op.get('id') if isinstance(op, dict) else None
+        if not op_id or len(str(op_id)) > 36:
+            resultados.append({'id': op_id, 'estado': 'rechazada', 'error': 'Falta el id de la operación'})
+            continue
+
+        anterior = anteriores.get(op_id)
+        if anterior is not None:
+            resultados.append({
+                'id': op_id, 'estado': 'duplicada',
+                'resultado': json.loads(anterior.resultado) if anterior.resultado else None,
+            })
+            continue
+        if op_id in aplicadas:
+            resultados.append({'id': op_id, 'estado': 'duplicada', 'resultado': aplicadas[op_id]})
+            continue
+
+        tipo = op.get('tipo')
+        fecha = _fecha_cliente(op.get('fecha'), ahora)
+        funcion = OPERACIONES.get(tipo)
+        try:
+            if funcion is None:
+                raise OperacionInvalida(f"Operación desconocida: {tipo}")
+            with db.session.begin_nested():
+                resultado = funcion(op.get('datos') or {}, usuario, fecha, creados, aplicadas)
+            estado, respuesta = 'aplicada', {'resultado': resultado}
+        except (OperacionInvalida, SQLAlchemyError) as e:
+            resultado = {'error': str(e) if isinstance(e, OperacionInvalida) else 'Error al guardar'}
+            estado, respuesta = 'rechazada', {'error': resultado['error']}
+
+        # Las rechazadas también se guardan: reenviarlas daría el mismo error
+        db.session.add(OperacionSincronizada(
+            id=op_id, usuario_id=usuario.id, tipo=str(tipo)[:30], estado=estado,
+            resultado=json.dumps(resultado), fecha_cliente=fecha, fecha_aplicada=ahora
+        ))
+        aplicadas[op_id] = resultado
+        resultados.append({'id': op_id, 'estado': estado, **respuesta})
+
+    return resultados, creados
+
+
+def sincronizar(operaciones, usuario):
+    """
+    Aplica un lote de operaciones en una transacción.
+    Retorna una lista con {'id', 'estado': aplicada|duplicada|rechazada,
+    'resultado' o 'error'} por operación, en el mismo orden.
+    """
+    if len(operaciones) > MAXIMO_OPERACIONES:
+        raise OperacionInvalida(f"Máximo {MAXIMO_OPERACIONES} operaciones por lote")
+
+    for intento in range(2):
+        try:
+            resultados, creados = _aplicar(operaciones, usuario)
+            limpiar_operaciones()
+            db.session.commit()
+            break
+        except IntegrityError:
+            # El mismo lote llegó dos veces a la vez: el segundo intento ve el
+            # primero ya guardado y responde con sus resultados
+            db.session.rollback()
+            if intento:
+                raise
+
+    # Tickets de cocina después del commit, una comanda por mesa
+    por_mesa = {}
+    for mesa_id, numero, item in creados:
+        por_mesa.setdefault((mesa_id, numero), []).append(item)
+    for (mesa_id, numero), items in por_mesa.items():
+        enviar_tickets_cocina(('mesa', mesa_id), f"MESA {numero}", items)
+
+    return resultados
+
+
+def limpiar_operaciones(dias=DIAS_RETENCION):
+    """Borra los ids de operaciones antiguas. No hace commit"""
+    limite = datetime.now() - timedelta(days=dias)
+    return db.session.execute(
+        db.delete(OperacionSincronizada).where(OperacionSincronizada.fecha_aplicada < limite)
+    ).rowcount
@@ -0,0 +1,396 @@
+// ============================================
+// CONFIGURACIÓN
+// ============================================
+const REFRESH_INTERVAL = 5000; // 5 segundos (más frecuente)
+const CHECK_INTERVAL = 3000; // 3 segundos para verificación rápida
+let currentPedidosIds = new Set();
+let countdown = 5;
+let hasUserInteracted = false;
+let lastNotificationTime = 0;
+const NOTIFICATION_COOLDOWN = 2000; // 2 segundos entre notificaciones
+
+// ============================================
+// SOLICITAR PERMISOS DE NOTIFICACIÓN
+// ============================================
+function requestNotificationPermission() {
+    if ('Notification' in window && Notification.permission === 'default') {
+        Notification.requestPermission();
+    }
+}
+
+// ============================================
+// MOSTRAR NOTIFICACIÓN DEL NAVEGADOR
+// ============================================
+function showBrowserNotification(message, pedido) {
+    if ('Notification' in window && Notification.permission === 'granted') {
+        const notification = new Notification('🍽️ Nuevo Pedido en Cocina', {
+            body: message,
+            icon: '/static/favicon.ico',
+            badge: '/static/favicon.ico',
+            tag: 'cocina-pedido',
+            requireInteraction: true,
+            vibrate: [200, 100, 200, 100, 200]
+        });
+
+        notification.onclick = function() {
+            window.focus();
+            notification.close();
+        };
+
+        setTimeout(() => notification.close(), 10000);
+    }
+}
+
+// ============================================
+// GENERAR SONIDO DE ALERTA POTENTE 🚨
+// ============================================
+function createAlertSound() {
+    const audioContext = new (window.AudioContext || window.webkitAudioContext)();
+
+    return function playAlert() {
+        if (!hasUserInteracted) {
+            console.log('⚠️ Haz click en la página para activar el sonido');
+            return;
+        }
+
+        // Verificar cooldown
+        const now = Date.now();
+        if (now - lastNotificationTime < NOTIFICATION_COOLDOWN) {
+            return;
+        }
+        lastNotificationTime = now;
+
+        // ALARMA TIPO SIRENA - MÁS POTENTE
+        const duration = 0.3;
+        const volume = 0.7; // VOLUMEN MÁS ALTO (0.7 = 70%)
+
+        // Patrón de sirena: 3 repeticiones de sube-baja
+        for (let repeat = 0; repeat < 3; repeat++) {
+            setTimeout(() => {
+                // Sonido 1: Frecuencia que sube (efecto sirena)
+                const oscillator1 = audioContext.createOscillator();
+                const gainNode1 = audioContext.createGain();
+
+                oscillator1.connect(gainNode1);
+                gainNode1.connect(audioContext.destination);
+
+                oscillator1.type = 'square'; // Onda cuadrada = más agresivo
+                oscillator1.frequency.setValueAtTime(800, audioContext.currentTime);
+                oscillator1.frequency.exponentialRampToValueAtTime(1200, audioContext.currentTime + duration);
+
+                gainNode1.gain.setValueAtTime(volume, audioContext.currentTime);
+                gainNode1.gain.exponentialRampToValueAtTime(0.01, audioContext.currentTime + duration);
+
+                oscillator1.start(audioContext.currentTime);
+                oscillator1.stop(audioContext.currentTime + duration);
+
+                // Sonido 2: Frecuencia que baja (efecto sirena inverso)
+                setTimeout(() => {
+                    const oscillator2 = audioContext.createOscillator();
+                    const gainNode2 = audioContext.createGain();
+
+                    oscillator2.connect(gainNode2);
+                    gainNode2.connect(audioContext.destination);
+
+                    oscillator2.type = 'square';
+                    oscillator2.frequency.setValueAtTime(1200, audioContext.currentTime);
+                    oscillator2.frequency.exponentialRampToValueAtTime(800, audioContext.currentTime + duration);
+
+                    gainNode2.gain.setValueAtTime(volume, audioContext.currentTime);
+                    gainNode2.gain.exponentialRampToValueAtTime(0.01, audioContext.currentTime + duration);
+
+                    oscillator2.start(audioContext.currentTime);
+                    oscillator2.stop(audioContext.currentTime + duration);
+                }, duration * 1000);
+
+            }, repeat * 700); // Repetir cada 700ms
+        }
+
+        // VIBRACIÓN MÁS LARGA Y POTENTE
+        if ('vibrate' in navigator) {
+            navigator.vibrate([300, 100, 300, 100, 300, 100, 300]);
+        }
+    };
+}
+
+const playAlertSound = createAlertSound();
+
+// ============================================
+// DETECTAR INTERACCIÓN DEL USUARIO
+// ============================================
+document.addEventListener('click', () => {
+    if (!hasUserInteracted) {
+        hasUserInteracted = true;
+        console.log('✅ Sonido activado');
+        showToast('🔊 Sonido de alertas activado', 'success');
+    }
+}, { once: true });
+
+document.addEventListener('keydown', () => {
+    if (!hasUserInteracted) {
+        hasUserInteracted = true;
+        console.log('✅ Sonido activado');
+    }
+}, { once: true });
+
+// Solicitar permisos al cargar
+setTimeout(requestNotificationPermission, 2000);
+
+// ============================================
+// INICIALIZAR IDS DE PEDIDOS ACTUALES
+// ============================================
+document.querySelectorAll('.pedido-card').forEach(card => {
+    currentPedidosIds.add(card.dataset.pedidoId);
+});
+
+// ============================================
+// MOSTRAR NOTIFICACIÓN TOAST
+// ============================================
+function showToast(message, type = 'info') {
+    const notification = document.getElementById('notification');
+    const notificationText = notification.querySelector('.notification-text');
+
+    // Cambiar color según tipo
+    if (type === 'success') {
+        notification.style.background = '#10b981';
+    } else if (type === 'warning') {
+        notification.style.background = '#f59e0b';
+    } else if (type === 'error') {
+        notification.style.background = '#ef4444';
+    } else {
+        notification.style.background = '#3b82f6';
+    }
+
+    notificationText.textContent = message;
+    notification.classList.add('show');
+
+    setTimeout(() => {
+        notification.classList.remove('show');
+    }, 5000);
+}
+
+// ============================================
+// ACTUALIZAR TIEMPO TRANSCURRIDO
+// ============================================
+function updateElapsedTimes() {
+    const now = Date.now() / 1000;
+    document.querySelectorAll('.tiempo-transcurrido').forEach(el => {
+        const timestamp = parseFloat(el.dataset.timestamp);
+        const minutes = Math.floor((now - timestamp) / 60);
+        el.textContent = `Hace ${minutes} min`;
+
+        // Cambiar color según tiempo
+        if (minutes > 20) {
+            el.style.color = '#dc2626';
+            el.style.fontWeight = '700';
+            el.parentElement.parentElement.parentElement.style.borderColor = '#dc2626';
+        } else if (minutes > 15) {
+            el.style.color = '#ef4444';
+            el.style.fontWeight = '700';
+        } else if (minutes > 10) {
+            el.style.color = '#f59e0b';
+        }
+    });
+}
+
+// ============================================
+// VERIFICAR NUEVOS PEDIDOS (API LIGERA)
+// ============================================
+let isChecking = false;
+
+async function checkNewPedidos() {
+    if (isChecking) return;
+    isChecking = true;
+
+    try {
+        const response = await fetch('/api/cocina/verificar_nuevos');
+        const data = await response.json();
+
+        let hasNewPedidos = false;
+        let newPedidosList = [];
+
+        data.pedidos.forEach(pedido => {
+            if (!currentPedidosIds.has(pedido.id.toString())) {
+                hasNewPedidos = true;
+                currentPedidosIds.add(pedido.id.toString());
+                newPedidosList.push(pedido);
+            }
+        });
+
+        if (hasNewPedidos) {
+            console.log('🆕 Nuevos pedidos detectados:', newPedidosList);
+
+            // Reproducir sonido
+            playAlertSound();
+
+            // Mostrar toast
+            const mensaje = newPedidosList.length === 1
+                ? `Mesa ${newPedidosList[0].mesa}: ${newPedidosList[0].cantidad}x ${newPedidosList[0].producto}`
+                : `${newPedidosList.length} nuevos pedidos en cocina`;
+
+            showToast(`🔔 ${mensaje}`, 'warning');
+
+            // Notificación del navegador
+            showBrowserNotification(mensaje, newPedidosList[0]);
+
+            // Recargar página para mostrar los pedidos
+            setTimeout(() => {
+                updatePage();
+            }, 500);
+        }
+
+        // Actualizar contadores sin recargar
+        if (!hasNewPedidos) {
+            document.getElementById('total-pedidos').textContent = data.total;
+            document.getElementById('pendientes-count').textContent = data.pendientes;
+            document.getElementById('preparando-count').textContent = data.preparando;
+        }
+
+    } catch (error) {
+        console.error('❌ Error al verificar pedidos:', error);
+    } finally {
+        isChecking = false;
+    }
+}
+
+// ============================================
+// ACTUALIZAR PÁGINA COMPLETA
+// ============================================
+async function updatePage() {
+    try {
+        const refreshStatus = document.getElementById('refresh-status');
+        refreshStatus.classList.add('updating');
+
+        const response = await fetch(window.location.href);
+        const html = await response.text();
+        const parser = new DOMParser();
+        const doc = parser.parseFromString(html, 'text/html');
+
+        // Obtener nuevos pedidos
+        const newPedidosContainer = doc.querySelector('#pedidos-container');
+        const newPedidosCards = doc.querySelectorAll('.pedido-card');
+
+        // Actualizar set de IDs
+        const newIds = new Set();
+        newPedidosCards.forEach(card => {
+            const pedidoId = card.dataset.pedidoId;
+            newIds.add(pedidoId);
+
+            // Marcar como nuevo si no existía antes
+            if (!currentPedidosIds.has(pedidoId)) {
+                card.classList.add('nuevo');
+            }
+        });
+
+        currentPedidosIds = newIds;
+
+        // Actualizar contenido
+        if (newPedidosContainer) {
+            document.getElementById('pedidos-container').innerHTML = newPedidosContainer.innerHTML;
+        }
+
+        // Actualizar contadores
+        document.getElementById('total-pedidos').textContent = 
+            doc.getElementById('total-pedidos').textContent;
+        document.getElementById('pendientes-count').textContent = 
+            doc.getElementById('pendientes-count').textContent;
+        document.getElementById('preparando-count').textContent = 
+            doc.getElementById('preparando-count').textContent;
+
+        refreshStatus.classList.remove('updating');
+
+    } catch (error) {
+        console.error('❌ Error al actualizar:', error);
+        showToast('Error al actualizar la página', 'error');
+    }
+}
+
+// ============================================
+// TIEMPOS EN VIVO (p50 / p90)
+// ============================================
+function textoSLA(nombre, cifras) {
+    return `<span class="sla-item ${cifras.fuera_de_objetivo ? 'fuera' : ''}">` +
+        `${nombre}: <strong>${cifras.p50} / ${cifras.p90} min</strong> (${cifras.cantidad})</span>`;
+}
+
+async function actualizarSLA() {
+    try {
+        const response = await fetch('/api/cocina/sla');
+        const datos = await response.json();
+        const cocina = datos.cocina;
+        const partes = [];
+        if (cocina.total.cantidad) {
+            partes.push(textoSLA('Todo', cocina.total));
+        }
+        for (const [estacion, cifras] of Object.entries(cocina.por_estacion)) {
+            partes.push(textoSLA(estacion, cifras));
+        }
+        document.getElementById('sla-estaciones').innerHTML =
+            partes.length ? partes.join(' · ') + ` <small>(objetivo ${cocina.objetivo_minutos} min)</small>` : 'Sin datos todavía';
+    } catch (error) {
+        console.error('❌ Error al leer los tiempos:', error);
+    }
+}
+
+// ============================================
+// CONTADOR REGRESIVO
+// ============================================
+function updateCountdown() {
+    countdown--;
+    document.getElementById('countdown').textContent = countdown;
+
+    if (countdown <= 0) {
+        countdown = 5;
+        updatePage();
+    }
+}
+
+// ============================================
+// INICIAR TIMERS
+// ============================================
+
+// Verificación rápida cada 3 segundos
+setInterval(checkNewPedidos, CHECK_INTERVAL);
+
+// Actualización completa cada 5 segundos
+setInterval(updateCountdown, 1000);
+
+// Actualizar tiempos transcurridos cada 30 segundos
+setInterval(updateElapsedTimes, 30000);
+
+// Actualizar tiempos al cargar
+updateElapsedTimes();
+
+// Tiempos en vivo cada 30 segundos
+actualizarSLA();
+setInterval(actualizarSLA, 30000);
+
+// Primera verificación después de 2 segundos
+setTimeout(checkNewPedidos, 2000);
+
+// ============================================
+// MANEJO DE VISIBILIDAD DE LA PÁGINA
+// ============================================
+document.addEventListener('visibilitychange', () => {
+    if (!document.hidden) {
+        // Cuando vuelven a la página, verificar inmediatamente
+        console.log('👀 Página visible, verificando pedidos...');
+        checkNewPedidos();
+        updatePage();
+    }
+});
+
+// ============================================
+// MENSAJE INICIAL
+// ============================================
+console.log('🔔 Sistema de alertas de cocina activo');
+console.log('👆 Haz click en cualquier parte para activar el sonido');
+console.log('🔄 Verificación automática cada 3 segundos');
+console.log('📱 Notificaciones del navegador disponibles');
+
+// Mostrar mensaje inicial
+setTimeout(() => {
+    if (!hasUserInteracted) {
+        showToast('👆 Haz click para activar el sonido de alertas', 'info');
+    }
+}, 3000);
@@ -0,0 +1,191 @@
+let selectedItem = null;
+let currentQuantity = 1;
+let currentMode = 'menu';
+
+function switchMode(mode) {
+    currentMode = mode;
+
+    // Actualizar botones
+    document.querySelectorAll('.mode-btn').forEach(btn => btn.classList.remove('active'));
+    event.target.classList.add('active');
+
+    // Actualizar vistas
+    document.getElementById('menuView').classList.toggle('active', mode === 'menu');
+    document.getElementById('manualView').classList.toggle('active', mode === 'manual');
+}
+
+function selectItem(id, nombre, precio, descripcion, element) {
+    // Remover selección anterior
+    document.querySelectorAll('.item-card').forEach(card => card.classList.remove('selected'));
+    element.classList.add('selected');
+
+    // Guardar item seleccionado
+    selectedItem = { id, nombre, precio, descripcion };
+    currentQuantity = 1;
+
+    // Mostrar info
+    document.getElementById('selectedName').textContent = nombre;
+    document.getElementById('selectedDesc').textContent = descripcion || '';
+    document.getElementById('selectedPrice').textContent = precio.toFixed(2);
+    document.getElementById('selectedInfo').classList.add('show');
+
+    // Mostrar panel de detalles
+    document.getElementById('orderDetails').classList.add('show');
+    document.getElementById('quantityDisplay').textContent = '1';
+
+    // Calcular total
+    updateTotal();
+
+    // Scroll al panel de detalles
+    document.getElementById('orderDetails').scrollIntoView({ behavior: 'smooth', block: 'nearest' });
+}
+
+// Tarjetas de platillos (los más pedidos o el resultado de la búsqueda)
+function mostrarPlatillos(platillos) {
+    const grid = document.getElementById('resultadosMenu');
+    grid.innerHTML = '';
+    platillos.forEach(p => {
+        const card = document.createElement('div');
+        card.className = 'item-card';
+        if (selectedItem && selectedItem.id === p.id) card.classList.add('selected');
+
+        const emoji = document.createElement('div');
+        emoji.className = 'item-emoji';
+        emoji.textContent = '🍽️';
+        card.appendChild(emoji);
+
+        const nombre = document.createElement('div');
+        nombre.className = 'item-nombre';
+        nombre.textContent = p.nombre;
+        card.appendChild(nombre);
+
+        if (p.descripcion) {
+            const desc = document.createElement('div');
+            desc.className = 'item-descripcion';
+            desc.textContent = p.descripcion;
+            card.appendChild(desc);
+        }
+
+        const precio = document.createElement('div');
+        precio.className = 'item-precio';
+        precio.textContent = '$' + p.precio.toFixed(2);
+        card.appendChild(precio);
+
+        card.addEventListener('click', () => selectItem(p.id, p.nombre, p.precio, p.descripcion, card));
+        grid.appendChild(card);
+    });
+    document.getElementById('sinResultados').classList.toggle('show', platillos.length === 0);
+}
+
+// Búsqueda en el servidor: espera a que se deje de escribir y descarta respuestas viejas
+let temporizadorBusqueda = null;
+let busquedaActual = null;
+
+document.getElementById('buscarPlatillo')?.addEventListener('input', function() {
+    const texto = this.value.trim();
+    clearTimeout(temporizadorBusqueda);
+    if (!texto) {
+        if (busquedaActual) busquedaActual.abort();
+        document.getElementById('tituloResultados').textContent = '⭐ Más pedidos';
+        mostrarPlatillos(FRECUENTES);
+        return;
+    }
+    temporizadorBusqueda = setTimeout(() => {
+        if (busquedaActual) busquedaActual.abort();
+        busquedaActual = new AbortController();
+        fetch(URL_BUSCAR + '?q=' + encodeURIComponent(texto), { signal: busquedaActual.signal })
+            .then(r => r.json())
+            .then(platillos => {
+                document.getElementById('tituloResultados').textContent = `Resultados para "${texto}"`;
+                mostrarPlatillos(platillos);
+            })
+            .catch(error => {
+                if (error.name === 'AbortError' || !Offline.disponible) return;
+                // Sin conexión: se busca en la copia local del menú
+                Offline.buscarMenu(texto).then(platillos => {
+                    document.getElementById('tituloResultados').textContent = `Resultados para "${texto}" (sin conexión)`;
+                    mostrarPlatillos(platillos);
+                });
+            });
+    }, 150);
+});
+
+if (document.getElementById('resultadosMenu')) {
+    mostrarPlatillos(FRECUENTES);
+    if (Offline.disponible) Offline.cargarMenu();
+}
+
+function changeQuantity(delta) {
+    currentQuantity = Math.max(1, currentQuantity + delta);
+    document.getElementById('quantityDisplay').textContent = currentQuantity;
+    updateTotal();
+}
+
+function updateTotal() {
+    if (selectedItem) {
+        const total = selectedItem.precio * currentQuantity;
+        document.getElementById('totalAmount').textContent = total.toFixed(2);
+    }
+}
+
+// Calcular total en modo manual
+document.getElementById('cantidad_manual')?.addEventListener('input', calcularTotalManual);
+document.getElementById('precio_manual')?.addEventListener('input', calcularTotalManual);
+
+function calcularTotalManual() {
+    const cantidad = parseInt(document.getElementById('cantidad_manual').value) || 0;
+    const precio = parseFloat(document.getElementById('precio_manual').value) || 0;
+    const total = cantidad * precio;
+
+    document.getElementById('totalManual').textContent = total.toFixed(2);
+    document.getElementById('totalPreviewManual').style.display = total > 0 ? 'block' : 'none';
+}
+
+// Enviar formulario
+document.getElementById('orderForm').addEventListener('submit', function(e) {
+    if (currentMode === 'menu') {
+        // Modo menú
+        if (!selectedItem) {
+            e.preventDefault();
+            alert('Por favor selecciona un producto del menú');
+            return;
+        }
+
+        document.getElementById('producto').value = selectedItem.nombre;
+        document.getElementById('cantidad').value = currentQuantity;
+        document.getElementById('precio_unitario').value = selectedItem.precio;
+        document.getElementById('item_menu_id').value = selectedItem.id;
+    } else {
+        // Modo manual
+        const productoManual = document.getElementById('producto_manual').value;
+        const cantidadManual = document.getElementById('cantidad_manual').value;
+        const precioManual = document.getElementById('precio_manual').value;
+
+        if (!productoManual || !cantidadManual || !precioManual) {
+            e.preventDefault();
+            alert('Por favor completa todos los campos obligatorios');
+            return;
+        }
+
+        document.getElementById('producto').value = productoManual;
+        document.getElementById('cantidad').value = cantidadManual;
+        document.getElementById('precio_unitario').value = precioManual;
+        document.getElementById('item_menu_id').value = '';
+        document.getElementById('notas').value = document.getElementById('notas_manual').value;
+    }
+
+    // El pedido se guarda en la cola local y se envía en segundo plano
+    if (Offline.disponible) {
+        e.preventDefault();
+        const valor = id => document.getElementById(id).value;
+        Offline.encolar('pedido', {
+            mesa_id: MESA_ID,
+            producto: valor('producto'),
+            cantidad: parseInt(valor('cantidad')),
+            precio_unitario: parseFloat(valor('precio_unitario')),
+            notas: valor('notas'),
+            item_menu_id: valor('item_menu_id') ? parseInt(valor('item_menu_id')) : null,
+        }).then(() => { window.location.href = URL_MESA; })
+          .catch(() => this.submit());
+    }
+});
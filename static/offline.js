@@ -0,0 +1,211 @@
+// Modo sin conexión de las páginas de meseros (ver sincronizacion.py).
+// Las operaciones (pedidos, cambios de estado, pagos) se guardan primero en
+// IndexedDB y la página sigue sin esperar al servidor. Luego se envían en
+// lotes a /api/sincronizar; si no hay conexión, se reintenta más tarde.
+// Cada operación lleva un id propio, así que reenviar un lote no la duplica.
+
+const Offline = (() => {
+    const URL_SINCRONIZAR = '/api/sincronizar';
+    const URL_MENU = '/api/menu/platillos';
+    const TAMANO_LOTE = 50;
+    const ESPERA_RESPUESTA_MS = 10000;
+    const REINTENTO_MS = 15000;
+
+    let baseDatos = null;
+    let sincronizando = false;
+
+    // ---------- IndexedDB ----------
+
+    function abrir() {
+        if (baseDatos) return Promise.resolve(baseDatos);
+        return new Promise((resolve, reject) => {
+            const solicitud = indexedDB.open('meseros', 1);
+            solicitud.onupgradeneeded = () => {
+                const db = solicitud.result;
+                db.createObjectStore('operaciones', { keyPath: 'id' });
+                db.createObjectStore('menu');
+            };
+            solicitud.onsuccess = () => { baseDatos = solicitud.result; resolve(baseDatos); };
+            solicitud.onerror = () => reject(solicitud.error);
+        });
+    }
+
+    function transaccion(almacen, modo, accion) {
+        return abrir().then(db => new Promise((resolve, reject) => {
+            const tx = db.transaction(almacen, modo);
+            const resultado = accion(tx.objectStore(almacen));
+            tx.oncomplete = () => resolve(resultado && 'result' in resultado ? resultado.result : undefined);
+            tx.onerror = () => reject(tx.error);
+        }));
+    }
+
+    function uuid() {
+        if (self.crypto && crypto.randomUUID) return crypto.randomUUID();
+        const b = crypto.getRandomValues(new Uint8Array(16));
+        b[6] = (b[6] & 0x0f) | 0x40;
+        b[8] = (b[8] & 0x3f) | 0x80;
+        const h = Array.from(b, x => x.toString(16).padStart(2, '0')).join('');
+        return `${h.slice(0, 8)}-${h.slice(8, 12)}-${h.slice(12, 16)}-${h.slice(16, 20)}-${h.slice(20)}`;
+    }
+
+    function fechaLocal() {
+        // Hora local sin zona, como las fechas del servidor
+        const d = new Date();
+        return new Date(d.getTime() - d.getTimezoneOffset() * 60000).toISOString().slice(0, 19);
+    }
+
+    // ---------- Cola de operaciones ----------
+
+    function encolar(tipo, datos) {
+        const operacion = { id: uuid(), tipo, datos, fecha: fechaLocal(), estado: 'pendiente', creada: Date.now() };
+        return transaccion('operaciones', 'readwrite', s => s.put(operacion)).then(() => {
+            actualizarIndicador();
+            sincronizar();
+            return operacion;
+        });
+    }
+
+    function operaciones(filtro) {
+        return transaccion('operaciones', 'readonly', s => s.getAll()).then(todas =>
+            todas.sort((a, b) => a.creada - b.creada).filter(filtro || (() => true))
+        );
+    }
+
+    function descartar(id) {
+        return transaccion('operaciones', 'readwrite', s => s.delete(id)).then(actualizarIndicador);
+    }
+
+    function enviar(lote) {
+        const controlador = new AbortController();
+        const temporizador = setTimeout(() => controlador.abort(), ESPERA_RESPUESTA_MS);
+        return fetch(URL_SINCRONIZAR, {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            credentials: 'same-origin',
+            body: JSON.stringify({
+                operaciones: lote.map(op => ({ id: op.id, tipo: op.tipo, datos: op.datos, fecha: op.fecha }))
+            }),
+            signal: controlador.signal,
+        }).then(respuesta => {
+            clearTimeout(temporizador);
+            // Sesión vencida: el login responde HTML; se reintenta después de entrar
+            if (!respuesta.ok || respuesta.redirected) throw new Error(`HTTP ${respuesta.status}`);
+            return respuesta.json();
+        });
+    }
+
+    async function sincronizar() {
+        if (sincronizando || !navigator.onLine) return;
+        sincronizando = true;
+        const aplicadas = [];
+        try {
+            const pendientes = await operaciones(op => op.estado === 'pendiente');
+            for (let i = 0; i < pendientes.length; i += TAMANO_LOTE) {
+                const lote = pendientes.slice(i, i + TAMANO_LOTE);
+                const { resultados } = await enviar(lote);
+                const porId = Object.fromEntries(lote.map(op => [op.id, op]));
+                await transaccion('operaciones', 'readwrite', s => {
+                    resultados.forEach(r => {
+                        const op = porId[r.id];
+                        if (!op) return;
+                        if (r.estado === 'rechazada') {
+                            // Queda a la vista para que el mesero la revise
+                            s.put(Object.assign(op, { estado: 'rechazada', error: r.error }));
+                        } else {
+                            s.delete(r.id);
+                            aplicadas.push(Object.assign(op, { resultado: r.resultado }));
+                        }
+                    });
+                });
+            }
+        } catch (error) {
+            setTimeout(sincronizar, REINTENTO_MS);
+        } finally {
+            sincronizando = false;
+            actualizarIndicador();
+            if (aplicadas.length) {
+                window.dispatchEvent(new CustomEvent('offline:sincronizado', { detail: aplicadas }));
+            }
+        }
+    }
+
+    // ---------- Menú local ----------
+
+    function normalizar(texto) {
+        return (texto || '').normalize('NFD').replace(/[\u0300-\u036f]/g, '').toLowerCase();
+    }
+
+    function cargarMenu() {
+        if (!navigator.onLine) return Promise.resolve();
+        return fetch(URL_MENU, { credentials: 'same-origin' })
+            .then(r => (r.ok && !r.redirected) ? r.json() : Promise.reject())
+            .then(platillos => transaccion('menu', 'readwrite', s => s.put(platillos, 'platillos')))
+            .catch(() => {});
+    }
+
+    function buscarMenu(texto, limite = 20) {
+        const palabras = normalizar(texto).split(/\s+/).filter(Boolean);
+        return transaccion('menu', 'readonly', s => s.get('platillos')).then(platillos =>
+            (platillos || [])
+                .map(([id, nombre, precio, categoria, descripcion]) => ({ id, nombre, precio, categoria, descripcion }))
+                .filter(p => {
+                    const texto = normalizar(`${p.nombre} ${p.descripcion} ${p.categoria}`);
+                    return palabras.every(palabra => texto.includes(palabra));
+                })
+                .slice(0, limite)
+        );
+    }
+
+    // ---------- Indicador ----------
+
+    function actualizarIndicador() {
+        operaciones().then(todas => {
+            let indicador = document.getElementById('indicadorOffline');
+            if (!indicador) {
+                indicador = document.createElement('div');
+                indicador.id = 'indicadorOffline';
+                indicador.style.cssText = 'position: fixed; bottom: 16px; left: 16px; z-index: 2000; ' +
+                    'padding: 8px 14px; border-radius: 20px; font-size: 14px; color: white; ' +
+                    'box-shadow: 0 2px 8px rgba(0,0,0,0.25); display: none; cursor: pointer;';
+                indicador.addEventListener('click', revisar);
+                document.body.appendChild(indicador);
+            }
+            const pendientes = todas.filter(op => op.estado === 'pendiente').length;
+            const rechazadas = todas.filter(op => op.estado === 'rechazada').length;
+            const partes = [];
+            if (!navigator.onLine) partes.push('📡 Sin conexión');
+            if (pendientes) partes.push(`⏳ ${pendientes} por sincronizar`);
+            if (rechazadas) partes.push(`⚠️ ${rechazadas} rechazada(s)`);
+            indicador.textContent = partes.join(' · ');
+            indicador.style.background = rechazadas ? '#e74c3c' : (navigator.onLine ? '#f39c12' : '#7f8c8d');
+            indicador.style.display = partes.length ? 'block' : 'none';
+        }).catch(() => {});
+    }
+
+    function revisar() {
+        operaciones(op => op.estado === 'rechazada').then(rechazadas => {
+            if (!rechazadas.length) return sincronizar();
+            const detalle = rechazadas.map(op =>
+                `• ${op.tipo === 'pedido' ? `${op.datos.cantidad}x ${op.datos.producto}` : op.tipo}: ${op.error}`
+            ).join('\n');
+            if (confirm(`El servidor rechazó estas operaciones:\n\n${detalle}\n\n¿Descartarlas?`)) {
+                Promise.all(rechazadas.map(op => descartar(op.id)));
+            }
+        });
+    }
+
+    // ---------- Arranque ----------
+
+    const disponible = 'indexedDB' in window && 'fetch' in window && 'AbortController' in window;
+
+    if (disponible) {
+        if ('serviceWorker' in navigator) {
+            navigator.serviceWorker.register('/sw.js').catch(() => {});
+        }
+        window.addEventListener('online', () => { actualizarIndicador(); sincronizar(); });
+        window.addEventListener('offline', actualizarIndicador);
+        document.addEventListener('DOMContentLoaded', () => { actualizarIndicador(); sincronizar(); });
+    }
+
+    return { disponible, encolar, operaciones, descartar, sincronizar, cargarMenu, buscarMenu };
+})();
@@ -0,0 +1,121 @@
+// Service worker de las páginas de meseros (ver sincronizacion.py).
+// - Páginas de meseros: primero la red; si no hay conexión, la última copia guardada.
+// - Archivos estáticos: la copia guardada, y se actualiza en segundo plano.
+// - Archivos con huella (/activos/, ver activos.py): la copia guardada; esa URL
+//   nunca cambia de contenido, así que no se vuelve a pedir.
+// Los POST no pasan por aquí: offline.js los guarda en IndexedDB y los sincroniza.
+
+const VERSION = 'meseros-v2';
+const CACHE_PAGINAS = `${VERSION}-paginas`;
+const CACHE_ESTATICOS = `${VERSION}-estaticos`;
+
+const PAGINAS_MESEROS = [/^\/dashboard$/, /^\/mesa\/\d+$/, /^\/nuevo_pedido\/\d+$/];
+
+// Sin respuesta en este tiempo, se usa la copia guardada
+const ESPERA_RED_MS = 3000;
+
+// Las páginas piden sus archivos por la URL con huella: se guardan la primera
+// vez que se abren con conexión, no hace falta descargarlos al instalar
+self.addEventListener('install', event => {
+    event.waitUntil(self.skipWaiting());
+});
+
+self.addEventListener('activate', event => {
+    event.waitUntil(
+        caches.keys()
+            .then(nombres => Promise.all(
+                nombres.filter(nombre => !nombre.startsWith(VERSION)).map(nombre => caches.delete(nombre))
+            ))
+            .then(() => self.clients.claim())
+    );
+});
+
+self.addEventListener('message', event => {
+    // Al cerrar sesión no quedan páginas de un usuario en el dispositivo
+    if (event.data === 'limpiar') {
+        event.waitUntil(caches.delete(CACHE_PAGINAS));
+    }
+});
+
+function conTiempoLimite(promesa, ms) {
+    return new Promise((resolve, reject) => {
+        const temporizador = setTimeout(() => reject(new Error('tiempo agotado')), ms);
+        promesa.then(
+            valor => { clearTimeout(temporizador); resolve(valor); },
+            error => { clearTimeout(temporizador); reject(error); }
+        );
+    });
+}
+
+function guardable(respuesta) {
+    // Una redirección al login no es la página pedida
+    return respuesta && respuesta.ok && !respuesta.redirected;
+}
+
+async function primeroRed(request) {
+    const cache = await caches.open(CACHE_PAGINAS);
+    const red = fetch(request).then(respuesta => {
+        if (guardable(respuesta)) cache.put(request, respuesta.clone());
+        return respuesta;
+    });
+    try {
+        return await conTiempoLimite(red, ESPERA_RED_MS);
+    } catch (error) {
+        const guardada = await cache.match(request, { ignoreSearch: true });
+        if (guardada) return guardada;
+        try {
+            return await red;
+        } catch (errorRed) {
+            return new Response(
+                '<!DOCTYPE html><html lang="es"><meta charset="UTF-8">' +
+                '<meta name="viewport" content="width=device-width, initial-scale=1.0">' +
+                '<body style="font-family: sans-serif; text-align: center; padding: 3rem;">' +
+                '<h2>📡 Sin conexión</h2><p>Esta página no se ha abierto antes en este dispositivo.</p>' +
+                '<p><a href="/dashboard">Volver al dashboard</a></p></body></html>',
+                { status: 503, headers: { 'Content-Type': 'text/html; charset=utf-8' } }
+            );
+        }
+    }
+}
+
+async function copiaYActualizar(request) {
+    const cache = await caches.open(CACHE_ESTATICOS);
+    const guardada = await cache.match(request);
+    const red = fetch(request).then(respuesta => {
+        if (guardable(respuesta)) cache.put(request, respuesta.clone());
+        return respuesta;
+    });
+    if (guardada) {
+        red.catch(() => {});
+        return guardada;
+    }
+    return red;
+}
+
+async function primeroCopia(request) {
+    const cache = await caches.open(CACHE_ESTATICOS);
+    const guardada = await cache.match(request);
+    if (guardada) return guardada;
+    const respuesta = await fetch(request);
+    // Solo se guarda si el servidor la marcó inmutable (la huella coincidía)
+    if (guardable(respuesta) && (respuesta.headers.get('Cache-Control') || '').includes('immutable')) {
+        cache.put(request, respuesta.clone());
+    }
+    return respuesta;
+}
+
+self.addEventListener('fetch', event => {
+    const request = event.request;
+    if (request.method !== 'GET') return;
+
+    const url = new URL(request.url);
+    if (url.origin !== self.location.origin) return;
+
+    if (request.mode === 'navigate' && PAGINAS_MESEROS.some(patron => patron.test(url.pathname))) {
+        event.respondWith(primeroRed(request));
+    } else if (url.pathname.startsWith('/activos/')) {
+        event.respondWith(primeroCopia(request));
+    } else if (url.pathname.startsWith('/static/')) {
+        event.respondWith(copiaYActualizar(request));
+    }
+});
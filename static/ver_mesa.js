@@ -0,0 +1,83 @@
+// Pagar y cambiar estado sin esperar al servidor: se guardan en la cola
+// y la tarjeta se actualiza de inmediato
+document.querySelectorAll('a[data-operacion]').forEach(enlace => {
+    enlace.addEventListener('click', function(e) {
+        if (!Offline.disponible || e.defaultPrevented) return;
+        e.preventDefault();
+        const tarjeta = this.closest('.pedido-card');
+        const datos = { pedido_id: parseInt(this.dataset.pedido) };
+        if (this.dataset.operacion === 'estado_pedido') {
+            datos.estado = this.dataset.estado;
+            const badge = tarjeta.querySelector('.estado-badge');
+            badge.className = 'estado-badge estado-' + datos.estado;
+            badge.textContent = datos.estado;
+        } else {
+            tarjeta.classList.add('pedido-pagado');
+            const badge = tarjeta.querySelector('.badge-warning');
+            if (badge) {
+                badge.className = 'badge badge-success';
+                badge.textContent = 'Pagado ✓';
+            }
+        }
+        this.remove();
+        Offline.encolar(this.dataset.operacion, datos);
+    });
+});
+
+function mostrarPorSincronizar() {
+    if (!Offline.disponible) return;
+    Offline.operaciones(op => op.tipo === 'pedido' && op.datos.mesa_id === MESA_ID).then(pedidos => {
+        const contenedor = document.getElementById('pedidosPorSincronizar');
+        contenedor.innerHTML = '';
+        pedidos.forEach(op => {
+            const tarjeta = document.createElement('div');
+            tarjeta.className = 'pedido-card';
+            const titulo = document.createElement('h3');
+            titulo.textContent = `${op.datos.cantidad}x ${op.datos.producto}`;
+            const detalle = document.createElement('p');
+            detalle.className = 'pedido-hora';
+            detalle.textContent = op.estado === 'rechazada'
+                ? `⚠️ Rechazado: ${op.error}`
+                : `⏰ ${op.fecha.slice(11, 16)} - ⏳ Por sincronizar`;
+            tarjeta.append(titulo, detalle);
+            contenedor.appendChild(tarjeta);
+        });
+        contenedor.style.display = pedidos.length ? 'block' : 'none';
+    }).catch(() => {});
+}
+
+document.addEventListener('DOMContentLoaded', mostrarPorSincronizar);
+
+// Cuando llegan al servidor los pedidos de esta mesa, se recarga para verlos con su id
+window.addEventListener('offline:sincronizado', e => {
+    if (e.detail.some(op => op.tipo === 'pedido' && op.datos.mesa_id === MESA_ID)) {
+        location.reload();
+    } else {
+        mostrarPorSincronizar();
+    }
+});
+
+function abrirModalCuenta(idSesion) {
+    const modal = document.getElementById('modal_' + idSesion);
+    modal.classList.add('show');
+}
+
+function cerrarModal(idSesion) {
+    const modal = document.getElementById('modal_' + idSesion);
+    modal.classList.remove('show');
+}
+
+// Cerrar modal al hacer clic fuera de él
+window.onclick = function(event) {
+    if (event.target.classList.contains('modal')) {
+        event.target.classList.remove('show');
+    }
+}
+
+// Cerrar modal con tecla ESC
+document.addEventListener('keydown', function(event) {
+    if (event.key === 'Escape') {
+        const modals = document.querySelectorAll('.modal.show');
+        modals.forEach(modal => modal.classList.remove('show'));
+    }
+});
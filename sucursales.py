@@ -0,0 +1,223 @@
+"""
+Varias sucursales en un solo despliegue.
+
+RAZÓN: Cada local corría su propia copia de la app, con su propia
+ConfiguracionRestaurante y su propio consecutivo FACT-. Ahora las tablas de
+la operación (mesas, sesiones, pedidos, facturas, gastos, domicilios, menú,
+presupuestos, configuración, inventario, consumo interno y los agregados de ocupación y ventas) llevan
+sucursal_id, y cada consulta ORM de una petición se filtra por la sucursal de
+esa petición sin que cada ruta tenga que acordarse:
+
+- El filtro es un with_loader_criteria global (evento do_orm_execute): aplica
+  a SELECT, UPDATE y DELETE, a los conteos y a las relaciones perezosas.
+  get_or_404 de una fila de otra sucursal da 404.
+- Las filas nuevas reciben la sucursal de la petición al hacer flush.
+- Los índices de esas tablas empiezan por sucursal_id, así que las consultas
+  de una sucursal no recorren las filas de las otras.
+
+La sucursal de la petición: la del usuario; si el usuario no tiene (el
+dueño), la que eligió en el menú; sin sesión iniciada (menú público), la de
+?sucursal=codigo. Si no hay ninguna de esas, la primera sucursal.
+
+Fuera de una petición (comandos flask, migraciones) no hay filtro. Los
+reportes consolidados usan `with todas_las_sucursales():`.
+"""
+
+from contextlib import contextmanager
+
+from flask import g, has_app_context, has_request_context, request, session as sesion_flask
+from flask_login import current_user
+from sqlalchemy import event
+from sqlalchemy.orm import Session, with_loader_criteria
+
+from cache_local import CacheLRU
+from extensiones import db
+from modelos import (
+    Sucursal,
+    Mesa,
+    Sesion,
+    Pedido,
+    ItemMenu,
+    Factura,
+    ConfiguracionRestaurante,
+    Presupuesto,
+    Gasto,
+    Domicilio,
+    OcupacionMesaHora,
+    VentasDia,
+    VentaItemDia,
+    TransicionEstado,
+    Ingrediente,
+    PagoFactura,
+    ConsumoInterno,
+)
+
+MODELOS_POR_SUCURSAL = (
+    Mesa, Sesion, Pedido, ItemMenu, Factura, ConfiguracionRestaurante, Presupuesto,
+    Gasto, Domicilio, OcupacionMesaHora, VentasDia, VentaItemDia, TransicionEstado, Ingrediente,
+    PagoFactura, ConsumoInterno,
+)
+
+# Sucursal elegida por el dueño en la cookie de sesión
+CLAVE_SESION = 'sucursal_id'
+
+cache_sucursales = CacheLRU(max_elementos=1, ttl=60)
+
+
+# =========================
+# SUCURSALES
+# =========================
+
+def listar():
+    """Sucursales activas [{'id', 'nombre', 'codigo'}] (se releen cada minuto)"""
+    sucursales = cache_sucursales.obtener('activas')
+    if sucursales is None:
+        sucursales = [
+            {'id': id_, 'nombre': nombre, 'codigo': codigo}
+            for id_, nombre, codigo in db.session.execute(
+                db.select(Sucursal.id, Sucursal.nombre, Sucursal.codigo)
+                .where(Sucursal.activa == True)
+                .order_by(Sucursal.id)
+            )
+        ]
+        cache_sucursales.guardar('activas', sucursales)
+    return sucursales
+
+
+def invalidar():
+    """Llamar después de crear o modificar sucursales"""
+    cache_sucursales.limpiar()
+
+
+def sucursal_defecto_id():
+    sucursales = listar()
+    return sucursales[0]['id'] if sucursales else None
+
+
+def es_dueno(usuario):
+    """Administrador sin sucursal fija: ve todas y puede cambiar de una a otra"""
+    return usuario.rol == 'admin' and getattr(usuario, 'sucursal_id', None) is None
+
+
+def _resolver():
+    """Sucursal de la petición (antes de cada petición)"""
+    activas = {s['id'] for s in listar()}
+    if current_user.is_authenticated:
+        if getattr(current_user, 'sucursal_id', None):
+            return current_user.sucursal_id
+        elegida = sesion_flask.get(CLAVE_SESION)
+        if es_dueno(current_user) and elegida in activas:
+            return elegida
+    else:
+        codigo = request.args.get('sucursal')
+        for sucursal in listar():
+            if codigo and sucursal['codigo'] == codigo:
+                return sucursal['id']
+    return sucursal_defecto_id()
+
+
+def sucursal_actual_id():
+    """Sucursal por la que se filtra ahora mismo (None = sin filtro)"""
+    if not has_app_context() or g.get('todas_sucursales'):
+        return None
+    return g.get('sucursal_id')
+
+
+def sucursal_actual():
+    """{'id', 'nombre', 'codigo'} de la sucursal de la petición, para las plantillas"""
+    sucursal_id = g.get('sucursal_id') if has_app_context() else None
+    return next((s for s in listar() if s['id'] == sucursal_id), None)
+
+
+@contextmanager
+def todas_las_sucursales():
+    """Consultas sin filtro de sucursal (reportes consolidados, agregados)"""
+    anterior = g.get('todas_sucursales', False)
+    g.todas_sucursales = True
+    try:
+        yield
+    finally:
+        g.todas_sucursales = anterior
+
+
+# =========================
+# FILTRO Y ASIGNACIÓN AUTOMÁTICOS
+# =========================
+
+@event.listens_for(Session, 'do_orm_execute')
+def _filtrar_por_sucursal(estado):
+    if not (estado.is_select or estado.is_update or estado.is_delete):
+        return
+    # Refrescar un objeto ya cargado o cargar sus relaciones hereda el filtro de la consulta original
+    if estado.is_column_load or estado.is_relationship_load:
+        return
+    sucursal_id = sucursal_actual_id()
+    if sucursal_id is None:
+        return
+    estado.statement = estado.statement.options(*(
+        with_loader_criteria(modelo, lambda tabla: tabla.sucursal_id == sucursal_id, include_aliases=True)
+        for modelo in MODELOS_POR_SUCURSAL
+    ))
+
+
+def sucursal_para_nuevos():
+    """Sucursal de las filas que se crean ahora: la de la petición o la primera"""
+    sucursal_id = g.get('sucursal_id') if has_app_context() else None
+    return sucursal_id or sucursal_defecto_id()
+
+
+@event.listens_for(Session, 'before_flush')
+def _asignar_sucursal(sesion, contexto, instancias):
+    nuevos = [obj for obj in sesion.new if isinstance(obj, MODELOS_POR_SUCURSAL) and obj.sucursal_id is None]
+    if nuevos:
+        with sesion.no_autoflush:
+            sucursal_id = sucursal_para_nuevos()
+        for obj in nuevos:
+            obj.sucursal_id = sucursal_id
+
+
+# =========================
+# FACTURAS
+# =========================
+
+def siguiente_numero_factura():
+    """
+    Siguiente número del consecutivo de la sucursal ("FACT-000124").
+    El UPDATE deja la fila de la sucursal bloqueada hasta el commit de la
+    factura, así que dos cajas no sacan el mismo número. Se saltan los
+    números que ya existan (facturas creadas con el esquema anterior).
+    No hace commit.
+    """
+    sucursal_id = sucursal_para_nuevos()
+    while True:
+        prefijo, consecutivo = db.session.execute(
+            db.update(Sucursal).where(Sucursal.id == sucursal_id)
+            .values(ultimo_consecutivo=Sucursal.ultimo_consecutivo + 1)
+            .returning(Sucursal.prefijo_factura, Sucursal.ultimo_consecutivo)
+        ).one()
+        numero = f"{prefijo}-{consecutivo:06d}"
+        with todas_las_sucursales():
+            existe = db.session.query(
+                db.select(Factura.id).where(Factura.numero_consecutivo == numero).exists()
+            ).scalar()
+        if not existe:
+            return numero
+
+
+# =========================
+# INSTALACIÓN
+# =========================
+
+def instalar(app):
+    @app.before_request
+    def fijar_sucursal():
+        g.sucursal_id = _resolver()
+
+    @app.context_processor
+    def datos_sucursal():
+        if not has_request_context() or not current_user.is_authenticated:
+            return {}
+        return {
+            'sucursal_actual': sucursal_actual(),
+            'sucursales_disponibles': listar() if es_dueno(current_user) else [],
+        }
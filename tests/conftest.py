@@ -0,0 +1,99 @@
+"""
+Fixtures de las pruebas: cada prueba arma su propia app con una base SQLite
+nueva en tmp_path (DATABASE_URL), igual que en producción pero sin datos.
+
+    python -m pytest -q
+"""
+
+import os
+import sys
+
+import pytest
+from flask.testing import FlaskClient
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+# La app global de app.py no debe abrir restaurante.db del repositorio
+os.environ['DATABASE_URL'] = 'sqlite://'
+os.environ.pop('MODULOS_DESHABILITADOS', None)
+os.environ.pop('DATABASE_REPLICA_URL', None)
+os.environ.pop('IMPRESORAS_COCINA', None)
+
+from app import create_app  # noqa: E402
+from cache_local import CacheLRU  # noqa: E402
+from extensiones import db  # noqa: E402
+import esquema  # noqa: E402
+
+
+def _limpiar_caches():
+    """Las caches del proceso guardan ids y versiones de la base de la prueba anterior"""
+    for modulo in list(sys.modules.values()):
+        if not getattr(modulo, '__file__', None) or not modulo.__file__.startswith(RAIZ):
+            continue
+        for valor in list(vars(modulo).values()):
+            if isinstance(valor, CacheLRU):
+                valor.limpiar()
+
+
+class ClientePruebas(FlaskClient):
+    """
+    Cada petición corre en su propio app_context, como en un worker, aunque la
+    prueba tenga uno abierto: no comparte g ni db.session con la prueba.
+    """
+
+    def open(self, *args, **kwargs):
+        contexto = self.application.extensions.get('contexto_pruebas')
+        if contexto is None:
+            return super().open(*args, **kwargs)
+        contexto.pop()
+        try:
+            return super().open(*args, **kwargs)
+        finally:
+            contexto.push()
+
+
+@pytest.fixture
+def app_vacia(tmp_path, monkeypatch):
+    """App con una base de datos sin tablas, dentro de un app_context"""
+    ruta = tmp_path / 'restaurante.db'
+    monkeypatch.setenv('DATABASE_URL', f"sqlite:///{ruta}")
+    _limpiar_caches()
+    aplicacion = create_app()
+    aplicacion.config['TESTING'] = True
+    aplicacion.test_client_class = ClientePruebas
+    contexto = aplicacion.app_context()
+    contexto.push()
+    aplicacion.extensions['contexto_pruebas'] = contexto
+    try:
+        yield aplicacion
+    finally:
+        del aplicacion.extensions['contexto_pruebas']
+        db.session.remove()
+        db.engine.dispose()
+        contexto.pop()
+
+
+@pytest.fixture
+def app(app_vacia):
+    """App con el esquema actual y los datos iniciales (usuarios, mesas, sucursal)"""
+    esquema.preparar_base_datos()
+    return app_vacia
+
+
+def iniciar_sesion(aplicacion, username, password):
+    """Cliente de pruebas con la sesión de ese usuario iniciada"""
+    cliente = aplicacion.test_client()
+    respuesta = cliente.post('/', data={'username': username, 'password': password})
+    assert respuesta.status_code == 302, respuesta.get_data(as_text=True)
+    return cliente
+
+
+@pytest.fixture
+def mesero(app):
+    return iniciar_sesion(app, 'mesero1', 'mesero123')
+
+
+@pytest.fixture
+def admin(app):
+    return iniciar_sesion(app, 'admin', 'admin123')
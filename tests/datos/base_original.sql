@@ -0,0 +1,297 @@
+-- Base de datos como la dejaba el app.py original (antes de migraciones/),
+-- con algunos datos de cada cosa que rellenan las migraciones.
+CREATE TABLE usuario (
+	id INTEGER NOT NULL,
+	username VARCHAR(80) NOT NULL,
+	password_hash VARCHAR(200) NOT NULL,
+	nombre VARCHAR(100) NOT NULL,
+	rol VARCHAR(20),
+	PRIMARY KEY (id),
+	UNIQUE (username)
+);
+
+CREATE TABLE mesa (
+	id INTEGER NOT NULL,
+	numero INTEGER NOT NULL,
+	capacidad INTEGER,
+	activa BOOLEAN,
+	PRIMARY KEY (id),
+	UNIQUE (numero)
+);
+
+CREATE TABLE categoria_menu (
+	id INTEGER NOT NULL,
+	nombre VARCHAR(100) NOT NULL,
+	orden INTEGER,
+	activa BOOLEAN,
+	PRIMARY KEY (id)
+);
+
+CREATE TABLE configuracion_restaurante (
+	id INTEGER NOT NULL,
+	nombre VARCHAR(200),
+	nit VARCHAR(50),
+	direccion VARCHAR(300),
+	ciudad VARCHAR(100),
+	telefono VARCHAR(50),
+	email VARCHAR(100),
+	regimen VARCHAR(100),
+	resolucion_dian VARCHAR(200),
+	rango_facturacion VARCHAR(100),
+	iva_porcentaje FLOAT,
+	logo_url VARCHAR(500),
+	PRIMARY KEY (id)
+);
+
+CREATE TABLE categoria_gasto (
+	id INTEGER NOT NULL,
+	nombre VARCHAR(100) NOT NULL,
+	descripcion TEXT,
+	color VARCHAR(7),
+	activa BOOLEAN,
+	PRIMARY KEY (id)
+);
+
+CREATE TABLE proveedor (
+	id INTEGER NOT NULL,
+	nombre VARCHAR(200) NOT NULL,
+	nit VARCHAR(50),
+	telefono VARCHAR(50),
+	email VARCHAR(100),
+	direccion VARCHAR(300),
+	notas TEXT,
+	activo BOOLEAN,
+	fecha_registro DATETIME,
+	PRIMARY KEY (id)
+);
+
+CREATE TABLE repartidor (
+	id INTEGER NOT NULL,
+	nombre VARCHAR(200) NOT NULL,
+	telefono VARCHAR(50),
+	placa_vehiculo VARCHAR(20),
+	tipo_vehiculo VARCHAR(50),
+	activo BOOLEAN,
+	fecha_registro DATETIME,
+	total_domicilios INTEGER,
+	calificacion_promedio FLOAT,
+	PRIMARY KEY (id)
+);
+
+CREATE TABLE zona_delivery (
+	id INTEGER NOT NULL,
+	nombre VARCHAR(100) NOT NULL,
+	barrios TEXT,
+	costo_envio FLOAT,
+	tiempo_estimado INTEGER,
+	activa BOOLEAN,
+	orden INTEGER,
+	PRIMARY KEY (id)
+);
+
+CREATE TABLE sesion (
+	id INTEGER NOT NULL,
+	mesa_id INTEGER NOT NULL,
+	fecha_inicio DATETIME,
+	fecha_fin DATETIME,
+	total FLOAT,
+	activa BOOLEAN,
+	PRIMARY KEY (id),
+	FOREIGN KEY(mesa_id) REFERENCES mesa (id)
+);
+
+CREATE TABLE item_menu (
+	id INTEGER NOT NULL,
+	nombre VARCHAR(200) NOT NULL,
+	descripcion TEXT,
+	precio FLOAT NOT NULL,
+	categoria_id INTEGER NOT NULL,
+	disponible BOOLEAN,
+	imagen_url VARCHAR(500),
+	orden INTEGER,
+	PRIMARY KEY (id),
+	FOREIGN KEY(categoria_id) REFERENCES categoria_menu (id)
+);
+
+CREATE TABLE presupuesto (
+	id INTEGER NOT NULL,
+	categoria_id INTEGER NOT NULL,
+	monto_limite FLOAT NOT NULL,
+	periodo VARCHAR(20),
+	mes INTEGER,
+	anio INTEGER,
+	activo BOOLEAN,
+	fecha_creacion DATETIME,
+	alerta_porcentaje INTEGER,
+	PRIMARY KEY (id),
+	FOREIGN KEY(categoria_id) REFERENCES categoria_gasto (id)
+);
+
+CREATE TABLE gasto (
+	id INTEGER NOT NULL,
+	fecha DATETIME NOT NULL,
+	concepto VARCHAR(300) NOT NULL,
+	monto FLOAT NOT NULL,
+	categoria_id INTEGER NOT NULL,
+	proveedor_id INTEGER,
+	usuario_id INTEGER NOT NULL,
+	metodo_pago VARCHAR(50),
+	numero_factura VARCHAR(100),
+	notas TEXT,
+	archivo_adjunto VARCHAR(500),
+	aprobado BOOLEAN,
+	fecha_aprobacion DATETIME,
+	aprobado_por_id INTEGER,
+	estado_pago VARCHAR(20),
+	fecha_vencimiento DATE,
+	fecha_pago_real DATETIME,
+	PRIMARY KEY (id),
+	FOREIGN KEY(categoria_id) REFERENCES categoria_gasto (id),
+	FOREIGN KEY(proveedor_id) REFERENCES proveedor (id),
+	FOREIGN KEY(usuario_id) REFERENCES usuario (id),
+	FOREIGN KEY(aprobado_por_id) REFERENCES usuario (id)
+);
+
+CREATE TABLE pedido (
+	id INTEGER NOT NULL,
+	fecha DATETIME,
+	mesa_id INTEGER NOT NULL,
+	sesion_id INTEGER,
+	mesero_id INTEGER NOT NULL,
+	producto VARCHAR(200) NOT NULL,
+	cantidad INTEGER,
+	precio_unitario FLOAT,
+	notas TEXT,
+	estado VARCHAR(20),
+	pagado BOOLEAN,
+	estado_actualizado DATETIME,
+	PRIMARY KEY (id),
+	FOREIGN KEY(mesa_id) REFERENCES mesa (id),
+	FOREIGN KEY(sesion_id) REFERENCES sesion (id),
+	FOREIGN KEY(mesero_id) REFERENCES usuario (id)
+);
+
+CREATE TABLE factura (
+	id INTEGER NOT NULL,
+	numero_consecutivo VARCHAR(50) NOT NULL,
+	sesion_id INTEGER,
+	subtotal FLOAT,
+	iva FLOAT,
+	propina FLOAT,
+	total FLOAT,
+	metodo_pago VARCHAR(50),
+	desglose_pago TEXT,
+	cliente_nombre VARCHAR(200),
+	cliente_documento VARCHAR(50),
+	notas TEXT,
+	estado_pago VARCHAR(20),
+	fecha_vencimiento DATE,
+	fecha_pago_real DATETIME,
+	saldo_pendiente FLOAT,
+	fecha_emision DATETIME,
+	PRIMARY KEY (id),
+	UNIQUE (numero_consecutivo),
+	FOREIGN KEY(sesion_id) REFERENCES sesion (id)
+);
+
+CREATE TABLE consumo_interno (
+	id INTEGER NOT NULL,
+	item_id INTEGER NOT NULL,
+	cantidad INTEGER,
+	costo FLOAT,
+	fecha DATETIME,
+	usuario_id INTEGER NOT NULL,
+	notas TEXT,
+	PRIMARY KEY (id),
+	FOREIGN KEY(item_id) REFERENCES item_menu (id),
+	FOREIGN KEY(usuario_id) REFERENCES usuario (id)
+);
+
+CREATE TABLE domicilio (
+	id INTEGER NOT NULL,
+	cliente_nombre VARCHAR(200) NOT NULL,
+	cliente_telefono VARCHAR(50) NOT NULL,
+	cliente_direccion TEXT NOT NULL,
+	cliente_barrio VARCHAR(100),
+	cliente_referencias TEXT,
+	fecha_pedido DATETIME NOT NULL,
+	fecha_entrega_estimada DATETIME,
+	fecha_entrega_real DATETIME,
+	estado VARCHAR(20),
+	subtotal FLOAT,
+	costo_domicilio FLOAT,
+	propina FLOAT,
+	total FLOAT,
+	metodo_pago VARCHAR(50),
+	pagado BOOLEAN,
+	tomado_por_id INTEGER NOT NULL,
+	repartidor_id INTEGER,
+	factura_id INTEGER,
+	notas TEXT,
+	notas_cancelacion TEXT,
+	estado_actualizado DATETIME,
+	PRIMARY KEY (id),
+	FOREIGN KEY(tomado_por_id) REFERENCES usuario (id),
+	FOREIGN KEY(repartidor_id) REFERENCES usuario (id),
+	FOREIGN KEY(factura_id) REFERENCES factura (id)
+);
+
+CREATE TABLE item_domicilio (
+	id INTEGER NOT NULL,
+	domicilio_id INTEGER NOT NULL,
+	item_menu_id INTEGER,
+	producto_nombre VARCHAR(200) NOT NULL,
+	cantidad INTEGER,
+	precio_unitario FLOAT NOT NULL,
+	notas TEXT,
+	estado_cocina VARCHAR(20),
+	PRIMARY KEY (id),
+	FOREIGN KEY(domicilio_id) REFERENCES domicilio (id),
+	FOREIGN KEY(item_menu_id) REFERENCES item_menu (id)
+);
+
+INSERT INTO usuario (id, username, password_hash, nombre, rol) VALUES
+    (1, 'admin', 'sin-clave', 'Administrador', 'admin'),
+    (2, 'mesero1', 'sin-clave', 'Mesero 1', 'mesero');
+
+INSERT INTO mesa (id, numero, capacidad, activa) VALUES (1, 1, 4, 1), (2, 2, 4, 1), (3, 3, 2, 1);
+
+INSERT INTO configuracion_restaurante (id, nombre, nit, iva_porcentaje) VALUES (1, 'La Esquina', '900.123.456-7', 19.0);
+
+INSERT INTO categoria_gasto (id, nombre, color, activa) VALUES (1, 'Otros Gastos', '#6610f2', 1);
+
+INSERT INTO categoria_menu (id, nombre, orden, activa) VALUES (1, 'Platos', 0, 1);
+
+INSERT INTO item_menu (id, nombre, precio, categoria_id, disponible, orden) VALUES
+    (1, 'Hamburguesa', 15000, 1, 1, 0),
+    (2, 'Limonada', 5000, 1, 1, 1);
+
+INSERT INTO consumo_interno (id, item_id, cantidad, costo, fecha, usuario_id, notas) VALUES
+    (1, 2, 2, 1500, '2024-05-10 15:00:00', 2, 'Almuerzo del personal');
+
+-- Dos sesiones cerradas y facturadas y una abierta
+INSERT INTO sesion (id, mesa_id, fecha_inicio, fecha_fin, total, activa) VALUES
+    (1, 1, '2024-05-10 19:00:00', '2024-05-10 20:10:00', 35000, 0),
+    (2, 2, '2024-05-10 20:30:00', '2024-05-10 21:00:00', 15000, 0),
+    (3, 3, '2024-05-11 13:00:00', NULL, 0, 1);
+
+-- Nombres escritos a mano: con mayúsculas, espacios y un error de escritura
+INSERT INTO pedido (id, fecha, mesa_id, sesion_id, mesero_id, producto, cantidad, precio_unitario, estado, pagado) VALUES
+    (1, '2024-05-10 19:05:00', 1, 1, 2, 'hamburguesa', 2, 15000, 'entregado', 1),
+    (2, '2024-05-10 19:06:00', 1, 1, 2, 'Limonada ', 1, 5000, 'entregado', 1),
+    (3, '2024-05-10 20:35:00', 2, 2, 2, 'Hamburgesa', 1, 15000, 'entregado', 1),
+    (4, '2024-05-11 13:05:00', 3, 3, 2, 'LIMONADA', 2, 5000, 'pendiente', 0);
+
+-- Una pagada y una a crédito con un abono de 10000
+INSERT INTO factura (id, numero_consecutivo, sesion_id, subtotal, iva, propina, total, metodo_pago, estado_pago, saldo_pendiente, fecha_pago_real, fecha_emision) VALUES
+    (1, 'FACT-000001', 1, 35000, 0, 0, 35000, 'efectivo', 'pagada', 0, '2024-05-10 20:10:00', '2024-05-10 20:10:00'),
+    (2, 'FACT-000002', 2, 15000, 0, 0, 15000, 'efectivo', 'pendiente', 5000, NULL, '2024-05-10 21:00:00');
+
+-- El mismo cliente con el teléfono escrito de dos formas
+INSERT INTO domicilio (id, cliente_nombre, cliente_telefono, cliente_direccion, fecha_pedido, estado, subtotal, costo_domicilio, total, metodo_pago, pagado, tomado_por_id) VALUES
+    (1, 'Ana', '300 111 2222', 'Calle 1 # 2-3', '2024-05-09 12:00:00', 'entregado', 15000, 3000, 18000, 'efectivo', 1, 2),
+    (2, 'Ana María', '3001112222', 'Calle 1 # 2-3', '2024-05-10 12:00:00', 'entregado', 5000, 3000, 8000, 'efectivo', 1, 2);
+
+INSERT INTO item_domicilio (id, domicilio_id, producto_nombre, cantidad, precio_unitario) VALUES
+    (1, 1, 'Hamburguesa', 1, 15000),
+    (2, 2, 'limonada', 1, 5000);
@@ -0,0 +1,45 @@
+"""
+Arranque con módulos deshabilitados (MODULOS_DESHABILITADOS): los módulos
+opcionales y sus eventos de la sesión no se cargan.
+"""
+
+import json
+import os
+import subprocess
+import sys
+
+from conftest import RAIZ
+
+OPCIONALES = ['transiciones', 'monitor_sla', 'inventario', 'totales_sesion', 'idempotencia', 'esquema']
+
+COMPROBAR = r'''
+import json, sys
+import app
+from sqlalchemy.orm import Session
+eventos = set()
+for nombre in ("after_flush", "after_commit", "after_rollback"):
+    eventos |= {f.__module__ for f in getattr(Session.dispatch, nombre)._clslevel.get(Session, ())}
+print(json.dumps({
+    "cargados": sorted(set(sys.argv[1:]) & set(sys.modules)),
+    "eventos": sorted(eventos & set(sys.argv[1:])),
+}))
+'''
+
+
+def _arrancar(deshabilitados):
+    entorno = dict(os.environ, MODULOS_DESHABILITADOS=','.join(deshabilitados), DATABASE_URL='sqlite://')
+    salida = subprocess.run([sys.executable, '-c', COMPROBAR, *OPCIONALES], cwd=RAIZ, env=entorno,
+                            capture_output=True, text=True, check=True).stdout
+    return json.loads(salida.strip().splitlines()[-1])
+
+
+def test_minimo_no_carga_opcionales():
+    import rutas
+    resultado = _arrancar(sorted(set(rutas.MODULOS) - rutas.OBLIGATORIOS))
+    assert resultado == {"cargados": [], "eventos": []}
+
+
+def test_completo_engancha_los_eventos():
+    resultado = _arrancar([])
+    assert set(resultado["cargados"]) == set(OPCIONALES) - {'esquema'}
+    assert resultado["eventos"] == ['inventario', 'monitor_sla', 'totales_sesion', 'transiciones']
@@ -0,0 +1,29 @@
+"""
+load_user: la cookie lleva id y sello; sin sello o con uno viejo no hay sesión.
+"""
+
+from extensiones import db
+from modelos import Usuario
+from rutas.auth import load_user, cache_usuarios
+
+
+def test_cookie_sin_sello_no_inicia_sesion(app):
+    usuario = Usuario.query.filter_by(username='mesero1').one()
+    assert load_user(str(usuario.id)) is None
+    assert load_user(usuario.get_id()).id == usuario.id
+
+
+def test_sello_viejo_en_otro_worker(app):
+    usuario = Usuario.query.filter_by(username='mesero1').one()
+    cookie = usuario.get_id()
+    assert load_user(cookie) is not None
+
+    # Otro worker cambió la contraseña: esta cache no se enteró
+    usuario.set_password('nueva')
+    db.session.commit()
+    assert load_user(cookie) is not None
+
+    # Al vencer la entrada se compara con la base de datos
+    cache_usuarios.limpiar()
+    assert load_user(cookie) is None
+    assert load_user(usuario.get_id()) is not None
@@ -0,0 +1,49 @@
+"""
+Búsqueda de platillos (busqueda_menu.py): solo lee, nunca hace commit de la
+sesión de la petición.
+"""
+
+from datetime import datetime, timedelta
+
+from sqlalchemy import event
+
+from extensiones import db
+from modelos import CategoriaMenu, ItemMenu, Mesa, Pedido, Usuario, VentasDia
+
+
+def _menu_con_ventas():
+    categoria = CategoriaMenu(nombre='Platos')
+    db.session.add(categoria)
+    db.session.flush()
+    arepa = ItemMenu(nombre='Arepa', precio=4000, categoria_id=categoria.id, orden=0)
+    bandeja = ItemMenu(nombre='Bandeja paisa', precio=25000, categoria_id=categoria.id, orden=1)
+    db.session.add_all([arepa, bandeja])
+    db.session.flush()
+    mesero = Usuario.query.filter_by(username='mesero1').one()
+    db.session.add(Pedido(
+        fecha=datetime.now() - timedelta(days=3), mesa_id=Mesa.query.first().id, mesero_id=mesero.id,
+        producto=bandeja.nombre, item_menu_id=bandeja.id, cantidad=5, precio_unitario=bandeja.precio,
+    ))
+    db.session.commit()
+    return arepa.id, bandeja.id
+
+
+def test_buscar_no_hace_commit(app, mesero):
+    arepa_id, bandeja_id = _menu_con_ventas()
+    mesa_id = Mesa.query.first().id
+    commits = []
+
+    def contar(sesion):
+        commits.append(sesion)
+
+    event.listen(db.session, 'after_commit', contar)
+    try:
+        respuesta = mesero.get('/api/menu/buscar?q=')
+        assert mesero.get(f'/nuevo_pedido/{mesa_id}').status_code == 200
+    finally:
+        event.remove(db.session, 'after_commit', contar)
+
+    assert commits == []
+    assert VentasDia.query.count() == 0
+    # Los más pedidos primero, aunque el día no esté calculado en ventas_dia
+    assert [p['id'] for p in respuesta.get_json()] == [bandeja_id, arepa_id]
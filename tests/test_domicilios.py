@@ -0,0 +1,56 @@
+"""
+Domicilios: estimar la entrega solo lee las tablas de tiempos, así que un
+domicilio que falla a medio crear no deja nada guardado.
+"""
+
+import json
+from datetime import datetime, timedelta
+
+from sqlalchemy import event
+
+from extensiones import db
+from modelos import Domicilio, TiempoEntrega, Usuario, ZonaDelivery
+import eta_domicilios
+
+
+def _historial_sin_calcular():
+    """Entregas viejas y ninguna tabla de tiempos: antes se recalculaba en la petición"""
+    hace_dias = datetime.now() - timedelta(days=3)
+    db.session.add(Domicilio(cliente_nombre='Ana', cliente_telefono='3001112222', cliente_direccion='Calle 1',
+                             cliente_barrio='Centro', subtotal=10000, total=10000, estado='entregado',
+                             tomado_por_id=Usuario.query.filter_by(username='admin').one().id,
+                             fecha_pedido=hace_dias, fecha_entrega_real=hace_dias + timedelta(minutes=40)))
+    db.session.add(ZonaDelivery(nombre='Centro', barrios='Centro', costo_envio=4000, tiempo_estimado=25))
+    db.session.commit()
+    eta_domicilios.invalidar()
+
+
+def test_domicilio_fallido_no_deja_filas(app, admin):
+    _historial_sin_calcular()
+    items = [{'item_id': None, 'cantidad': 1, 'precio': 5000}]  # sin 'nombre': falla al crear los items
+
+    respuesta = admin.post('/domicilio/nuevo', data={
+        'cliente_nombre': 'Luis', 'cliente_telefono': '3009998888', 'cliente_direccion': 'Carrera 2',
+        'cliente_barrio': 'Centro', 'items_json': json.dumps(items),
+    })
+
+    assert respuesta.status_code == 302
+    assert Domicilio.query.count() == 1
+    assert TiempoEntrega.query.count() == 0
+
+
+def test_calcular_costo_no_escribe(app, admin):
+    _historial_sin_calcular()
+    commits = []
+
+    def contar(sesion):
+        commits.append(sesion)
+
+    event.listen(db.session, 'after_commit', contar)
+    try:
+        datos = admin.post('/api/zona/calcular_costo', json={'barrio': 'Centro'}).get_json()
+    finally:
+        event.remove(db.session, 'after_commit', contar)
+
+    assert commits == []
+    assert (datos['zona'], datos['tiempo_estimado'], datos['fuente']) == ('Centro', 25, 'zona')
@@ -0,0 +1,60 @@
+"""
+Recibos guardados: un abono o el pago completo de una factura a crédito
+vuelve a renderizar el recibo; verlo o imprimirlo solo lee.
+"""
+
+from sqlalchemy import event
+
+from extensiones import db
+from modelos import Factura, PagoFactura, ReciboFactura
+from servicios import obtener_recibo, regenerar_recibo
+
+
+def factura_a_credito(total=30000):
+    factura = Factura(numero_consecutivo='FACT-000900', subtotal=total, total=total,
+                      estado_pago='pendiente', saldo_pendiente=total)
+    db.session.add(factura)
+    db.session.flush()
+    regenerar_recibo(factura)
+    db.session.commit()
+    return factura.id
+
+
+def test_pagar_actualiza_el_recibo(app, admin):
+    factura_id = factura_a_credito()
+    assert 'PENDIENTE' in db.session.get(Factura, factura_id).recibo.texto_80
+
+    assert admin.post(f'/marcar_factura_pagada/{factura_id}', data={'monto_pago': 10000}).status_code == 302
+    db.session.expire_all()
+    factura = db.session.get(Factura, factura_id)
+    assert (factura.estado_pago, factura.saldo_pendiente) == ('pendiente', 20000)
+
+    assert admin.post(f'/marcar_factura_pagada/{factura_id}', data={'monto_pago': 20000}).status_code == 302
+    db.session.expire_all()
+    recibo = db.session.get(Factura, factura_id).recibo
+    assert 'PENDIENTE' not in recibo.texto_80 and 'PAGADO' in recibo.texto_80
+    assert 'PENDIENTE' not in recibo.html
+    assert PagoFactura.query.with_entities(db.func.sum(PagoFactura.monto)).scalar() == 30000
+
+
+def test_ver_factura_sin_recibo_no_escribe(app, admin):
+    factura = Factura(numero_consecutivo='FACT-000902', subtotal=8000, total=8000)
+    db.session.add(factura)
+    db.session.commit()
+    factura_id = factura.id
+    commits = []
+
+    def contar(sesion):
+        commits.append(sesion)
+
+    event.listen(db.session, 'after_commit', contar)
+    try:
+        assert admin.get(f'/factura/{factura_id}').status_code == 200
+        texto = admin.get(f'/factura/{factura_id}/imprimir/texto-80')
+    finally:
+        event.remove(db.session, 'after_commit', contar)
+
+    assert commits == []
+    assert 'PAGADO' in texto.get_data(as_text=True)
+    assert ReciboFactura.query.count() == 0
+    assert obtener_recibo(db.session.get(Factura, factura_id)) not in db.session
@@ -0,0 +1,53 @@
+"""
+Envíos repetidos: la misma clave de formulario (idempotencia.py) o el mismo
+id de operación sin conexión (sincronizacion.py) no se aplican dos veces.
+"""
+
+from extensiones import db
+from modelos import Factura, Mesa, OperacionSincronizada, PagoFactura, Pedido
+from idempotencia import CAMPO, nueva_clave
+
+
+def test_formulario_repetido_no_duplica_el_pedido(app, mesero):
+    mesa_id = Mesa.query.first().id
+    datos = {'producto': 'Arepa', 'cantidad': 2, 'precio_unitario': 4000, CAMPO: nueva_clave()}
+
+    primera = mesero.post(f'/nuevo_pedido/{mesa_id}', data=datos)
+    segunda = mesero.post(f'/nuevo_pedido/{mesa_id}', data=datos)
+
+    assert primera.status_code == segunda.status_code == 302
+    assert segunda.location == primera.location
+    assert Pedido.query.count() == 1
+
+
+def test_abono_repetido_no_suma_dos_veces(app, admin):
+    factura = Factura(numero_consecutivo='FACT-000901', total=30000, estado_pago='pendiente', saldo_pendiente=30000)
+    db.session.add(factura)
+    db.session.commit()
+    factura_id = factura.id
+    datos = {'monto_pago': 10000, CAMPO: nueva_clave()}
+
+    for _ in range(2):
+        assert admin.post(f'/marcar_factura_pagada/{factura_id}', data=datos).status_code == 302
+
+    db.session.expire_all()
+    assert db.session.get(Factura, factura_id).saldo_pendiente == 20000
+    assert PagoFactura.query.count() == 1
+
+
+def test_lote_reenviado_no_duplica(app, mesero):
+    mesa_id = Mesa.query.first().id
+    lote = {'operaciones': [
+        {'id': 'op-1', 'tipo': 'pedido', 'datos': {'mesa_id': mesa_id, 'producto': 'Jugo', 'precio_unitario': 3000}},
+        {'id': 'op-2', 'tipo': 'pedido_pagado', 'datos': {'operacion_pedido': 'op-1'}},
+        {'id': 'op-3', 'tipo': 'pedido', 'datos': {'mesa_id': 999, 'producto': 'Jugo'}},
+    ]}
+
+    primera = mesero.post('/api/sincronizar', json=lote).get_json()['resultados']
+    segunda = mesero.post('/api/sincronizar', json=lote).get_json()['resultados']
+
+    assert [r['estado'] for r in primera] == ['aplicada', 'aplicada', 'rechazada']
+    assert [r['estado'] for r in segunda] == ['duplicada', 'duplicada', 'duplicada']
+    assert segunda[0]['resultado'] == primera[0]['resultado']
+    assert Pedido.query.count() == 1 and Pedido.query.one().pagado
+    assert OperacionSincronizada.query.count() == 3
@@ -0,0 +1,74 @@
+"""
+Inventario por receta (inventario.py): los pedidos descuentan y devuelven
+ingredientes, y el platillo se agota y vuelve a mostrarse solo.
+"""
+
+from extensiones import db
+from modelos import CategoriaMenu, ConsumoInterno, Ingrediente, ItemMenu, Mesa, Receta, Usuario
+from servicios import registrar_pedido
+import inventario
+
+
+def _arepa_con_masa(stock):
+    categoria = CategoriaMenu(nombre='Platos')
+    db.session.add(categoria)
+    db.session.flush()
+    arepa = ItemMenu(nombre='Arepa', precio=4000, categoria_id=categoria.id)
+    masa = Ingrediente(nombre='Masa', unidad='g', stock=stock)
+    db.session.add_all([arepa, masa])
+    db.session.flush()
+    db.session.add(Receta(item_menu_id=arepa.id, ingrediente_id=masa.id, cantidad=100))
+    db.session.commit()
+    return arepa.id, masa.id
+
+
+def _estado(arepa_id, masa_id):
+    db.session.expire_all()
+    arepa = db.session.get(ItemMenu, arepa_id)
+    return db.session.get(Ingrediente, masa_id).stock, arepa.disponible, arepa.agotado
+
+
+def test_descuenta_agota_y_devuelve(app):
+    arepa_id, masa_id = _arepa_con_masa(300)
+    mesa = Mesa.query.first()
+    mesero = Usuario.query.filter_by(username='mesero1').one()
+
+    pedido = registrar_pedido(mesa.id, mesero.id, 'Arepa', 2, 0, item_menu_id=arepa_id)
+    db.session.commit()
+    assert _estado(arepa_id, masa_id) == (100, True, False)
+
+    # Ya no alcanza para una porción: se agota
+    pedido.cantidad = 3
+    db.session.commit()
+    assert _estado(arepa_id, masa_id) == (0, False, True)
+
+    # Borrar el pedido devuelve los ingredientes y vuelve a mostrarla
+    db.session.delete(pedido)
+    db.session.commit()
+    assert _estado(arepa_id, masa_id) == (300, True, False)
+
+    # El consumo interno también descuenta
+    db.session.add(ConsumoInterno(item_id=arepa_id, cantidad=3, costo=0, usuario_id=mesero.id))
+    db.session.commit()
+    assert _estado(arepa_id, masa_id) == (0, False, True)
+
+
+def test_entrada_de_mercancia_la_vuelve_a_mostrar(app):
+    arepa_id, masa_id = _arepa_con_masa(50)
+    inventario.reevaluar(item_ids=[arepa_id])
+    db.session.commit()
+    assert _estado(arepa_id, masa_id) == (50, False, True)
+
+    inventario.ajustar_stock(db.session.get(Ingrediente, masa_id), cantidad=500)
+    db.session.commit()
+    assert _estado(arepa_id, masa_id) == (550, True, False)
+
+
+def test_oculto_por_el_administrador_no_vuelve_solo(app):
+    arepa_id, masa_id = _arepa_con_masa(50)
+    db.session.get(ItemMenu, arepa_id).disponible = False
+    db.session.commit()
+
+    inventario.ajustar_stock(db.session.get(Ingrediente, masa_id), cantidad=500)
+    db.session.commit()
+    assert _estado(arepa_id, masa_id) == (550, False, False)
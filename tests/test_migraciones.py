@@ -0,0 +1,111 @@
+"""
+Actualizar una base de datos del app.py original hasta la versión actual,
+como lo hace el comando de arranque (`flask init-db && flask migrar`).
+"""
+
+import os
+import sqlite3
+
+from sqlalchemy import inspect
+
+import esquema
+import migraciones
+import totales_sesion
+from extensiones import db
+from modelos import (
+    Sucursal, Mesa, Sesion, Pedido, Factura, ItemDomicilio, Domicilio, Cliente,
+    ConfiguracionRestaurante, OcupacionMesaHora, PagoFactura, ReciboFactura,
+)
+from sucursales import MODELOS_POR_SUCURSAL
+
+BASE_ORIGINAL = os.path.join(os.path.dirname(__file__), 'datos', 'base_original.sql')
+
+
+def _cargar_base_original():
+    with open(BASE_ORIGINAL, encoding='utf-8') as archivo:
+        script = archivo.read()
+    conexion = sqlite3.connect(db.engine.url.database)
+    try:
+        conexion.executescript(script)
+    finally:
+        conexion.close()
+
+
+def _arrancar():
+    """flask init-db && flask migrar"""
+    salida = []
+    esquema.preparar_base_datos()
+    aplicadas = migraciones.migrar(salida=salida.append)
+    db.session.remove()
+    return aplicadas, salida
+
+
+def test_base_original_hasta_la_ultima_version(app_vacia):
+    _cargar_base_original()
+    aplicadas, salida = _arrancar()
+    assert aplicadas > 0, salida
+
+    # Todas las columnas de los modelos existen en la base
+    inspector = inspect(db.engine)
+    for tabla in db.metadata.sorted_tables:
+        existentes = {c['name'] for c in inspector.get_columns(tabla.name)}
+        assert set(tabla.columns.keys()) <= existentes, tabla.name
+
+    # Todo quedó en la sucursal inicial, con el consecutivo de facturas al día
+    sucursal = Sucursal.query.one()
+    assert sucursal.ultimo_consecutivo == 2
+    for modelo in MODELOS_POR_SUCURSAL:
+        assert not modelo.query.filter(modelo.sucursal_id.is_(None)).count(), modelo.__tablename__
+    assert ConfiguracionRestaurante.query.one().nombre == 'La Esquina'
+
+    # Pedidos e items de domicilio vinculados al menú, incluido el mal escrito
+    assert {p.id: p.item_menu_id for p in Pedido.query} == {1: 1, 2: 2, 3: 1, 4: 2}
+    assert {i.id: i.item_menu_id for i in ItemDomicilio.query} == {1: 1, 2: 2}
+
+    # Un cliente para los dos teléfonos, con el nombre del último domicilio
+    cliente = Cliente.query.one()
+    assert (cliente.telefono, cliente.nombre, cliente.pedidos, cliente.gasto_total) == (
+        '3001112222', 'Ana María', 2, 26000)
+    assert {d.cliente_id for d in Domicilio.query} == {cliente.id}
+
+    # Ocupación de las sesiones cerradas
+    assert OcupacionMesaHora.query.with_entities(db.func.sum(OcupacionMesaHora.sesiones)).scalar() == 2
+
+    # Pagos: la pagada por el total, la de crédito por lo abonado
+    pagos = {p.factura_id: p.monto for p in PagoFactura.query}
+    assert pagos == {1: 35000, 2: 10000}
+
+    # Recibos de las facturas anteriores al pre-renderizado
+    recibos = {r.factura_id: r.texto_80 for r in ReciboFactura.query}
+    assert set(recibos) == {1, 2}
+    assert 'PAGADO' in recibos[1] and 'PENDIENTE' in recibos[2]
+
+    # Contadores de las sesiones
+    assert totales_sesion.conciliar() == []
+    abierta = db.session.get(Sesion, 3)
+    assert (abierta.subtotal, abierta.num_pedidos, abierta.pedidos_sin_pagar) == (10000, 1, 1)
+    assert Factura.query.count() == 2 and Mesa.query.count() == 3
+
+
+def test_segundo_arranque_no_hace_nada(app_vacia):
+    _cargar_base_original()
+    _arrancar()
+    aplicadas, salida = _arrancar()
+    assert aplicadas == 0
+    assert salida == ["Migraciones al día"]
+
+
+def test_base_original_no_se_siembra_antes_de_migrar(app_vacia):
+    _cargar_base_original()
+    mensaje = esquema.preparar_base_datos()
+    assert 'flask migrar' in mensaje
+    # La configuración y la sucursal las pone la migración, no la semilla
+    with sqlite3.connect(db.engine.url.database) as conexion:
+        assert conexion.execute("SELECT COUNT(*) FROM configuracion_restaurante").fetchone() == (1,)
+        assert conexion.execute("SELECT COUNT(*) FROM sucursal").fetchone() == (0,)
+
+
+def test_base_nueva(app):
+    assert migraciones.migrar(salida=lambda texto: None) > 0
+    assert Mesa.query.count() == esquema.NUMERO_MESAS_INICIALES
+    assert totales_sesion.conciliar() == []
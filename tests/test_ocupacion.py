@@ -0,0 +1,46 @@
+"""
+Ocupación por mesa y hora: liberar una mesa suma la sesión con su total, y
+dos cierres en la misma hora suman sobre la misma fila.
+"""
+
+from datetime import datetime, timedelta
+
+from extensiones import db
+from modelos import Mesa, OcupacionMesaHora, Pedido, Sesion, Usuario
+from ocupacion import registrar_sesion
+
+
+def test_liberar_mesa_suma_el_total(app, mesero):
+    mesa = Mesa.query.first()
+    usuario = Usuario.query.filter_by(username='mesero1').one()
+    sesion = Sesion(mesa_id=mesa.id, fecha_inicio=datetime.now() - timedelta(minutes=30))
+    db.session.add(sesion)
+    db.session.flush()
+    db.session.add_all([
+        Pedido(mesa_id=mesa.id, sesion_id=sesion.id, mesero_id=usuario.id, producto='Arepa', cantidad=2, precio_unitario=4000),
+        Pedido(mesa_id=mesa.id, sesion_id=sesion.id, mesero_id=usuario.id, producto='Jugo', cantidad=1, precio_unitario=3000),
+    ])
+    db.session.commit()
+    mesa_id, sesion_id = mesa.id, sesion.id
+
+    assert mesero.get(f'/liberar_mesa/{mesa_id}').status_code == 302
+
+    db.session.expire_all()
+    assert db.session.get(Sesion, sesion_id).total == 11000
+    assert db.session.query(db.func.sum(OcupacionMesaHora.ingresos)).scalar() == 11000
+
+
+def test_cierres_en_la_misma_hora(app):
+    mesa = Mesa.query.first()
+    inicio = datetime.now().replace(minute=10, second=0, microsecond=0)
+    for total in (10000, 5000):
+        sesion = Sesion(mesa_id=mesa.id, fecha_inicio=inicio, fecha_fin=inicio + timedelta(minutes=20),
+                        activa=False, total=total)
+        db.session.add(sesion)
+        db.session.flush()
+        registrar_sesion(sesion)
+    db.session.commit()
+
+    fila = OcupacionMesaHora.query.filter_by(hora=inicio.hour).one()
+    assert (fila.sesiones, fila.ingresos, fila.minutos_sesiones) == (2, 15000, 40)
+    assert fila.sucursal_id is not None
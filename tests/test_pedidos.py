@@ -0,0 +1,24 @@
+"""
+registrar_pedido: un producto escrito igual a un platillo queda vinculado al
+menú con el precio del menú.
+"""
+
+from extensiones import db
+from modelos import CategoriaMenu, ItemMenu, Mesa, Usuario
+from servicios import registrar_pedido
+
+
+def test_nombre_escrito_usa_el_precio_del_menu(app):
+    categoria = CategoriaMenu(nombre='Platos')
+    db.session.add(categoria)
+    db.session.flush()
+    hamburguesa = ItemMenu(nombre='Hamburguesa', precio=15000, categoria_id=categoria.id)
+    db.session.add(hamburguesa)
+    db.session.flush()
+    mesero = Usuario.query.filter_by(username='mesero1').one()
+
+    pedido = registrar_pedido(Mesa.query.first().id, mesero.id, ' hamburguesa ', 2, 1)
+    assert (pedido.producto, pedido.item_menu_id, pedido.precio_unitario) == ('Hamburguesa', hamburguesa.id, 15000)
+
+    libre = registrar_pedido(Mesa.query.first().id, mesero.id, 'Torta de cumpleaños', 1, 20000)
+    assert (libre.item_menu_id, libre.precio_unitario) == (None, 20000)
@@ -0,0 +1,39 @@
+"""
+Filtro por sucursal: el consumo interno de otra sucursal no se ve ni se
+puede borrar (y no devuelve existencias a su inventario).
+"""
+
+from extensiones import db
+from modelos import CategoriaMenu, ConsumoInterno, Ingrediente, ItemMenu, Receta, Sucursal, Usuario
+
+
+def _consumo_en_otra_sucursal():
+    otra = Sucursal(nombre='Norte', codigo='norte', prefijo_factura='NTE')
+    db.session.add(otra)
+    db.session.flush()
+    categoria = CategoriaMenu(nombre='Platos')
+    db.session.add(categoria)
+    db.session.flush()
+    arepa = ItemMenu(nombre='Arepa del norte', precio=4000, categoria_id=categoria.id, sucursal_id=otra.id)
+    masa = Ingrediente(nombre='Masa', unidad='g', stock=1000, sucursal_id=otra.id)
+    db.session.add_all([arepa, masa])
+    db.session.flush()
+    db.session.add(Receta(item_menu_id=arepa.id, ingrediente_id=masa.id, cantidad=100))
+    consumo = ConsumoInterno(item_id=arepa.id, cantidad=2, usuario_id=Usuario.query.first().id,
+                             notas='Almuerzo en el norte', sucursal_id=otra.id)
+    db.session.add(consumo)
+    db.session.commit()
+    return consumo.id, masa.id
+
+
+def test_consumo_de_otra_sucursal(app, admin):
+    consumo_id, masa_id = _consumo_en_otra_sucursal()
+    assert db.session.get(Ingrediente, masa_id).stock == 800
+
+    # El administrador está en la sucursal inicial
+    assert 'Almuerzo en el norte' not in admin.get('/consumo_interno').get_data(as_text=True)
+    assert admin.post(f'/consumo_interno/{consumo_id}/eliminar').status_code == 404
+
+    db.session.expire_all()
+    assert db.session.get(ConsumoInterno, consumo_id) is not None
+    assert db.session.get(Ingrediente, masa_id).stock == 800
@@ -0,0 +1,68 @@
+"""
+Contadores de la sesión (totales_sesion.py): al día después de crear,
+cambiar, pagar, mover y borrar pedidos, y iguales a lo que calcula conciliar().
+"""
+
+from extensiones import db
+from modelos import Mesa, Pedido, Sesion, Usuario
+from servicios import registrar_pedido
+import totales_sesion
+
+
+def _contadores(sesion_id):
+    sesion = db.session.get(Sesion, sesion_id)
+    db.session.refresh(sesion)
+    return sesion.subtotal, sesion.total_pagado, sesion.num_pedidos, sesion.pedidos_sin_pagar
+
+
+def test_contadores_en_cada_escritura(app):
+    mesa_a, mesa_b = Mesa.query.order_by(Mesa.numero).limit(2).all()
+    mesero = Usuario.query.filter_by(username='mesero1').one()
+
+    # Insertar
+    arepa = registrar_pedido(mesa_a.id, mesero.id, 'Arepa', 2, 4000)
+    jugo = registrar_pedido(mesa_a.id, mesero.id, 'Jugo', 1, 3000)
+    db.session.commit()
+    sesion_id = arepa.sesion_id
+    assert _contadores(sesion_id) == (11000, 0, 2, 2)
+    assert totales_sesion.conciliar() == []
+
+    # Actualizar cantidad, precio y pagado
+    arepa.cantidad = 3
+    jugo.precio_unitario = 3500
+    jugo.pagado = True
+    db.session.commit()
+    assert _contadores(sesion_id) == (15500, 3500, 2, 1)
+    assert totales_sesion.conciliar() == []
+
+    # Mover un pedido a otra mesa
+    otra = registrar_pedido(mesa_b.id, mesero.id, 'Café', 1, 2000)
+    db.session.commit()
+    otra_sesion_id = otra.sesion_id
+    jugo.sesion_id = otra_sesion_id
+    jugo.mesa_id = mesa_b.id
+    db.session.commit()
+    assert _contadores(sesion_id) == (12000, 0, 1, 1)
+    assert _contadores(otra_sesion_id) == (5500, 3500, 2, 1)
+    assert totales_sesion.conciliar() == []
+
+    # Borrar
+    db.session.delete(arepa)
+    db.session.commit()
+    assert _contadores(sesion_id) == (0, 0, 0, 0)
+    assert totales_sesion.conciliar() == []
+
+
+def test_update_masivo_con_recalcular(app):
+    mesa = Mesa.query.first()
+    mesero = Usuario.query.filter_by(username='mesero1').one()
+    sesion_id = registrar_pedido(mesa.id, mesero.id, 'Arepa', 2, 4000).sesion_id
+    db.session.commit()
+
+    # Como facturar_sesion: UPDATE en bloque, que no pasa por el flush
+    db.session.query(Pedido).filter(Pedido.sesion_id == sesion_id).update({'pagado': True}, synchronize_session=False)
+    assert [s for s, _ in totales_sesion.conciliar()] == [sesion_id]
+    totales_sesion.recalcular([sesion_id])
+    db.session.commit()
+    assert _contadores(sesion_id) == (8000, 8000, 1, 0)
+    assert totales_sesion.conciliar() == []
@@ -0,0 +1,52 @@
+"""
+ver_mesa: las sesiones anteriores del día se muestran con sus contadores y
+las líneas de su cuenta, sin cargar sus pedidos.
+"""
+
+from datetime import datetime, timedelta
+
+from sqlalchemy import event
+
+from extensiones import db
+from modelos import Mesa, Pedido, Sesion, Usuario
+
+
+def _sesion_cerrada(mesa, mesero, minutos, pedidos):
+    ahora = datetime.now()
+    sesion = Sesion(mesa_id=mesa.id, fecha_inicio=ahora - timedelta(minutes=minutos), fecha_fin=ahora, activa=False)
+    db.session.add(sesion)
+    db.session.flush()
+    for producto, cantidad, precio, pagado in pedidos:
+        db.session.add(Pedido(mesa_id=mesa.id, sesion_id=sesion.id, mesero_id=mesero.id, producto=producto,
+                              cantidad=cantidad, precio_unitario=precio, pagado=pagado))
+    return sesion
+
+
+def test_sesiones_anteriores_sin_cargar_pedidos(app, mesero):
+    mesa = Mesa.query.first()
+    usuario = Usuario.query.filter_by(username='mesero1').one()
+    _sesion_cerrada(mesa, usuario, 90, [('Arepa', 1, 4000, True), ('Arepa', 2, 4000, True),
+                                        ('Jugo', 1, 3000, False)])
+    for k in range(5):
+        _sesion_cerrada(mesa, usuario, 60 - k, [('Café', 1, 2000, True)])
+    db.session.commit()
+    mesa_id = mesa.id
+
+    pedidos_cargados = []
+
+    def anotar(sesion, instancia):
+        if isinstance(instancia, Pedido):
+            pedidos_cargados.append(instancia)
+
+    event.listen(db.session, 'loaded_as_persistent', anotar)
+    try:
+        respuesta = mesero.get(f'/mesa/{mesa_id}')
+    finally:
+        event.remove(db.session, 'loaded_as_persistent', anotar)
+
+    assert respuesta.status_code == 200
+    assert pedidos_cargados == []
+    html = respuesta.get_data(as_text=True)
+    assert html.count('sesion-badge cerrada') == 6
+    # Las dos Arepas pagadas en una línea; el total de la sesión, de sus contadores
+    assert '$12000.00' in html and '$15000.00' in html and '$3000.00' in html
@@ -0,0 +1,261 @@
+"""
+Totales de cada sesión de mesa, al día en cada escritura.
+
+RAZÓN: Sesion.total solo se escribía al facturar o liberar la mesa; el
+dashboard, ver_mesa y facturar_sesion volvían a sumar cantidad ×
+precio_unitario de los pedidos en cada carga (el dashboard, una consulta por
+mesa cada 5 segundos). Ahora Sesion lleva contadores que se actualizan en la
+misma transacción que cada pedido que se crea, cambia, se paga o se borra:
+
+- subtotal y total_pagado (total_pendiente es la resta)
+- num_pedidos y pedidos_sin_pagar
+- ultima_actividad
+
+Como en inventario.py, un solo UPDATE por flush con la diferencia de cada
+sesión: subtotal = subtotal + delta. La suma la hace la base de datos, así
+que dos meseros que piden a la vez en la misma mesa no se pisan, y si la
+transacción falla no cambia nada.
+
+Los UPDATE masivos de pedidos (facturar, anular una factura) no pasan por el
+flush: después de hacerlos se llama recalcular() con las sesiones tocadas.
+`flask conciliar-sesiones` compara los contadores con los pedidos y, con
+--corregir, los rehace.
+
+Lo importan rutas/mesas.py y rutas/facturacion.py, las que escriben pedidos.
+"""
+
+from datetime import datetime
+
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.attributes import set_committed_value
+from sqlalchemy.orm.util import identity_key
+
+from extensiones import db
+from modelos import Sesion, Pedido
+
+# Contadores en el orden de las diferencias de diferencias_del_flush()
+CONTADORES = ('subtotal', 'total_pagado', 'num_pedidos', 'pedidos_sin_pagar')
+
+# Diferencia menor que esto en los montos se considera redondeo (Float)
+TOLERANCIA = 0.005
+
+
+# =========================
+# VALOR ANTERIOR
+# =========================
+# Como en inventario.py: los pedidos expirados cargan el valor anterior al
+# cambiarlos y antes de borrarlos, para poder restar lo que aportaban.
+
+CAMPOS_PEDIDO = ('sesion_id', 'cantidad', 'precio_unitario', 'pagado')
+
+
+def _sin_cambios(objetivo, valor, anterior, iniciador):
+    return valor
+
+
+for _campo in CAMPOS_PEDIDO:
+    event.listen(getattr(Pedido, _campo), 'set', _sin_cambios, active_history=True)
+
+
+@event.listens_for(Session, 'before_flush')
+def _cargar_borrados(sesion, contexto, instancias):
+    for obj in sesion.deleted:
+        if isinstance(obj, Pedido) and inspect(obj).expired_attributes:
+            sesion.refresh(obj)
+
+
+# =========================
+# DIFERENCIAS DEL FLUSH
+# =========================
+
+def _anterior(atributos, campo):
+    """Valor de la columna antes del flush"""
+    historia = atributos[campo].history
+    return (historia.deleted or historia.unchanged or historia.added or [None])[0]
+
+
+def _aporte(cantidad, precio_unitario, pagado):
+    """Lo que un pedido suma a cada contador de su sesión"""
+    subtotal = (cantidad or 0) * (precio_unitario or 0)
+    return (subtotal, subtotal if pagado else 0, 1, 0 if pagado else 1)
+
+
+def diferencias_del_flush(sesion):
+    """
+    {sesion_id: [subtotal, total_pagado, num_pedidos, pedidos_sin_pagar]} que
+    cambia este flush. Usar dentro de after_flush, donde la historia de los
+    atributos sigue disponible.
+    """
+    diferencias = {}
+
+    def sumar(sesion_id, aporte, signo):
+        if sesion_id is None:
+            return
+        actual = diferencias.setdefault(sesion_id, [0, 0, 0, 0])
+        for i, valor in enumerate(aporte):
+            actual[i] += signo * valor
+
+    def anterior(atributos):
+        return _aporte(*(_anterior(atributos, campo) for campo in ('cantidad', 'precio_unitario', 'pagado')))
+
+    for obj in sesion.new:
+        if isinstance(obj, Pedido):
+            sumar(obj.sesion_id, _aporte(obj.cantidad, obj.precio_unitario, obj.pagado), 1)
+
+    for obj in sesion.deleted:
+        if isinstance(obj, Pedido):
+            atributos = inspect(obj).attrs
+            sumar(_anterior(atributos, 'sesion_id'), anterior(atributos), -1)
+
+    for obj in sesion.dirty:
+        if not isinstance(obj, Pedido):
+            continue
+        atributos = inspect(obj).attrs
+        if not any(atributos[campo].history.has_changes() for campo in CAMPOS_PEDIDO):
+            continue
+        # Se quita lo que aportaba antes y se suma lo de ahora (puede cambiar de sesión)
+        sumar(_anterior(atributos, 'sesion_id'), anterior(atributos), -1)
+        sumar(obj.sesion_id, _aporte(obj.cantidad, obj.precio_unitario, obj.pagado), 1)
+
+    return diferencias
+
+
+# =========================
+# SENTENCIAS
+# =========================
+
+def _refrescar(sesion, filas):
+    """Pone los contadores que devolvió el UPDATE en las sesiones ya cargadas"""
+    for fila in filas:
+        obj = sesion.identity_map.get(identity_key(Sesion, fila.id))
+        if obj is None:
+            continue
+        for campo in CONTADORES + ('ultima_actividad',):
+            set_committed_value(obj, campo, getattr(fila, campo))
+
+
+def _retornar(sentencia):
+    return sentencia.returning(Sesion.id, *(getattr(Sesion, campo) for campo in CONTADORES + ('ultima_actividad',)))
+
+
+def _aplicar(conexion, diferencias, ahora):
+    """contador = contador + diferencia de su sesión, en un UPDATE"""
+    valores = {
+        campo: getattr(Sesion, campo) + db.case(
+            {sesion_id: diferencia[i] for sesion_id, diferencia in diferencias.items()},
+            value=Sesion.id, else_=0)
+        for i, campo in enumerate(CONTADORES)
+    }
+    return conexion.execute(_retornar(
+        db.update(Sesion)
+        .where(Sesion.id.in_(list(diferencias)))
+        .values(ultima_actividad=ahora, **valores)
+    )).all()
+
+
+def _valores_reales():
+    """Los contadores calculados desde los pedidos (subconsultas correlacionadas)"""
+    subtotal = Pedido.cantidad * Pedido.precio_unitario
+    pagado = Pedido.pagado == True
+
+    def de_la_sesion(agregado):
+        return db.select(agregado).where(Pedido.sesion_id == Sesion.id).scalar_subquery()
+
+    def suma(expresion):
+        return de_la_sesion(db.func.coalesce(db.func.sum(expresion), 0))
+
+    return {
+        'subtotal': suma(subtotal),
+        'total_pagado': suma(db.case((pagado, subtotal), else_=0)),
+        'num_pedidos': de_la_sesion(db.func.count()),
+        'pedidos_sin_pagar': suma(db.case((pagado, 0), else_=1)),
+    }
+
+
+# =========================
+# EVENTOS DE LA SESIÓN
+# =========================
+
+@event.listens_for(Session, 'after_flush')
+def _actualizar_totales(sesion, contexto):
+    diferencias = diferencias_del_flush(sesion)
+    if diferencias:
+        _refrescar(sesion, _aplicar(sesion.connection(), diferencias, datetime.now()))
+
+
+# =========================
+# RECÁLCULO Y CONCILIACIÓN
+# =========================
+
+def recalcular(sesion_ids, actividad=None):
+    """
+    Rehace los contadores de esas sesiones desde sus pedidos, en un UPDATE.
+    Para después de un UPDATE masivo de pedidos. El llamador hace commit.
+    """
+    if not sesion_ids:
+        return
+    valores = _valores_reales()
+    if actividad is not None:
+        valores['ultima_actividad'] = actividad
+    _refrescar(db.session, db.session.connection().execute(_retornar(
+        db.update(Sesion).where(Sesion.id.in_(list(sesion_ids))).values(**valores)
+    )).all())
+
+
+def recalcular_existentes(desde_id, hasta_id):
+    """
+    Relleno: contadores de las sesiones con id en (desde_id, hasta_id].
+    La última actividad es la del último pedido (o el inicio de la sesión).
+    Retorna cuántas sesiones procesó.
+    """
+    ultimo_pedido = db.select(db.func.max(Pedido.fecha)).where(Pedido.sesion_id == Sesion.id).scalar_subquery()
+    return db.session.connection().execute(
+        db.update(Sesion)
+        .where(Sesion.id > desde_id, Sesion.id <= hasta_id)
+        .values(ultima_actividad=db.func.coalesce(ultimo_pedido, Sesion.fecha_inicio), **_valores_reales())
+    ).rowcount
+
+
+def _distinto(guardado, real, monto):
+    if monto:
+        return abs((guardado or 0) - (real or 0)) > TOLERANCIA
+    return (guardado or 0) != (real or 0)
+
+
+def conciliar(corregir=False, lote=1000):
+    """
+    Compara los contadores de todas las sesiones con sus pedidos, por lotes
+    de id. Con corregir=True rehace los que no cuadran y hace commit por lote.
+    Retorna [(sesion_id, {campo: (guardado, real)})] de las que no cuadraban.
+    """
+    reales = _valores_reales()
+    diferentes = []
+    desde = 0
+    while True:
+        filas = db.session.execute(
+            db.select(Sesion.id, *(getattr(Sesion, campo) for campo in CONTADORES), *reales.values())
+            .where(Sesion.id > desde)
+            .order_by(Sesion.id)
+            .limit(lote)
+        ).all()
+        if not filas:
+            return diferentes
+
+        lote_diferentes = []
+        for fila in filas:
+            guardados = fila[1:1 + len(CONTADORES)]
+            calculados = fila[1 + len(CONTADORES):]
+            campos = {
+                campo: (guardado, real)
+                for campo, guardado, real in zip(CONTADORES, guardados, calculados)
+                if _distinto(guardado, real, campo in ('subtotal', 'total_pagado'))
+            }
+            if campos:
+                lote_diferentes.append((fila.id, campos))
+
+        if corregir and lote_diferentes:
+            recalcular([sesion_id for sesion_id, _ in lote_diferentes])
+            db.session.commit()
+        diferentes.extend(lote_diferentes)
+        desde = filas[-1].id
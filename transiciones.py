@@ -0,0 +1,267 @@
+"""
+Registro de cambios de estado y tiempos de preparación.
+
+RAZÓN: actualizar_estado, actualizar_estado_domicilio y
+actualizar_estado_item_domicilio sobrescriben `estado` (y un solo
+estado_actualizado), así que no se sabía cuánto estuvo un pedido pendiente,
+cuánto tardó la cocina en prepararlo ni cuánto esperó listo. Ahora cada flush
+que crea o cambia de estado un Pedido, un Domicilio o un ItemDomicilio agrega
+una fila a TransicionEstado, con un solo INSERT por flush, en la misma
+transacción. No importa por qué ruta cambió el estado (cocina, sincronización
+sin conexión, despacho de viajes, cancelación...). Lo importan los
+blueprints que cambian estados (rutas/mesas.py, cocina.py y domicilios.py).
+
+La hora de la transición es la que la operación guardó en
+estado_actualizado (p.ej. la del dispositivo en las operaciones sin
+conexión) o, si no, la del flush.
+
+tiempos_preparacion() calcula, sobre esas filas, cuánto dura cada etapa por
+producto, por estación (según ESTACIONES_CATEGORIAS, ver cola_impresion.py)
+y por hora del día.
+"""
+
+from datetime import datetime, timedelta
+
+from flask import has_request_context
+from flask_login import current_user
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+
+from extensiones import db, cola_tickets
+from modelos import (
+    Pedido,
+    Domicilio,
+    ItemDomicilio,
+    ItemMenu,
+    CategoriaMenu,
+    EstadoDomicilio,
+    TransicionEstado,
+)
+from sucursales import sucursal_para_nuevos
+
+# modelo -> (entidad, columna de estado, columna con la hora del cambio, columna con la hora de creación)
+ENTIDADES = {
+    Pedido: ('pedido', 'estado', 'estado_actualizado', 'fecha'),
+    Domicilio: ('domicilio', 'estado', 'estado_actualizado', 'fecha_pedido'),
+    ItemDomicilio: ('item_domicilio', 'estado_cocina', None, None),
+}
+
+# Entidades que corresponden a un producto del menú
+ENTIDADES_PRODUCTO = ('pedido', 'item_domicilio')
+
+# Etapas que se miden: desde que se entra en el estado hasta el siguiente cambio
+ETAPAS = ['pendiente', 'preparando', 'listo', 'en_camino']
+
+# Cuánto después del rango se busca el final de una etapa que empezó dentro de él
+MARGEN_FIN = timedelta(hours=12)
+
+
+# =========================
+# REGISTRO
+# =========================
+
+def _usuario_id():
+    if has_request_context() and current_user.is_authenticated:
+        return current_user.id
+    return None
+
+
+def _transicion(obj, es_nuevo, ahora):
+    """(entidad, anterior, nuevo, fecha) del cambio de estado de obj en este flush, o None"""
+    entidad, campo_estado, campo_fecha, campo_creacion = ENTIDADES[type(obj)]
+    if es_nuevo:
+        nuevo = getattr(obj, campo_estado)
+        fecha = getattr(obj, campo_creacion) if campo_creacion else None
+        return entidad, None, nuevo, fecha or ahora
+
+    atributos = inspect(obj).attrs
+    historia = atributos[campo_estado].history
+    if not historia.added:
+        return None
+    nuevo = historia.added[0]
+    anterior = historia.deleted[0] if historia.deleted else None
+    if nuevo == anterior:
+        return None
+    fecha = None
+    if campo_fecha:
+        fechas = atributos[campo_fecha].history.added
+        fecha = fechas[0] if fechas else None
+    return entidad, anterior, nuevo, fecha or ahora
+
+
+def cambios_de_estado(sesion, ahora):
+    """
+    (obj, entidad, anterior, nuevo, fecha) de cada Pedido, Domicilio o
+    ItemDomicilio que este flush crea o cambia de estado. Usar dentro de
+    after_flush: ahí los objetos nuevos ya tienen id y la historia de los
+    atributos sigue disponible.
+    """
+    cambiados = [(obj, True) for obj in sesion.new if type(obj) in ENTIDADES]
+    cambiados += [(obj, False) for obj in sesion.dirty if type(obj) in ENTIDADES]
+    for obj, es_nuevo in cambiados:
+        transicion = _transicion(obj, es_nuevo, ahora)
+        if transicion is not None and transicion[2] is not None:
+            yield (obj, *transicion)
+
+
+@event.listens_for(Session, 'after_flush')
+def _registrar_transiciones(sesion, contexto):
+    filas = []
+    usuario_id = sucursal_id = None
+    for obj, entidad, anterior, nuevo, fecha in cambios_de_estado(sesion, datetime.now()):
+        if not filas:
+            usuario_id = _usuario_id()
+            sucursal_id = sucursal_para_nuevos()
+        filas.append({
+            'sucursal_id': getattr(obj, 'sucursal_id', None) or sucursal_id,
+            'entidad': entidad,
+            'entidad_id': obj.id,
+            'estado_anterior': anterior,
+            'estado_nuevo': nuevo,
+            'usuario_id': usuario_id,
+            'fecha': fecha,
+        })
+    if filas:
+        sesion.connection().execute(db.insert(TransicionEstado.__table__), filas)
+
+
+# =========================
+# TIEMPOS POR ETAPA
+# =========================
+
+def _es_sqlite():
+    return db.session.get_bind().dialect.name == 'sqlite'
+
+
+def _segundos_entre(inicio, fin):
+    if _es_sqlite():
+        return (db.func.julianday(fin) - db.func.julianday(inicio)) * 86400
+    return db.func.extract('epoch', fin - inicio)
+
+
+def _hora(columna):
+    if _es_sqlite():
+        return db.cast(db.func.strftime('%H', columna), db.Integer)
+    return db.cast(db.func.extract('hour', columna), db.Integer)
+
+
+def _consulta_etapas(desde, hasta, entidades):
+    """
+    Una fila por (platillo, producto, categoría, hora, etapa) con cantidad,
+    segundos totales y máximo de las etapas que empezaron en [desde, hasta).
+    La etapa termina en la siguiente transición de la misma entidad (LEAD).
+    Las que terminaron en cancelación no cuentan.
+    """
+    orden = {
+        'partition_by': (TransicionEstado.entidad, TransicionEstado.entidad_id),
+        'order_by': (TransicionEstado.fecha, TransicionEstado.id),
+    }
+    etapas = (
+        db.select(
+            TransicionEstado.entidad,
+            TransicionEstado.entidad_id,
+            TransicionEstado.estado_nuevo.label('etapa'),
+            TransicionEstado.fecha.label('inicio'),
+            db.func.lead(TransicionEstado.fecha).over(**orden).label('fin'),
+            db.func.lead(TransicionEstado.estado_nuevo).over(**orden).label('siguiente'),
+        )
+        .where(
+            TransicionEstado.fecha >= desde,
+            TransicionEstado.fecha < hasta + MARGEN_FIN,
+            TransicionEstado.entidad.in_(entidades),
+        )
+        .subquery()
+    )
+
+    item_menu_id = db.func.coalesce(Pedido.item_menu_id, ItemDomicilio.item_menu_id)
+    producto = db.func.coalesce(Pedido.producto, ItemDomicilio.producto_nombre)
+    segundos = _segundos_entre(etapas.c.inicio, etapas.c.fin)
+    hora = _hora(etapas.c.inicio)
+    return db.session.execute(
+        db.select(
+            item_menu_id.label('item_menu_id'),
+            ItemMenu.nombre.label('platillo'),
+            producto.label('producto'),
+            CategoriaMenu.nombre.label('categoria'),
+            hora.label('hora'),
+            etapas.c.etapa,
+            db.func.count().label('cantidad'),
+            db.func.sum(segundos).label('segundos'),
+            db.func.max(segundos).label('maximo'),
+        )
+        .select_from(etapas)
+        .outerjoin(Pedido, db.and_(etapas.c.entidad == 'pedido', Pedido.id == etapas.c.entidad_id))
+        .outerjoin(ItemDomicilio, db.and_(etapas.c.entidad == 'item_domicilio',
+                                          ItemDomicilio.id == etapas.c.entidad_id))
+        .outerjoin(ItemMenu, ItemMenu.id == item_menu_id)
+        .outerjoin(CategoriaMenu, CategoriaMenu.id == ItemMenu.categoria_id)
+        .where(
+            etapas.c.inicio < hasta,
+            etapas.c.fin.isnot(None),
+            etapas.c.etapa.in_(ETAPAS),
+            etapas.c.siguiente != EstadoDomicilio.CANCELADO,
+        )
+        .group_by(item_menu_id, ItemMenu.nombre, producto, CategoriaMenu.nombre, hora, etapas.c.etapa)
+    ).all()
+
+
+def _sumar(destino, etapa, cantidad, segundos, maximo):
+    actual = destino.setdefault(etapa, [0, 0.0, 0.0])
+    actual[0] += cantidad
+    actual[1] += segundos
+    actual[2] = max(actual[2], maximo)
+
+
+def _resumen(acumulado):
+    """{etapa: [cantidad, segundos, máximo]} -> {etapa: {'cantidad', 'promedio_minutos', 'maximo_minutos'}}"""
+    return {
+        etapa: {
+            'cantidad': cantidad,
+            'promedio_minutos': round(segundos / cantidad / 60, 1),
+            'maximo_minutos': round(maximo / 60, 1),
+        }
+        for etapa, (cantidad, segundos, maximo) in acumulado.items()
+        if cantidad
+    }
+
+
+def tiempos_preparacion(desde, hasta, entidades=ENTIDADES_PRODUCTO):
+    """
+    Duración de cada etapa (pendiente, preparando, listo, en_camino) de las
+    etapas que empezaron en [desde, hasta):
+    {
+        'por_producto': [{'item_menu_id', 'producto', 'estacion', 'etapas'}],
+        'por_estacion': {estacion: etapas},
+        'por_hora': {hora: etapas},
+    }
+    donde etapas = {etapa: {'cantidad', 'promedio_minutos', 'maximo_minutos'}}.
+    Los productos escritos a mano se agrupan por su texto.
+    """
+    por_producto = {}
+    por_estacion = {}
+    por_hora = {}
+    for fila in _consulta_etapas(desde, hasta, entidades):
+        segundos = float(fila.segundos or 0)
+        maximo = float(fila.maximo or 0)
+        _sumar(por_hora.setdefault(fila.hora, {}), fila.etapa, fila.cantidad, segundos, maximo)
+        if fila.producto is None:
+            # Domicilio completo: no es un producto
+            continue
+        estacion = cola_tickets.estacion_para(fila.categoria)
+        _sumar(por_estacion.setdefault(estacion, {}), fila.etapa, fila.cantidad, segundos, maximo)
+        clave = fila.item_menu_id or fila.producto
+        producto = por_producto.setdefault(clave, {
+            'item_menu_id': fila.item_menu_id,
+            'producto': fila.platillo or fila.producto,
+            'estacion': estacion,
+            'etapas': {},
+        })
+        _sumar(producto['etapas'], fila.etapa, fila.cantidad, segundos, maximo)
+
+    for producto in por_producto.values():
+        producto['etapas'] = _resumen(producto['etapas'])
+    return {
+        'por_producto': sorted(por_producto.values(), key=lambda p: p['producto'].lower()),
+        'por_estacion': {estacion: _resumen(etapas) for estacion, etapas in sorted(por_estacion.items())},
+        'por_hora': {hora: _resumen(etapas) for hora, etapas in sorted(por_hora.items())},
+    }
@@ -0,0 +1,404 @@
+"""
+Ranking de ventas por platillo y por categoría del menú.
+
+RAZÓN: Pedido.producto es texto libre ("Bandeja paisa", "bandeja  paisa",
+"Bandeja Paísa"...), así que los más vendidos exigían agrupar todos los
+pedidos por un texto sin índice y con variantes de escritura. Ahora cada
+pedido guarda item_menu_id (los antiguos se vinculan con la migración 0005)
+y el ranking agrupa por ese entero.
+
+Los días operativos ya cerrados (de 03:00 a 03:00) no cambian, así que se
+calculan una sola vez y quedan en VentasDia/VentaItemDia, una fila por
+sucursal; un reporte de un año suma esas filas y solo agrupa en vivo los
+pedidos de hoy. El reporte de una sucursal lee sus filas (ver sucursales.py)
+y el consolidado suma las de todas. Si un día cerrado cambia (un domicilio
+cancelado tarde), invalidar_dia() lo borra y se recalcula en la siguiente
+consulta.
+"""
+
+import difflib
+import re
+import unicodedata
+from collections import Counter
+from datetime import datetime, date, timedelta
+
+from sqlalchemy.exc import IntegrityError
+
+from cache_local import CacheLRU
+from extensiones import db
+from modelos import (
+    Sucursal,
+    Pedido,
+    ItemMenu,
+    CategoriaMenu,
+    EstadoDomicilio,
+    Domicilio,
+    ItemDomicilio,
+    VentasDia,
+    VentaItemDia,
+)
+from ocupacion import HORA_INICIO_DIA, dia_operativo
+from sucursales import sucursal_actual_id, todas_las_sucursales
+
+# Similitud mínima (0-1) para aceptar un nombre escrito distinto al del menú
+SIMILITUD_MINIMA = 0.88
+
+# Rangos que incluyen el día en curso cambian con cada pedido
+TTL_DIA_ABIERTO = 60
+TTL_DIAS_CERRADOS = 3600
+
+cache_rankings = CacheLRU(max_elementos=64)
+
+
+# =========================
+# VINCULAR PRODUCTOS AL MENÚ
+# =========================
+
+def normalizar_nombre(texto):
+    """'  Bandeja Paísa!! ' -> 'bandeja paisa'"""
+    texto = unicodedata.normalize('NFKD', texto or '')
+    texto = ''.join(c for c in texto if not unicodedata.combining(c)).lower()
+    return ' '.join(re.sub(r'[^a-z0-9]+', ' ', texto).split())
+
+
+class EmparejadorProductos:
+    """Encuentra el ItemMenu que corresponde a un nombre escrito a mano"""
+
+    def __init__(self, items=None):
+        items = ItemMenu.query.all() if items is None else items
+        self._por_nombre = {}
+        ambiguos = set()
+        for item in items:
+            nombre = normalizar_nombre(item.nombre)
+            if nombre in self._por_nombre and self._por_nombre[nombre] != item.id:
+                ambiguos.add(nombre)
+            self._por_nombre.setdefault(nombre, item.id)
+        # Dos platillos con el mismo nombre: no se adivina cuál era
+        for nombre in ambiguos:
+            del self._por_nombre[nombre]
+        self._nombres = list(self._por_nombre)
+        self._resultados = {}
+
+    def buscar(self, texto):
+        """id del ItemMenu o None si no hay uno suficientemente parecido"""
+        if texto in self._resultados:
+            return self._resultados[texto]
+        nombre = normalizar_nombre(texto)
+        item_id = self._por_nombre.get(nombre)
+        if item_id is None and nombre:
+            parecidos = difflib.get_close_matches(nombre, self._nombres, n=2, cutoff=SIMILITUD_MINIMA)
+            # Solo si el parecido no es igual de cercano a otro platillo
+            if len(parecidos) == 1:
+                item_id = self._por_nombre[parecidos[0]]
+        self._resultados[texto] = item_id
+        return item_id
+
+
+def _vincular(modelo, columna_nombre, desde_id, hasta_id, emparejador):
+    """Vincula las filas de modelo con id en (desde_id, hasta_id] sin item_menu_id"""
+    rango = [modelo.id > desde_id, modelo.id <= hasta_id, modelo.item_menu_id.is_(None)]
+    nombres = db.session.scalars(db.select(columna_nombre).where(*rango).distinct()).all()
+
+    por_item = {}
+    for nombre in nombres:
+        item_id = emparejador.buscar(nombre)
+        if item_id is not None:
+            por_item.setdefault(item_id, []).append(nombre)
+
+    vinculados = 0
+    for item_id, variantes in por_item.items():
+        vinculados += db.session.execute(
+            db.update(modelo).where(*rango, columna_nombre.in_(variantes)).values(item_menu_id=item_id)
+        ).rowcount
+    return vinculados
+
+
+def vincular_pedidos(desde_id, hasta_id, emparejador):
+    """Backfill: vincula los pedidos con id en (desde_id, hasta_id]. Retorna cuántos. No hace commit"""
+    return _vincular(Pedido, Pedido.producto, desde_id, hasta_id, emparejador)
+
+
+def vincular_items_domicilio(desde_id, hasta_id, emparejador):
+    return _vincular(ItemDomicilio, ItemDomicilio.producto_nombre, desde_id, hasta_id, emparejador)
+
+
+# =========================
+# AGREGADOS POR DÍA
+# =========================
+
+def inicio_dia(dia):
+    return datetime.combine(dia, datetime.min.time()) + timedelta(hours=HORA_INICIO_DIA)
+
+
+def expresion_dia(columna):
+    """Día operativo de una columna DateTime, calculado en SQL"""
+    if db.session.get_bind().dialect.name == 'sqlite':
+        return db.func.date(columna, f'-{HORA_INICIO_DIA} hours')
+    return db.cast(columna - timedelta(hours=HORA_INICIO_DIA), db.Date)
+
+
+def como_fecha(valor):
+    # SQLite devuelve date() como texto
+    return date.fromisoformat(valor) if isinstance(valor, str) else valor
+
+
+def _ventas_por_item(desde, hasta, por_dia=False, por_sucursal=False):
+    """
+    {(sucursal_id o None, dia o None, item_menu_id o None): [unidades, ingresos]}
+    de los pedidos de mesa y los domicilios no cancelados entre dos días
+    operativos (inclusive). Dos consultas agrupadas; el rango usa
+    ix_pedido_sucursal_fecha_item_menu (o ix_pedido_fecha_item_menu sin filtro de sucursal).
+    """
+    inicio, fin = inicio_dia(desde), inicio_dia(hasta + timedelta(days=1))
+    consultas = [
+        (Pedido.sucursal_id, Pedido.fecha, Pedido.item_menu_id, Pedido.cantidad, Pedido.precio_unitario,
+         lambda q: q.select_from(Pedido)),
+        (Domicilio.sucursal_id, Domicilio.fecha_pedido, ItemDomicilio.item_menu_id, ItemDomicilio.cantidad,
+         ItemDomicilio.precio_unitario,
+         lambda q: q.select_from(ItemDomicilio).join(Domicilio, ItemDomicilio.domicilio_id == Domicilio.id)
+                    .where(Domicilio.estado != EstadoDomicilio.CANCELADO)),
+    ]
+
+    ventas = {}
+    for columna_sucursal, fecha, item_menu_id, cantidad, precio, origen in consultas:
+        sucursal = columna_sucursal if por_sucursal else db.literal(None)
+        dia = expresion_dia(fecha) if por_dia else db.literal(None)
+        grupos = ([sucursal] if por_sucursal else []) + ([dia] if por_dia else [])
+        consulta = origen(db.select(
+            sucursal,
+            dia,
+            item_menu_id,
+            db.func.sum(cantidad),
+            db.func.sum(cantidad * precio)
+        )).where(fecha >= inicio, fecha < fin).group_by(*grupos, item_menu_id)
+        for sucursal_id, valor_dia, item_id, unidades, ingresos in db.session.execute(consulta):
+            fila = ventas.setdefault((sucursal_id, como_fecha(valor_dia), item_id), [0, 0])
+            fila[0] += unidades or 0
+            fila[1] += ingresos or 0
+    return ventas
+
+
+def _calcular_dias(faltan):
+    """Guarda VentasDia/VentaItemDia de los (sucursal_id, día) cerrados que faltan, con un commit"""
+    dias = [dia for _, dia in faltan]
+    with todas_las_sucursales():
+        ventas = _ventas_por_item(min(dias), max(dias), por_dia=True, por_sucursal=True)
+    totales = {clave: [0, 0] for clave in faltan}
+    filas = []
+    for (sucursal_id, dia, item_id), (unidades, ingresos) in ventas.items():
+        if (sucursal_id, dia) not in totales:
+            continue  # Día entre medio que ya estaba calculado
+        totales[sucursal_id, dia][0] += unidades
+        totales[sucursal_id, dia][1] += ingresos
+        if item_id is not None:
+            filas.append({'sucursal_id': sucursal_id, 'dia': dia, 'item_menu_id': item_id,
+                          'unidades': unidades, 'ingresos': ingresos})
+
+    ahora = datetime.now()
+    try:
+        db.session.execute(db.insert(VentasDia.__table__), [
+            {'sucursal_id': sucursal_id, 'dia': dia, 'unidades': unidades, 'ingresos': ingresos,
+             'fecha_calculo': ahora}
+            for (sucursal_id, dia), (unidades, ingresos) in totales.items()
+        ])
+        if filas:
+            db.session.execute(db.insert(VentaItemDia.__table__), filas)
+        db.session.commit()
+    except IntegrityError:
+        # Otro worker calculó los mismos días al mismo tiempo
+        db.session.rollback()
+
+
+def asegurar_dias_cerrados(desde, hasta, hoy=None):
+    """
+    Calcula los días cerrados del rango que aún no tienen agregados, de todas
+    las sucursales a la vez. Retorna cuántos (sucursal, día) calculó.
+    """
+    hoy = hoy or dia_operativo(datetime.now())
+    ultimo = min(hasta, hoy - timedelta(days=1))
+    if ultimo < desde:
+        return 0
+    with todas_las_sucursales():
+        sucursales = db.session.scalars(db.select(Sucursal.id)).all()
+        calculados = set(db.session.execute(
+            db.select(VentasDia.sucursal_id, VentasDia.dia).where(VentasDia.dia >= desde, VentasDia.dia <= ultimo)
+        ).tuples())
+    dias = [desde + timedelta(days=i) for i in range((ultimo - desde).days + 1)]
+    faltan = [(sucursal_id, dia) for dia in dias for sucursal_id in sucursales
+              if (sucursal_id, dia) not in calculados]
+    if faltan:
+        _calcular_dias(faltan)
+    return len(faltan)
+
+
+def unidades_por_item(desde, hasta):
+    """
+    {item_menu_id: unidades} de la sucursal de la petición entre dos días
+    cerrados (inclusive). Solo lee: suma los agregados que ya existen y agrupa
+    en vivo los días que aún no se han calculado, sin guardarlos (eso lo hace
+    asegurar_dias_cerrados(), con commit).
+    """
+    unidades = Counter()
+    for item_id, total in db.session.execute(
+        db.select(VentaItemDia.item_menu_id, db.func.sum(VentaItemDia.unidades))
+        .where(VentaItemDia.dia >= desde, VentaItemDia.dia <= hasta)
+        .group_by(VentaItemDia.item_menu_id)
+    ):
+        unidades[item_id] += total or 0
+
+    calculados = set(db.session.scalars(
+        db.select(VentasDia.dia).where(VentasDia.dia >= desde, VentasDia.dia <= hasta)
+    ))
+    faltan = {desde + timedelta(days=i) for i in range((hasta - desde).days + 1)} - calculados
+    if faltan:
+        for (_, dia, item_id), (total, _) in _ventas_por_item(min(faltan), max(faltan), por_dia=True).items():
+            if dia in faltan and item_id is not None:
+                unidades[item_id] += total
+    return dict(unidades)
+
+
+def invalidar_dia(momento):
+    """
+    Borra los agregados del día operativo de `momento` (de la sucursal de la
+    petición) para que se recalculen. Llamar al modificar ventas de un día ya
+    cerrado; no hace commit.
+    """
+    dia = dia_operativo(momento)
+    if dia >= dia_operativo(datetime.now()):
+        return
+    db.session.execute(db.delete(VentaItemDia).where(VentaItemDia.dia == dia))
+    db.session.execute(db.delete(VentasDia).where(VentasDia.dia == dia))
+    cache_rankings.limpiar()
+
+
+def invalidar_todo():
+    """Después de vincular pedidos antiguos al menú. No hace commit"""
+    db.session.execute(db.delete(VentaItemDia))
+    db.session.execute(db.delete(VentasDia))
+    cache_rankings.limpiar()
+
+
+# =========================
+# REPORTE
+# =========================
+
+def ranking_ventas(desde, hasta):
+    """
+    Ventas por platillo y por categoría entre dos días operativos (inclusive).
+    Retorna {'productos': [...], 'categorias': [...], 'sin_vincular': {...},
+             'unidades': total, 'ingresos': total}, ordenado por ingresos.
+    """
+    hoy = dia_operativo(datetime.now())
+    clave = (sucursal_actual_id(), desde, hasta)
+    resultado = cache_rankings.obtener(clave)
+    if resultado is not None:
+        return resultado
+
+    asegurar_dias_cerrados(desde, hasta, hoy)
+
+    # Días cerrados: suma de los agregados
+    por_item = {
+        item_id: [unidades or 0, ingresos or 0]
+        for item_id, unidades, ingresos in db.session.execute(
+            db.select(VentaItemDia.item_menu_id, db.func.sum(VentaItemDia.unidades), db.func.sum(VentaItemDia.ingresos))
+            .where(VentaItemDia.dia >= desde, VentaItemDia.dia <= hasta)
+            .group_by(VentaItemDia.item_menu_id)
+        )
+    }
+    unidades_total, ingresos_total = db.session.execute(
+        db.select(db.func.sum(VentasDia.unidades), db.func.sum(VentasDia.ingresos))
+        .where(VentasDia.dia >= desde, VentasDia.dia <= hasta)
+    ).one()
+    unidades_total, ingresos_total = unidades_total or 0, ingresos_total or 0
+
+    # Día en curso: en vivo
+    if desde <= hoy <= hasta:
+        for (_, _, item_id), (unidades, ingresos) in _ventas_por_item(hoy, hoy).items():
+            unidades_total += unidades
+            ingresos_total += ingresos
+            if item_id is not None:
+                fila = por_item.setdefault(item_id, [0, 0])
+                fila[0] += unidades
+                fila[1] += ingresos
+
+    # Datos planos: el resultado queda en caché más allá de la sesión de la petición
+    items_menu = {
+        item_id: (nombre, categoria_id, categoria)
+        for item_id, nombre, categoria_id, categoria in db.session.execute(
+            db.select(ItemMenu.id, ItemMenu.nombre, ItemMenu.categoria_id, CategoriaMenu.nombre)
+            .join(CategoriaMenu, ItemMenu.categoria_id == CategoriaMenu.id)
+            .where(ItemMenu.id.in_(por_item))
+        )
+    } if por_item else {}
+    categorias = {}
+    items = []
+    for item_id, (unidades, ingresos) in por_item.items():
+        if item_id not in items_menu:
+            continue
+        nombre, categoria_id, nombre_categoria = items_menu[item_id]
+        items.append({'id': item_id, 'nombre': nombre, 'categoria': nombre_categoria,
+                      'unidades': unidades, 'ingresos': ingresos})
+        categoria = categorias.setdefault(categoria_id, {
+            'nombre': nombre_categoria, 'unidades': 0, 'ingresos': 0, 'platillos': 0
+        })
+        categoria['unidades'] += unidades
+        categoria['ingresos'] += ingresos
+        categoria['platillos'] += 1
+
+    vinculadas_unidades = sum(fila['unidades'] for fila in items)
+    vinculados_ingresos = sum(fila['ingresos'] for fila in items)
+    for fila in items + list(categorias.values()):
+        fila['participacion'] = fila['ingresos'] / ingresos_total * 100 if ingresos_total else 0
+
+    resultado = {
+        'productos': sorted(items, key=lambda f: f['ingresos'], reverse=True),
+        'categorias': sorted(categorias.values(), key=lambda f: f['ingresos'], reverse=True),
+        'sin_vincular': {
+            'unidades': max(0, unidades_total - vinculadas_unidades),
+            'ingresos': max(0, ingresos_total - vinculados_ingresos),
+        },
+        'unidades': unidades_total,
+        'ingresos': ingresos_total,
+    }
+    ttl = TTL_DIA_ABIERTO if hasta >= hoy else TTL_DIAS_CERRADOS
+    cache_rankings.guardar(clave, resultado, ttl=ttl)
+    return resultado
+
+
+def ventas_por_sucursal(desde, hasta):
+    """
+    Ventas de cada sucursal entre dos días operativos (inclusive), para el
+    reporte consolidado. Los días cerrados salen de VentasDia; solo el día en
+    curso se agrupa en vivo.
+    Retorna {sucursal_id: {'unidades', 'ingresos', 'por_dia': {dia: ingresos}}}.
+    """
+    hoy = dia_operativo(datetime.now())
+    clave = ('consolidado', desde, hasta)
+    resultado = cache_rankings.obtener(clave)
+    if resultado is not None:
+        return resultado
+
+    asegurar_dias_cerrados(desde, hasta, hoy)
+
+    resultado = {}
+
+    def sumar(sucursal_id, dia, unidades, ingresos):
+        fila = resultado.setdefault(sucursal_id, {'unidades': 0, 'ingresos': 0, 'por_dia': {}})
+        fila['unidades'] += unidades or 0
+        fila['ingresos'] += ingresos or 0
+        fila['por_dia'][dia] = fila['por_dia'].get(dia, 0) + (ingresos or 0)
+
+    with todas_las_sucursales():
+        for sucursal_id, dia, unidades, ingresos in db.session.execute(
+            db.select(VentasDia.sucursal_id, VentasDia.dia, VentasDia.unidades, VentasDia.ingresos)
+            .where(VentasDia.dia >= desde, VentasDia.dia <= hasta)
+        ):
+            sumar(sucursal_id, dia, unidades, ingresos)
+        if desde <= hoy <= hasta:
+            for (sucursal_id, _, _), (unidades, ingresos) in _ventas_por_item(hoy, hoy, por_sucursal=True).items():
+                if sucursal_id is not None:
+                    sumar(sucursal_id, hoy, unidades, ingresos)
+
+    ttl = TTL_DIA_ABIERTO if hasta >= hoy else TTL_DIAS_CERRADOS
+    cache_rankings.guardar(clave, resultado, ttl=ttl)
+    return resultado